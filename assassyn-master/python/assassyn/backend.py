@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import os
-import inspect
 import hashlib
 import json
 from pathlib import Path
@@ -12,7 +11,7 @@ from .builder import SysBuilder
 from . import codegen
 from . import utils
 
-def config( # pylint: disable=too-many-arguments
+def config( # pylint: disable=too-many-arguments, too-many-locals
         path='./workspace',
         resource_base=None,
         pretty_printer=True,
@@ -24,6 +23,11 @@ def config( # pylint: disable=too-many-arguments
         idle_threshold=100,
         fifo_depth=4,
         random=False,
+        seed=None,
+        parallel=False,
+        library=False,
+        inline_modules=False,
+        build_profile='release',
         enable_cache=True):
     '''The helper function to dump the default configuration of elaboration.'''
     res = {
@@ -38,6 +42,11 @@ def config( # pylint: disable=too-many-arguments
         'idle_threshold': idle_threshold,
         'fifo_depth': fifo_depth,
         'random': random,
+        'seed': seed,
+        'parallel': parallel,
+        'library': library,
+        'inline_modules': inline_modules,
+        'build_profile': build_profile,
         'enable_cache': enable_cache
     }
     return res.copy()
@@ -65,16 +74,24 @@ def _generate_cache_key(sys_name: str, config_dict: dict) -> str:
     Returns:
         A string that uniquely identifies this build configuration
     '''
-    # Include only build-relevant parameters in cache key
+    # Include only build-relevant parameters in cache key. The simulator reads its thresholds
+    # and seed at runtime (see RUNTIME_PARAMS), so only the Verilog testbench bakes one in.
+    verilog = config_dict.get('verilog', False)
+    build_profile = config_dict.get('build_profile', 'release')
     cache_params = {
-        'cache_version': 2,
+        'cache_version': 5,
         'system': sys_name,
         'simulator': config_dict.get('simulator', True),
-        'verilog': config_dict.get('verilog', False),
-        'sim_threshold': config_dict.get('sim_threshold'),
-        'idle_threshold': config_dict.get('idle_threshold'),
+        'verilog': verilog,
+        'sim_threshold': config_dict.get('sim_threshold') if verilog else None,
         'fifo_depth': config_dict.get('fifo_depth'),
         'random': config_dict.get('random', False),
+        'parallel': config_dict.get('parallel', False),
+        'library': config_dict.get('library', False),
+        'inline_modules': config_dict.get('inline_modules', False),
+        'build_profile': build_profile,
+        # A binary built for the host CPU only runs on a CPU with its features
+        'native_cpu': utils.native_cpu(build_profile),
     }
 
     # Create a stable string representation and hash it
@@ -96,6 +113,15 @@ def elaborate(# pylint: disable=too-many-locals
         verilog (bool): Whether to generate the SystemVerilog code.
         idle_threshold (int): The threshold for the idle state to terminate the simulation.
         sim_threshold (int): The threshold for the simulation to terminate.
+        seed (int): The seed of the module order shuffled under `random`.
+        parallel (bool | int): Whether to evaluate the modules of a cycle on several threads,
+            by default one per core, or this many.
+        library (bool): Whether to also build the simulator as a shared library, which
+            `utils.open_simulator` loads to step, peek and poke the simulation from Python.
+        inline_modules (bool): Whether to mark the generated module functions `#[inline]`,
+            trading build time for a cycle loop the compiler can flatten.
+        build_profile (str): How `utils.build_simulator` builds the simulator: `release`,
+            `fast-compile`, `max-throughput` or `pgo`, trained on a run of the simulator.
         **kwargs: The optional arguments that will be passed to the code generator.
     '''
 
@@ -106,27 +132,42 @@ def elaborate(# pylint: disable=too-many-locals
             raise ValueError(f'Invalid config key: {k}')
         real_config[k] = v
 
-    frame = inspect.stack()[1]
-    caller_file = frame.filename
-    source_dir = os.path.dirname(os.path.abspath(caller_file))
+    build_profile = real_config['build_profile']
+    if build_profile not in utils.BUILD_PROFILES:
+        raise ValueError(f'Invalid build profile: {build_profile}, '
+                         f'expected one of {list(utils.BUILD_PROFILES)}')
+    if real_config['library'] and build_profile in utils.ABORTING_PROFILES:
+        raise ValueError(f'A simulator library unwinds, which {build_profile} aborts')
 
     ir_hash = hashlib.sha256(repr(sys).encode()).hexdigest()[:24]
     config_hash = _generate_cache_key(sys.name, real_config)
     cache_key = f"{ir_hash}_{config_hash}"
 
     # Avoid collisions in global `CARGO_TARGET_DIR` by using a unique simulator
-    # crate/binary name per (IR, config). Without this, two different systems
-    # with the same `sys.name` can overwrite each other's simulator binaries.
+    # crate/binary name per (output directory, config). Without this, two different systems
+    # with the same `sys.name` can overwrite each other's simulator binaries. The name leaves
+    # the IR out, so that Cargo rebuilds an edited design incrementally.
     if real_config.get('simulator', True) and real_config.get('simulator_crate_name') is None:
         config_suffix = config_hash.split('_')[-1]
-        real_config['simulator_crate_name'] = f"{sys.name}_{ir_hash[:8]}_{config_suffix}"
+        path_hash = hashlib.sha256(os.path.abspath(real_config['path']).encode()).hexdigest()
+        real_config['simulator_crate_name'] = f"{sys.name}_{path_hash[:8]}_{config_suffix}"
+
+    # These are runtime parameters of the simulator, which `run_simulator` passes to whatever
+    # binary this call returns, cached or not.
+    runtime_params = {k: real_config[k] for k in ('sim_threshold', 'idle_threshold', 'seed')}
 
-    # Check cache if source directory was detected and caching is enabled
-    if source_dir and real_config.get('simulator', True) and real_config.get('enable_cache', True):
-        cached = utils.check_build_cache(source_dir, cache_key)
+    # The build an earlier elaboration left pending is not the one built next
+    utils.CACHE_PENDING = None
+
+    # Check the shared build cache if caching is enabled
+    if real_config.get('simulator', True) and real_config.get('enable_cache', True):
+        # A hit copies the cached Verilog, if any, where this elaboration would generate it
+        verilog_dir = os.path.join(real_config['path'], sys.name, 'verilog')
+        cached = utils.check_build_cache(cache_key, verilog_dir)
         if cached:
             binary_path, verilog_path = cached
-            print(f"[Cache Hit] Using cached build from {source_dir}")
+            utils.RUNTIME_PARAMS[os.path.abspath(binary_path)] = runtime_params
+            print(f"[Cache Hit] Using cached build {cache_key}")
             print(f"Binary: {binary_path}")
             if verilog_path:
                 print(f"Verilog: {verilog_path}")
@@ -144,11 +185,50 @@ def elaborate(# pylint: disable=too-many-locals
     # Update the path in config to point to the system directory
     real_config['path'] = str(sys_dir)
 
-    # Generate code
+    # Generate code. The simulator versions its checkpoints against the IR hash.
+    real_config['ir_hash'] = ir_hash
     simulator_manifest, verilog_path = codegen.codegen(sys, **real_config)
+    if simulator_manifest:
+        utils.RUNTIME_PARAMS[os.path.abspath(simulator_manifest)] = runtime_params
 
     # Store cache info globally for build_simulator to use after building
-    if source_dir and real_config.get('enable_cache', True):
-        utils.CACHE_PENDING = (source_dir, cache_key, verilog_path)
+    if real_config.get('simulator', True) and real_config.get('enable_cache', True):
+        utils.CACHE_PENDING = (cache_key, verilog_path)
 
     return [simulator_manifest, verilog_path]
+
+def elaborate_many(systems, **kwargs):
+    '''
+    Elaborate several systems with one configuration, and build the simulators of those the
+    build cache misses with one cargo build, which compiles them in parallel.
+    Args:
+        systems (list[SysBuilder]): The systems to be elaborated, of distinct names.
+        **kwargs: The configuration of every system, as for `elaborate`.
+    Returns:
+        dict: The simulator binary of each system, built or cached, for `utils.run_simulator`.
+    '''
+    names = [sys.name for sys in systems]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f'Systems elaborated together share a directory: {duplicates}')
+    if not kwargs.get('simulator', True):
+        raise ValueError('elaborate_many builds simulators; use elaborate for Verilog only')
+
+    binaries = {}
+    pending = []
+    for sys in systems:
+        simulator_path, _ = elaborate(sys, **kwargs)
+        if str(simulator_path).endswith('.toml'):
+            pending.append((sys, simulator_path, utils.CACHE_PENDING))
+        else:
+            binaries[sys] = simulator_path
+        utils.CACHE_PENDING = None
+
+    built = utils.build_simulators([manifest for _, manifest, _ in pending])
+    for (sys, _, cache_data), binary_path in zip(pending, built):
+        if cache_data is not None:
+            cache_key, verilog_path = cache_data
+            utils.save_build_cache(cache_key, binary_path, verilog_path)
+            print("[Cache Saved] Build cached for future use")
+        binaries[sys] = binary_path
+    return {sys: binaries[sys] for sys in systems}
@@ -34,6 +34,37 @@ __all__ = [
 ]
 
 
+# Whether each source file seen by `_source_location` is the user's, i.e. neither part of
+# assassyn nor of an installed package, by the file name of its code objects
+_USER_FILES: dict[str, bool] = {}
+
+
+def _is_user_file(filename: str) -> bool:
+    user = _USER_FILES.get(filename)
+    if user is None:
+        from ..utils import package_path  # pylint: disable=import-outside-toplevel
+        Singleton.initialize_dirs_to_exclude()
+        path = os.path.abspath(filename)
+        excluded = [os.path.abspath(package_path())] + Singleton.all_dirs_to_exclude
+        user = not any(path.startswith(exclude_dir) for exclude_dir in excluded)
+        _USER_FILES[filename] = user
+    return user
+
+
+def _source_location(frame) -> str | None:
+    '''The `file:line` of the innermost user frame from `frame` outwards, if any.
+
+    The frames are walked as they are, rather than through `inspect.stack()`, which reads the
+    source lines of every frame of the stack for each IR node.
+    '''
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _is_user_file(filename):
+            return f'{filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
 def ir_builder(func=None):
     '''Decorator that records builder metadata and injects IR nodes into the AST.'''
 
@@ -48,7 +79,6 @@ def ir_builder(func=None):
 
             #pylint: disable=cyclic-import,import-outside-toplevel
             from ..ir.const import Const
-            from ..utils import package_path
             from ..ir.expr import Expr
 
             builder = Singleton.peek_builder()
@@ -68,22 +98,9 @@ def ir_builder(func=None):
                 if not already_materialized:
                     builder.insert_point.append(res)
 
-            package_dir = os.path.abspath(package_path())
-
-            Singleton.initialize_dirs_to_exclude()
-            for i in inspect.stack()[1:]:  # pylint: disable=too-many-nested-blocks
-                fname, lineno = i.filename, i.lineno
-                fname_abs = os.path.abspath(fname)
-
-                if not fname_abs.startswith(package_dir) \
-                    and not any(
-                        fname_abs.startswith(exclude_dir)
-                        for exclude_dir in Singleton.all_dirs_to_exclude
-                    ):
-                    res.loc = f'{fname}:{lineno}'
-
-                    break
-            assert hasattr(res, 'loc')
+            res.loc = None
+            if builder.source_locations:
+                res.loc = _source_location(inspect.currentframe().f_back)
             return res
 
         return _wrapper
@@ -155,6 +172,7 @@ class SysBuilder:
     _exposes: dict  # Dictionary of exposed nodes
     line_expression_tracker: dict  # Dictionary of line expression tracker
     naming_manager: NamingManager  # Naming manager
+    source_locations: bool  # Whether IR nodes record the source location they are built at
 
     @property
     def current_module(self):
@@ -259,8 +277,13 @@ class SysBuilder:
                 return i
         return None
 
-    def __init__(self, name):
+    def __init__(self, name, source_locations=None):
+        '''Build the system `name`, recording the source location of each IR node unless
+        `source_locations` is false, by default unless `ASSASSYN_SOURCE_LOCATIONS=0`.'''
         self.name = name
+        if source_locations is None:
+            source_locations = os.environ.get('ASSASSYN_SOURCE_LOCATIONS', '1') != '0'
+        self.source_locations = source_locations
         self.modules = []
         self.downstreams = []
         self.arrays = []
@@ -15,6 +15,8 @@ def codegen(sys: SysBuilder, **kwargs):
         idle_threshold: Idle threshold for the simulator
         sim_threshold: Simulation threshold
         random: Whether to randomize module execution order
+        seed: Seed of the randomized module order, which the simulator takes at runtime
+        parallel: Whether to evaluate the modules of a cycle on several threads
         resource_base: Path to resource files
         fifo_depth: Default FIFO depth
     '''
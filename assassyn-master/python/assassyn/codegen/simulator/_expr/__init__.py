@@ -22,8 +22,11 @@ from ....ir.expr import (
 from ....ir.expr.intrinsic import PureIntrinsic, Intrinsic
 from ....ir.expr.call import Bind
 from ....ir.array import Slice
-from ..utils import dtype_to_rust_type
-from ..node_dumper import dump_rval_ref
+from ....ir.dtype import Bits
+from ....utils import unwrap_operand
+from ..utils import dtype_to_rust_type, int_imm_dumper_impl, WIDE_INT_MAX_BITS
+from ..node_dumper import dump_rval_ref, dump_rval_as
+from ..trace_formats import get_log_formats, trace_arg_bytes
 from .array import codegen_array_read, codegen_array_write
 from .arith import codegen_binary_op, codegen_unary_op
 from .intrinsics import codegen_intrinsic, codegen_pure_intrinsic
@@ -31,60 +34,130 @@ from .call import codegen_async_call, codegen_fifo_pop, codegen_fifo_push, codeg
 
 
 def codegen_log(node: Log, module_ctx):
-    """Generate code for log operations."""
-    module_name = module_ctx.name
-    result = [f'print!("@line:{{:<5}} {{:<10}}: [{module_name}]\\t", line!(), cyclize(sim.stamp));']
-    result.append("println!(")
-    result.append(f"{dump_rval_ref(module_ctx, node.operands[0])}, ")
+    """Generate code for log operations.
 
-    for elem in node.operands[1:]:
+    The arguments are evaluated only when the logger admits this module and cycle. They are
+    then either appended to the binary trace, under the format ID registered for this log, or
+    formatted into a line of the simulator's buffered log sink. In a parallel simulator, the
+    logger is the module's own lane (see `LogFormatTable.sink`).
+    """
+    module_name = module_ctx.name
+    fmt = dump_rval_ref(module_ctx, node.operands[0])
+    values = node.operands[1:]
+    format_id = get_log_formats().register(
+        module_name, unwrap_operand(node.operands[0]), [elem.dtype for elem in values])
+    sink = get_log_formats().sink(module_name)
+    result = [f'if {sink}.enabled("{module_name}", sim.stamp) {{']
+
+    args = []
+    for i, elem in enumerate(values):
         dump = dump_rval_ref(module_ctx, elem)
         dtype = elem.dtype
         if dtype.bits == 1:
             dump = f"if {dump} {{ 1 }} else {{ 0 }}"
-        result.append(f"{dump}, ")
+        # Borrow the arguments first, so that they do not overlap the logger's borrow of sim
+        result.append(f"let arg_{i} = &({dump});")
+        args.append(f"arg_{i}")
+
+    result.append("let stamp = sim.stamp;")
+    result.append(f"if let Some(trace) = {sink}.tracer() {{")
+    result.append(f"trace.record(stamp, {format_id});")
+    for arg, elem in zip(args, values):
+        result.append(f"trace.arg({arg}, {trace_arg_bytes(elem.dtype.bits)});")
+    result.append("} else {")
+    result.append(f"let out = {sink}.writer();")
+    result.append(f'write!(out, "@line:{{:<5}} Cycle @{{}}.{{:02}}: [{module_name}]\\t", '
+                  'line!(), stamp / 100, stamp % 100).unwrap();')
+    result.append(f"writeln!(out, {', '.join([fmt] + args)}).unwrap();")
+    result.append("}")
+    result.append("}")
+    return "\n".join(result)
+
+
+def _carrier_type(bits: int) -> str:
+    """The narrowest unsigned Rust type that holds `bits` bits, used for shift/mask lowering."""
+    return dtype_to_rust_type(Bits(max(bits, 8)))
+
+
+def _carrier_bits(bits: int) -> int:
+    if bits > 128:
+        return (bits + 63) // 64 * 64
+    return 1 << (max(bits, 8) - 1).bit_length()
+
+
+def _mask_literal(carrier_bits: int, bits: int) -> str:
+    """A literal of the carrier type for `bits` bits with the low `bits` bits set."""
+    return int_imm_dumper_impl(Bits(max(carrier_bits, 8)), (1 << bits) - 1)
+
+
+def _shift_amount(carrier: str, amount: int) -> str:
+    # The wide integers shift by `usize` or by themselves, so pin the literal's type.
+    return f"{amount}usize" if carrier.startswith("UWide") else str(amount)
 
-    result.append(")")
-    return "".join(result)
+
+def _cast_to(rust_ty: str, value: str) -> str:
+    return f"ValueCastTo::<{rust_ty}>::cast(&{value})"
+
+
+def _cast_from_big(rust_ty: str, value: str) -> str:
+    """Cast the `BigUint` variable `value` to `rust_ty`, unless that is `BigUint` already."""
+    return value if rust_ty == "BigUint" else _cast_to(rust_ty, value)
 
 
 def codegen_slice(node: Slice, module_ctx):
-    """Generate code for slice operations."""
-    a = dump_rval_ref(module_ctx, node.x)
+    """Generate code for slice operations.
+
+    Bits [l, r] are extracted on the narrowest unsigned type that holds bit r, with the
+    mask emitted as a literal. BigUint is only used when r is beyond WIDE_INT_MAX_BITS.
+    """
     l = node.l.value.value
     r = node.r.value.value
-    dtype = node.dtype
+    dest = dtype_to_rust_type(node.dtype)
     num_bits = r - l + 1
-    mask_bits = "1" * num_bits
 
-    if l < 64 and r < 64:
-        result_a = f'''let a = ValueCastTo::<u64>::cast(&{a});
-        let mask = u64::from_str_radix("{mask_bits}", 2).unwrap();'''
-    else:
-        result_a = f'''let a = ValueCastTo::<BigUint>::cast(&{a});
-        let mask = BigUint::parse_bytes("{mask_bits}".as_bytes(), 2).unwrap();'''
-
-    return f"""{{
-                {result_a}
+    if r + 1 > WIDE_INT_MAX_BITS:
+        return f"""{{
+                let a = {dump_rval_as(module_ctx, node.x, 'BigUint')};
+                let mask = (BigUint::from(1u8) << {num_bits}) - 1u8;
                 let res = (a >> {l}) & mask;
-                ValueCastTo::<{dtype_to_rust_type(dtype)}>::cast(&res)
+                {_cast_from_big(dest, 'res')}
             }}"""
 
+    carrier = _carrier_type(r + 1)
+    res = dump_rval_as(module_ctx, node.x, carrier)
+    if l != 0:
+        res = f"({res} >> {_shift_amount(carrier, l)})"
+    if num_bits < _carrier_bits(r + 1):
+        res = f"({res} & {_mask_literal(r + 1, num_bits)})"
+    return res if carrier == dest else _cast_to(dest, res)
+
 
 def codegen_concat(node: Concat, module_ctx):
-    """Generate code for concatenation operations."""
+    """Generate code for concatenation operations.
+
+    Both halves are masked to their widths with literal masks and combined on the narrowest
+    unsigned type that holds the result. BigUint is only used beyond WIDE_INT_MAX_BITS.
+    """
     dtype = node.dtype
-    a = dump_rval_ref(module_ctx, node.msb)
-    b = dump_rval_ref(module_ctx, node.lsb)
+    dest = dtype_to_rust_type(dtype)
+    a_bits = node.msb.dtype.bits
     b_bits = node.lsb.dtype.bits
+    bits = a_bits + b_bits
 
-    return f"""{{
-                let a = ValueCastTo::<BigUint>::cast(&{a});
-                let b = ValueCastTo::<BigUint>::cast(&{b});
+    if bits > WIDE_INT_MAX_BITS:
+        return f"""{{
+                let a = {dump_rval_as(module_ctx, node.msb, 'BigUint')};
+                let b = {dump_rval_as(module_ctx, node.lsb, 'BigUint')};
                 let c = (a << {b_bits}) | b;
-                ValueCastTo::<{dtype_to_rust_type(dtype)}>::cast(&c)
+                {_cast_from_big(dest, 'c')}
             }}"""
 
+    carrier = _carrier_type(bits)
+    msb = f"({dump_rval_as(module_ctx, node.msb, carrier)} & {_mask_literal(bits, a_bits)})"
+    lsb = f"({dump_rval_as(module_ctx, node.lsb, carrier)} & {_mask_literal(bits, b_bits)})"
+    res = f"(({msb} << {_shift_amount(carrier, b_bits)}) | {lsb})"
+    return res if carrier == dest else _cast_to(dest, res)
+
 
 def codegen_select(node: Select, module_ctx):
     """Generate code for select operations."""
@@ -104,9 +177,9 @@ assert!(cond.count_ones() == 1, "Select1Hot: condition is not 1-hot");''']
     for i, value in enumerate(node.values):
         if i != 0:
             result.append(" else ")
-        value_ref = dump_rval_ref(module_ctx, value)
+        value_ref = dump_rval_as(module_ctx, value, target_type)
         result.append(f'''if cond >> {i} & 1 != 0
-{{ ValueCastTo::<{target_type}>::cast(&{value_ref}) }}''')
+{{ {value_ref} }}''')
 
     result.append(" else { unreachable!() } }")
     return "".join(result)
@@ -114,11 +187,8 @@ assert!(cond.count_ones() == 1, "Select1Hot: condition is not 1-hot");''']
 
 def codegen_cast(node: Cast, module_ctx):
     """Generate code for cast operations."""
-    dest_dtype = node.dtype
-    a = dump_rval_ref(module_ctx, node.x)
-
     if node.opcode in [Cast.ZEXT, Cast.BITCAST, Cast.SEXT]:
-        return f"ValueCastTo::<{dtype_to_rust_type(dest_dtype)}>::cast(&{a})"
+        return dump_rval_as(module_ctx, node.x, dtype_to_rust_type(node.dtype))
 
     return None
 
@@ -7,57 +7,44 @@ This module contains helper functions to generate simulator code for arithmetic
 
 from ....ir.expr import BinaryOp, UnaryOp
 from ..utils import dtype_to_rust_type
-from ..node_dumper import dump_rval_ref
+from ..node_dumper import dump_rval_ref, dump_rval_as
 
 
 def codegen_binary_op(node: BinaryOp, module_ctx):
-    """Generate code for binary operations."""
+    """Generate code for binary operations.
+
+    Operands are cast to the type of the operation only if they are of another Rust type.
+    """
     binop = BinaryOp.OPERATORS[node.opcode]
 
     if node.is_comparative():
-        rust_ty = node.lhs.dtype
+        rust_ty = dtype_to_rust_type(node.lhs.dtype)
     else:
-        rust_ty = node.dtype
+        rust_ty = dtype_to_rust_type(node.dtype)
+
+    # Special handling for shift operations with signed values
+    if node.opcode == BinaryOp.SHR and node.lhs.dtype.is_signed():
+        # For signed right shift, cast to signed type first, which the result keeps
+        rust_ty = dtype_to_rust_type(node.lhs.dtype)
+
+    lhs = _dump_operand(module_ctx, node.lhs, rust_ty)
+    rhs = _dump_operand(module_ctx, node.rhs, rust_ty)
+    return f"{lhs} {binop} {rhs}"
 
-    rust_ty = dtype_to_rust_type(rust_ty)
 
+def _dump_operand(module_ctx, operand, rust_ty):
+    """Render an operand as `rust_ty`, casting it only if it is of another type."""
     # Handle intrinsics properly in binary operations
     # pylint: disable=import-outside-toplevel
     from .intrinsics import codegen_intrinsic
 
     # Check if operands are intrinsics and handle them specially
-    lhs_code = None
-    if hasattr(node.lhs, 'opcode') and hasattr(node.lhs, 'args'):
-        lhs_code = codegen_intrinsic(node.lhs, module_ctx)
-
-    if lhs_code:
-        lhs = lhs_code
-    else:
-        lhs = dump_rval_ref(module_ctx, node.lhs)
+    if hasattr(operand, 'opcode') and hasattr(operand, 'args'):
+        code = codegen_intrinsic(operand, module_ctx)
+        if code:
+            return f"ValueCastTo::<{rust_ty}>::cast(&{code})"
 
-    rhs_code = None
-    if hasattr(node.rhs, 'opcode') and hasattr(node.rhs, 'args'):
-        rhs_code = codegen_intrinsic(node.rhs, module_ctx)
-
-    if rhs_code:
-        rhs = rhs_code
-    else:
-        rhs = dump_rval_ref(module_ctx, node.rhs)
-
-    # Special handling for shift operations with signed values
-    if node.opcode == BinaryOp.SHR and node.lhs.dtype.is_signed():
-        # For signed right shift, cast to signed type first
-        if node.lhs.dtype.bits <= 64:
-            lhs = f"ValueCastTo::<i{node.lhs.dtype.bits}>::cast(&{lhs})"
-            rhs = f"ValueCastTo::<i{node.lhs.dtype.bits}>::cast(&{rhs})"
-        else:
-            lhs = f"ValueCastTo::<BigInt>::cast(&{lhs})"
-            rhs = f"ValueCastTo::<BigInt>::cast(&{rhs})"
-    else:
-        lhs = f"ValueCastTo::<{rust_ty}>::cast(&{lhs})"
-        rhs = f"ValueCastTo::<{rust_ty}>::cast(&{rhs})"
-
-    return f"{lhs} {binop} {rhs}"
+    return dump_rval_as(module_ctx, operand, rust_ty)
 
 
 def codegen_unary_op(node: UnaryOp, module_ctx):
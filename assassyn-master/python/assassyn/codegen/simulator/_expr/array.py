@@ -4,6 +4,7 @@
 
 from ....utils import namify
 from ..node_dumper import dump_rval_ref
+from ..utils import is_copy_type
 from ..port_mapper import get_port_manager
 
 
@@ -13,7 +14,8 @@ def codegen_array_read(node, module_ctx):
     idx = node.idx
     array_name = namify(array.name)
     idx_val = dump_rval_ref(module_ctx, idx)
-    return f"sim.{array_name}.payload[{idx_val} as usize].clone()"
+    value = f"sim.{array_name}.payload[{idx_val} as usize]"
+    return value if is_copy_type(node.dtype) else f"{value}.clone()"
 
 
 def codegen_array_write(node, module_ctx, module_name):
@@ -34,6 +36,6 @@ def codegen_array_write(node, module_ctx, module_name):
     return f"""{{
               let stamp = sim.stamp - sim.stamp % 100 + 50;
               let write = ArrayWrite::new(stamp, {idx_val} as usize,
-                                         {value_val}.clone(), "{module_writer}");
+                                         {value_val}, "{module_writer}");
               sim.{array_name}.write({port_idx}, write);
             }}"""
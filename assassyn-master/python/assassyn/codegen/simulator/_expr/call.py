@@ -9,7 +9,7 @@ including async calls, FIFO operations, and bindings.
 from ....ir.expr import AsyncCall, FIFOPop, FIFOPush
 from ....ir.expr.call import Bind
 from ....utils import namify
-from ..utils import fifo_name
+from ..utils import fifo_name, is_copy_type
 from ..node_dumper import dump_rval_ref
 
 
@@ -28,13 +28,14 @@ def codegen_fifo_pop(node: FIFOPop, module_ctx):
     fifo = node.fifo
     fifo_id = fifo_name(fifo)
     module_name = module_ctx.name
-    loc_info = str(getattr(node, "loc", "<unknown location>")).replace('"', '\\"')
+    loc_info = str(getattr(node, "loc", None) or "<unknown location>").replace('"', '\\"')
+    value = "*value" if is_copy_type(fifo.dtype) else "value.clone()"
 
     return f"""{{
               let stamp = sim.stamp - sim.stamp % 100 + 50;
-              sim.{fifo_id}.pop.push(FIFOPop::new(stamp, "{module_name}"));
+              sim.{fifo_id}.schedule_pop(FIFOPop::new(stamp, "{module_name}"));
               match sim.{fifo_id}.payload.front() {{
-                Some(value) => value.clone(),
+                Some(value) => {value},
                 None => panic!("{loc_info} is trying to pop an empty FIFO"),
               }}
             }}"""
@@ -49,8 +50,8 @@ def codegen_fifo_push(node: FIFOPush, module_ctx):
 
     return f"""{{
               let stamp = sim.stamp;
-              sim.{fifo_id}.push.push(
-                FIFOPush::new(stamp + 50, {value}.clone(), "{module_name}"));
+              sim.{fifo_id}.schedule_push(
+                FIFOPush::new(stamp + 50, {value}, "{module_name}"));
             }}"""
 
 
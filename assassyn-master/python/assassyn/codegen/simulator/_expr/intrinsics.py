@@ -9,6 +9,7 @@ This module contains helper functions to generate simulator code for intrinsic o
 from ....ir.expr.intrinsic import PureIntrinsic, Intrinsic, ExternalIntrinsic
 from ....utils import namify
 from ..node_dumper import dump_rval_ref
+from ..utils import dtype_to_rust_type
 
 
 def _codegen_fifo_peek(node, module_ctx):
@@ -29,7 +30,7 @@ def _codegen_value_valid(node, module_ctx):
     assert isinstance(node.get_operand(0).value, Expr)
     value = node.get_operand(0).value
     value = namify(value.as_operand())
-    return f"sim.{value}_value.is_some()"
+    return f"sim.{value}_value.is_valid(sim.stamp)"
 
 
 def _codegen_module_triggered(node, module_ctx):
@@ -49,7 +50,9 @@ def _codegen_get_mem_resp(node, module_ctx):
     """Generate code for GET_MEM_RESP intrinsic."""
     dram_module = node.args[0]
     dram_name = namify(dram_module.name)
-    return f"BigUint::from_bytes_le(&sim.{dram_name}_response.data)"
+    data = f"BigUint::from_bytes_le(&sim.{dram_name}_response.data)"
+    rust_ty = dtype_to_rust_type(node.dtype)
+    return data if rust_ty == "BigUint" else f"ValueCastTo::<{rust_ty}>::cast(&{data})"
 
 
 def _codegen_external_output_read(node, module_ctx, **_kwargs):
@@ -115,7 +118,7 @@ def _codegen_wait_until(node, module_ctx):
 
 def _codegen_finish(node, module_ctx):
     """Generate code for FINISH intrinsic."""
-    return "std::process::exit(0);"
+    return 'sim.report("finish"); finish_simulation();'
 
 
 def _codegen_assert(node, module_ctx):
@@ -0,0 +1,96 @@
+"""Backpressure: the stages a full FIFO stalls, and the pushes it drops.
+
+As in the RTL (see `codegen/verilog/cleanup.py`), a module which pops a FIFO and pushes to one
+only executes in a cycle in which every FIFO it actually pushes to is `push_ready`; the guard
+itself is emitted by `ElaborateModule`. A module which pops nothing, such as a Driver, is never
+stalled: its push into a full FIFO is dropped when the FIFO commits, and so is the event of
+the call it belongs to.
+"""
+
+from __future__ import annotations
+
+from ...ir.const import Const
+from ...ir.expr import AsyncCall, FIFOPop, FIFOPush
+from ...ir.expr.intrinsic import Intrinsic
+from ...utils import namify, unwrap_operand
+from .utils import fifo_name
+
+
+def push_guarded(module) -> bool:
+    """Whether `module` pops a FIFO and pushes to one, so that, as in the RTL, it only
+    executes in a cycle in which every FIFO it pushes to can take the push."""
+    body = getattr(module, 'body', None) or []
+    return (any(isinstance(elem, FIFOPop) for elem in body)
+            and any(isinstance(elem, FIFOPush) for elem in body))
+
+
+def push_predicates(body) -> dict:
+    """The predicates of the pushes in `body`, by FIFO: for each push, the list of the
+    conditions it is taken under, i.e. its `meta_cond` and the `wait_until` conditions before
+    it, leaving out those always true."""
+    predicates = {}
+    waits = []
+    for elem in body:
+        if isinstance(elem, Intrinsic) and elem.opcode == Intrinsic.WAIT_UNTIL:
+            waits.append(unwrap_operand(elem.args[0]))
+        elif isinstance(elem, FIFOPush):
+            conds = [elem.meta_cond] + waits
+            predicates.setdefault(elem.fifo, []).append(
+                [c for c in conds if not (c is None or isinstance(c, Const) and c.value)])
+    return predicates
+
+
+def retracting_callers(sys) -> dict:
+    """The FIFOs into which a stage which pops no FIFO pushes as part of an async call, each
+    with the name of its module, the callee, and the names of those stages.
+
+    Such a stage is not gated by its pushes, so a push of its call into a full FIFO is dropped,
+    and `tick_registers` retracts the event of the call, as the RTL gates the trigger of a
+    call on the `push_ready` of its pushes.
+    """
+    result = {}
+    for module in sys.modules:
+        body = module.body or []
+        if any(isinstance(elem, FIFOPop) for elem in body):
+            continue
+        for call in body:
+            if not isinstance(call, AsyncCall):
+                continue
+            for push in map(unwrap_operand, call.bind.pushes):
+                if push.parent is not module:
+                    continue
+                callee = namify(call.bind.callee.name)
+                _, callers = result.setdefault(fifo_name(push.fifo), (callee, []))
+                if module.name not in callers:
+                    callers.append(module.name)
+    return result
+
+
+def dump_settle(fd, blocked):
+    """Generate `settle_blocked`, which runs the stages `blocked` stalled by a full FIFO again
+    once every stage of the cycle ran, until none of them makes progress.
+
+    A stage stalled by its push guard has done nothing, so running it again is safe, and it
+    sees the pops of the stages which ran after it: the cycle then computes what the RTL
+    does, whatever the order of its stages. The stages still blocked then stall, in a last
+    run with `settling` set, as any other stalled stage does.
+    """
+    if not blocked:
+        return
+    fd.write("  pub fn settle_blocked(&mut self) {\n")
+    fd.write("    loop {\n")
+    fd.write("      let mut progress = false;\n")
+    for name in blocked:
+        fd.write(f"      if self.{name}_blocked {{\n"
+                 f"        self.{name}_blocked = false;\n"
+                 f"        self.simulate_{name}();\n"
+                 f"        progress |= !self.{name}_blocked;\n"
+                 "      }\n")
+    fd.write("      if !progress { break; }\n")
+    fd.write("    }\n")
+    fd.write("    self.settling = true;\n")
+    for name in blocked:
+        fd.write(f"    if self.{name}_blocked {{ self.{name}_blocked = false; "
+                 f"self.simulate_{name}(); }}\n")
+    fd.write("    self.settling = false;\n")
+    fd.write("  }\n\n")
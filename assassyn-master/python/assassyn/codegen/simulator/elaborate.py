@@ -2,40 +2,108 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
 import shutil
 import subprocess
+import tempfile
 import typing
 from pathlib import Path
 
 from .modules import dump_modules
+from .parallel import module_views
 from .simulator import dump_simulator
 from .verilator import emit_external_sv_ffis, write_external_ffis_rs
 
 from ...utils import repo_path
+from ...utils.build_profiles import profile_sections
+from ...utils.cargo_workspace import runtime_dependency
 
 if typing.TYPE_CHECKING:
     from ...builder import SysBuilder
 
 
-def _write_manifest(simulator_path: Path, sys_name: str) -> Path:
-    """Write the Cargo manifest for the generated simulator crate."""
+def _write_manifest(simulator_path: Path, sys_name: str, library: bool = False,
+                    build_profile: str = 'release') -> Path:
+    """Write the Cargo manifest for the generated simulator crate.
+
+    The simulator is a library, which the binary runs. With `library`, the library is also
+    built as a shared library that other programs load to step the simulation. A
+    `build_profile` other than `release` is recorded for `build_simulator`, which builds the
+    crate with the Cargo profile of that name.
+    """
     manifest_path = simulator_path / "Cargo.toml"
-    runtime_path = Path(repo_path()) / "tools" / "rust-sim-runtime"
     with open(manifest_path, 'w', encoding="utf-8") as cargo:
         cargo.write("[package]\n")
         cargo.write(f'name = "{sys_name}_simulator"\n')
         cargo.write('version = "0.1.0"\n')
         cargo.write('edition = "2021"\n')
+        if build_profile != 'release':
+            cargo.write('[package.metadata.assassyn]\n')
+            cargo.write(f'build-profile = "{build_profile}"\n')
+        if library:
+            cargo.write('[lib]\n')
+            cargo.write('crate-type = ["rlib", "cdylib"]\n')
         cargo.write('[dependencies]\n')
-        cargo.write(f'sim-runtime = {{ path = "{runtime_path}" }}\n')
+        cargo.write(runtime_dependency())
+        if build_profile != 'release':
+            cargo.write(profile_sections())
     return manifest_path
 
 
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _sync_tree(staging: Path, simulator_path: Path) -> tuple[int, int]:
+    """Move the files generated in `staging` into `simulator_path`, but only those whose
+    content changed, and remove the generated files no longer generated.
+
+    The crate directory, its `target/` and `Cargo.lock`, and the Verilator crates are left in
+    place, and an unchanged file keeps its mtime, so Cargo only rebuilds what changed.
+
+    Returns the number of files replaced or removed, and the number of files generated.
+    """
+    generated = {path.relative_to(staging) for path in staging.rglob('*') if path.is_file()}
+    changed = 0
+    for rel in sorted(generated):
+        dst = simulator_path / rel
+        if dst.is_file() and _digest(dst) == _digest(staging / rel):
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staging / rel, dst)
+        changed += 1
+    # Only src/ is generated as a whole; e.g. a removed module leaves a stale file there
+    for path in sorted((simulator_path / "src").rglob('*'), reverse=True):
+        rel = path.relative_to(simulator_path)
+        if path.is_file() and rel not in generated:
+            path.unlink()
+            changed += 1
+        elif path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+    return changed, len(generated)
+
+
+def _format_crate(manifest_path: Path):
+    """Best-effort `cargo fmt` over the generated crate."""
+    try:
+        subprocess.run(
+            ["cargo", "fmt", "--manifest-path", str(manifest_path)],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("Warning: Failed to format code with cargo fmt")
+
+
 def elaborate_impl(sys, config):
     """Internal implementation of the elaborate function.
 
     This matches the Rust function in src/backend/simulator/elaborate.rs
+
+    The crate is generated and formatted in a staging directory next to the simulator
+    directory, then synchronized into it file by file (see `_sync_tree`).
     """
     simulator_dirname = (
         config.get('simulator_dirname')
@@ -45,33 +113,48 @@ def elaborate_impl(sys, config):
     simulator_path = Path(config.get('path', os.getcwd())) / simulator_dirname
     verilator_root = simulator_path / config.get('verilator_dirname', f"{sys.name}_verilator")
 
-    if simulator_path.exists() and config.get('override_dump', True):
-        shutil.rmtree(simulator_path)
-
     simulator_path.mkdir(parents=True, exist_ok=True)
-    (simulator_path / "src").mkdir(exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{simulator_dirname}.", dir=simulator_path.parent))
+    try:
+        (staging / "src").mkdir()
 
-    ffi_specs = emit_external_sv_ffis(sys, config, simulator_path, verilator_root)
-    write_external_ffis_rs(simulator_path, ffi_specs)
+        # The Verilator crates build in place; only their Rust wrappers are staged
+        ffi_specs = emit_external_sv_ffis(sys, config, simulator_path, verilator_root)
+        write_external_ffis_rs(simulator_path, ffi_specs, out_root=staging)
+        if not ffi_specs:
+            (simulator_path / "external_modules.json").unlink(missing_ok=True)
 
-    print(f"Writing simulator code to rust project: {simulator_path}")
+        print(f"Writing simulator code to rust project: {simulator_path}")
 
-    crate_name = config.get('simulator_crate_name') or sys.name
-    manifest_path = _write_manifest(simulator_path, crate_name)
+        crate_name = config.get('simulator_crate_name') or sys.name
+        _write_manifest(staging, crate_name, config.get('library', False),
+                        config.get('build_profile', 'release'))
 
-    shutil.copy(Path(repo_path()) / "rustfmt.toml", simulator_path / "rustfmt.toml")
+        shutil.copy(Path(repo_path()) / "rustfmt.toml", staging / "rustfmt.toml")
 
-    dump_modules(sys, simulator_path / "src" / "modules")
+        # The modules of a parallel simulator run on views of the simulator (see parallel.md)
+        dump_modules(sys, staging / "src" / "modules", config.get('inline_modules', False),
+                     module_views(sys) if config.get('parallel') else None)
 
-    with open(simulator_path / "src/simulator.rs", 'w', encoding='utf-8') as fd:
-        dump_simulator(sys, config, fd)
+        with open(staging / "src/simulator.rs", 'w', encoding='utf-8') as fd:
+            dump_simulator(sys, config, fd)
 
-    shutil.copy(
-        Path(__file__).resolve().parent / "template" / "main.rs",
-        simulator_path / "src/main.rs"
-    )
+        # The binary uses the library crate, which is named after the package
+        template = Path(__file__).resolve().parent / "template"
+        shutil.copy(template / "lib.rs", staging / "src/lib.rs")
+        main = (template / "main.rs").read_text(encoding='utf-8')
+        lib_name = f"{crate_name}_simulator".replace('-', '_')
+        (staging / "src/main.rs").write_text(
+            main.replace("__SIMULATOR_LIB__", lib_name), encoding='utf-8')
 
-    return manifest_path
+        # Format before comparing, so that unchanged code compares equal
+        _format_crate(staging / "Cargo.toml")
+        changed, total = _sync_tree(staging, simulator_path)
+        print(f"Updated {changed} of {total} generated files")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return simulator_path / "Cargo.toml"
 
 
 def elaborate(sys, **config):
@@ -79,18 +162,8 @@ def elaborate(sys, **config):
 
     # pylint: disable=import-outside-toplevel
     from .port_mapper import reset_port_manager
+    from .trace_formats import reset_log_formats
     reset_port_manager()
+    reset_log_formats(lanes=bool(config.get('parallel')))
 
-    manifest_path = elaborate_impl(sys, config)
-
-    try:
-        subprocess.run(
-            ["cargo", "fmt", "--manifest-path", str(manifest_path)],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Warning: Failed to format code with cargo fmt")
-
-    return manifest_path
+    return elaborate_impl(sys, config)
@@ -0,0 +1,54 @@
+"""The arrays and FIFOs a simulator library reads and writes by name.
+
+A simulator elaborated as a library (see `tools/rust-sim-runtime/src/runtime/library.md`)
+describes its arrays and FIFOs in `Simulation::PORTS`, and hands them out by name, so that
+a testbench in Python can peek and poke them while the simulation runs.
+"""
+
+from __future__ import annotations
+
+import json
+
+from ...ir.dtype import ArrayType, Void
+
+
+def port_spec(name: str, dtype, size: int = None) -> dict | None:
+    """Describe the array or FIFO `name` holding values of `dtype`.
+
+    Args:
+        name: The name of the simulator field
+        dtype: The type of an element
+        size: The number of elements of an array, None for a FIFO
+
+    Returns:
+        A dict of the name, bits and signedness, and the size of an array, or None if the
+        elements are no plain values, i.e. events or nested arrays
+    """
+    if isinstance(dtype, (Void, ArrayType)):
+        return None
+    spec = {'name': name, 'bits': dtype.bits, 'signed': dtype.is_signed()}
+    if size is not None:
+        spec['size'] = size
+    return spec
+
+
+def dump_ports(fd, arrays, fifos, sim):
+    """Generate `PORTS` and the `array` and `fifo` accessors of `impl Simulation`.
+
+    Args:
+        fd: File descriptor to write to
+        arrays: The specs of the arrays, as from `port_spec`
+        fifos: The specs of the FIFOs
+        sim: The expression of the `Simulator` in `&mut self`
+    """
+    ports = json.dumps({'arrays': arrays, 'fifos': fifos})
+    fd.write(f"  const PORTS: &'static str = r#\"{ports}\"#;\n\n")
+    for kind, specs in (('array', arrays), ('fifo', fifos)):
+        trait = 'ArrayAccess' if kind == 'array' else 'FifoAccess'
+        fd.write(f"  fn {kind}(&mut self, name: &str) -> Option<&mut dyn {trait}> {{\n")
+        fd.write("    match name {\n")
+        for spec in specs:
+            fd.write(f"      \"{spec['name']}\" => Some(&mut {sim}.{spec['name']}),\n")
+        fd.write("      _ => None,\n")
+        fd.write("    }\n")
+        fd.write("  }\n\n")
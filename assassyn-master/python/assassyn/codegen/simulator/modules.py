@@ -6,11 +6,16 @@ import typing
 
 from ...ir.visitor import Visitor
 from ...ir.dtype import RecordValue
-from ...ir.expr import Expr
-from ...ir.expr.intrinsic import Intrinsic as IRIntrinsic
+from ...ir.array import Slice
+from ...ir.expr import (
+    ArrayRead, BinaryOp, Cast, Concat, Expr, FIFOPop, Select, Select1Hot, UnaryOp,
+)
+from ...ir.expr.intrinsic import Intrinsic as IRIntrinsic, PureIntrinsic
 from ...ir.memory.dram import DRAM
-from ...utils import namify
-from .node_dumper import dump_rval_ref
+from ...utils import namify, unwrap_operand
+from .node_dumper import dump_rval_ref, local_rust_type
+from .utils import fifo_name
+from .backpressure import push_guarded, push_predicates
 from ...analysis import expr_externally_used
 from ...ir.module.external import ExternalSV
 from .external import has_module_body
@@ -19,13 +24,21 @@ if typing.TYPE_CHECKING:
     from ...ir.module import Module
     from ...builder import SysBuilder
 
+# The expressions the push guard may evaluate again ahead of the body: those without side effects
+_GUARD_SAFE = (ArrayRead, BinaryOp, Cast, Concat, FIFOPop, PureIntrinsic, Select, Select1Hot,
+               Slice, UnaryOp)
+
 
 class ElaborateModule(Visitor):  # pylint: disable=too-many-instance-attributes
     """Visitor for elaborating modules with ExternalSV support."""
 
-    def __init__(self, sys):
+    def __init__(self, sys, inline=False, views=None):
         super().__init__()
         self.sys = sys
+        # Mark the module functions #[inline], so that their simulate_* callers can absorb them
+        self.fn_attr = "#[inline]\n" if inline else ""
+        # The views modules of a parallel simulator run on, rather than on the simulator
+        self.views = views or {}
         self.indent = 0
         self.module_name = ""
         self.module_ctx = None
@@ -39,9 +52,13 @@ class ElaborateModule(Visitor):  # pylint: disable=too-many-instance-attributes
             return self.visit_external_module(node)
 
         result = [f"\n// Elaborating module {self.module_name}"]
-        result.append(f"pub fn {namify(self.module_name)}(sim: &mut Simulator) -> bool {{")
+        view = self.views.get(node)
+        sim_type = f"{view}<'_>" if view else "Simulator"
+        result.append(
+            f"{self.fn_attr}pub fn {namify(self.module_name)}(sim: &mut {sim_type}) -> bool {{")
 
         self.indent += 2
+        result.append(self._emit_push_ready_guard(node.body or []))
         body = self._emit_body(node.body or [])
         result.append(body)
 
@@ -90,12 +107,15 @@ class ElaborateModule(Visitor):  # pylint: disable=too-many-instance-attributes
         if id_and_exposure:
             id_expr, need_exposure = id_and_exposure
             if code:
-                lines = [f"{indent_str}let {id_expr} = {{ {code} }};"]
+                # The type operands are rendered as, which codegen_expr must produce
+                ty = local_rust_type(node)
+                ty = f": {ty}" if ty else ""
+                lines = [f"{indent_str}let {id_expr}{ty} = {{ {code} }};"]
                 # Skip validity tracking for ExternalIntrinsic
                 # pylint: disable=import-outside-toplevel
                 from ...ir.expr.intrinsic import ExternalIntrinsic
                 if need_exposure and not isinstance(node, ExternalIntrinsic):
-                    lines.append(f"{indent_str}sim.{id_expr}_value = Some({id_expr}.clone());")
+                    lines.append(f"{indent_str}sim.{id_expr}_value.set(sim.stamp, &{id_expr});")
                 result = "\n".join(lines) + "\n"
         else:
             if code:
@@ -103,6 +123,88 @@ class ElaborateModule(Visitor):  # pylint: disable=too-many-instance-attributes
 
         return result
 
+    def _emit_push_ready_guard(self, body_nodes):
+        """Stall a module which pops a FIFO while a FIFO it pushes to cannot take its push.
+
+        This is the guard `cleanup.py` puts on the executed wire of such a module: for each
+        FIFO it pushes to, either none of its pushes is predicated on, or the FIFO is
+        `push_ready`, so that the module never pops its inputs without pushing its outputs.
+        The predicate of a push is its `meta_cond` and the `wait_until` conditions before it,
+        computed ahead of the body, in a block of their own; a push whose predicate depends on
+        a side effect counts as predicated on. A module stalled by the guard has done nothing,
+        so it flags itself `<module>_blocked`, and `settle_blocked` runs it again once the
+        other stages of the cycle ran, as one of them may pop the FIFO.
+
+        Producer-only modules are not gated: a push of theirs into a full FIFO is dropped when
+        the FIFO commits, as `push_valid & push_ready` drops it in the RTL.
+        """
+        if not push_guarded(self.module_ctx):
+            return ""
+        predicates = push_predicates(body_nodes)
+        values = {id(c): c for group in predicates.values() for conds in group for c in conds}
+        lets = self._guard_values(body_nodes, list(values.values()))
+        if lets is None:
+            # Some predicate depends on a side effect: count every push as predicated on
+            predicates = {fifo: [[]] for fifo in predicates}
+            lets = []
+
+        def render(conds):
+            terms = [dump_rval_ref(self.module_ctx, c) for c in conds]
+            return " && ".join(f"({term})" for term in terms) or "true"
+
+        terms = []
+        for fifo, group in predicates.items():
+            any_push = " || ".join(f"({render(conds)})" for conds in group)
+            terms.append(f"(!({any_push}) || sim.{fifo_name(fifo)}.push_ready())")
+
+        indent_str = " " * self.indent
+        module_name = namify(self.module_name)
+        result = [f"{indent_str}let push_guard: bool = {{"]
+        result += [f"{indent_str}  {line}" for line in lets]
+        result.append(f"{indent_str}  {' && '.join(terms)}")
+        result.append(f"{indent_str}}};")
+        result.append(f"{indent_str}if !push_guard {{")
+        result.append(f"{indent_str}  if !sim.settling {{ sim.{module_name}_blocked = true; }}")
+        result.append(f"{indent_str}  return false;")
+        result.append(f"{indent_str}}}")
+        return "\n".join(result) + "\n"
+
+    def _guard_values(self, body_nodes, values):
+        """The `let` statements computing `values` and everything of this module they depend
+        on, in the order of the body, or None if they depend on a side effect. A pop only
+        peeks at its FIFO, and yields a default value when the FIFO is empty."""
+        from ._expr import codegen_expr  # pylint: disable=import-outside-toplevel
+        needed = set()
+        stack = [v for v in values if isinstance(v, Expr)]
+        while stack:
+            expr = stack.pop()
+            if id(expr) in needed or expr.parent is not self.module_ctx:
+                continue
+            if not isinstance(expr, _GUARD_SAFE):
+                return None
+            needed.add(id(expr))
+            for operand in expr.operands:
+                value = unwrap_operand(operand)
+                if isinstance(value, Expr):
+                    stack.append(value)
+
+        lets = []
+        for elem in body_nodes:
+            if isinstance(elem, RecordValue):
+                elem = elem.value()
+            if id(elem) not in needed:
+                continue
+            if isinstance(elem, FIFOPop):
+                code = f"sim.{fifo_name(elem.fifo)}.front().cloned().unwrap_or_default()"
+            else:
+                code = codegen_expr(elem, self.module_ctx)
+                if code is None:
+                    return None
+            ty = local_rust_type(elem)
+            ty = f": {ty}" if ty else ""
+            lets.append(f"let {namify(elem.as_operand())}{ty} = {{ {code} }};")
+        return lets
+
     def _emit_body(self, body_nodes):
         result = []
         visited = set()
@@ -132,24 +234,28 @@ class ElaborateModule(Visitor):  # pylint: disable=too-many-instance-attributes
         module_id = namify(node.name)
         return (
             f"\n// External module {node.name} is driven via FFI handles\n"
-            f"pub fn {module_id}(sim: &mut Simulator) -> bool {{\n"
+            f"{self.fn_attr}pub fn {module_id}(sim: &mut Simulator) -> bool {{\n"
             "    let _ = sim;\n"
             "    true\n"
             " }\n"
         )
 
 
-def dump_modules(sys: SysBuilder, modules_dir):
-    """Generate individual module files in the modules/ directory."""
+def dump_modules(sys: SysBuilder, modules_dir, inline=False, views=None):
+    """Generate individual module files in the modules/ directory, with `#[inline]` module
+    functions if `inline`, and functions taking the module's view for the modules `views`
+    maps to one."""
     modules_dir.mkdir(exist_ok=True)
 
-    em = ElaborateModule(sys)
+    views = views or {}
+    em = ElaborateModule(sys, inline, views)
 
     mod_rs_path = modules_dir / "mod.rs"
     with open(mod_rs_path, 'w', encoding="utf-8") as mod_fd:
         mod_fd.write("""use sim_runtime::*;
 use super::simulator::Simulator;
 use std::collections::VecDeque;
+use std::io::Write;
 use sim_runtime::num_bigint::{BigInt, BigUint};
 use sim_runtime::libloading::{Library, Symbol};
 use std::ffi::{CString, c_char, c_float, c_longlong, c_void};
@@ -163,9 +269,10 @@ use std::sync::Arc;
 
             module_file_path = modules_dir / f"{module_name}.rs"
             with open(module_file_path, 'w', encoding="utf-8") as module_fd:
-                module_fd.write("""use sim_runtime::*;
-use sim_runtime::num_bigint::{BigInt, BigUint};
-use crate::simulator::Simulator;
+                module_fd.write(f"""use sim_runtime::*;
+use sim_runtime::num_bigint::{{BigInt, BigUint}};
+use std::io::Write;
+use crate::simulator::{views.get(module) or "Simulator"};
 use std::ffi::c_void;
 
 """)
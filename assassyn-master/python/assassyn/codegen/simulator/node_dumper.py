@@ -1,8 +1,8 @@
 """Node reference dumper for simulator code generation."""
 
-from .utils import int_imm_dumper_impl, fifo_name
+from .utils import int_imm_dumper_impl, fifo_name, dtype_to_rust_type, is_copy_type
 from ...utils import unwrap_operand, namify
-from ...ir.expr import Expr
+from ...ir.expr import Expr, BinaryOp, UnaryOp
 from ...ir.array import Array
 from ...ir.const import Const
 from ...ir.module import Module, Port
@@ -37,23 +37,20 @@ def _handle_expr(unwrapped, module_ctx):
         raw = namify(unwrapped.as_operand())
         field_id = f"{raw}_value"
         panic_log = f"Value {raw} invalid!"
-        # Return as a block expression that evaluates to the value
-        return f"""{{
-                if let Some(x) = &sim.{field_id} {{
-                    x
-                }} else {{
-                    panic!("{panic_log}");
-                }}
-            }}.clone()"""
+        # The value its module set in this cycle
+        value = f"""sim.{field_id}
+                .get(sim.stamp)
+                .unwrap_or_else(|| panic!("{panic_log}"))"""
+        return f"*{value}" if is_copy_type(unwrapped.dtype) else f"{value}.clone()"
 
     ref = namify(unwrapped.as_operand())
     if isinstance(unwrapped, PureIntrinsic) and unwrapped.opcode == PureIntrinsic.FIFO_PEEK:
-        return f"{ref}.clone().unwrap()"
+        ref = f"{ref}.unwrap()" if is_copy_type(unwrapped.dtype) else f"{ref}.clone().unwrap()"
+        return ref
 
-    dtype = unwrapped.dtype
-    if dtype.bits <= 64:
-        # Simple value
-        return namify(ref)
+    if is_copy_type(unwrapped.dtype):
+        # Copy values are moved, which copies them
+        return ref
 
     # Large value needs cloning
     return f"{ref}.clone()"
@@ -92,3 +89,44 @@ def dump_rval_ref(module_ctx, node):
 
     # Default case
     return namify(unwrapped.as_operand())
+
+
+def rval_rust_type(node):
+    """The Rust type of the value `dump_rval_ref` renders for `node`, or None if it is no value,
+    e.g. an array or a FIFO, or its type is not known."""
+    unwrapped = unwrap_operand(node)
+    if isinstance(unwrapped, UnaryOp):
+        # The operator keeps the type of its operand, e.g. a signed one
+        return rval_rust_type(unwrapped.x)
+    if isinstance(unwrapped, BinaryOp) and unwrapped.opcode == BinaryOp.SHR and \
+            unwrapped.lhs.dtype.is_signed():
+        # A signed right shift shifts on, and keeps, the signed type
+        return dtype_to_rust_type(unwrapped.lhs.dtype)
+    if isinstance(unwrapped, Const) or (isinstance(unwrapped, Expr) and unwrapped.is_valued()):
+        try:
+            return dtype_to_rust_type(unwrapped.dtype)
+        except ValueError:
+            return None
+    return None
+
+
+def local_rust_type(node):
+    """The Rust type of the local variable holding the value of the expression `node` in its
+    module, or None if it holds no plain value."""
+    # pylint: disable=import-outside-toplevel
+    from ...ir.expr.call import Bind
+    from ...ir.expr.intrinsic import ExternalIntrinsic
+    if isinstance(node, (Bind, ExternalIntrinsic)):
+        return None
+    if isinstance(node, PureIntrinsic) and node.opcode == PureIntrinsic.FIFO_PEEK:
+        return None
+    return rval_rust_type(node)
+
+
+def dump_rval_as(module_ctx, node, rust_ty):
+    """Render `node` as a value of the Rust type `rust_ty`, through `ValueCastTo` only if it is
+    not of that type already."""
+    value = dump_rval_ref(module_ctx, node)
+    if rval_rust_type(node) == rust_ty:
+        return value
+    return f"ValueCastTo::<{rust_ty}>::cast(&{value})"
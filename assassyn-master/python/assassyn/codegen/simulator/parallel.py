@@ -0,0 +1,317 @@
+"""Partitioning of a simulator's modules into phases that can be evaluated in parallel.
+
+Within a cycle, the simulator evaluates its stages one after the other, then its downstreams.
+Most of what a module reads does not change until the cycle ends: array and FIFO payloads are
+committed by `tick_registers`, and every write is buffered in an XEQ until then. What does
+change within a cycle is the state modules share, such as the pending pushes and pops of a
+FIFO (a producer's `push_ready` looks at the consumer's pops), the event queue of a callee,
+and the values and triggered flags that downstreams read.
+
+So each module gets a footprint of the simulator fields it reads and writes within a cycle,
+and modules are levelized in their serial order: a module goes to the first phase after every
+earlier module it conflicts with, i.e. that writes a field it accesses or accesses a field it
+writes. Modules in one phase then touch disjoint state, and every pair of conflicting modules
+runs in the same order as serially, so a parallel simulation computes what a serial one does.
+Modules whose state lives outside the simulator, i.e. DRAMs and external modules, and those
+calling `finish()`, run alone in a phase of their own.
+
+The modules of a phase run at the same time on the same simulator, so none may borrow it as a
+whole. Each other module runs on a view of the simulator instead (see `dump_views`), which
+borrows the fields of its footprint one by one: no two views of a phase overlap mutably.
+"""
+
+from __future__ import annotations
+
+from ...analysis import expr_externally_used, get_upstreams
+from ...ir.expr import ArrayRead, ArrayWrite, AsyncCall, Bind, Expr, FIFOPop, FIFOPush
+from ...ir.expr.intrinsic import ExternalIntrinsic, Intrinsic, PureIntrinsic
+from ...ir.memory.dram import DRAM
+from ...ir.module import Downstream
+from ...ir.module.external import ExternalSV
+from ...ir.visitor import Visitor
+from ...utils import namify, unwrap_operand
+from .backpressure import push_guarded
+from .node_dumper import dump_rval_ref
+from .utils import fifo_name
+
+
+class ModuleFootprint:  # pylint: disable=too-few-public-methods
+    """The simulator fields a module reads and writes within a cycle.
+
+    Attributes:
+        reads: Names of the fields the module reads
+        writes: Names of the fields the module writes
+        arrays: Names of the arrays whose payload the module reads, which conflicts with
+            nothing: a write only goes to an array's write ports until the cycle ends
+        exclusive: Why the module must run alone, or None
+    """
+
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+        self.arrays = set()
+        self.exclusive = None
+
+
+class _FootprintCollector(Visitor):
+    """Collect the footprint of the body of a module."""
+
+    def __init__(self, module, footprint):
+        super().__init__()
+        self.module = module
+        self.footprint = footprint
+
+    def visit_expr(self, node: Expr):
+        footprint = self.footprint
+        if node.is_valued() and not isinstance(node, (Bind, ExternalIntrinsic)):
+            if expr_externally_used(node, True):
+                footprint.writes.add(f"{namify(node.as_operand())}_value")
+        for operand in node.operands:
+            value = unwrap_operand(operand)
+            if isinstance(value, Expr) and value.parent is not self.module:
+                footprint.reads.add(f"{namify(value.as_operand())}_value")
+
+        if isinstance(node, (FIFOPush, FIFOPop)):
+            footprint.writes.add(fifo_name(node.fifo))
+        elif isinstance(node, ArrayWrite):
+            footprint.writes.add(namify(node.array.name))
+        elif isinstance(node, ArrayRead):
+            footprint.arrays.add(namify(node.array.name))
+        elif isinstance(node, AsyncCall):
+            footprint.writes.add(f"{namify(node.bind.callee.name)}_event")
+        elif isinstance(node, (ExternalIntrinsic, PureIntrinsic, Intrinsic)):
+            self.visit_intrinsic(node)
+
+    def visit_intrinsic(self, node):
+        """Record what an intrinsic reads, or why it keeps the module from running in parallel."""
+        footprint = self.footprint
+        if isinstance(node, ExternalIntrinsic):
+            footprint.exclusive = "external module"
+        elif isinstance(node, PureIntrinsic):
+            if node.opcode == PureIntrinsic.MODULE_TRIGGERED:
+                module = dump_rval_ref(self.module, node.get_operand(0))
+                footprint.reads.add(f"{module}_triggered")
+            elif node.opcode in (PureIntrinsic.FIFO_VALID, PureIntrinsic.FIFO_PEEK):
+                footprint.reads.add(dump_rval_ref(self.module, node.get_operand(0)))
+            elif node.opcode == PureIntrinsic.VALUE_VALID:
+                value = namify(node.get_operand(0).value.as_operand())
+                footprint.reads.add(f"{value}_value")
+            elif node.opcode in (PureIntrinsic.HAS_MEM_RESP, PureIntrinsic.GET_MEM_RESP):
+                footprint.exclusive = "DRAM"
+            elif node.opcode == PureIntrinsic.EXTERNAL_OUTPUT_READ:
+                footprint.exclusive = "external module"
+        elif isinstance(node, Intrinsic):
+            if node.opcode == Intrinsic.FINISH:
+                footprint.exclusive = "finish()"
+            elif node.opcode in (Intrinsic.SEND_READ_REQUEST, Intrinsic.SEND_WRITE_REQUEST):
+                footprint.exclusive = "DRAM"
+            elif node.opcode == Intrinsic.EXTERNAL_INSTANTIATE:
+                footprint.exclusive = "external module"
+
+
+def module_footprint(module) -> ModuleFootprint:
+    """Compute what `module`, and the `simulate_<module>` wrapper calling it, touch.
+
+    The log lane and the counters of the module are its own, so they never conflict, but
+    they are part of the footprint, which is what the module's view borrows.
+
+    Args:
+        module: A stage or downstream module
+
+    Returns:
+        The footprint of the module
+    """
+    footprint = ModuleFootprint()
+    name = namify(module.name)
+    footprint.writes.update([f"{name}_triggered", f"{name}_log", f"{name}_counters"])
+    if isinstance(module, Downstream):
+        for upstream in get_upstreams(module):
+            footprint.reads.add(f"{namify(upstream.name)}_triggered")
+    else:
+        footprint.writes.add(f"{name}_event")
+        if push_guarded(module):
+            footprint.writes.add(f"{name}_blocked")
+            footprint.reads.add("settling")
+
+    if isinstance(module, DRAM):
+        footprint.exclusive = "DRAM"
+    elif isinstance(module, ExternalSV):
+        footprint.exclusive = "external module"
+    _FootprintCollector(module, footprint).visit_module(module)
+    return footprint
+
+
+def partition_phases(modules) -> list:
+    """Levelize `modules`, given in their serial order, into phases.
+
+    A module goes to the first phase after every earlier module it conflicts with, and an
+    exclusive module to a phase of its own, after every earlier module and before every later
+    one.
+
+    Args:
+        modules: The stages, or the downstreams, in the order a serial simulator runs them
+
+    Returns:
+        A list of phases, each a list of modules in their serial order
+    """
+    phases = []
+    # The last phase writing, and the last phase reading, each field
+    last_write = {}
+    last_read = {}
+    barrier = 0
+    for module in modules:
+        footprint = module_footprint(module)
+        if footprint.exclusive:
+            phase = max(len(phases), barrier)
+            barrier = phase + 1
+        else:
+            phase = barrier
+            for field in footprint.reads | footprint.writes:
+                phase = max(phase, last_write.get(field, -1) + 1)
+            for field in footprint.writes:
+                phase = max(phase, last_read.get(field, -1) + 1)
+        for field in footprint.reads:
+            last_read[field] = max(last_read.get(field, -1), phase)
+        for field in footprint.writes:
+            last_write[field] = max(last_write.get(field, -1), phase)
+        while len(phases) <= phase:
+            phases.append([])
+        phases[phase].append(module)
+    return phases
+
+
+# The types of the fields a view copies rather than borrows
+_COPIED = ("bool", "usize")
+
+
+def _view_member(field, ty, written):
+    """The type of the member of a view for the simulator field `field` of type `ty`, and its
+    value, made from `sim`, a pointer to the simulator."""
+    if ty in _COPIED:
+        return ty, f"(*sim).{field}"
+    if ty.startswith("Array<"):
+        if written:
+            return (f"ArrayView<'a, {ty[len('Array<'):-1]}>",
+                    f"ArrayView::writer(std::ptr::addr_of_mut!((*sim).{field}))")
+        return (f"ArrayView<'a, {ty[len('Array<'):-1]}>",
+                f"ArrayView::reader(std::ptr::addr_of!((*sim).{field}))")
+    if written:
+        return f"&'a mut {ty}", f"&mut (*sim).{field}"
+    return f"&'a {ty}", f"&(*sim).{field}"
+
+
+def view_name(module):
+    """The view a parallel simulator runs `module` on, or None if the module runs alone in a
+    phase of its own, on the whole simulator."""
+    if module_footprint(module).exclusive:
+        return None
+    return f"{namify(module.name)}_View"
+
+
+def module_views(sys):
+    """The view of each module of `sys` which a parallel simulator runs on a view."""
+    return {m: v for m in sys.modules + sys.downstreams if (v := view_name(m))}
+
+
+def dump_views(fd, views, fields):
+    """Generate the view of each module a parallel simulator runs on a view.
+
+    A view has a member for each field of the simulator in the module's footprint, and the
+    stamp: a copy of a flag or of the stamp, written back once the module ran if the module
+    writes it, an `ArrayView` of an array, and a reference to anything else, mutable if the
+    module writes it. The module's `simulate_<module>` is a method of its view, and `run`, the
+    task of the module in a phase, makes the view from a pointer to the simulator and calls it.
+
+    Args:
+        fd: File descriptor to write to
+        views: Pairs of a module and the code of its `simulate_<module>` method
+        fields: The Rust type of each field of the simulator, by name
+    """
+    for module, simulate in views:
+        name = view_name(module)
+        footprint = module_footprint(module)
+        members, init, write_back = [], [], []
+        for field in sorted(footprint.reads | footprint.writes | footprint.arrays | {"stamp"}):
+            # The footprint may name values the simulator does not expose, e.g. those of binds
+            if field in fields:
+                member, value = _view_member(field, fields[field], field in footprint.writes)
+                members.append(f"  pub {field}: {member},\n")
+                init.append(f"      {field}: {value},\n")
+                if field in footprint.writes and fields[field] in _COPIED:
+                    write_back.append(f"    (*sim).{field} = view.{field};\n")
+        module_name = namify(module.name)
+        fd.write(f"// What {module_name} accesses of the simulator, borrowed field by field\n")
+        fd.write(f"pub struct {name}<'a> {{\n{''.join(members)}}}\n\n")
+        fd.write(f"impl {name}<'_> {{\n")
+        fd.write(f"""  // The task of {module_name} in a phase.
+  // SAFETY: `sim` is valid, and the other modules of the phase neither write what the view
+  // borrows nor borrow what it writes, as `partition_phases` guarantees.
+  pub unsafe fn run(sim: *mut Simulator) {{
+    let mut view = {name} {{
+{''.join(init)}    }};
+    view.simulate_{module_name}();
+{''.join(write_back)}  }}
+
+""")
+        if not isinstance(module, Downstream):
+            fd.write("  fn event_valid(&self, event: &EventQueue) -> bool {\n")
+            fd.write("    event.front().map_or(false, |x| x <= self.stamp)\n")
+            fd.write("  }\n\n")
+        fd.write(simulate)
+        fd.write("}\n\n")
+
+
+def dump_phases(fd, stage_phases, downstream_phases, threads):
+    """Generate the phases of a parallel simulator and its worker pool in `Session::new`.
+
+    Args:
+        fd: File descriptor to write to
+        stage_phases: The phases of the stages, as from `partition_phases`
+        downstream_phases: The phases of the downstreams, which run after the stages
+        threads: The default number of threads, or True for one per core
+    """
+    fd.write("  let phases: Vec<Vec<Task<Simulator>>> = vec![\n")
+    for phase in stage_phases + downstream_phases:
+        tasks = []
+        for module in phase:
+            name = view_name(module)
+            # An exclusive module is alone in its phase, so it may borrow the whole simulator
+            tasks.append(f"{name}::run" if name else
+                         f"|sim| unsafe {{ (*sim).simulate_{namify(module.name)}() }}")
+        fd.write(f"    vec![{', '.join(tasks)}],\n")
+    fd.write("  ];\n")
+    default = "default_threads()" if threads is True else str(int(threads))
+    fd.write(f"""  let threads: usize =
+    runtime_param("threads", "ASSASSYN_THREADS", {default});
+""")
+    fd.write("  let pool = WorkerPool::new(threads);\n")
+
+
+def dump_phase_loop(fd, stage_phases, settle=""):
+    """Generate the evaluation of one cycle's phases in `Session::step`, with `settle`, the
+    code settling the stages blocked by a full FIFO, between the `stage_phases` first phases,
+    those of the stages, and the phases of the downstreams."""
+    if settle:
+        fd.write("        for (p, phase) in self.phases.iter().enumerate() {\n")
+        fd.write(f"          if p == {stage_phases} {{\n  {settle}          }}\n")
+    else:
+        fd.write("        for phase in self.phases.iter() {\n")
+    fd.write("""          // SAFETY: the modules of a phase borrow disjoint fields of the simulator
+          if let Err(panic) = unsafe { self.pool.run(sim, phase) } {
+            sim.absorb_logs();
+            std::panic::resume_unwind(panic);
+          }
+        }
+""")
+    if settle:
+        fd.write(f"        if self.phases.len() == {stage_phases} {{\n  {settle}        }}\n")
+    fd.write("        sim.absorb_logs();\n")
+
+
+def dump_absorb_logs(fd, modules):
+    """Generate `absorb_logs`, which appends the log lanes of `modules`, in their serial
+    order, to the simulator's log."""
+    fd.write("  pub fn absorb_logs(&mut self) {\n")
+    for module in modules:
+        fd.write(f"    self.logger.absorb(&mut self.{namify(module.name)}_log);\n")
+    fd.write("  }\n\n")
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import io
 import os
 from ...analysis import topo_downstream_modules, get_upstreams
 from .utils import dtype_to_rust_type, int_imm_dumper_impl, fifo_name
@@ -21,9 +22,23 @@ from .external import (
 )
 from ...utils import namify, repo_path
 from .port_mapper import get_port_manager
+from .parallel import (
+    dump_absorb_logs, dump_phase_loop, dump_phases, dump_views, partition_phases, view_name,
+)
+from .backpressure import dump_settle, push_guarded, retracting_callers
+from .library import dump_ports, port_spec
+from .trace_formats import get_log_formats
 from ...utils.enforce_type import enforce_type
 
 
+def _rust_raw_str(text: str) -> str:
+    """Quote `text` as a Rust raw string literal, with enough `#`s to delimit it."""
+    hashes = "#"
+    while f'"{hashes}' in text:
+        hashes += "#"
+    return f'r{hashes}"{text}"{hashes}'
+
+
 @enforce_type
 def analyze_and_register_ports(sys: SysBuilder) -> None:
     """Analyze system and register all array write ports and DRAM modules.
@@ -70,6 +85,99 @@ def analyze_and_register_ports(sys: SysBuilder) -> None:
 
 
 
+def analyze_fifo_depths(sys: SysBuilder, default_depth) -> dict:
+    """Compute the log2 depth of every module input FIFO.
+
+    This mirrors the Verilog backend (see ``codegen/verilog/top.py``): every FIFO starts
+    at ``default_depth`` and is widened to the largest explicit depth requested through
+    ``Bind.set_fifo_depth`` by any of its producers. Non-positive requests fall back to
+    the default, as they do for the RTL.
+
+    Args:
+        sys: The Assassyn system builder
+        default_depth: The ``fifo_depth`` config (log2 of the number of entries)
+
+    Returns:
+        Dictionary mapping each Port to its log2 depth
+    """
+    # pylint: disable=import-outside-toplevel
+    from ...ir.expr import FIFOPush
+    from ...ir.visitor import Visitor
+
+    depths = {}
+    for module in sys.modules:
+        for port in module.ports:
+            depths[port] = default_depth
+
+    class FIFODepthVisitor(Visitor):
+        """Visitor that widens FIFO depths by explicit producer requests."""
+
+        def visit_expr(self, node):
+            """Visit an expression and record explicit FIFO depths."""
+            if not isinstance(node, FIFOPush) or node.fifo not in depths:
+                return
+            depth = node.fifo_depth
+            if not isinstance(depth, int) or depth <= 0:
+                depth = default_depth
+            depths[node.fifo] = max(depths[node.fifo], depth)
+
+    FIFODepthVisitor().visit_system(sys)
+    return depths
+
+
+def _dump_report(fd, stats, lanes):
+    """Generate `stats`, the end-of-run statistics so far, and `report`, which ends a
+    simulation: it writes the statistics to `--stats <path>`, if given, and flushes the log,
+    after absorbing the log lanes of a parallel simulator."""
+    fd.write("  pub fn stats(&self, exit: &str) -> StatsReport {\n")
+    fd.write("    let mut stats = StatsReport::new(self.stamp, exit);\n")
+    for kind, names in stats.items():
+        for name in names:
+            fd.write(f"    stats.{kind}(\"{name}\", &self.{name}")
+            fd.write("_counters);\n" if kind == "module" else ");\n")
+    fd.write("    stats\n")
+    fd.write("  }\n\n")
+    fd.write("  pub fn report(&mut self, exit: &str) {\n")
+    if lanes:
+        fd.write("    self.absorb_logs();\n")
+    fd.write("    if let Some(path) = runtime_option(\"stats\", \"ASSASSYN_STATS\") {\n")
+    fd.write("      self.stats(exit).write(&path)")
+    fd.write(".unwrap_or_else(|e| panic!(\"Failed to write stats {}: {}\", path, e));\n")
+    fd.write("    }\n")
+    fd.write("    self.logger.flush();\n")
+    fd.write("  }\n\n")
+
+
+def _dump_checkpoint(fd, fields, blockers):
+    """Generate `save_checkpoint` / `load_checkpoint`, which save and restore `fields` of the
+    simulator in order, or fail for a design whose state is partly held outside it."""
+    if blockers:
+        unsupported = (
+            "    Err(std::io::Error::new(std::io::ErrorKind::Unsupported,\n"
+            f"      \"checkpoints do not support {', '.join(blockers)}\"))\n"
+        )
+        fd.write("  pub fn save_checkpoint(&self, _path: &str) -> std::io::Result<()> {\n")
+        fd.write(unsupported)
+        fd.write("  }\n\n")
+        fd.write("  pub fn load_checkpoint(&mut self, _path: &str) -> std::io::Result<()> {\n")
+        fd.write(unsupported)
+        fd.write("  }\n\n")
+        return
+
+    fd.write("  pub fn save_checkpoint(&self, path: &str) -> std::io::Result<()> {\n")
+    fd.write("    let mut out = checkpoint_writer(path, IR_HASH)?;\n")
+    for field in fields:
+        fd.write(f"    self.{field}.save(&mut out)?;\n")
+    fd.write("    out.flush()\n")
+    fd.write("  }\n\n")
+    fd.write("  pub fn load_checkpoint(&mut self, path: &str) -> std::io::Result<()> {\n")
+    fd.write("    let mut inp = checkpoint_reader(path, IR_HASH)?;\n")
+    for field in fields:
+        fd.write(f"    self.{field}.restore(&mut inp)?;\n")
+    fd.write("    checkpoint_end(&mut inp)\n")
+    fd.write("  }\n\n")
+
+
 @enforce_type
 def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-many-statements
                    sys: SysBuilder, config, fd):
@@ -80,35 +188,52 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
     Args:
         sys: The Assassyn system builder
         config: Configuration dictionary with the following keys:
-            - idle_threshold: Idle threshold for the simulator
-            - sim_threshold: Maximum number of simulation cycles
+            - idle_threshold: Default idle threshold for the simulator
+            - sim_threshold: Default maximum number of simulation cycles
             - random: Whether to randomize module execution order
             - resource_base: Path to resource files
-            - fifo_depth: Default FIFO depth
+            - fifo_depth: Default FIFO depth (log2 of the number of entries); None
+              leaves the FIFOs unbounded
+            - parallel: Evaluate the modules of a cycle on a pool of threads, True for one
+              per core or the default number of threads
+            - inline_modules: Mark the module functions `#[inline]`
         fd: File descriptor to write to
     """
     # First, analyze the system to determine port requirements and collect DRAM modules
     # This registers all array write ports with the global port manager
     port_manager, dram_modules = analyze_and_register_ports(sys)
+    default_fifo_depth = config.get('fifo_depth', 2)
+    fifo_depths = {}
+    if default_fifo_depth is not None:
+        fifo_depths = analyze_fifo_depths(sys, default_fifo_depth)
     external_specs = {
         spec.original_module_name: spec for spec in config.get('external_ffis', [])
     }
     external_clock_handles = []
+    parallel = config.get('parallel', False)
+    if parallel and config.get('random', False):
+        raise ValueError("A parallel simulator runs its modules in a fixed order, "
+                         "it cannot randomize it")
 
     # Write imports
     fd.write("use sim_runtime::*;\n")
-    fd.write("use std::collections::VecDeque;\n")
     fd.write("use std::collections::HashMap;\n")
+    fd.write("use std::io::Write;\n")
     fd.write("use crate::modules;\n")
     # Platform-specific imports are no longer needed since we use the utility method
     fd.write("use std::sync::Arc;\n")
     fd.write("use sim_runtime::num_bigint::{BigInt, BigUint};\n")
     fd.write("use sim_runtime::rand::seq::SliceRandom;\n\n")
 
+    # The format table of the binary log trace; every log() was registered by dump_modules
+    fd.write(f"const LOG_FORMATS: &str = {_rust_raw_str(get_log_formats().to_json())};\n\n")
+
     # Initialize data structures
     simulator_init = []
     downstream_reset = []
     registers = []
+    # The stages with a push guard, which `settle_blocked` runs again
+    blocked = []
 
     expr_validities, module_expr_map = gather_expr_validities(sys)
 
@@ -117,13 +242,27 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
     # Track unique external classes
     external_classes = collect_external_classes(external_intrinsics)
 
+    # The fields a checkpoint saves, in order, and what keeps a design from being checkpointed:
+    # state held outside the simulator, by Ramulator2 or a Verilated module.
+    checkpointed = ["stamp", "idle_count", "request_stamp_map_table"]
+    checkpoint_blockers = []
+    # What the end-of-run statistics report on: module counters, FIFOs and arrays
+    stats = {"module": [], "fifo": [], "array": []}
+    # The arrays and FIFOs a simulator library reads and writes by name
+    ports = {"array": [], "fifo": []}
+    # The type of the fields modules access, which the views of a parallel simulator borrow
+    fields = {"stamp": "usize"}
+
+    # The IR the simulator was elaborated from, which its checkpoints are versioned against
+    fd.write(f"const IR_HASH: &str = \"{config.get('ir_hash', '')}\";\n\n")
+
     # Begin simulator struct definition
-    fd.write("pub struct Simulator { pub stamp: usize, ")
+    fd.write("pub struct Simulator { pub stamp: usize, pub idle_count: usize, pub logger: Logger, ")
     fd.write("pub request_stamp_map_table: HashMap<i64, usize>,\n")
-    home = repo_path()
     # Add per-DRAM memory interfaces and response fields
     for dram in dram_modules:
         dram_name = namify(dram.name)
+        checkpoint_blockers.append(f"DRAM {dram_name}")
         fd.write(f"pub mi_{dram_name}: MemoryInterface,\n")
         fd.write(f"pub {dram_name}_response: Response,\n")
     # Add array fields to simulator struct
@@ -136,6 +275,7 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
         num_ports = port_manager.get_port_count(name)
 
         fd.write(f"pub {name} : Array<{dtype}>, ")
+        fields[name] = f"Array<{dtype}>"
         # Handle array initialization with pre-allocated ports
         if array.initializer:
             init_values = []
@@ -148,6 +288,9 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
         else:
             simulator_init.append(f"{name} : Array::new_with_ports({array.size}, {num_ports}),")
         registers.append(name)
+        checkpointed.append(name)
+        stats["array"].append(name)
+        ports["array"].append(port_spec(name, array.scalar_ty, array.size))
 
     # Add module fields to simulator struct
     for module in sys.modules[:] + sys.downstreams[:]:
@@ -155,21 +298,54 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
 
         # Add triggered flag for all modules
         fd.write(f"pub {module_name}_triggered : bool, ")
+        fields[f"{module_name}_triggered"] = "bool"
         simulator_init.append(f"{module_name}_triggered : false,")
         downstream_reset.append(f"self.{module_name}_triggered = false;")
+        checkpointed.append(f"{module_name}_triggered")
+
+        # Count how often the module completes or stalls, for the end-of-run statistics
+        fd.write(f"pub {module_name}_counters : ModuleCounters, ")
+        fields[f"{module_name}_counters"] = "ModuleCounters"
+        simulator_init.append(f"{module_name}_counters : ModuleCounters::default(),")
+        checkpointed.append(f"{module_name}_counters")
+        stats["module"].append(module_name)
+
+        # A parallel simulator merges the modules' logs once every module of the cycle ran
+        if parallel:
+            fd.write(f"pub {module_name}_log : LogLane, ")
+            fields[f"{module_name}_log"] = "LogLane"
+            simulator_init.append(f"{module_name}_log : logger.lane(),")
 
         if isinstance(module, Module):
             # Add event queue for non-downstream modules
-            fd.write(f"pub {module_name}_event : VecDeque<usize>, ")
-            simulator_init.append(f"{module_name}_event : VecDeque::new(),")
+            fd.write(f"pub {module_name}_event : EventQueue, ")
+            fields[f"{module_name}_event"] = "EventQueue"
+            simulator_init.append(f"{module_name}_event : EventQueue::new(),")
+            checkpointed.append(f"{module_name}_event")
+
+            # Set by the push guard of a module stalled by a full FIFO (see modules.md), and
+            # cleared by `settle_blocked` before the cycle ends, so never checkpointed
+            if push_guarded(module):
+                fd.write(f"pub {module_name}_blocked : bool, ")
+                fields[f"{module_name}_blocked"] = "bool"
+                simulator_init.append(f"{module_name}_blocked : false,")
+                blocked.append(module_name)
 
             # Add FIFO fields for each FIFO
             for fifo in module.ports:
                 name = fifo_name(fifo)
                 ty = dtype_to_rust_type(fifo.dtype)
                 fd.write(f"pub {name} : FIFO<{ty}>, ")
-                simulator_init.append(f"{name} : FIFO::new(),")
+                fields[name] = f"FIFO<{ty}>"
+                if fifo in fifo_depths:
+                    capacity = 1 << fifo_depths[fifo]
+                    simulator_init.append(f"{name} : FIFO::with_capacity({capacity}),")
+                else:
+                    simulator_init.append(f"{name} : FIFO::new(),")
                 registers.append(name)
+                checkpointed.append(name)
+                stats["fifo"].append(name)
+                ports["fifo"].append(port_spec(name, fifo.dtype))
 
         if isinstance(module, ExternalSV):
             handle_field = external_handle_field(module.name)
@@ -180,6 +356,7 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
                 simulator_init.append(f"{handle_field} : {field_type}::new(),")
                 if getattr(spec, "has_clock", False):
                     external_clock_handles.append(handle_field)
+                checkpoint_blockers.append(f"external module {module.name}")
             else:
                 fd.write(f"pub {handle_field} : (), ")
                 simulator_init.append(f"{handle_field} : (),")
@@ -196,6 +373,7 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
             field_type = f"crate::external_ffis::{spec.crate_name}::{spec.struct_name}"
             fd.write(f"pub {field_name} : {field_type}, ")
             simulator_init.append(f"{field_name} : {field_type}::new(),")
+            checkpoint_blockers.append(f"external module {cls_name}")
         else:
             # Fallback if no Verilator FFI was generated
             fd.write(f"pub {field_name} : (), ")
@@ -214,9 +392,22 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
             continue
         name = namify(expr.as_operand())
         dtype = dtype_to_rust_type(expr.dtype)
-        fd.write(f"pub {name}_value : Option<{dtype}>, ")
-        simulator_init.append(f"{name}_value : None,")
-        downstream_reset.append(f"self.{name}_value = None;")
+        # Valid only in the cycle that set it, so neither reset every cycle nor checkpointed
+        fd.write(f"pub {name}_value : Exposed<{dtype}>, ")
+        fields[f"{name}_value"] = f"Exposed<{dtype}>"
+        simulator_init.append(f"{name}_value : Exposed::new(),")
+
+    if config.get('random', False):
+        # The module order of a cycle is drawn from the seed and the cycle, so the seed is all
+        # a checkpoint needs to resume the schedule
+        fd.write("pub seed : u64, ")
+        simulator_init.append("seed : 0,")
+        checkpointed.append("seed")
+
+    if blocked:
+        fd.write("pub settling : bool, ")
+        fields["settling"] = "bool"
+        simulator_init.append("settling : false,")
 
     # Close simulator struct
     fd.write("}\n\n")
@@ -237,17 +428,23 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
             f"{dram_name}_response: Response {{ valid: false, addr: 0, "
             f"data: Vec::new(), read_succ: false, write_succ: false, "
             f"is_write: false }},")
+    fd.write("    let logger = Logger::new().with_trace(LOG_FORMATS);\n")
     fd.write("    Simulator {\n")
     fd.write("      stamp: 0,\n")
+    fd.write("      idle_count: 0,\n")
     fd.write("      request_stamp_map_table: HashMap::new(),\n")
     for init in simulator_init:
         fd.write(f"      {init}\n")
+    fd.write("      logger,\n")
     fd.write("    }\n")
     fd.write("  }\n\n")
 
+    _dump_checkpoint(fd, checkpointed, checkpoint_blockers)
+    _dump_report(fd, stats, parallel)
+
     # Event validity check
-    fd.write("  fn event_valid(&self, event: &VecDeque<usize>) -> bool {\n")
-    fd.write("    event.front().map_or(false, |x| *x <= self.stamp)\n")
+    fd.write("  fn event_valid(&self, event: &EventQueue) -> bool {\n")
+    fd.write("    event.front().map_or(false, |x| x <= self.stamp)\n")
     fd.write("  }\n\n")
 
     # Reset downstream method
@@ -258,8 +455,22 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
 
     # Tick registers method
     fd.write("  pub fn tick_registers(&mut self) {\n")
+    # Only registers and FIFOs written this cycle have anything to commit
+    retracting = retracting_callers(sys)
+    for callee in sorted({callee for callee, _ in retracting.values()}):
+        fd.write(f"    let mut dropped_{callee} = false;\n")
     for reg in registers:
-        fd.write(f"    self.{reg}.tick(self.stamp);\n")
+        if reg in retracting:
+            callee, callers = retracting[reg]
+            callers = " | ".join(f'"{caller}"' for caller in callers)
+            fd.write(f"    if self.{reg}.is_dirty() {{\n"
+                     f"      dropped_{callee} |= matches!(self.{reg}.tick(self.stamp), "
+                     f"Some({callers}));\n    }}\n")
+        else:
+            fd.write(f"    if self.{reg}.is_dirty() {{ self.{reg}.tick(self.stamp); }}\n")
+    # A call whose push was dropped by a full FIFO does not trigger its callee either
+    for callee in sorted({callee for callee, _ in retracting.values()}):
+        fd.write(f"    if dropped_{callee} {{ self.{callee}_event.retract(self.stamp + 50); }}\n")
     for handle in external_clock_handles:
         fd.write(f"    self.{handle}.clock_tick();\n")
     # Tick ExternalIntrinsic instances with registered outputs
@@ -280,6 +491,7 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
             instance_uid = intr.uid
             field_name = f"external_{instance_uid}"
             fd.write(f"    self.{field_name}.clock_tick();\n")
+            external_clock_handles.append(field_name)
     fd.write("  }\n\n")
 
     # Reset DRAM responses method
@@ -296,16 +508,22 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
 
 
     # Module simulation functions
+    inline = "  #[inline]\n" if config.get('inline_modules', False) else ""
     simulators = []
+    stage_modules = []
+    views = []
     for module in sys.modules[:] + sys.downstreams[:]:
         if is_stub_external(module):
             continue
         module_name = namify(module.name)
-        fd.write(f"  fn simulate_{module_name}(&mut self) {{\n")
+        # The modules of a parallel simulator run on views, which their wrappers are methods of
+        view = view_name(module) if parallel else None
+        out = io.StringIO() if view else fd
+        out.write(f"{inline}  fn simulate_{module_name}(&mut self) {{\n")
 
         if not isinstance(module, Downstream):
             # Event based triggering for non-downstream modules
-            fd.write(f"    if self.event_valid(&self.{module_name}_event) {{\n")
+            out.write(f"    if self.event_valid(&self.{module_name}_event) {{\n")
         else:
             # Dependency based triggering for downstream modules
             upstream_conds = []
@@ -314,17 +532,21 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
                 upstream_conds.append(f"self.{upstream_name}_triggered")
 
             conds = " || ".join(upstream_conds) if upstream_conds else "false"
-            fd.write(f"    if {conds} {{\n")
+            out.write(f"    if {conds} {{\n")
 
         # Call module function and handle result
-        fd.write(f"      let succ = modules::{module_name}::{module_name}(self);\n")
+        out.write(f"      let succ = modules::{module_name}::{module_name}(self);\n")
+        if module_name in blocked:
+            # Left to `settle_blocked`, which runs the module again
+            out.write(f"      if self.{module_name}_blocked {{ return; }}\n")
+        out.write(f"      self.{module_name}_counters.record(succ);\n")
 
         if not isinstance(module, Downstream):
             # Pop event on success
-            fd.write(f"      if succ {{ self.{module_name}_event.pop_front(); }}\n")
-            fd.write("      else {\n")
+            out.write(f"      if succ {{ self.{module_name}_event.pop_front(); }}\n")
+            out.write("      else {\n")
 
-            # Reset externally used values on failure
+            # Invalidate externally used values on failure
             for expr in module_expr_map.get(module, ()):  # type: ignore[arg-type]
                 if isinstance(expr, Bind):
                     continue
@@ -332,21 +554,196 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
                 if isinstance(expr, ExternalIntrinsic):
                     continue
                 name = namify(expr.as_operand())
-                fd.write(f"        self.{name}_value = None;\n")
+                out.write(f"        self.{name}_value.invalidate();\n")
 
-            fd.write("      }\n")
+            out.write("      }\n")
             simulators.append(module_name)
+            stage_modules.append(module)
 
         # Update trigger state and close condition
-        fd.write(f"      self.{module_name}_triggered = succ;\n")
-        fd.write("    } // close event condition\n")
-        fd.write("  } // close function\n\n")
+        out.write(f"      self.{module_name}_triggered = succ;\n")
+        out.write("    } // close event condition\n")
+        out.write("  } // close function\n\n")
+        if view:
+            views.append((module, out.getvalue()))
+            fd.write(f"{inline}  fn simulate_{module_name}(&mut self) {{\n")
+            fd.write("    // SAFETY: the simulator is borrowed whole, so nothing else uses it\n")
+            fd.write(f"    unsafe {{ {view}::run(self) }}\n  }}\n\n")
+
+    downstreams = [x for x in downstreams if not is_stub_external(x)]
+    dump_settle(fd, blocked)
+    if parallel:
+        dump_absorb_logs(fd, stage_modules + downstreams)
+    elif not config.get('random', False):
+        # Without a shuffled order, one cycle calls every module directly, in order
+        fd.write("  // Simulate the stages, then the downstreams, of one cycle\n")
+        fd.write("  #[inline]\n")
+        fd.write("  pub fn step_cycle(&mut self) {\n")
+        for module_name in simulators:
+            fd.write(f"    self.simulate_{module_name}();\n")
+        if blocked:
+            fd.write("    self.settle_blocked();\n")
+        for module_name in [namify(x.name) for x in downstreams]:
+            fd.write(f"    self.simulate_{module_name}();\n")
+        fd.write("  }\n\n")
+    _dump_pending(fd, stage_modules, registers)
 
     # Close simulator impl
     fd.write("}\n\n")
+    dump_views(fd, views, fields)
+
+    _dump_session(fd, sys, config, {
+        'dram_modules': dram_modules,
+        'simulators': simulators,
+        'stage_modules': stage_modules,
+        'downstreams': downstreams,
+        'registers': registers,
+        'blocked': blocked,
+        'ports': ports,
+        # Clocked external modules change every cycle, so no cycle can be skipped
+        'skippable': not external_clock_handles,
+    })
+
+    return True
+
+
+def _dump_pending(fd, stage_modules, registers):
+    """Generate `busy_at` and `next_event`, which tell `Session::skip` the cycles in which
+    nothing can happen.
+
+    A stage runs only with an event due, and a downstream only after one of its upstreams ran,
+    so no module runs in a cycle without a due event, and such a cycle only commits the
+    writes still pending on registers and FIFOs.
+
+    Args:
+        fd: File descriptor to write to
+        stage_modules: The stages, i.e. the modules with an event queue
+        registers: The arrays and FIFOs of the simulator
+    """
+    events = [f"self.{namify(m.name)}_event" for m in stage_modules]
+    busy = [f"{event}.front().map_or(false, |x| x <= stamp)" for event in events]
+    busy += [f"self.{reg}.is_dirty()" for reg in registers]
+    fd.write("  // Whether a stage has an event due at `stamp`, or a write is left to commit\n")
+    fd.write("  pub fn busy_at(&self, stamp: usize) -> bool {\n")
+    fd.write(f"    {' || '.join(busy) or 'false'}\n")
+    fd.write("  }\n\n")
+    fd.write("  // The stamp of the earliest event of any stage\n")
+    fd.write("  pub fn next_event(&self) -> Option<usize> {\n")
+    if events:
+        fronts = ", ".join(f"{event}.front()" for event in events)
+        fd.write(f"    [{fronts}].into_iter().flatten().min()\n")
+    else:
+        fd.write("    None\n")
+    fd.write("  }\n\n")
+
+
+def _dump_skip(fd, dram_modules):
+    """Generate `Session::skip`, which jumps over the cycles in which no module can run.
+
+    Such cycles only count as idle, so `skip` adds them to `idle_count` and moves `stamp` to
+    the end of the last one. DRAMs still tick every cycle, and under `random` the module order
+    draws the module order of a cycle from the cycle itself, so a skipped cycle draws
+    nothing. The cycle of the next event, the one the design turns idle in, and the checkpoint
+    cycle are left to `step`.
+
+    Args:
+        fd: File descriptor to write to
+        dram_modules: The DRAM modules, whose memory interfaces tick every cycle
+    """
+    fd.write("""  fn skip(&mut self, max: usize) -> usize {
+    let i = self.next_cycle;
+    if self.exit.is_some() || i > self.sim_threshold || self.sim.busy_at(i * 100) {
+      return 0;
+    }
+    let sim = &mut self.sim;
+    // The first cycle `step` simulates again
+    let mut end = sim
+      .next_event()
+      .map_or(self.sim_threshold + 1, |x| x.div_ceil(100))
+      .min(self.sim_threshold + 1);
+    if self.checkpoint_at >= i {
+      end = end.min(self.checkpoint_at);
+    }
+    if sim.idle_count < self.idle_threshold {
+      end = end.min(i + self.idle_threshold - sim.idle_count - 1);
+    }
+    let cycles = end.saturating_sub(i).min(max);
+    if cycles == 0 {
+      return 0;
+    }
+    sim.reset_downstream();
+    sim.idle_count += cycles;
+""")
+    if dram_modules:
+        fd.write("    for cycle in i..i + cycles {\n")
+        fd.write("      sim.stamp = cycle * 100 + 50;\n")
+        fd.write("      sim.reset_dram();\n")
+        fd.write("      unsafe {\n")
+        for dram in dram_modules:
+            dram_name = namify(dram.name)
+            fd.write(f"        sim.mi_{dram_name}.frontend_tick();\n")
+            fd.write(f"        sim.mi_{dram_name}.memory_system_tick();\n")
+        fd.write("      }\n")
+        fd.write("    }\n")
+    fd.write("""    sim.stamp = (i + cycles - 1) * 100 + 50;
+    self.next_cycle = i + cycles;
+    cycles
+  }
+
+""")
+
+
+def _dump_session( #pylint: disable=too-many-locals, too-many-statements, too-many-branches
+                  fd, sys, config, parts):
+    """Generate `Session`, which simulates the design cycle by cycle, and `simulate()`, which
+    runs a session until it ends.
+
+    A session keeps what the loop of a simulation needs from one cycle to the next, so that
+    `step` simulates one cycle at a time, as a simulator library calls it (see
+    `tools/rust-sim-runtime/src/runtime/library.md`).
+
+    Args:
+        fd: File descriptor to write to
+        sys: The Assassyn system builder
+        config: The configuration of `dump_simulator`
+        parts: What `dump_simulator` collected: the DRAM modules, the names of the stages
+            (`simulators`), the stages and downstreams in order, the registers, and the
+            arrays and FIFOs a library reads and writes (`ports`)
+    """
+    dram_modules = parts['dram_modules']
+    parallel = config.get('parallel', False)
+    randomized = config.get('random', False)
+    home = repo_path()
+
+    # The state of the loop, besides the simulator itself
+    fields = ["pub sim: Simulator"]
+    if parallel:
+        fields += ["phases: Vec<Vec<Task<Simulator>>>", "pool: WorkerPool<Simulator>"]
+    elif randomized:
+        # The stages in order, and in the order of the current cycle
+        fields += ["simulators: Vec<fn(&mut Simulator)>", "order: Vec<fn(&mut Simulator)>",
+                   "downstreams: Vec<fn(&mut Simulator)>"]
+    fields += ["sim_threshold: usize", "idle_threshold: usize", "checkpoint_at: usize",
+               "checkpoint_file: String", "stop_when_idle: bool",
+               "next_cycle: usize", "exit: Option<&'static str>"]
+    fd.write("pub struct Session {\n")
+    for field in fields:
+        fd.write(f"  {field},\n")
+    fd.write("}\n\n")
+
+    fd.write("impl Session {\n")
+    fd.write("  fn end(&mut self, exit: &'static str) {\n")
+    fd.write("    self.exit = Some(exit);\n")
+    fd.write("    self.sim.report(exit);\n")
+    fd.write("  }\n")
+    fd.write("}\n\n")
+
+    fd.write("impl Simulation for Session {\n")
+    arrays = [spec for spec in parts['ports']['array'] if spec]
+    fifos = [spec for spec in parts['ports']['fifo'] if spec]
+    dump_ports(fd, arrays, fifos, "self.sim")
 
-    # Generate simulate function
-    fd.write("pub fn simulate() {\n")
+    fd.write("  fn new(stop_when_idle: bool) -> Self {\n")
     fd.write("  let mut sim = Simulator::new();\n")
     # Initialize each DRAM with configuration
     for dram in dram_modules:
@@ -359,93 +756,159 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
     """)  # noqa: E501
 
     # Handle randomization if enabled
-    if config.get('random', False):
-        fd.write("  let mut rng = rand::thread_rng();\n")
-        fd.write("  let mut simulators : Vec<fn(&mut Simulator)> = vec![")
-    else:
+    if parallel:
+        # Modules that touch disjoint state run at the same time, phase by phase
+        stage_phases = partition_phases(parts['stage_modules'])
+        parts['stage_phases'] = len(stage_phases)
+        dump_phases(fd, stage_phases, partition_phases(parts['downstreams']), parallel)
+    elif randomized:
+        # Only a shuffled order needs the modules in vectors; otherwise `step_cycle` runs them
+        # The seed is a runtime parameter (`--seed`), which the cache key leaves out; a
+        # checkpoint restores the one of the run that saved it
+        fd.write("  sim.seed = runtime_seed(None);\n")
+        # Add simulators for all non-downstream modules
         fd.write("  let simulators : Vec<fn(&mut Simulator)> = vec![")
-
-    # Add simulators for all non-downstream modules
-    for sim in simulators:
-        fd.write(f"Simulator::simulate_{sim}, ")
-    fd.write("];\n")
-
-    # Add simulators for downstream modules
-    fd.write("  let downstreams : Vec<fn(&mut Simulator)> = vec![")
-    for downstream in downstreams:
-        if is_stub_external(downstream):
-            continue
-        module_name = downstream.name
-        fd.write(f"Simulator::simulate_{module_name}, ")
-    fd.write("];\n")
-    all_modules = sys.modules[:] + sys.downstreams[:]
-    # Initialize memory from files if needed
+        for sim in parts['simulators']:
+            fd.write(f"Simulator::simulate_{sim}, ")
+        fd.write("];\n")
+        fd.write("  let order = simulators.clone();\n")
+
+        # Add simulators for downstream modules
+        fd.write("  let downstreams : Vec<fn(&mut Simulator)> = vec![")
+        for downstream in parts['downstreams']:
+            module_name = namify(downstream.name)
+            fd.write(f"Simulator::simulate_{module_name}, ")
+        fd.write("];\n")
+    # Initialize memory from files: an SRAM's init_file is the default image of its payload,
+    # and any array can be loaded with `--load <name>=<file>` when the simulator starts.
     # TODO(@derui): Make SRAM a subclass of Downstream and make all SRAM payload
     #               initialization RegArray initialization.
-    for sram in [m for m in all_modules if isinstance(m, SRAM)]:
-        if not sram.init_file:
-            continue
-        init_file_path = os.path.join(config.get('resource_base', '.'), sram.init_file)
-        init_file_path = os.path.normpath(init_file_path)
-        init_file_path = init_file_path.replace('//', '/')
-        array = sram._payload  # pylint: disable=protected-access
+    fd.write("  let mut images = MemoryImages::new();\n")
+    image_names = []
+    for array in sys.arrays:
         array_name = namify(array.name)
-        fd.write(f'  load_hex_file(&mut sim.{array_name}.payload, "{init_file_path}");\n')
-
-    # Set simulation threshold and other parameters
+        if array_name not in parts['registers']:
+            continue
+        names = [array_name]
+        default = "None"
+        owner = array.owner
+        if isinstance(owner, SRAM) and array.is_payload(owner):
+            names.insert(0, namify(owner.name))
+            if owner.init_file:
+                init_file_path = os.path.join(config.get('resource_base', '.'), owner.init_file)
+                init_file_path = os.path.normpath(init_file_path)
+                init_file_path = init_file_path.replace('//', '/')
+                default = f'Some("{init_file_path}")'
+        image_names += names
+        names = ", ".join(f'"{name}"' for name in names)
+        elem_bytes = (array.scalar_ty.bits + 7) // 8
+        fd.write(f"  images.load(&[{names}], &mut sim.{array_name}.payload, {default}, "
+                 f"{elem_bytes});\n")
+    names = ", ".join(f'"{name}"' for name in image_names)
+    fd.write(f"  images.finish(&[{names}]);\n")
+
+    # The elaborated thresholds are only defaults, which the simulator's command line
+    # (--sim-threshold, --idle-threshold) or environment can override without a rebuild.
     sim_threshold = config.get('sim_threshold', 100)
+    idle_threshold = config.get('idle_threshold', 5)
+    fd.write(f"""  let sim_threshold: usize =
+    runtime_param("sim-threshold", "ASSASSYN_SIM_THRESHOLD", {sim_threshold});
+  let idle_threshold: usize =
+    runtime_param("idle-threshold", "ASSASSYN_IDLE_THRESHOLD", {idle_threshold});
+""")
 
-    # Add initial events for driver if present
-    if sys.has_module("Driver") is not None:
-        fd.write(f"""
-        for i in 1..={sim_threshold} {{ sim.Driver_event.push_back(i * 100); }} """)
-
-    # Add initial events for testbench if present: schedule every cycle
-    testbench = sys.has_module("Testbench")
-    if testbench is not None:
-        fd.write(f"""
-              for i in 1..={sim_threshold} {{
-                sim.Testbench_event.push_back(i * 100);
-              }}
-            """)
+    # Driver and testbench fire every cycle; the generator stands in for sim_threshold events
+    free_running = [x for x in ["Driver", "Testbench"] if sys.has_module(x) is not None]
+    for module_name in free_running:
+        fd.write(f"  sim.{module_name}_event = EventQueue::every_cycle(sim_threshold);\n")
+
+    # Fast-forward from a checkpoint with --restore, skipping every cycle it already simulated,
+    # and save one after cycle --checkpoint-at.
+    fd.write("""  let checkpoint_at: usize =
+    runtime_param("checkpoint-at", "ASSASSYN_CHECKPOINT_AT", 0);
+  let checkpoint_file = runtime_option("checkpoint-file", "ASSASSYN_CHECKPOINT_FILE")
+    .unwrap_or_else(|| format!("checkpoint-{}.ckpt", checkpoint_at));
+  let mut start = 1;
+  if let Some(path) = runtime_option("restore", "ASSASSYN_RESTORE") {
+    sim.load_checkpoint(&path)
+      .unwrap_or_else(|e| panic!("Failed to restore checkpoint {}: {}", path, e));
+    start = sim.stamp / 100 + 1;
+""")
+    for module_name in free_running:
+        fd.write(f"    sim.{module_name}_event.set_last_cycle(sim_threshold);\n")
+    fd.write("  }\n")
+    fd.write("  Session {\n")
+    for field in fields:
+        name = field.split(':', maxsplit=1)[0].replace('pub ', '')
+        if name == 'next_cycle':
+            fd.write("    next_cycle: start,\n")
+        elif name == 'exit':
+            fd.write("    exit: None,\n")
+        else:
+            fd.write(f"    {name},\n")
+    fd.write("  }\n")
+    fd.write("  }\n\n")
 
-    # Generate main simulation loop
+    # Generate the loop body: one cycle
     randomization = ""
-    if config.get('random', False):
-        randomization = "    simulators.shuffle(&mut rng);\n"
-
-    # Get idle threshold parameter
-    idle_threshold = config.get('idle_threshold', 5)
+    if randomized:
+        randomization = ("    self.order.copy_from_slice(&self.simulators);\n"
+                         "    self.order.shuffle(&mut cycle_rng(sim.seed, i));\n")
 
     # Add idle threshold check
     any_module_triggered = 'let any_module_triggered =' + \
                            ' || '.join([f"sim.{namify(m.name)}_triggered" for m in sys.modules])
 
-    fd.write(f"""
-      let mut idle_count = 0;
-      for i in 1..={sim_threshold} {{
+    if parts['skippable']:
+        _dump_skip(fd, dram_modules)
+
+    fd.write(f"""  fn step(&mut self) -> bool {{
+    if self.exit.is_some() {{
+      return false;
+    }}
+    let i = self.next_cycle;
+    if i > self.sim_threshold {{
+      self.end("sim_threshold");
+      return false;
+    }}
+    self.next_cycle += 1;
+    let sim = &mut self.sim;
         sim.stamp = i * 100;
         sim.reset_downstream();
 {randomization}
-        for simulate in simulators.iter() {{
-          simulate(&mut sim);
-        }}
-
-        for simulate in downstreams.iter() {{
-          simulate(&mut sim);
-        }}
-
+""")
+    settle = "        sim.settle_blocked();\n" if parts['blocked'] else ""
+    if parallel:
+        dump_phase_loop(fd, parts['stage_phases'], settle)
+    elif not randomized:
+        fd.write("        sim.step_cycle();\n")
+    else:
+        fd.write("""
+        for simulate in self.order.iter() {
+          simulate(sim);
+        }
+""" + settle + """
+        for simulate in self.downstreams.iter() {
+          simulate(sim);
+        }
+""")
+    fd.write(f"""
         {any_module_triggered};
 
         // Handle idle threshold
         if !any_module_triggered {{
-          idle_count += 1;
-          if idle_count >= {idle_threshold} {{
-            println!("Simulation stopped due to reaching idle threshold of {idle_threshold}");
-            break;
+          sim.idle_count += 1;
+          if self.stop_when_idle && sim.idle_count >= self.idle_threshold {{
+            writeln!(
+              sim.logger.writer(),
+              "Simulation stopped due to reaching idle threshold of {{}}",
+              self.idle_threshold
+            ).unwrap();
+            self.end("idle");
+            return false;
           }}
         }} else {{
-          idle_count = 0;
+          sim.idle_count = 0;
         }}
 
         sim.stamp += 50;
@@ -461,10 +924,46 @@ def dump_simulator( #pylint: disable=too-many-locals, too-many-branches, too-man
         fd.write(f"            sim.mi_{dram_name}.memory_system_tick();\n")
 
     fd.write("        }\n")
-    fd.write("      }\n")
-    fd.write("    ")
-
-    # Close simulate function
-    fd.write("}\n")
-
-    return True
+    fd.write("""        if i == self.checkpoint_at {
+          let path = &self.checkpoint_file;
+          sim.save_checkpoint(path)
+            .unwrap_or_else(|e| panic!("Failed to save checkpoint {}: {}", path, e));
+        }
+        true
+  }
+
+  fn finished(&mut self) {
+    self.exit = Some("finish");
+  }
+
+  fn cycle(&self) -> usize {
+    self.sim.stamp / 100
+  }
+
+  fn idle(&self) -> bool {
+    self.sim.idle_count >= self.idle_threshold
+  }
+
+  fn exit(&self) -> Option<&'static str> {
+    self.exit
+  }
+
+  fn stats(&self) -> StatsReport {
+    self.sim.stats(self.exit.unwrap_or("running"))
+  }
+
+  fn flush(&mut self) {
+    self.sim.logger.flush();
+  }
+}
+
+pub fn simulate() {
+  let mut session = Session::new(true);
+  loop {
+    session.skip(usize::MAX);
+    if !session.step() {
+      break;
+    }
+  }
+}
+""")
@@ -0,0 +1,6 @@
+mod external_ffis;
+mod modules;
+pub mod simulator;
+
+// The C ABI of a simulator library, built as a cdylib when elaborated with `library=True`
+sim_runtime::export_simulator!(simulator::Session);
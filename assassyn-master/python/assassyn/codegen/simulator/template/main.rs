@@ -1,7 +1,9 @@
-mod modules;
-mod external_ffis;
-mod simulator;
+use __SIMULATOR_LIB__::simulator;
 
 fn main() {
-  simulator::simulate();
+  // `--batch <file>` simulates many instances of the design in this one process
+  match sim_runtime::Batch::from_args() {
+    Some(batch) => std::process::exit(if batch.run(simulator::simulate) { 0 } else { 1 }),
+    None => simulator::simulate(),
+  }
 }
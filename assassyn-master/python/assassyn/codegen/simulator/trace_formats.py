@@ -0,0 +1,84 @@
+"""Log format table for the simulator's binary trace.
+
+Every `log()` the code generator emits is given a format ID here. The table of formats is
+embedded in the generated simulator and written at the head of each binary trace, so that
+`assassyn.utils.trace` can decode a trace without the IR that produced it.
+"""
+
+import json
+
+from ...ir.dtype import Float
+from ...utils import namify
+
+
+class LogFormatTable:
+    """Assigns format IDs to log statements during code generation."""
+
+    def __init__(self, lanes: bool = False):
+        # Indexed by format ID: {"module", "format", "args": [{"kind", "bits"}]}
+        self.formats = []
+        # Whether every module logs to a lane of its own, as in a parallel simulator
+        self.lanes = lanes
+
+    def sink(self, module_name: str) -> str:
+        """The logger the logs of `module_name` go to in the generated code."""
+        return f"sim.{namify(module_name)}_log" if self.lanes else "sim.logger"
+
+    def register(self, module_name: str, fmt: str, dtypes) -> int:
+        """Register a log of `module_name` with format string `fmt`.
+
+        Args:
+            module_name: Name of the module the log belongs to
+            fmt: The Rust format string of the log
+            dtypes: Data types of the log's arguments
+
+        Returns:
+            The format ID of this log
+        """
+        args = []
+        for dtype in dtypes:
+            if isinstance(dtype, Float):
+                kind = "float"
+            elif dtype.is_signed():
+                kind = "int"
+            else:
+                kind = "uint"
+            args.append({"kind": kind, "bits": dtype.bits})
+        self.formats.append({"module": module_name, "format": fmt, "args": args})
+        return len(self.formats) - 1
+
+    def to_json(self) -> str:
+        """The table as the JSON text written at the head of a trace."""
+        return json.dumps({"formats": self.formats}, separators=(",", ":"))
+
+
+def trace_arg_bytes(bits: int) -> int:
+    """Number of bytes a traced argument of `bits` bits takes."""
+    return (bits + 7) // 8
+
+
+# Global singleton for the current compilation
+# pylint: disable=invalid-name
+_log_formats = None
+
+
+def get_log_formats():
+    """Get the global log format table.
+
+    Returns:
+        The global LogFormatTable instance
+    """
+    global _log_formats  # pylint: disable=global-statement
+    if _log_formats is None:
+        _log_formats = LogFormatTable()
+    return _log_formats
+
+
+def reset_log_formats(lanes: bool = False):
+    """Reset the log format table (useful for tests and new compilations).
+
+    Args:
+        lanes: Whether modules log to lanes of their own, for a parallel simulator
+    """
+    global _log_formats  # pylint: disable=global-statement
+    _log_formats = LogFormatTable(lanes)
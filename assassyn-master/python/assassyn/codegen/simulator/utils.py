@@ -4,6 +4,11 @@ from ...ir.dtype import DType, Void, ArrayType, Record, Bits
 from ...ir.module import Port
 from ...utils import namify
 
+# Widths up to this many bits are simulated with the stack-allocated `UWide`/`IWide` runtime
+# integers; anything wider falls back to `BigUint`/`BigInt`.
+WIDE_INT_MAX_BITS = 256
+
+
 def camelize(name: str) -> str:
     """Convert a name to camelCase.
 
@@ -22,8 +27,22 @@ def camelize(name: str) -> str:
     return result
 
 
+def _int_rust_type(prefix: str, bits: int) -> str:
+    """The Rust integer type of a `bits`-bit value, `prefix` being `u` or `i`."""
+    if bits == 1:
+        return "bool"
+    if bits <= 64:
+        # Round up to next power of 2, at least 8
+        return f"{prefix}{max(8, 1 << (bits - 1).bit_length())}"
+    if bits <= 128:
+        return f"{prefix}128"
+    if bits <= WIDE_INT_MAX_BITS:
+        wide = "UWide" if prefix == "u" else "IWide"
+        return f"{wide}<{(bits + 63) // 64}>"
+    return 'BigUint' if prefix == "u" else 'BigInt'
+
+
 def dtype_to_rust_type(dtype: DType) -> str:
-    # disable=too-many-return-statements
     """Convert an Assassyn data type to a Rust type.
 
     This matches the Rust function in src/backend/simulator/utils.rs
@@ -34,19 +53,7 @@ def dtype_to_rust_type(dtype: DType) -> str:
 
     if dtype.is_int() or dtype.is_raw():
         prefix = "u" if not dtype.is_signed() or dtype.is_raw() else "i"
-        bits = dtype.bits
-
-        if 8 <= bits <= 64:
-            # Round up to next power of 2
-            bits = 1 << (bits - 1).bit_length()
-            return f"{prefix}{bits}"
-        if bits == 1:
-            return "bool"
-        if bits < 8:
-            return f"{prefix}8"
-        if bits > 64:
-            return 'BigUint' if not dtype.is_signed() or dtype.is_raw() else 'BigInt'
-        raise ValueError(f"Unsupported data type: {dtype}")
+        return _int_rust_type(prefix, dtype.bits)
 
     if isinstance(dtype, Void):
         return "Box<EventKind>"
@@ -58,6 +65,16 @@ def dtype_to_rust_type(dtype: DType) -> str:
     raise ValueError(f"Unsupported data type: {dtype}")
 
 
+def is_copy_type(dtype: DType) -> bool:
+    """Whether the Rust type of an Assassyn data type is `Copy`, so that a value of it is
+    copied by a plain move rather than cloned."""
+    if isinstance(dtype, Void):
+        return False
+    if isinstance(dtype, ArrayType):
+        return is_copy_type(dtype.scalar_ty)
+    return dtype.bits <= WIDE_INT_MAX_BITS
+
+
 def int_imm_dumper_impl(ty: DType, value: int) -> str:
     """Generate Rust code for integer immediate values.
 
@@ -66,11 +83,17 @@ def int_imm_dumper_impl(ty: DType, value: int) -> str:
     if ty.bits == 1:
         return "true" if value != 0 else "false"
 
-    if ty.bits <= 64:
-        return f"{value}{dtype_to_rust_type(ty)}"
+    rust_ty = dtype_to_rust_type(ty)
+    if ty.bits <= 128:
+        return f"{value}{rust_ty}"
+
+    if ty.bits <= WIDE_INT_MAX_BITS:
+        n_words = (ty.bits + 63) // 64
+        bits = value & ((1 << (64 * n_words)) - 1)
+        words = ", ".join(hex((bits >> (64 * i)) & 0xFFFF_FFFF_FFFF_FFFF) for i in range(n_words))
+        return f"{rust_ty.replace('<', '::<')}::from_words([{words}])"
 
-    scalar_ty = "i64" if ty.is_signed() else "u64"
-    return f"ValueCastTo::<{dtype_to_rust_type(ty)}>::cast(&({value} as {scalar_ty}))"
+    return f'"{value}".parse::<{rust_ty}>().unwrap()'
 
 
 def fifo_name(fifo: Port):
@@ -940,14 +940,19 @@ def emit_external_sv_ffis(
     return ffi_specs
 
 
-def write_external_ffis_rs(simulator_root: Path, ffi_specs: List[ExternalFFIModule]) -> None:
-    """Emit `src/external_ffis.rs` for the simulator crate.
+def write_external_ffis_rs(
+    simulator_root: Path,
+    ffi_specs: List[ExternalFFIModule],
+    out_root: Path | None = None,
+) -> None:
+    """Emit `src/external_ffis.rs` for the simulator crate at `simulator_root`, into
+    `out_root` if the crate is staged there.
 
     We intentionally avoid adding the generated `verilated_*` crates as Cargo
     dependencies: the simulator embeds their Rust wrappers directly, while still
     loading the Verilator-built shared libraries via `libloading`.
     """
-    out_path = simulator_root / "src" / "external_ffis.rs"
+    out_path = (out_root or simulator_root) / "src" / "external_ffis.rs"
     lines: List[str] = [
         "// Auto-generated by assassyn.codegen.simulator.verilator",
         "",
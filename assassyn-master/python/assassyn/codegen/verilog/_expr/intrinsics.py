@@ -103,7 +103,9 @@ def codegen_log(dumper, expr: Log) -> Optional[str]:
 
     dumper.logs.append(f'# {expr}')
 
-    line_info = f"@line:{expr.loc.rsplit(':', 1)[-1]}"
+    # Without source locations, the line is unknown
+    loc = expr.loc or '?:?'
+    line_info = f"@line:{loc.rsplit(':', 1)[-1]}"
 
     module_info = f"[{namify(dumper.current_module.name)}]"
 
@@ -114,7 +116,7 @@ def codegen_log(dumper, expr: Log) -> Optional[str]:
          f'f"{line_info} {cycle_info} {module_info:<20} {f_string_content}"'
      )
 
-    dumper.logs.append(f'#@ line {expr.loc}: {expr}')
+    dumper.logs.append(f'#@ line {loc}: {expr}')
     if if_condition:
         dumper.logs.append(f'if ( {if_condition} ):')
         dumper.logs.append(f'    print({final_print_string})')
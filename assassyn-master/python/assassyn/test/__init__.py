@@ -9,14 +9,17 @@ from assassyn.frontend import SysBuilder
 from assassyn.backend import elaborate, config
 from assassyn import utils
 
-def run_test(name: str, top: callable, checker: callable, **kwargs):
+def run_test(name: str, top: callable, checker: callable, instances=None, **kwargs):
     """
     Lightweight test utility for assassyn systems.
 
     Args:
         name: Base system name (unique suffix appended per invocation)
         top: Callable that builds the system (receives no args or sys, uses sys context)
-        checker: Callable that validates simulator output (receives raw string)
+        checker: Callable that validates simulator output (receives raw string, and the
+            instance it comes from if it takes two arguments)
+        instances: Dicts of `run_simulator` arguments (e.g., load, sim_threshold), each a run
+            of the simulator, all of them simulated in one process by `run_simulator_batch`
         **config: Additional config passed to elaborate()
             (e.g., sim_threshold, idle_threshold, random)
     """
@@ -41,12 +44,25 @@ def run_test(name: str, top: callable, checker: callable, **kwargs):
 
     simulator_path, verilator_path = elaborate(sys, **cfg)
 
-    raw = utils.run_simulator(simulator_path)
-    checker(raw)
+    # Check if checker() also takes the instance
+    with_instance = len(inspect.signature(checker).parameters) > 1
+
+    def check(raw, instance=None):
+        if with_instance:
+            checker(raw, instance)
+        else:
+            checker(raw)
+
+    if instances is None:
+        check(utils.run_simulator(simulator_path))
+    else:
+        for raw, instance in zip(utils.run_simulator_batch(simulator_path, instances),
+                                 instances):
+            check(raw, instance)
 
     if verilator_path and cfg['verilog']:
         raw = utils.run_verilator(verilator_path)
-        checker(raw)
+        check(raw)
 
 
 def dump_ir(name: str, builder: callable, checker: callable, print_dump: bool = True):
@@ -10,11 +10,29 @@ import re
 import glob
 import hashlib
 import json
+import random
+import shutil
+import tempfile
 # Local imports
 from .enforce_type import enforce_type, validate_arguments, check_type
+from .trace import read_trace
+from .stats import SimulatorOutput, read_stats
+from .library import LiveSimulator, library_path
+from .build_cache import BuildCache, build_cache
+from .build_profiles import (
+    BUILD_PROFILES, ABORTING_PROFILES, PGO_TRAIN_PROFILE, manifest_profile, cargo_profile_args,
+    pgo_data_dir, llvm_profdata, native_cpu,
+)
+from .cargo_workspace import (
+    cargo_target_dir, prebuild_runtime, seed_lockfile, batch_workspace,
+)
 
 # Cache coordination data between elaborate() and build_simulator()
-CACHE_PENDING: tuple[str, str, str] | None = None
+CACHE_PENDING: tuple[str, str] | None = None
+
+# The runtime parameters (sim_threshold, idle_threshold, seed) elaborate() was given for each
+# simulator it returned, by absolute manifest or binary path, for run_simulator() to pass on
+RUNTIME_PARAMS: dict[str, dict] = {}
 
 def identifierize(obj):
     '''The helper function to get the identifier of the given object. You can change `id_slice`
@@ -62,17 +80,23 @@ def package_path() -> str:
     """Get the path to this python package."""
     return os.path.join(repo_path(), 'python', 'assassyn')
 
-def _cmd_wrapper(cmd):
+def _cmd_wrapper(cmd, rustflags=()):
     env = os.environ.copy()
     env.pop('RUSTC_WRAPPER', None)  # sccache fails under some sandboxed runners
+    if rustflags:
+        env['RUSTFLAGS'] = ' '.join([env.get('RUSTFLAGS', ''), *rustflags]).strip()
+
+    # Every simulator builds into one target directory, sharing the build of the runtime
+    if cmd[0] == 'cargo' and not env.get('CARGO_TARGET_DIR'):
+        env['CARGO_TARGET_DIR'] = cargo_target_dir()
 
     # Cargo/rustc sometimes writes temp artifacts then renames them into
     # `CARGO_TARGET_DIR`. If the temp dir is on a different filesystem, the rename
     # can fail with EXDEV ("Invalid cross-device link"). Prefer placing TMPDIR
     # under CARGO_TARGET_DIR to keep it on the same filesystem.
-    cargo_target_dir = env.get('CARGO_TARGET_DIR')
-    if cargo_target_dir and 'TMPDIR' not in env:
-        tmpdir = os.path.join(cargo_target_dir, 'tmp')
+    target_dir = env.get('CARGO_TARGET_DIR')
+    if target_dir and 'TMPDIR' not in env:
+        tmpdir = os.path.join(target_dir, 'tmp')
         os.makedirs(tmpdir, exist_ok=True)
         env['TMPDIR'] = tmpdir
 
@@ -124,15 +148,8 @@ def patch_fifo(file_path):
             f.write(content)
 
 
-def get_simulator_binary_path(manifest_path):
-    '''Get the path to the compiled simulator binary.
-
-    Args:
-        manifest_path: Path to Cargo.toml
-
-    Returns:
-        str: Path to the compiled binary
-    '''
+def _read_manifest(manifest_path):
+    '''Parse the Cargo.toml at `manifest_path`.'''
     # pylint: disable=import-outside-toplevel
     try:
         # Python 3.11+ has tomllib in the standard library
@@ -141,45 +158,41 @@ def get_simulator_binary_path(manifest_path):
         # Fallback to toml package for Python < 3.11
         import toml as tomllib  # type: ignore
 
-    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
-
-    # Parse Cargo.toml to get package name
     with open(manifest_path, 'rb') as f:
-        cargo_toml = tomllib.load(f)
-
-    package_name = cargo_toml['package']['name']
-
-    # Check if CARGO_TARGET_DIR is set (used by the build system)
-    cargo_target_dir = os.environ.get('CARGO_TARGET_DIR')
-    if cargo_target_dir:
-        binary_path = os.path.join(cargo_target_dir, 'release', package_name)
-    else:
-        binary_path = os.path.join(manifest_dir, 'target', 'release', package_name)
-
-    return binary_path
+        return tomllib.load(f)
 
 
-def build_simulator(manifest_path, offline=False):
-    '''Build the simulator binary using cargo build.
+def get_simulator_binary_path(manifest_path, cargo_profile=None):
+    '''Get the path to the compiled simulator binary.
 
     Args:
         manifest_path: Path to Cargo.toml
-        offline: Whether to use offline mode
+        cargo_profile: The Cargo profile the binary is built with, by default that of the
+            build profile the simulator was elaborated with
 
     Returns:
         str: Path to the compiled binary
     '''
-    # If it's already a binary (from cache), just return it
-    if os.path.exists(manifest_path) and not str(manifest_path).endswith('.toml'):
-        print(f"[Cache] Using cached binary: {manifest_path}")
-        return manifest_path
+    # Parse Cargo.toml to get package name
+    cargo_toml = _read_manifest(manifest_path)
+
+    package_name = cargo_toml['package']['name']
+    if cargo_profile is None:
+        cargo_profile = BUILD_PROFILES[manifest_profile(cargo_toml)][0]
+
+    return os.path.join(cargo_target_dir(), cargo_profile, package_name)
+
 
+def _cargo_build(manifest_path, offline, cargo_profile='release', rustflags=()):
+    '''Build the crate, or workspace, of `manifest_path` with `cargo_profile` and the extra
+    `rustflags`, retrying offline unless `offline` was asked for in the first place.'''
     def _build(off):
-        cmd = ['cargo', 'build', '--release', '--manifest-path', manifest_path]
+        cmd = ['cargo', 'build', *cargo_profile_args(cargo_profile),
+               '--manifest-path', manifest_path]
         if off:
             cmd += ['--offline']
         print(cmd)
-        _cmd_wrapper(cmd)
+        _cmd_wrapper(cmd, rustflags)
 
     try:
         _build(offline)
@@ -191,22 +204,142 @@ def build_simulator(manifest_path, offline=False):
         except subprocess.CalledProcessError as retry_err:
             raise err from retry_err
 
+
+def _build_with_pgo(manifest_path, offline, workload):
+    '''Build the simulator of `manifest_path` instrumented, run it with the options
+    `workload` of `run_simulator`, and rebuild it with the profile of that training run.'''
+    _, rustflags = BUILD_PROFILES['pgo']
+    package_name = _read_manifest(manifest_path)['package']['name']
+    data = pgo_data_dir(cargo_target_dir(), package_name)
+    shutil.rmtree(data, ignore_errors=True)
+    os.makedirs(data)
+
+    _cargo_build(manifest_path, offline, PGO_TRAIN_PROFILE,
+                 rustflags + (f'-Cprofile-generate={data}',))
+    trained = get_simulator_binary_path(manifest_path, PGO_TRAIN_PROFILE)
+    params = RUNTIME_PARAMS.get(os.path.abspath(manifest_path))
+    if params is not None:
+        RUNTIME_PARAMS[os.path.abspath(trained)] = params
+    run_simulator(binary_path=trained, **workload)
+
+    merged = os.path.join(data, 'merged.profdata')
+    profdata = llvm_profdata()
+    try:
+        _cmd_wrapper([profdata, 'merge', '-o', merged, data])
+    except subprocess.CalledProcessError as err:
+        raise EnvironmentError(
+            f"{profdata} cannot merge the profile of the training run, which needs the LLVM "
+            "of rustc. Please run 'rustup component add llvm-tools' first.") from err
+    _cargo_build(manifest_path, offline, 'pgo', rustflags + (f'-Cprofile-use={merged}',))
+
+
+def _build_crate(manifest_path, offline, pgo_workload):
+    '''Build the simulator crate of `manifest_path` with the build profile it was elaborated
+    with.'''
+    profile = manifest_profile(_read_manifest(manifest_path))
+    if profile == 'pgo':
+        _build_with_pgo(manifest_path, offline, pgo_workload or {})
+    else:
+        _cargo_build(manifest_path, offline, *BUILD_PROFILES[profile])
+
+
+def _built_binary(manifest_path):
+    '''The binary built from `manifest_path`, which inherits its runtime parameters.'''
     binary_path = get_simulator_binary_path(manifest_path)
+    params = RUNTIME_PARAMS.get(os.path.abspath(manifest_path))
+    if params is not None:
+        RUNTIME_PARAMS[os.path.abspath(binary_path)] = params
+    return binary_path
+
+
+def build_simulator(manifest_path, offline=False, pgo_workload=None):
+    '''Build the simulator binary using cargo build.
+
+    Args:
+        manifest_path: Path to Cargo.toml
+        offline: Whether to use offline mode
+        pgo_workload: The options of the `run_simulator` training run of a simulator
+            elaborated with `build_profile='pgo'`, by default none but its runtime parameters
+
+    Returns:
+        str: Path to the compiled binary
+    '''
+    # If it's already a binary (from cache), just return it
+    if os.path.exists(manifest_path) and not str(manifest_path).endswith('.toml'):
+        print(f"[Cache] Using cached binary: {manifest_path}")
+        return manifest_path
+
+    # The runtime and its dependencies are built once, and the crate uses the same versions
+    seed_lockfile(manifest_path, prebuild_runtime(lambda m: _cargo_build(m, offline)))
+    _build_crate(manifest_path, offline, pgo_workload)
+
+    binary_path = _built_binary(manifest_path)
 
     # Save cache if elaborate() set up cache info
     # pylint: disable=global-statement
     global CACHE_PENDING
     cache_data = CACHE_PENDING
     if cache_data is not None:
-        source_dir, cache_key, verilog_path = cache_data
-        save_build_cache(source_dir, cache_key, binary_path, verilog_path)
+        cache_key, verilog_path = cache_data
+        save_build_cache(cache_key, binary_path, verilog_path)
         print("[Cache Saved] Build cached for future use")
         CACHE_PENDING = None
 
     return binary_path
 
 
-def run_simulator(manifest_path=None, offline=False, release=True, binary_path=None):
+def build_simulators(manifest_paths, offline=False, pgo_workload=None):
+    '''Build several simulators with one cargo build, which compiles their crates in parallel.
+
+    The crates are built as the members of a Cargo workspace written into their common parent
+    directory for this build only, or one by one if that directory has a manifest of its own.
+    There is one build per build profile; simulators trained for `pgo` are built one by one.
+    Unlike `build_simulator`, this saves nothing to the build cache.
+
+    Args:
+        manifest_paths: Paths to the Cargo.toml of each simulator
+        offline: Whether to use offline mode
+        pgo_workload: The options of the training run of each `pgo` simulator
+
+    Returns:
+        list[str]: Paths to the compiled binaries, in the order of `manifest_paths`
+    '''
+    if not manifest_paths:
+        return []
+    lock = prebuild_runtime(lambda m: _cargo_build(m, offline))
+    by_profile = {}
+    for manifest_path in manifest_paths:
+        profile = manifest_profile(_read_manifest(manifest_path))
+        by_profile.setdefault(profile, []).append(manifest_path)
+    for profile, manifests in by_profile.items():
+        # Each simulator trains on its own
+        if profile != 'pgo':
+            with batch_workspace(manifests, lock) as workspace:
+                if workspace is not None:
+                    _cargo_build(workspace, offline, *BUILD_PROFILES[profile])
+                    continue
+        for manifest_path in manifests:
+            seed_lockfile(manifest_path, lock)
+            _build_crate(manifest_path, offline, pgo_workload)
+    return [_built_binary(manifest_path) for manifest_path in manifest_paths]
+
+
+def _runtime_param_args(path, **overrides):
+    '''The simulator options of the runtime parameters elaborate() was last given for the
+    simulator at `path`, which may be a cached binary built with other defaults, with the
+    non-None `overrides` applied.'''
+    params = dict(RUNTIME_PARAMS.get(os.path.abspath(path), {}))
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    # The binary bakes no seed in, as the cache key leaves it out: an elaborated seed of None
+    # is a fresh seed every run, unless ASSASSYN_SEED gives one
+    if 'seed' in params and params['seed'] is None and 'ASSASSYN_SEED' not in os.environ:
+        params['seed'] = random.getrandbits(64)
+    return [f'--{k.replace("_", "-")}={v}' for k, v in params.items() if v is not None]
+
+
+def run_simulator(manifest_path=None, offline=False, release=True, binary_path=None, #pylint: disable=too-many-arguments
+                  trace=None, load=None, sim_threshold=None, idle_threshold=None, seed=None,
+                  stats=None):
     '''The helper function to run the simulator.
 
     Args:
@@ -214,24 +347,143 @@ def run_simulator(manifest_path=None, offline=False, release=True, binary_path=N
         offline: Whether to use offline mode
         release: Whether to use release mode
         binary_path: Path to compiled binary (if provided, run directly)
+        trace: Path of a binary log trace to write instead of the text log
+            (decode it with `read_trace`)
+        load: Dict from array or SRAM name to the hex, binary or ELF image to load into it,
+            overriding the SRAM's init_file
+        sim_threshold, idle_threshold, seed: Override the runtime parameters the simulator
+            was elaborated with, without rebuilding it
+        stats: Path to keep the end-of-run statistics at (a temporary file by default)
 
     Returns:
-        str: Output from the simulator
+        SimulatorOutput: Output from the simulator, a str with the parsed statistics as `stats`
     '''
+    sim_args = _instance_args(binary_path or manifest_path, trace=trace, load=load,
+                              sim_threshold=sim_threshold, idle_threshold=idle_threshold,
+                              seed=seed)
+
+    # The simulator writes its statistics when it exits, to a temporary file unless asked to
+    # keep them. A simulator built before statistics existed leaves the file empty.
+    stats_path = _temp_path('.json') if stats is None else os.path.abspath(stats)
+    sim_args.append(f'--stats={stats_path}')
+    try:
+        output = SimulatorOutput(
+            _launch_simulator(manifest_path, binary_path, offline, release, sim_args))
+        if os.path.exists(stats_path) and os.path.getsize(stats_path) > 0:
+            output.stats = read_stats(stats_path)
+    finally:
+        if stats is None:
+            os.remove(stats_path)
+    return output
+
+
+def run_simulator_batch(manifest_path=None, instances=(), offline=False, release=True, #pylint: disable=too-many-arguments,too-many-locals
+                        binary_path=None, jobs=None):
+    '''Run many instances of one simulator in a single process, on a pool of threads.
+
+    Args:
+        manifest_path: Path to Cargo.toml (used if binary_path is None)
+        instances: One dict per instance, with the keyword arguments of `run_simulator` it
+            runs with: `trace`, `load`, `sim_threshold`, `idle_threshold`, `seed`, `stats`
+        offline: Whether to use offline mode
+        release: Whether to use release mode
+        binary_path: Path to compiled binary (if provided, run directly)
+        jobs: The number of instances simulated at a time (one per core by default)
+
+    Returns:
+        list[SimulatorOutput]: The output of each instance, in order, with its statistics
+    '''
+    instances = [dict(instance) for instance in instances]
+    workdir = tempfile.mkdtemp(prefix='assassyn-batch-')
+    try:
+        lines = []
+        for i, instance in enumerate(instances):
+            stats = instance.pop('stats', None)
+            args = _instance_args(binary_path or manifest_path, **instance)
+            instance['log'] = os.path.join(workdir, f'{i}.log')
+            instance['stats'] = os.path.abspath(stats) if stats else \
+                os.path.join(workdir, f'{i}.json')
+            args += [f'--log-file={instance["log"]}', f'--stats={instance["stats"]}']
+            lines.append(' '.join(f'"{arg}"' for arg in args))
+        batch = os.path.join(workdir, 'batch.txt')
+        with open(batch, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        sim_args = [f'--batch={batch}']
+        if jobs is not None:
+            sim_args.append(f'--jobs={jobs}')
+        _launch_simulator(manifest_path, binary_path, offline, release, sim_args)
+
+        outputs = []
+        for instance in instances:
+            with open(instance['log'], encoding='utf-8') as f:
+                output = SimulatorOutput(f.read())
+            if os.path.exists(instance['stats']) and os.path.getsize(instance['stats']) > 0:
+                output.stats = read_stats(instance['stats'])
+            outputs.append(output)
+        return outputs
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def open_simulator(path, offline=False, trace=None, load=None, #pylint: disable=too-many-arguments
+                   sim_threshold=None, idle_threshold=None, seed=None):
+    '''Start a simulation in this process, to step it and peek and poke its arrays and FIFOs.
+
+    Args:
+        path: Path to the Cargo.toml of a simulator elaborated with `library=True`, which is
+            built first, or to its binary
+        offline: Whether to build in offline mode
+        trace, load, sim_threshold, idle_threshold, seed: As for `run_simulator`
+
+    Returns:
+        LiveSimulator: The simulation, before its first cycle
+    '''
+    binary_path = build_simulator(path, offline) if str(path).endswith('.toml') else path
+    sim_args = _instance_args(binary_path, trace=trace, load=load, sim_threshold=sim_threshold,
+                              idle_threshold=idle_threshold, seed=seed)
+    return LiveSimulator(library_path(binary_path), sim_args)
+
+
+def _instance_args(path, trace=None, load=None, sim_threshold=None, idle_threshold=None,  #pylint: disable=too-many-arguments
+                   seed=None):
+    '''The options of a run of the simulator at `path`, as `run_simulator` takes them.'''
+    sim_args = _runtime_param_args(path, sim_threshold=sim_threshold,
+                                   idle_threshold=idle_threshold, seed=seed)
+    if trace is not None:
+        sim_args.append(f'--log-trace={os.path.abspath(trace)}')
+    for name, image in (load or {}).items():
+        sim_args.append(f'--load={name}={os.path.abspath(image)}')
+    return sim_args
+
+
+def _temp_path(suffix):
+    '''A new empty temporary file, which the caller removes.'''
+    fd, path = tempfile.mkstemp(prefix='assassyn-', suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def _launch_simulator(manifest_path, binary_path, offline, release, sim_args):
+    '''Run the simulator binary, or `cargo run` its manifest, with `sim_args`.'''
     if binary_path is not None:
         # Run the binary directly
-        print([binary_path])
-        return _cmd_wrapper([binary_path])
+        print([binary_path] + sim_args)
+        return _cmd_wrapper([binary_path] + sim_args)
+
+    # Fall back to cargo run, with the build profile of the simulator, untrained for `pgo`
+    cargo_profile, rustflags = BUILD_PROFILES[manifest_profile(_read_manifest(manifest_path))]
 
-    # Fall back to cargo run
     def _run(off):
         cmd = ['cargo', 'run', '--manifest-path', manifest_path]
         if off:
             cmd += ['--offline']
         if release:
-            cmd += ['--release']
+            cmd += cargo_profile_args(cargo_profile)
+        if sim_args:
+            cmd += ['--'] + sim_args
         print(cmd)
-        return _cmd_wrapper(cmd)
+        return _cmd_wrapper(cmd, rustflags if release else ())
 
     try:
         return _run(offline)
@@ -337,54 +589,46 @@ def namify(name: str) -> str:
     """
     return ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
 
-def check_build_cache(src_dir: str, cache_key: str):
-    """Check if cached build exists and is valid.
+def check_build_cache(cache_key: str, verilog: str = None):
+    """Look the build of `cache_key` up in the shared build cache (see build_cache.py).
 
     Args:
-        src_dir: Directory where cache file is stored
         cache_key: Combined IR hash + config hash key
+        verilog: The directory to copy the cached Verilog to (optional)
+
+    Returns:
+        The cached binary and Verilog directory, or None on a miss
     """
+    return build_cache().lookup(cache_key, verilog)
 
-    cache_file = f'{src_dir}/.build_cache.json'
-    if not os.path.exists(cache_file):
-        return None
-    try:
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache = json.load(f)
-        if cache.get('key') == cache_key:
-            binary = cache.get('binary')
-            if binary and os.path.exists(binary):
-                return binary, cache.get('verilog')
-    except (json.JSONDecodeError, KeyError, OSError):
-        pass
-    return None
-
-def save_build_cache(src_dir: str, cache_key: str, binary: str, verilog: str):
-    """Save build cache metadata.
+def save_build_cache(cache_key: str, binary: str, verilog: str):
+    """Add a build to the shared build cache.
 
     Args:
-        src_dir: Directory where cache file will be stored
         cache_key: Combined IR hash + config hash key
         binary: Path to built simulator binary
         verilog: Path to generated verilog (optional)
     """
-    cache_data = {
-        'key': cache_key,
-        'binary': str(binary),
-        'verilog': str(verilog) if verilog else None
-    }
-    cache_file = f'{src_dir}/.build_cache.json'
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f)
+    return build_cache().store(cache_key, binary, verilog)
+
+def build_cache_stats() -> dict:
+    """The hit, miss, store and eviction counts of the shared build cache, and its size."""
+    return build_cache().stats()
 
 __all__ = [
     # Type enforcement utilities
     'enforce_type', 'validate_arguments', 'check_type',
     # Existing utilities
     'identifierize', 'unwrap_operand', 'repo_path', 'package_path',
-    'patch_fifo', 'run_simulator', 'build_simulator', 'get_simulator_binary_path',
-    'run_verilator', 'parse_verilator_cycle',
+    'patch_fifo', 'run_simulator', 'build_simulator', 'build_simulators',
+    'get_simulator_binary_path', 'run_verilator', 'parse_verilator_cycle',
     'parse_simulator_cycle', 'has_verilator', 'create_dir', 'namify',
+    'read_trace', 'SimulatorOutput', 'read_stats',
+    'open_simulator', 'LiveSimulator',
     # Build caching
-    'check_build_cache', 'save_build_cache'
+    'check_build_cache', 'save_build_cache', 'build_cache_stats', 'BuildCache', 'build_cache',
+    # Shared Cargo state
+    'cargo_target_dir', 'prebuild_runtime',
+    # Build profiles
+    'BUILD_PROFILES', 'ABORTING_PROFILES',
 ]
@@ -0,0 +1,219 @@
+"""The build cache shared by every elaboration: built simulators and their Verilog, by key.
+
+A key is the hash of the IR and of the build-relevant configuration (see
+`backend._generate_cache_key`), so an entry is valid for as long as it exists. Entries live in
+one directory, `$ASSASSYN_BUILD_CACHE`, by default `<ASSASSYN_HOME>/.cache/build`, shared by the
+designs, configurations and processes using it:
+
+    <root>/entries/<key>/meta.json       what the entry holds; its mtime is its last use
+    <root>/entries/<key>/bin/            the simulator binary, and its shared library if built
+    <root>/entries/<key>/verilog/        the generated Verilog tree, if any
+    <root>/lock, <root>/stats.json       the lock of the cache and its hit/miss counters
+
+An entry is written to `<root>/tmp` and renamed into `entries` in one step, so no process ever
+sees a partial entry. Taking hits, adding entries and evicting them hold `lock`, which keeps
+concurrent pytest-xdist workers consistent. After each store, entries unused for longer than
+`$ASSASSYN_BUILD_CACHE_MAX_AGE_DAYS` (30 by default) are evicted, then the least recently used
+ones until the cache holds at most `$ASSASSYN_BUILD_CACHE_MAX_MB` (4096 by default).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no advisory locks on this platform
+    fcntl = None
+
+from .library import library_path
+
+_COUNTERS = ('hits', 'misses', 'stores', 'evictions')
+
+
+def _tree_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _write_json(path: str, data: dict):
+    """Write `data` to `path` at once, through a temporary file in the same directory."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class BuildCache:
+    """A content-addressed cache of built simulators, with LRU eviction.
+
+    Args:
+        root: The directory of the cache
+        max_bytes: The size the entries are evicted down to after each store
+        max_age: The number of seconds an entry may go unused before it is evicted
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_age: float):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.entries = os.path.join(root, 'entries')
+        self.tmp = os.path.join(root, 'tmp')
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.entries, key)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(self.entries, exist_ok=True)
+        os.makedirs(self.tmp, exist_ok=True)
+        with open(os.path.join(self.root, 'lock'), 'a+', encoding='utf-8') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _counters(self) -> dict:
+        try:
+            with open(os.path.join(self.root, 'stats.json'), encoding='utf-8') as f:
+                counters = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            counters = {}
+        return {name: int(counters.get(name, 0)) for name in _COUNTERS}
+
+    def _count(self, **increments):
+        counters = self._counters()
+        for name, value in increments.items():
+            counters[name] += value
+        _write_json(os.path.join(self.root, 'stats.json'), counters)
+
+    def _meta(self, key: str) -> dict | None:
+        try:
+            with open(os.path.join(self._entry(key), 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def lookup(self, key: str, verilog: str | None = None) -> tuple[str, str | None] | None:
+        """The binary built for `key`, and the directory its Verilog tree was copied to, or
+        `None` on a miss.
+
+        The Verilog simulator builds in the Verilog tree, so the tree of the entry is copied to
+        `verilog`, the directory the caller would have generated it in, and never used in place.
+        """
+        with self._locked():
+            meta = self._meta(key)
+            binary = meta and os.path.join(self._entry(key), meta['binary'])
+            if not binary or not os.path.exists(binary):
+                self._count(misses=1)
+                return None
+            os.utime(os.path.join(self._entry(key), 'meta.json'))
+            if verilog and meta.get('verilog_tree'):
+                shutil.rmtree(verilog, ignore_errors=True)
+                shutil.copytree(os.path.join(self._entry(key), meta['verilog_tree']), verilog)
+            else:
+                verilog = None
+            self._count(hits=1)
+        return binary, verilog
+
+    def store(self, key: str, binary: str, verilog: str | None = None) -> str:
+        """Add the `binary` (and its shared library, if any) and the `verilog` tree built for
+        `key`, and evict what no longer fits. Return the path of the cached binary."""
+        os.makedirs(self.tmp, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f'{key}.', dir=self.tmp)
+        os.makedirs(os.path.join(staging, 'bin'))
+        name = os.path.basename(binary)
+        shutil.copy2(binary, os.path.join(staging, 'bin', name))
+        library = library_path(binary)
+        if os.path.exists(library):
+            shutil.copy2(library, os.path.join(staging, 'bin', os.path.basename(library)))
+        meta = {'key': key, 'binary': f'bin/{name}', 'verilog_tree': None}
+        if verilog and os.path.isdir(verilog):
+            shutil.copytree(verilog, os.path.join(staging, 'verilog'),
+                            ignore=shutil.ignore_patterns('sim_build', '__pycache__'))
+            meta['verilog_tree'] = 'verilog'
+        meta['bytes'] = _tree_bytes(staging)
+        _write_json(os.path.join(staging, 'meta.json'), meta)
+
+        with self._locked():
+            if self._meta(key) is None:
+                shutil.rmtree(self._entry(key), ignore_errors=True)
+                os.replace(staging, self._entry(key))
+                self._count(stores=1)
+            else:
+                # Another process stored the same build first
+                shutil.rmtree(staging, ignore_errors=True)
+                os.utime(os.path.join(self._entry(key), 'meta.json'))
+            self._evict(keep=key)
+        return os.path.join(self._entry(key), meta['binary'])
+
+    def _evict(self, keep: str | None = None) -> int:
+        now = time.time()
+        entries = []
+        for key in os.listdir(self.entries):
+            meta_path = os.path.join(self._entry(key), 'meta.json')
+            meta = self._meta(key)
+            if meta is None:
+                # Left over by a process that died while removing the entry
+                shutil.rmtree(self._entry(key), ignore_errors=True)
+                continue
+            entries.append((os.path.getmtime(meta_path), key, meta.get('bytes', 0)))
+        entries.sort()
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for used, key, size in entries:
+            if key == keep:
+                continue
+            if now - used <= self.max_age and total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            self._count(evictions=evicted)
+        return evicted
+
+    def evict(self) -> int:
+        """Evict the entries over the age and size limits, returning how many."""
+        with self._locked():
+            return self._evict()
+
+    def clear(self):
+        """Remove every entry, keeping the counters."""
+        with self._locked():
+            shutil.rmtree(self.entries, ignore_errors=True)
+            os.makedirs(self.entries)
+
+    def stats(self) -> dict:
+        """The hits, misses, stores and evictions counted so far, and the `entries` and
+        `bytes` the cache holds."""
+        with self._locked():
+            stats = self._counters()
+            keys = [key for key in os.listdir(self.entries) if self._meta(key) is not None]
+            stats['entries'] = len(keys)
+            stats['bytes'] = sum(self._meta(key).get('bytes', 0) for key in keys)
+        return stats
+
+
+def build_cache() -> BuildCache:
+    """The build cache configured by the environment."""
+    root = os.environ.get('ASSASSYN_BUILD_CACHE')
+    if not root:
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from . import repo_path
+        root = os.path.join(repo_path(), '.cache', 'build')
+    max_mb = float(os.environ.get('ASSASSYN_BUILD_CACHE_MAX_MB', 4096))
+    max_days = float(os.environ.get('ASSASSYN_BUILD_CACHE_MAX_AGE_DAYS', 30))
+    return BuildCache(root, int(max_mb * 2 ** 20), max_days * 24 * 3600)
@@ -0,0 +1,121 @@
+"""The build profiles a simulator can be elaborated with, `elaborate(build_profile=...)`.
+
+Each profile but the default `release` is a Cargo profile of the simulator crate, written into
+its manifest with `profile_sections`, and named under `[package.metadata.assassyn]`, from
+which `build_simulator` and `get_simulator_binary_path` learn how to build it and where the
+binary is:
+
+    release         Cargo's release profile, the default
+    fast-compile    for edit-compile-test loops: less optimization, more codegen units
+    max-throughput  for long runs: fat LTO, one codegen unit, panic=abort, the host CPU
+    pgo             max-throughput, rebuilt with the profile of a training run
+"""
+
+from __future__ import annotations
+
+import functools
+import glob
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+
+# The Cargo profile, and the extra rustc flags, of each build profile. The flags are passed in
+# RUSTFLAGS, as Cargo profiles cannot set them, so they apply to the dependencies too; each
+# profile building into a target subdirectory of its own, they never invalidate another's.
+BUILD_PROFILES: dict[str, tuple[str, tuple[str, ...]]] = {
+    'release': ('release', ()),
+    'fast-compile': ('fast-compile', ()),
+    'max-throughput': ('max-throughput', ('-Ctarget-cpu=native',)),
+    'pgo': ('pgo', ('-Ctarget-cpu=native',)),
+}
+
+# The Cargo profile of the instrumented build of `pgo`
+PGO_TRAIN_PROFILE = 'pgo-train'
+
+# Profiles which abort on a panic, which a simulator library, or a batch, cannot
+ABORTING_PROFILES = ('max-throughput', 'pgo')
+
+
+def native_cpu(build_profile: str) -> str | None:
+    """The CPU a simulator of `build_profile` is built for, if the profile builds for the host
+    CPU, as the features `-Ctarget-cpu=native` enables: a binary built for one host may not
+    run on another, so the build cache tells them apart."""
+    if '-Ctarget-cpu=native' not in BUILD_PROFILES[build_profile][1]:
+        return None
+    return _native_features()
+
+
+@functools.lru_cache(maxsize=None)
+def _native_features() -> str:
+    try:
+        cfg = subprocess.check_output(
+            ['rustc', '--print', 'cfg', '-Ctarget-cpu=native'], text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        # Without rustc, nothing is built; the name of the host stands in for its CPU
+        return platform.node()
+    features = sorted(line for line in cfg.splitlines() if line.startswith('target_feature='))
+    return hashlib.sha256('\n'.join(features).encode()).hexdigest()[:12]
+
+
+def profile_sections() -> str:
+    """The Cargo profiles of the build profiles, for a simulator crate or workspace."""
+    return (
+        '[profile.fast-compile]\n'
+        'inherits = "release"\n'
+        'opt-level = 1\n'
+        'codegen-units = 256\n'
+        'incremental = true\n'
+        '[profile.max-throughput]\n'
+        'inherits = "release"\n'
+        'lto = "fat"\n'
+        'codegen-units = 1\n'
+        'panic = "abort"\n'
+        f'[profile.{PGO_TRAIN_PROFILE}]\n'
+        'inherits = "max-throughput"\n'
+        '[profile.pgo]\n'
+        'inherits = "max-throughput"\n')
+
+
+def manifest_profile(cargo_toml: dict) -> str:
+    """The build profile the parsed simulator manifest `cargo_toml` was elaborated with."""
+    metadata = cargo_toml['package'].get('metadata', {}).get('assassyn', {})
+    return metadata.get('build-profile', 'release')
+
+
+def cargo_profile_args(cargo_profile: str) -> list[str]:
+    """The options of `cargo build` or `cargo run` selecting `cargo_profile`."""
+    if cargo_profile == 'release':
+        return ['--release']
+    return ['--profile', cargo_profile]
+
+
+def pgo_data_dir(target_dir: str, package_name: str) -> str:
+    """Where the training run of the simulator `package_name` writes its profile."""
+    return os.path.join(target_dir, 'pgo-data', package_name)
+
+
+def llvm_profdata() -> str:
+    """The `llvm-profdata` merging the profiles of a training run: `$LLVM_PROFDATA`, that of
+    rustup's `llvm-tools` component, whose LLVM is rustc's, or else the one on the PATH.
+
+    Raises:
+        EnvironmentError: If there is none
+    """
+    if os.environ.get('LLVM_PROFDATA'):
+        return os.environ['LLVM_PROFDATA']
+    try:
+        sysroot = subprocess.check_output(['rustc', '--print', 'sysroot'], text=True).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        sysroot = None
+    if sysroot:
+        tools = glob.glob(os.path.join(sysroot, 'lib', 'rustlib', '*', 'bin', 'llvm-profdata'))
+        if tools:
+            return tools[0]
+    found = shutil.which('llvm-profdata')
+    if found is None:
+        raise EnvironmentError(
+            "The pgo build profile needs llvm-profdata. "
+            "Please run 'rustup component add llvm-tools' first.")
+    return found
@@ -0,0 +1,144 @@
+"""The Cargo state every generated simulator shares: one target directory and a prebuilt runtime.
+
+Each generated simulator is a crate of its own, depending on `sim-runtime` by path. Built into
+one target directory and resolved against one lock file, they all reuse the same build of
+`sim-runtime` and its dependencies, which is then compiled once per machine rather than once
+per design. `prebuild_runtime` builds it ahead of the first simulator, through a crate in the
+target directory that depends on the runtime exactly as a simulator does, and whose
+`Cargo.lock` seeds the lock file of every simulator crate, so that no build resolves, or
+fetches, dependencies again.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no advisory locks on this platform
+    fcntl = None
+
+from .build_profiles import profile_sections
+
+# The lock file of the prebuilt runtime, once built by this process
+_RUNTIME_LOCK: str | None = None
+
+
+def cargo_target_dir() -> str:
+    """The target directory of every simulator: `$CARGO_TARGET_DIR`, or else
+    `<ASSASSYN_HOME>/.sim-runtime-cache`."""
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from . import repo_path
+    return os.environ.get('CARGO_TARGET_DIR') or os.path.join(repo_path(), '.sim-runtime-cache')
+
+
+def runtime_dependency() -> str:
+    """The `[dependencies]` entry of `sim-runtime` in a simulator crate."""
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from . import repo_path
+    runtime_path = os.path.join(repo_path(), 'tools', 'rust-sim-runtime')
+    return f'sim-runtime = {{ path = "{runtime_path}" }}\n'
+
+
+def _write_if_changed(path: str, content: str):
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def prebuild_runtime(build) -> str | None:
+    """Build the runtime and its dependencies in release mode into the shared target
+    directory, once per process, with `build(manifest_path)`, and return its lock file.
+
+    Return `None`, leaving each simulator to build the runtime itself, if the build fails.
+    """
+    global _RUNTIME_LOCK  # pylint: disable=global-statement
+    if _RUNTIME_LOCK is not None:
+        return _RUNTIME_LOCK
+    crate = os.path.join(cargo_target_dir(), 'assassyn-runtime')
+    os.makedirs(os.path.join(crate, 'src'), exist_ok=True)
+    manifest = os.path.join(crate, 'Cargo.toml')
+    _write_if_changed(manifest, (
+        '[package]\n'
+        'name = "assassyn-runtime"\n'
+        'version = "0.1.0"\n'
+        'edition = "2021"\n'
+        '[dependencies]\n' + runtime_dependency()))
+    _write_if_changed(os.path.join(crate, 'src', 'lib.rs'), 'pub use sim_runtime;\n')
+    try:
+        build(manifest)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    lock = os.path.join(crate, 'Cargo.lock')
+    _RUNTIME_LOCK = lock if os.path.exists(lock) else None
+    return _RUNTIME_LOCK
+
+
+def seed_lockfile(manifest_path: str, lock: str | None):
+    """Give the simulator crate of `manifest_path` the dependency versions of the prebuilt
+    runtime, unless it was built, and locked, before."""
+    crate_lock = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), 'Cargo.lock')
+    if lock and not os.path.exists(crate_lock):
+        shutil.copyfile(lock, crate_lock)
+
+
+@contextlib.contextmanager
+def batch_workspace(manifest_paths, lock: str | None = None):
+    """Make the simulator crates of `manifest_paths` the members of a Cargo workspace for the
+    duration of the context, and yield its manifest.
+
+    The workspace is private to the target directory, with a directory of its own for each set
+    of crates, in which every member is a symlink to its crate, as Cargo only takes members
+    below the root of the workspace. Nothing is written next to the crates, where any other
+    `cargo` run would find the workspace. Yield `None` if a concurrent batch of the same crates
+    holds the workspace.
+    """
+    crates = [os.path.dirname(os.path.abspath(path)) for path in manifest_paths]
+    digest = hashlib.sha256('\n'.join(crates).encode()).hexdigest()[:16]
+    root = os.path.join(cargo_target_dir(), 'batch-workspaces', digest)
+    os.makedirs(root, exist_ok=True)
+    manifest = os.path.join(root, 'Cargo.toml')
+    with open(os.path.join(root, 'lock'), 'a+', encoding='utf-8') as held:
+        if fcntl is not None:
+            try:
+                fcntl.flock(held, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+        try:
+            # Whatever manifest a killed batch left is rewritten
+            with open(manifest, 'w', encoding='utf-8') as f:
+                f.write('[workspace]\nresolver = "2"\nmembers = [\n')
+                for i, crate in enumerate(crates):
+                    # The same member paths from batch to batch let Cargo rebuild incrementally
+                    member = f'{i}-{os.path.basename(crate)}'
+                    link = os.path.join(root, member)
+                    if os.path.islink(link) and os.readlink(link) != crate:
+                        os.unlink(link)
+                    if not os.path.islink(link):
+                        os.symlink(crate, link)
+                    f.write(f'    "{member}",\n')
+                f.write(']\n')
+                # A workspace builds its members with its own profiles
+                f.write(profile_sections())
+            root_lock = os.path.join(root, 'Cargo.lock')
+            if lock and not os.path.exists(root_lock):
+                shutil.copyfile(lock, root_lock)
+            yield manifest
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(manifest)
+            if fcntl is not None:
+                fcntl.flock(held, fcntl.LOCK_UN)
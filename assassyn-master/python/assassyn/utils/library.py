@@ -0,0 +1,248 @@
+"""Step a simulator in this process, and peek and poke its arrays and FIFOs.
+
+A simulator elaborated with `library=True` is also built as a shared library exporting the C
+ABI described in `tools/rust-sim-runtime/src/runtime/library.md`. `LiveSimulator` loads it
+with ctypes, so that a testbench in Python can drive the simulation cycle by cycle:
+
+    with utils.open_simulator(simulator_path) as sim:
+        sim.array('mem')[0] = 42
+        sim.step(10)
+        assert sim.array('acc')[0] == 42
+"""
+
+from __future__ import annotations
+
+import ctypes
+import json
+import os
+import sys
+from ctypes import c_char_p, c_int32, c_int64, c_size_t, c_uint64, c_void_p
+
+_BUFFER = ctypes.POINTER(ctypes.c_uint8)
+
+# The argument and return types of each function of the C ABI
+_SIGNATURES = {
+    'assassyn_sim_new': ([c_size_t, ctypes.POINTER(c_char_p)], c_void_p),
+    'assassyn_sim_free': ([c_void_p], None),
+    'assassyn_sim_step': ([c_void_p, c_uint64], c_int64),
+    'assassyn_sim_run_until_idle': ([c_void_p, c_uint64], c_int64),
+    'assassyn_sim_cycle': ([c_void_p], c_uint64),
+    'assassyn_sim_exit': ([c_void_p, _BUFFER, c_size_t], c_size_t),
+    'assassyn_sim_error': ([c_void_p, _BUFFER, c_size_t], c_size_t),
+    'assassyn_sim_ports': ([_BUFFER, c_size_t], c_size_t),
+    'assassyn_sim_stats': ([c_void_p, _BUFFER, c_size_t], c_size_t),
+    'assassyn_sim_array_read': ([c_void_p, c_char_p, c_size_t, _BUFFER, c_size_t], c_int32),
+    'assassyn_sim_array_write': ([c_void_p, c_char_p, c_size_t, _BUFFER, c_size_t], c_int32),
+    'assassyn_sim_fifo_len': ([c_void_p, c_char_p], c_int64),
+    'assassyn_sim_fifo_peek': ([c_void_p, c_char_p, c_size_t, _BUFFER, c_size_t], c_int32),
+    'assassyn_sim_fifo_push': ([c_void_p, c_char_p, _BUFFER, c_size_t], c_int32),
+    'assassyn_sim_fifo_pop': ([c_void_p, c_char_p], c_int32),
+}
+
+
+def _load(path):
+    '''Load the simulator library at `path` and declare its functions.'''
+    lib = ctypes.CDLL(os.path.abspath(path))
+    for name, (argtypes, restype) in _SIGNATURES.items():
+        func = getattr(lib, name)
+        func.argtypes = argtypes
+        func.restype = restype
+    return lib
+
+
+def _text(func, *args):
+    '''The text a function of the C ABI copies out, asking it for the length first.'''
+    size = func(*args, None, 0)
+    buf = (ctypes.c_uint8 * size)()
+    func(*args, buf, size)
+    return bytes(buf).decode('utf-8')
+
+
+class _Port:  # pylint: disable=too-few-public-methods
+    '''An array or FIFO of a `LiveSimulator`, whose values are `bits` wide.'''
+
+    def __init__(self, sim, spec):
+        self._sim = sim
+        self._name = spec['name'].encode()
+        self.bits = spec['bits']
+        self.signed = spec['signed']
+        self._nbytes = (self.bits + 7) // 8
+
+    def _encode(self, value):
+        value = int(value)
+        if self.signed:
+            low, high = -(1 << (self.bits - 1)), 1 << (self.bits - 1)
+        else:
+            low, high = 0, 1 << self.bits
+        if not low <= value < high:
+            raise ValueError(f'{value} does not fit in {self.bits} bits')
+        data = value.to_bytes(self._nbytes, 'little', signed=self.signed)
+        return (ctypes.c_uint8 * self._nbytes).from_buffer_copy(data)
+
+    def _decode(self, buf):
+        return int.from_bytes(bytes(buf), 'little', signed=self.signed)
+
+    def _buffer(self):
+        return (ctypes.c_uint8 * self._nbytes)()
+
+
+class ArrayView(_Port):
+    '''An array of a `LiveSimulator`, indexed like a list.
+
+    Writes go to the array in place, as if the array was loaded so: they take effect at once,
+    and no write port, array statistic or log sees them.
+    '''
+
+    def __init__(self, sim, spec):
+        super().__init__(sim, spec)
+        self._size = spec['size']
+
+    def __len__(self):
+        return self._size
+
+    def _index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(f'{self._name.decode()}[{index}] is out of range')
+        return index
+
+    def __getitem__(self, index):
+        buf = self._buffer()
+        self._sim.check(self._sim.lib.assassyn_sim_array_read(
+            self._sim.handle, self._name, self._index(index), buf, self._nbytes))
+        return self._decode(buf)
+
+    def __setitem__(self, index, value):
+        self._sim.check(self._sim.lib.assassyn_sim_array_write(
+            self._sim.handle, self._name, self._index(index), self._encode(value), self._nbytes))
+
+
+class FifoView(_Port):
+    '''A FIFO of a `LiveSimulator`, from its front (index 0) to its back.
+
+    Like an array write, a push or pop takes effect at once and bypasses the FIFO's statistics.
+    '''
+
+    def __len__(self):
+        return self._sim.check(self._sim.lib.assassyn_sim_fifo_len(self._sim.handle, self._name))
+
+    def peek(self, index=0):
+        '''The value `index` entries behind the front, or None if the FIFO is not as long.'''
+        buf = self._buffer()
+        found = self._sim.check(self._sim.lib.assassyn_sim_fifo_peek(
+            self._sim.handle, self._name, index, buf, self._nbytes))
+        return self._decode(buf) if found else None
+
+    def push(self, value):
+        '''Push `value` to the back, and return whether it fit in the FIFO.'''
+        return bool(self._sim.check(self._sim.lib.assassyn_sim_fifo_push(
+            self._sim.handle, self._name, self._encode(value), self._nbytes)))
+
+    def pop(self):
+        '''Pop the front, and return it, or None if the FIFO is empty.'''
+        value = self.peek()
+        if value is not None:
+            self._sim.check(self._sim.lib.assassyn_sim_fifo_pop(self._sim.handle, self._name))
+        return value
+
+
+class LiveSimulator:
+    '''A simulation run in this process by a simulator library.
+
+    Args:
+        path: The shared library of a simulator elaborated with `library=True`
+        args: The simulator options of the run, e.g. `['--load=mem=prog.hex']`; the
+            command line of this process is ignored
+    '''
+
+    def __init__(self, path, args=()):
+        self.handle = None
+        self.lib = _load(path)
+        ports = json.loads(_text(self.lib.assassyn_sim_ports))
+        self._arrays = {spec['name']: spec for spec in ports['arrays']}
+        self._fifos = {spec['name']: spec for spec in ports['fifos']}
+        argv = [str(arg).encode() for arg in args]
+        self.handle = self.lib.assassyn_sim_new(len(argv), (c_char_p * len(argv))(*argv))
+        error = _text(self.lib.assassyn_sim_error, self.handle)
+        if error:
+            self.close()
+            raise RuntimeError(error)
+
+    def check(self, status):
+        '''Raise the error of the simulator if `status` is -1, and return it otherwise.'''
+        if status == -1:
+            raise RuntimeError(_text(self.lib.assassyn_sim_error, self.handle))
+        return status
+
+    def step(self, cycles=1):
+        '''Simulate up to `cycles` cycles, and return how many were simulated, which is fewer
+        once the simulation ended, by `finish()` or the simulation threshold.'''
+        return self.check(self.lib.assassyn_sim_step(self.handle, cycles))
+
+    def run_until_idle(self, max_cycles):
+        '''Like `step`, but stop after the cycle the design became idle in.'''
+        return self.check(self.lib.assassyn_sim_run_until_idle(self.handle, max_cycles))
+
+    @property
+    def cycle(self):
+        '''The last cycle simulated.'''
+        return self.lib.assassyn_sim_cycle(self.handle)
+
+    @property
+    def exit(self):
+        '''Why the simulation ended, e.g. `"finish"`, or None while it runs.'''
+        return _text(self.lib.assassyn_sim_exit, self.handle) or None
+
+    @property
+    def stats(self):
+        '''The statistics of the simulation so far, as `run_simulator` reads them at exit.'''
+        return json.loads(_text(self.lib.assassyn_sim_stats, self.handle))
+
+    @property
+    def arrays(self):
+        '''The names of the arrays that `array` hands out.'''
+        return list(self._arrays)
+
+    @property
+    def fifos(self):
+        '''The names of the FIFOs that `fifo` hands out.'''
+        return list(self._fifos)
+
+    def array(self, name):
+        '''The array `name`, e.g. a register or the payload of an SRAM.'''
+        if name not in self._arrays:
+            raise KeyError(f'No array named {name!r}')
+        return ArrayView(self, self._arrays[name])
+
+    def fifo(self, name):
+        '''The FIFO `name`, named `<module>_<port>` as in the generated simulator.'''
+        if name not in self._fifos:
+            raise KeyError(f'No FIFO named {name!r}')
+        return FifoView(self, self._fifos[name])
+
+    def close(self):
+        '''End the simulation and free it.'''
+        if self.handle is not None:
+            self.lib.assassyn_sim_free(self.handle)
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def library_path(binary_path):
+    '''The simulator library built next to the simulator binary at `binary_path`.'''
+    directory, name = os.path.split(binary_path)
+    name = name.removesuffix('.exe').replace('-', '_')
+    if sys.platform.startswith('darwin'):
+        return os.path.join(directory, f'lib{name}.dylib')
+    if sys.platform.startswith('win'):
+        return os.path.join(directory, f'{name}.dll')
+    return os.path.join(directory, f'lib{name}.so')
@@ -0,0 +1,37 @@
+"""The end-of-run statistics of the Rust simulator.
+
+Every generated simulator counts, without any `log()` in the design, how often each module
+completed or stalled on a `wait_until`, the pushes, pops and occupancy of each FIFO, and the
+writes to each array. Run with `--stats=<path>`, it writes them as one JSON document when it
+exits, whether by `finish()`, the idle threshold or the simulation threshold. The document is
+described in `tools/rust-sim-runtime/src/runtime/stats.md`.
+"""
+
+from __future__ import annotations
+
+import json
+
+
+class SimulatorOutput(str):
+    """The text a simulator printed, as returned by `run_simulator`, with the statistics of
+    the run as `stats`, or `None` if the simulator wrote none."""
+
+    stats: dict | None
+
+    def __new__(cls, raw: str, stats: dict | None = None):
+        output = super().__new__(cls, raw)
+        output.stats = stats
+        return output
+
+    def ipc(self, module: str) -> float:
+        """The number of times `module` completed per simulated cycle, e.g. the instructions
+        per cycle of a CPU's writeback stage."""
+        if self.stats is None:
+            raise ValueError('The simulator wrote no statistics')
+        return self.stats['modules'][module]['triggered'] / max(self.stats['cycles'], 1)
+
+
+def read_stats(path: str) -> dict:
+    """Read the statistics a simulator wrote with `--stats=<path>`."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,159 @@
+"""Decoder of the binary log traces written by the Rust simulator.
+
+A simulator run with `--log-trace=<path>` (or `run_simulator(..., trace=<path>)`) appends one
+compact record per `log()` instead of a formatted line. This module reads such a trace back,
+either record by record, as the text lines the simulator would have printed, or in bulk as
+NumPy arrays. The layout is documented in `tools/rust-sim-runtime/src/runtime/trace.md`.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from typing import Iterator, NamedTuple
+
+TRACE_MAGIC = b'ASTRACE\0'
+TRACE_VERSION = 1
+
+
+class LogFormat(NamedTuple):
+    """The format of one `log()` statement, as registered by the code generator."""
+
+    module: str
+    format: str
+    # (kind, bits) of each argument, where kind is "uint", "int" or "float"
+    args: tuple
+
+    def render(self, values) -> str:
+        """Format the argument values like the simulator does."""
+        # Rust and Python share the format spec mini-language, bar the debug formatter.
+        return self.format.replace('{:?}', '{}').format(*values)
+
+
+class LogRecord(NamedTuple):
+    """One traced `log()`: where it fired and the values of its arguments."""
+
+    stamp: int
+    format_id: int
+    args: tuple
+
+    @property
+    def cycle(self) -> int:
+        '''The cycle the log fired in.'''
+        return self.stamp // 100
+
+
+class LogTrace:
+    """A binary log trace. Iterating over it decodes the records lazily.
+
+    Args:
+        path: Path to the trace file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = f.read(16)
+            if len(head) < 16 or head[:8] != TRACE_MAGIC:
+                raise ValueError(f"{path} is not an assassyn log trace")
+            version, length = struct.unpack('<II', head[8:])
+            if version != TRACE_VERSION:
+                raise ValueError(
+                    f"{path} is a version {version} trace, expected version {TRACE_VERSION}")
+            table = json.loads(f.read(length).decode('utf-8'))
+        self.offset = 16 + length
+        self.formats = [
+            LogFormat(fmt['module'], fmt['format'],
+                      tuple((arg['kind'], arg['bits']) for arg in fmt['args']))
+            for fmt in table['formats']
+        ]
+        # (bytes, kind) of each argument of each format, in the order they are stored
+        self._layouts = [
+            tuple(((bits + 7) // 8, kind) for kind, bits in fmt.args)
+            for fmt in self.formats
+        ]
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        with open(self.path, 'rb') as f:
+            if f.seek(0, 2) <= self.offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from self._decode(data)
+
+    def _decode(self, data) -> Iterator[LogRecord]:
+        pos = self.offset
+        end = len(data)
+        stamp = 0
+        layouts = self._layouts
+        from_bytes = int.from_bytes
+        while pos < end:
+            # Stamp delta, then format ID, both LEB128
+            delta, shift = 0, 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                delta |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            format_id, shift = 0, 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                format_id |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            stamp += delta
+            args = []
+            for size, kind in layouts[format_id]:
+                raw = data[pos:pos + size]
+                pos += size
+                if kind == 'float':
+                    args.append(struct.unpack('<f', raw)[0])
+                else:
+                    args.append(from_bytes(raw, 'little', signed=kind == 'int'))
+            yield LogRecord(stamp, format_id, tuple(args))
+
+    def lines(self) -> Iterator[str]:
+        """The traced logs as the lines the simulator prints, without the `@line:` prefix."""
+        for record in self:
+            fmt = self.formats[record.format_id]
+            yield (f"Cycle @{record.cycle}.{record.stamp % 100:02}: [{fmt.module}]\t"
+                   f"{fmt.render(record.args)}")
+
+    def to_numpy(self) -> dict:
+        """Decode the whole trace into one NumPy structured array per format ID.
+
+        Each array has a `stamp` field and one `arg<i>` field per argument. Arguments of up
+        to 64 bits are stored as (u)int64, floats as float32, and wider ones as Python ints.
+
+        Returns:
+            A dict from format ID to the array of its records, in trace order
+        """
+        # pylint: disable=import-outside-toplevel
+        import numpy as np
+
+        rows = {}
+        for record in self:
+            rows.setdefault(record.format_id, []).append((record.stamp, *record.args))
+
+        arrays = {}
+        for format_id, records in rows.items():
+            fields = [('stamp', np.uint64)]
+            for i, (kind, bits) in enumerate(self.formats[format_id].args):
+                if kind == 'float':
+                    ty = np.float32
+                elif bits > 64:
+                    ty = object
+                else:
+                    ty = np.int64 if kind == 'int' else np.uint64
+                fields.append((f'arg{i}', ty))
+            arrays[format_id] = np.array(records, dtype=fields)
+        return arrays
+
+
+def read_trace(path: str) -> LogTrace:
+    """Open the binary log trace at `path`."""
+    return LogTrace(path)
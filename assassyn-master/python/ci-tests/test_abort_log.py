@@ -0,0 +1,45 @@
+import subprocess
+
+import pytest
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn import utils
+
+
+class Driver(Module):
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self):
+        cnt = RegArray(UInt(32), 1)
+        (cnt & self)[0] <= cnt[0] + UInt(32)(1)
+        log('cnt: {}', cnt[0])
+        assume(cnt[0] < UInt(32)(20))
+
+
+def top():
+    sys = SysBuilder('abort_log')
+    with sys:
+        driver = Driver()
+        driver.build()
+    return sys
+
+
+def test_abort_log():
+    simulator_path, _ = elaborate(top(), verbose=False, verilog=False, sim_threshold=100,
+                                  build_profile='max-throughput', enable_cache=False)
+    binary = utils.build_simulator(simulator_path)
+
+    # The simulator aborts on the failed assumption, yet the log written before it is complete
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        utils.run_simulator(binary_path=binary)
+    raw = failure.value.output.decode('utf-8')
+    assert [int(line.split()[-1]) for line in raw.splitlines() if 'cnt:' in line] == \
+        list(range(21))
+
+
+if __name__ == '__main__':
+    test_abort_log()
@@ -0,0 +1,69 @@
+"""Build the simulators of several systems with one cargo build."""
+
+import os
+import shutil
+import tempfile
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate_many
+from assassyn.utils import run_simulator, build_cache_stats
+
+
+class Driver(Module):
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self, step: int):
+        cnt = RegArray(UInt(32), 1)
+        (cnt & self)[0] <= cnt[0] + UInt(32)(step)
+        log('cnt: {}', cnt[0])
+
+
+def counter(step):
+    sys = SysBuilder(f'counter_by_{step}')
+    with sys:
+        Driver().build(step)
+    return sys
+
+
+def _counts(output):
+    return [int(line.split()[-1]) for line in str(output).splitlines() if 'cnt:' in line]
+
+
+def test_elaborate_many():
+    workspace = tempfile.mkdtemp(prefix='assassyn-elaborate-many-')
+    # Use a build cache of our own, so that no earlier run hits
+    cache_dir = tempfile.mkdtemp(prefix='assassyn-build-cache-')
+    saved_cache_dir = os.environ.get('ASSASSYN_BUILD_CACHE')
+    os.environ['ASSASSYN_BUILD_CACHE'] = cache_dir
+    cfg = {'path': workspace, 'verbose': False, 'verilog': False, 'sim_threshold': 20}
+    try:
+        systems = [counter(step) for step in (1, 2, 3)]
+        binaries = elaborate_many(systems, **cfg)
+        assert list(binaries) == systems
+        for step, sys in zip((1, 2, 3), systems):
+            counts = _counts(run_simulator(binary_path=binaries[sys]))
+            assert counts[:5] == [step * i for i in range(5)]
+        # Nothing is written into the elaboration path but the simulators
+        assert not os.path.exists(os.path.join(workspace, 'Cargo.toml'))
+        assert (build_cache_stats()['misses'], build_cache_stats()['stores']) == (3, 3)
+
+        # The cached systems are not built again, only the new one
+        systems = [counter(step) for step in (1, 2, 3, 4)]
+        binaries = elaborate_many(systems, **cfg)
+        stats = build_cache_stats()
+        assert (stats['hits'], stats['misses'], stats['stores']) == (3, 4, 4)
+        assert _counts(run_simulator(binary_path=binaries[systems[3]]))[:3] == [0, 4, 8]
+    finally:
+        if saved_cache_dir is None:
+            del os.environ['ASSASSYN_BUILD_CACHE']
+        else:
+            os.environ['ASSASSYN_BUILD_CACHE'] = saved_cache_dir
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    test_elaborate_many()
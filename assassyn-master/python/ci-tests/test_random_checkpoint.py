@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn import utils
+
+
+class Stage(Module):
+
+    def __init__(self):
+        super().__init__(ports={'a': Port(UInt(32))})
+
+    @module.combinational
+    def build(self):
+        a = self.pop_all_ports(True)
+        log('got: {}', a)
+
+
+class Driver(Module):
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self, stages):
+        cnt = RegArray(UInt(32), 1)
+        (cnt & self)[0] <= cnt[0] + UInt(32)(1)
+        for stage in stages:
+            stage.async_called(a=cnt[0])
+
+
+def top():
+    sys = SysBuilder('random_checkpoint')
+    with sys:
+        stages = [Stage() for _ in range(4)]
+        for stage in stages:
+            stage.build()
+        Driver().build(stages)
+    return sys
+
+
+def _cycles(raw, after):
+    """The logged lines of each cycle after `after`, in the order the stages ran."""
+    cycles = {}
+    for line in str(raw).splitlines():
+        if 'got:' in line:
+            cycle = int(line.split('Cycle @')[1].split('.')[0])
+            if cycle > after:
+                cycles.setdefault(cycle, []).append(line)
+    return cycles
+
+
+def test_random_checkpoint():
+    simulator_path, _ = elaborate(top(), verbose=False, verilog=False, random=True,
+                                  sim_threshold=60, idle_threshold=60, enable_cache=False)
+    binary = utils.build_simulator(simulator_path)
+    checkpoint = os.path.join(tempfile.mkdtemp(prefix='assassyn-checkpoint-'), 'at30.ckpt')
+    try:
+        os.environ['ASSASSYN_CHECKPOINT_AT'] = '30'
+        os.environ['ASSASSYN_CHECKPOINT_FILE'] = checkpoint
+        full = _cycles(utils.run_simulator(binary_path=binary, seed=11), 30)
+        del os.environ['ASSASSYN_CHECKPOINT_AT'], os.environ['ASSASSYN_CHECKPOINT_FILE']
+        # The stages run in another order from one cycle to the next
+        orders = {tuple(line.split('[')[1].split(']')[0] for line in lines)
+                  for lines in full.values()}
+        assert len(full) == 30 and len(orders) > 1
+
+        # A restored run shuffles the stages as the run that saved the checkpoint, whatever
+        # its own seed
+        os.environ['ASSASSYN_RESTORE'] = checkpoint
+        restored = _cycles(utils.run_simulator(binary_path=binary, seed=99), 30)
+        assert restored == full
+    finally:
+        for var in ('ASSASSYN_CHECKPOINT_AT', 'ASSASSYN_CHECKPOINT_FILE', 'ASSASSYN_RESTORE'):
+            os.environ.pop(var, None)
+
+
+if __name__ == '__main__':
+    test_random_checkpoint()
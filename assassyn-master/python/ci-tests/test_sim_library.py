@@ -0,0 +1,92 @@
+import pytest
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn import utils
+
+
+class Adder(Module):
+
+    def __init__(self):
+        super().__init__(ports={'a': Port(Int(32))})
+
+    @module.combinational
+    def build(self):
+        a = self.pop_all_ports(True)
+        acc = RegArray(Int(32), 1)
+        (acc & self)[0] <= acc[0] + a
+        log('acc: {}', acc[0] + a)
+        with Condition(acc[0] + a > Int(32)(1000)):
+            finish()
+
+
+class Driver(Module):
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self, adder: Adder):
+        cnt = RegArray(Int(32), 1)
+        gate = RegArray(Bits(1), 1)
+        (cnt & self)[0] <= cnt[0] + Int(32)(1)
+        with Condition(gate[0]):
+            adder.async_called(a=cnt[0])
+
+
+def top():
+    sys = SysBuilder('sim_library')
+    with sys:
+        adder = Adder()
+        adder.build()
+        driver = Driver()
+        driver.build(adder)
+    return sys
+
+
+def test_sim_library():
+    simulator_path, _ = elaborate(top(), verbose=False, verilog=False, library=True,
+                                  sim_threshold=10000, enable_cache=False)
+    with utils.open_simulator(simulator_path) as sim:
+        assert sorted(sim.arrays) == ['acc', 'cnt', 'gate']
+        assert sim.fifos == ['AdderInstance_a']
+
+        # The gate is closed: the driver only counts
+        assert sim.step(5) == 5
+        assert sim.cycle == 5
+        assert sim.array('cnt')[0] == 5
+        assert sim.array('acc')[0] == 0
+        assert sim.exit is None
+
+        # Poke a negative count, which goes on from there
+        sim.array('cnt')[0] = -10
+        sim.step()
+        assert sim.array('cnt')[-1] == -9
+
+        fifo = sim.fifo('AdderInstance_a')
+        assert len(fifo) == 0
+        assert fifo.push(-3)
+        assert len(fifo) == 1 and fifo.peek() == -3
+        assert fifo.pop() == -3 and fifo.pop() is None
+
+        # Open the gate: the adder sums the count until it finishes the simulation
+        sim.array('gate')[0] = 1
+        assert sim.step(1000) < 1000
+        assert sim.exit == 'finish'
+        # finish() ends its cycle before the registers take their writes
+        assert 0 < sim.array('acc')[0] <= 1000
+        assert sim.step(1) == 0
+        stats = sim.stats
+        assert stats['exit'] == 'finish' and stats['cycles'] == sim.cycle
+        assert stats['modules']['AdderInstance']['triggered'] > 0
+
+        with pytest.raises(KeyError):
+            sim.array('nothing')
+        with pytest.raises(IndexError):
+            sim.array('cnt')[1]
+        with pytest.raises(ValueError):
+            sim.array('gate')[0] = 2
+
+
+if __name__ == '__main__':
+    test_sim_library()
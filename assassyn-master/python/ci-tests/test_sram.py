@@ -72,6 +72,24 @@ def test_memory_init():
              sim_threshold=200, idle_threshold=200,
              resource_base=f'{utils.repo_path()}/python/ci-tests/resources')
 
+def test_memory_batch():
+    def top():
+        user = MemUser()
+        driver = Driver()
+        sram = driver.build(32, 'init_1.hex', user)
+        user.build(sram.dout)
+
+    resources = f'{utils.repo_path()}/python/ci-tests/resources'
+
+    def check_instance(raw, instance):
+        check(raw)
+        assert raw.stats['cycles'] == instance['sim_threshold']
+
+    run_test('memory_batch', top, check_instance,
+             instances=[{'sim_threshold': 100},
+                        {'sim_threshold': 200, 'load': {'sram': f'{resources}/init_1.hex'}}],
+             sim_threshold=200, idle_threshold=200, resource_base=resources)
+
 def test_memory_wide():
     def top():
         user = MemUser()
@@ -84,4 +102,5 @@ def test_memory_wide():
 if __name__ == "__main__":
     test_memory()
     test_memory_init()
+    test_memory_batch()
     test_memory_wide()
@@ -0,0 +1,52 @@
+import time
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn import utils
+
+
+class Sink(Module):
+
+    def __init__(self):
+        super().__init__(ports={'a': Port(Int(32))})
+
+    @module.combinational
+    def build(self):
+        a = self.pop_all_ports(True)
+        log('a: {}', a)
+
+
+def top():
+    # Nothing calls the sink: no module can run in any cycle
+    sys = SysBuilder('time_skip')
+    with sys:
+        sink = Sink()
+        sink.build()
+    return sys
+
+
+def test_time_skip():
+    simulator_path, _ = elaborate(top(), verbose=False, verilog=False, library=True,
+                                  sim_threshold=10**9, idle_threshold=10**8,
+                                  enable_cache=False)
+
+    # Idle cycles are skipped, rather than simulated one by one
+    start = time.time()
+    raw = utils.run_simulator(simulator_path)
+    assert time.time() - start < 10
+    assert 'Simulation stopped due to reaching idle threshold of 100000000' in raw
+    assert '[Sink' not in raw
+    assert raw.stats['exit'] == 'idle' and raw.stats['cycles'] == 10**8
+
+    with utils.open_simulator(simulator_path) as sim:
+        assert sim.step(10**6) == 10**6
+        assert sim.cycle == 10**6
+        assert sim.run_until_idle(10**9) == 10**8 - 10**6
+        assert sim.cycle == 10**8
+        assert sim.step(10**9) == 10**9 - 10**8
+        assert sim.exit == 'sim_threshold'
+        assert sim.stats['cycles'] == 10**9
+
+
+if __name__ == '__main__':
+    test_time_skip()
@@ -0,0 +1,22 @@
+"""Simulator values are copied rather than cloned, and cast only to change their type."""
+
+from assassyn.ir.dtype import ArrayType, Bits, Int, UInt, Void
+from assassyn.codegen.simulator.utils import is_copy_type
+from assassyn.codegen.simulator.node_dumper import dump_rval_as, rval_rust_type
+
+
+def test_is_copy_type():
+    """Integers up to the wide limit and arrays of them are Copy; BigUint and events are not."""
+    assert is_copy_type(Bits(1)) and is_copy_type(UInt(32)) and is_copy_type(Int(256))
+    assert not is_copy_type(UInt(257))
+    assert is_copy_type(ArrayType(UInt(32), 16))
+    assert not is_copy_type(ArrayType(UInt(300), 2))
+    assert not is_copy_type(Void())
+
+
+def test_dump_rval_as():
+    """A constant of the asked type is rendered as is, any other one through ValueCastTo."""
+    five = UInt(32)(5)
+    assert rval_rust_type(five) == 'u32'
+    assert dump_rval_as(None, five, 'u32') == '5u32'
+    assert dump_rval_as(None, five, 'u64') == 'ValueCastTo::<u64>::cast(&5u32)'
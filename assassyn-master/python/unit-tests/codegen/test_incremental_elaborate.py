@@ -0,0 +1,34 @@
+"""Regenerating a simulator only replaces the files whose content changed."""
+
+import os
+
+from assassyn.codegen.simulator.elaborate import _sync_tree
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_sync_tree(tmp_path):
+    crate, staging = tmp_path / "crate", tmp_path / "staging"
+    _write(crate / "Cargo.toml", "same")
+    _write(crate / "src/modules/A.rs", "old")
+    _write(crate / "src/modules/Gone.rs", "removed module")
+    _write(crate / "Cargo.lock", "lock")
+    _write(crate / "target/release/sim", "binary")
+    os.utime(crate / "Cargo.toml", (1, 1))
+
+    _write(staging / "Cargo.toml", "same")
+    _write(staging / "src/modules/A.rs", "new")
+    _write(staging / "src/modules/B.rs", "added module")
+
+    assert _sync_tree(staging, crate) == (3, 3)
+    # An unchanged file keeps its mtime, so Cargo does not rebuild it
+    assert os.path.getmtime(crate / "Cargo.toml") == 1
+    assert (crate / "src/modules/A.rs").read_text() == "new"
+    assert (crate / "src/modules/B.rs").read_text() == "added module"
+    assert not (crate / "src/modules/Gone.rs").exists()
+    # What Cargo keeps next to the sources is left alone
+    assert (crate / "Cargo.lock").read_text() == "lock"
+    assert (crate / "target/release/sim").read_text() == "binary"
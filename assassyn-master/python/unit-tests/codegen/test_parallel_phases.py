@@ -0,0 +1,122 @@
+"""Partition of a simulator's modules into phases evaluated in parallel."""
+
+import io
+
+import pytest
+
+from assassyn.frontend import (  # type: ignore
+    Downstream,
+    Module,
+    Port,
+    RegArray,
+    SysBuilder,
+    UInt,
+    Value,
+    downstream,
+    finish,
+    log,
+    module,
+)
+from assassyn.codegen.simulator.parallel import module_footprint, partition_phases
+from assassyn.codegen.simulator.simulator import dump_simulator
+
+
+class Driver(Module):
+    """Counts, and calls both forwarders with the count."""
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self, lhs: Module, rhs: Module):
+        cnt = RegArray(UInt(32), 1)
+        (cnt & self)[0] <= cnt[0] + UInt(32)(1)
+        lhs.async_called(data=cnt[0])
+        rhs.async_called(data=cnt[0])
+
+
+class Forward(Module):
+    """Pops its port and exposes the data."""
+
+    def __init__(self):
+        super().__init__(ports={'data': Port(UInt(32))})
+
+    @module.combinational
+    def build(self):
+        return self.pop_all_ports(True)
+
+
+class Stop(Module):
+    """Ends the simulation."""
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self):
+        finish()
+
+
+class Adder(Downstream):
+    """Adds the data of both forwarders."""
+
+    @downstream.combinational
+    def build(self, a: Value, b: Value):
+        a = a.optional(UInt(32)(1))
+        b = b.optional(UInt(32)(1))
+        log("{} + {} = {}", a, b, a + b)
+
+
+def _build():
+    sys = SysBuilder("parallel_phases")
+    with sys:
+        driver = Driver()
+        lhs = Forward()
+        rhs = Forward()
+        a = lhs.build()
+        b = rhs.build()
+        stop = Stop()
+        stop.build()
+        driver.build(lhs, rhs)
+        Adder().build(a, b)
+    return sys, driver, lhs, rhs, stop
+
+
+def test_footprints():
+    _, driver, lhs, _, stop = _build()
+    calls = module_footprint(driver)
+    assert {f"{lhs.name}_event", f"{lhs.name}_data"} <= calls.writes
+    assert calls.exclusive is None
+    assert module_footprint(stop).exclusive == "finish()"
+
+
+def test_partition_keeps_conflicting_modules_in_order():
+    sys, driver, lhs, rhs, stop = _build()
+    # The forwarders touch disjoint state, but both depend on what the driver pushes.
+    assert partition_phases([driver, lhs, rhs]) == [[driver], [lhs, rhs]]
+    assert partition_phases([lhs, rhs, driver]) == [[lhs, rhs], [driver]]
+    # A module calling finish() runs alone, between the modules before and after it.
+    assert partition_phases([lhs, stop, rhs]) == [[lhs], [stop], [rhs]]
+    assert partition_phases(sys.downstreams) == [sys.downstreams]
+
+
+def test_parallel_excludes_random():
+    sys = _build()[0]
+    with pytest.raises(ValueError):
+        dump_simulator(sys, {'parallel': 2, 'random': True}, io.StringIO())
+
+
+def test_views_borrow_the_footprint():
+    sys, driver, lhs, _, stop = _build()
+    assert module_footprint(driver).arrays == {"cnt"}
+    fd = io.StringIO()
+    dump_simulator(sys, {'parallel': 2}, fd)
+    code = fd.getvalue()
+    # A module runs on a view of the fields it accesses, never on the whole simulator
+    assert f"pub struct {driver.name}_View<'a>" in code
+    assert "cnt: ArrayView::writer(std::ptr::addr_of_mut!((*sim).cnt))" in code
+    assert f"{lhs.name}_data: &mut (*sim).{lhs.name}_data" in code
+    assert f"{driver.name}_View::run" in code
+    # An exclusive module is alone in its phase, and runs on the simulator
+    assert f"pub struct {stop.name}_View" not in code
+    assert f"|sim| unsafe {{ (*sim).simulate_{stop.name}() }}" in code
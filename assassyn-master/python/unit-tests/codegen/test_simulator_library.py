@@ -0,0 +1,29 @@
+"""The arrays and FIFOs a simulator library describes in PORTS and hands out by name."""
+
+import io
+import json
+
+from assassyn.ir.dtype import ArrayType, Bits, Int, UInt, Void
+from assassyn.codegen.simulator.library import dump_ports, port_spec
+
+
+def test_port_spec():
+    """Plain values are described by their width and signedness, events are left out."""
+    assert port_spec('mem', UInt(32), 16) == \
+        {'name': 'mem', 'bits': 32, 'signed': False, 'size': 16}
+    assert port_spec('A_a', Int(8)) == {'name': 'A_a', 'bits': 8, 'signed': True}
+    assert port_spec('A_b', Bits(1)) == {'name': 'A_b', 'bits': 1, 'signed': False}
+    assert port_spec('A_e', Void()) is None
+    assert port_spec('nested', ArrayType(UInt(8), 4), 2) is None
+
+
+def test_dump_ports():
+    """PORTS embeds the specs as JSON, and each accessor matches the names to the fields."""
+    fd = io.StringIO()
+    dump_ports(fd, [port_spec('mem', UInt(32), 16)], [port_spec('A_a', Int(8))], 'self.sim')
+    code = fd.getvalue()
+    ports = code.split('r#"', 1)[1].split('"#', 1)[0]
+    assert [x['name'] for x in json.loads(ports)['arrays']] == ['mem']
+    assert '"mem" => Some(&mut self.sim.mem),' in code
+    assert '"A_a" => Some(&mut self.sim.A_a),' in code
+    assert code.count('_ => None,') == 2
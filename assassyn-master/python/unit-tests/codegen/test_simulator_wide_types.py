@@ -0,0 +1,31 @@
+"""Rust type and immediate selection for wide values in the simulator backend."""
+
+import pytest
+
+from assassyn.ir.dtype import Bits, Int, UInt
+from assassyn.codegen.simulator.utils import dtype_to_rust_type, int_imm_dumper_impl
+
+
+@pytest.mark.parametrize("dtype, expected", [
+    (UInt(64), "u64"),
+    (UInt(65), "u128"),
+    (Int(100), "i128"),
+    (Bits(128), "u128"),
+    (Bits(129), "UWide<3>"),
+    (Int(256), "IWide<4>"),
+    (UInt(257), "BigUint"),
+    (Int(512), "BigInt"),
+])
+def test_dtype_to_rust_type(dtype, expected):
+    """Values up to 256 bits should map to fixed-width Rust types."""
+    assert dtype_to_rust_type(dtype) == expected
+
+
+def test_int_imm_dumper_wide():
+    """Wide immediates should keep every bit instead of passing through a 64-bit literal."""
+    assert int_imm_dumper_impl(UInt(100), (1 << 99) + 1) == f"{(1 << 99) + 1}u128"
+    assert int_imm_dumper_impl(Bits(130), (3 << 128) | 5) == \
+        "UWide::<3>::from_words([0x5, 0x0, 0x3])"
+    assert int_imm_dumper_impl(Int(192), -1) == \
+        "IWide::<3>::from_words([0xffffffffffffffff, 0xffffffffffffffff, 0xffffffffffffffff])"
+    assert int_imm_dumper_impl(UInt(300), 1 << 299) == f'"{1 << 299}".parse::<BigUint>().unwrap()'
@@ -0,0 +1,91 @@
+"""The modules of a cycle are called directly, unless their order is shuffled."""
+
+import io
+
+from assassyn.frontend import (  # type: ignore
+    Downstream,
+    Module,
+    Port,
+    RegArray,
+    SysBuilder,
+    UInt,
+    Value,
+    downstream,
+    log,
+    module,
+)
+from assassyn.codegen.simulator.port_mapper import reset_port_manager
+from assassyn.codegen.simulator.simulator import dump_simulator
+
+
+class Counter(Module):
+    """Counts, and passes the count on."""
+
+    def __init__(self):
+        super().__init__(ports={})
+
+    @module.combinational
+    def build(self, sink):
+        cnt = RegArray(UInt(32), 1)
+        (cnt & self)[0] <= cnt[0] + UInt(32)(1)
+        sink.async_called(data=cnt[0])
+        return cnt[0]
+
+
+class Sink(Module):
+    """Logs what it is passed."""
+
+    def __init__(self):
+        super().__init__(ports={'data': Port(UInt(32))})
+
+    @module.combinational
+    def build(self):
+        data = self.pop_all_ports(True)
+        log("sink: {}", data)
+
+
+class Watcher(Downstream):
+    """Logs the count in the cycle the counter runs."""
+
+    @downstream.combinational
+    def build(self, cnt: Value):
+        cnt = cnt.optional(UInt(32)(0))
+        log("watch: {}", cnt)
+
+
+def _generate(**config):
+    sys = SysBuilder('step_cycle')
+    with sys:
+        sink = Sink()
+        sink.build()
+        cnt = Counter().build(sink)
+        Watcher().build(cnt)
+    reset_port_manager()
+    fd = io.StringIO()
+    dump_simulator(sys, config, fd)
+    return fd.getvalue()
+
+
+def test_step_cycle_calls_every_module_in_order():
+    code = _generate()
+    body = code.split("pub fn step_cycle(&mut self) {", 1)[1].split("}", 1)[0]
+    calls = [line.strip() for line in body.strip().splitlines()]
+    assert calls == ["self.simulate_SinkInstance();", "self.simulate_CounterInstance();",
+                     "self.simulate_Watcher();"]
+    assert "sim.step_cycle();" in code
+    assert "Vec<fn(&mut Simulator)>" not in code
+    assert "#[inline]\n  fn simulate_" not in code
+
+
+def test_random_order_keeps_function_vectors():
+    code = _generate(random=True)
+    assert "fn step_cycle" not in code
+    assert "simulators: Vec<fn(&mut Simulator)>" in code
+    # The order of a cycle is drawn from the seed and the cycle, and the seed is checkpointed
+    assert "self.order.shuffle(&mut cycle_rng(sim.seed, i));" in code
+    assert "self.seed.save(&mut out)?;" in code
+
+
+def test_inline_modules():
+    code = _generate(inline_modules=True)
+    assert code.count("#[inline]\n  fn simulate_") == 3
@@ -0,0 +1,95 @@
+"""The shared build cache: several entries, LRU eviction by size and age, and statistics."""
+
+import os
+import time
+
+from assassyn import utils
+from assassyn.utils.build_cache import BuildCache
+
+
+def _build(tmp_path, name, size=1000):
+    binary = tmp_path / "target" / name
+    binary.parent.mkdir(exist_ok=True)
+    binary.write_bytes(b"x" * size)
+    return str(binary)
+
+
+def _age(cache, key, seconds):
+    meta = os.path.join(cache.entries, key, "meta.json")
+    used = time.time() - seconds
+    os.utime(meta, (used, used))
+
+
+def test_entries_coexist(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), 2 ** 20, 3600)
+    assert cache.lookup("a") is None
+    cached_a = cache.store("a", _build(tmp_path, "sim_a"))
+    cached_b = cache.store("b", _build(tmp_path, "sim_b"))
+    # Rebuilding a into the same target path leaves the cached binary of a alone
+    _build(tmp_path, "sim_a", 10)
+    assert cache.lookup("a") == (cached_a, None)
+    assert cache.lookup("b") == (cached_b, None)
+    assert os.path.getsize(cached_a) == 1000
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (2, 1, 2)
+    assert stats["entries"] == 2 and stats["bytes"] == 2000
+
+
+def test_lru_eviction(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), 2500, 3600)
+    cache.store("a", _build(tmp_path, "sim_a"))
+    cache.store("b", _build(tmp_path, "sim_b"))
+    _age(cache, "a", 20)
+    _age(cache, "b", 10)
+    # Using a makes b the least recently used entry, which the third one evicts
+    assert cache.lookup("a") is not None
+    cache.store("c", _build(tmp_path, "sim_c"))
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None and cache.lookup("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_age_eviction(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), 2 ** 20, 60)
+    cache.store("old", _build(tmp_path, "sim_old"))
+    _age(cache, "old", 120)
+    assert cache.evict() == 1
+    assert cache.lookup("old") is None
+
+
+def test_verilog_is_copied_to_the_caller(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), 2 ** 20, 3600)
+    verilog = tmp_path / "a" / "verilog"
+    verilog.mkdir(parents=True)
+    (verilog / "design.py").write_text("a")
+    cache.store("a", _build(tmp_path, "sim"), str(verilog))
+    # The project which stored the entry builds its Verilog simulator
+    (verilog / "sim_build").mkdir()
+    mine = tmp_path / "b" / "verilog"
+    mine.mkdir(parents=True)
+    (mine / "design.py").write_text("b")
+    _, cached = cache.lookup("a", str(mine))
+    assert cached == str(mine)
+    assert (mine / "design.py").read_text() == "a"
+    assert (verilog / "sim_build").is_dir()
+    # Without a directory to copy it to, no Verilog is returned
+    assert cache.lookup("a")[1] is None
+
+
+def test_concurrent_store_keeps_first(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), 2 ** 20, 3600)
+    first = cache.store("a", _build(tmp_path, "sim", 10))
+    assert cache.store("a", _build(tmp_path, "sim", 20)) == first
+    assert os.path.getsize(first) == 10
+    assert cache.stats()["stores"] == 1
+    assert not os.listdir(cache.tmp)
+
+
+def test_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("ASSASSYN_BUILD_CACHE", str(tmp_path))
+    monkeypatch.setenv("ASSASSYN_BUILD_CACHE_MAX_MB", "1")
+    cache = utils.build_cache()
+    assert cache.root == str(tmp_path) and cache.max_bytes == 2 ** 20
+    utils.save_build_cache("k", _build(tmp_path, "sim"), None)
+    assert utils.check_build_cache("k") is not None
+    assert utils.build_cache_stats()["hits"] == 1
@@ -0,0 +1,49 @@
+"""A simulator is built with the Cargo profile of the build profile it was elaborated with."""
+
+import pytest
+
+from assassyn import utils
+from assassyn.utils import build_profiles
+from assassyn.backend import _generate_cache_key, elaborate
+from assassyn.builder import SysBuilder
+from assassyn.codegen.simulator.elaborate import _write_manifest
+
+
+def test_manifest_profile(monkeypatch, tmp_path):
+    monkeypatch.setenv("CARGO_TARGET_DIR", str(tmp_path / "target"))
+    manifest = _write_manifest(tmp_path, "fast", build_profile="fast-compile")
+    cargo_toml = utils._read_manifest(manifest)  # pylint: disable=protected-access
+    assert cargo_toml["package"]["metadata"]["assassyn"]["build-profile"] == "fast-compile"
+    assert cargo_toml["profile"]["max-throughput"]["panic"] == "abort"
+    assert utils.get_simulator_binary_path(manifest) == str(
+        tmp_path / "target" / "fast-compile" / "fast_simulator")
+
+    # The default manifest is left as it was
+    manifest = _write_manifest(tmp_path, "plain")
+    assert "profile" not in manifest.read_text()
+    assert utils.get_simulator_binary_path(manifest) == str(
+        tmp_path / "target" / "release" / "plain_simulator")
+
+
+def test_build_profile_config():
+    keys = {_generate_cache_key("sys", {"build_profile": profile})
+            for profile in utils.BUILD_PROFILES}
+    assert len(keys) == len(utils.BUILD_PROFILES)
+
+    with pytest.raises(ValueError, match="Invalid build profile"):
+        elaborate(SysBuilder("profiles"), build_profile="debug")
+    with pytest.raises(ValueError, match="unwinds"):
+        elaborate(SysBuilder("profiles"), build_profile="max-throughput", library=True)
+
+
+def test_native_profiles_key_the_host_cpu(monkeypatch):
+    assert utils.native_cpu("release") is None
+    assert utils.native_cpu("fast-compile") is None
+    key = _generate_cache_key("sys", {"build_profile": "max-throughput"})
+    assert _generate_cache_key("sys", {"build_profile": "max-throughput"}) == key
+    # A binary built on a host with other CPU features is another build
+    monkeypatch.setattr(build_profiles, "_native_features", lambda: "other-cpu")
+    assert _generate_cache_key("sys", {"build_profile": "max-throughput"}) != key
+    release = _generate_cache_key("sys", {})
+    monkeypatch.undo()
+    assert _generate_cache_key("sys", {}) == release
@@ -0,0 +1,72 @@
+"""Simulators share one target directory and the lock file of a prebuilt runtime."""
+
+import subprocess
+
+from assassyn.utils import cargo_workspace
+
+
+def test_prebuild_runtime_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("CARGO_TARGET_DIR", str(tmp_path / "target"))
+    monkeypatch.setattr(cargo_workspace, "_RUNTIME_LOCK", None)
+    built = []
+
+    def build(manifest):
+        built.append(manifest)
+        (tmp_path / "target/assassyn-runtime/Cargo.lock").write_text("lock")
+
+    lock = cargo_workspace.prebuild_runtime(build)
+    assert lock == str(tmp_path / "target/assassyn-runtime/Cargo.lock")
+    assert cargo_workspace.prebuild_runtime(build) == lock
+    assert len(built) == 1
+    # The crate depends on the runtime as a simulator does
+    manifest = (tmp_path / "target/assassyn-runtime/Cargo.toml").read_text()
+    assert manifest.endswith(cargo_workspace.runtime_dependency())
+
+    crate = tmp_path / "sim"
+    crate.mkdir()
+    cargo_workspace.seed_lockfile(str(crate / "Cargo.toml"), lock)
+    assert (crate / "Cargo.lock").read_text() == "lock"
+    # A crate locked by an earlier build keeps its lock file
+    (crate / "Cargo.lock").write_text("own")
+    cargo_workspace.seed_lockfile(str(crate / "Cargo.toml"), lock)
+    assert (crate / "Cargo.lock").read_text() == "own"
+
+
+def test_prebuild_failure_leaves_simulators_alone(monkeypatch, tmp_path):
+    monkeypatch.setenv("CARGO_TARGET_DIR", str(tmp_path))
+    monkeypatch.setattr(cargo_workspace, "_RUNTIME_LOCK", None)
+
+    def build(manifest):
+        raise subprocess.CalledProcessError(101, ["cargo", "build", manifest])
+
+    assert cargo_workspace.prebuild_runtime(build) is None
+    cargo_workspace.seed_lockfile(str(tmp_path / "sim" / "Cargo.toml"), None)
+    assert not (tmp_path / "sim").exists()
+
+
+def test_batch_workspace(monkeypatch, tmp_path):
+    monkeypatch.setenv("CARGO_TARGET_DIR", str(tmp_path / "target"))
+    (tmp_path / "runtime.lock").write_text("lock")
+    crates = [tmp_path / "ws" / name / f"{name}_simulator" for name in "ab"]
+    manifests = [str(crate / "Cargo.toml") for crate in crates]
+    with cargo_workspace.batch_workspace(manifests, str(tmp_path / "runtime.lock")) as manifest:
+        root = next((tmp_path / "target" / "batch-workspaces").iterdir())
+        assert manifest == str(root / "Cargo.toml")
+        text = (root / "Cargo.toml").read_text()
+        assert '"0-a_simulator",' in text and '"1-b_simulator",' in text
+        assert [str((root / member).readlink()) for member in ("0-a_simulator", "1-b_simulator")] \
+            == [str(crate) for crate in crates]
+        assert (root / "Cargo.lock").read_text() == "lock"
+        # A concurrent batch of the same crates builds them one by one
+        with cargo_workspace.batch_workspace(manifests) as nested:
+            assert nested is None
+    # Nothing is written next to the crates, and the workspace is released
+    assert not (tmp_path / "ws").exists()
+    assert not (root / "Cargo.toml").exists()
+    with cargo_workspace.batch_workspace(manifests) as again:
+        assert again == manifest
+    # The manifest of a batch that was killed does not hold the workspace
+    (root / "Cargo.toml").write_text("stale")
+    with cargo_workspace.batch_workspace(manifests) as after_kill:
+        assert after_kill == manifest
+        assert '"0-a_simulator",' in (root / "Cargo.toml").read_text()
@@ -0,0 +1,84 @@
+"""Decoding of the simulator's binary log traces."""
+
+import struct
+
+import pytest
+
+from assassyn.ir.dtype import Bits, Float, Int, UInt
+from assassyn.codegen.simulator.trace_formats import LogFormatTable
+from assassyn.utils.trace import TRACE_MAGIC, TRACE_VERSION, read_trace
+
+
+def _varint(x):
+    out = bytearray()
+    while x >= 0x80:
+        out.append((x & 0x7f) | 0x80)
+        x >>= 7
+    out.append(x)
+    return bytes(out)
+
+
+def _write_trace(path, table, records):
+    """Write a trace the way the Rust `Tracer` does."""
+    formats = table.to_json().encode()
+    data = bytearray(TRACE_MAGIC + struct.pack('<II', TRACE_VERSION, len(formats)) + formats)
+    last = 0
+    for stamp, format_id, args in records:
+        data += _varint(stamp - last) + _varint(format_id) + b''.join(args)
+        last = stamp
+    path.write_bytes(bytes(data))
+
+
+@pytest.fixture(name="trace_path")
+def fixture_trace_path(tmp_path):
+    table = LogFormatTable()
+    assert table.register("Driver", "cnt: {}, flag: {}", [UInt(32), Bits(1)]) == 0
+    assert table.register("Adder", "{:x} {} {}", [Bits(130), Int(5), Float()]) == 1
+    path = tmp_path / "trace.bin"
+    _write_trace(path, table, [
+        (100, 0, [(7).to_bytes(4, 'little'), b'\x01']),
+        (200, 1, [((1 << 129) | 0xab).to_bytes(17, 'little'), b'\xfd', struct.pack('<f', 1.5)]),
+        (200, 0, [(300).to_bytes(4, 'little'), b'\x00']),
+        (20000, 0, [(8).to_bytes(4, 'little'), b'\x01']),
+    ])
+    return path
+
+
+def test_records(trace_path):
+    """Records decode lazily into stamps, format IDs and typed argument values."""
+    trace = read_trace(str(trace_path))
+    assert [fmt.module for fmt in trace.formats] == ["Driver", "Adder"]
+    records = list(trace)
+    assert [(r.stamp, r.format_id) for r in records] == [(100, 0), (200, 1), (200, 0), (20000, 0)]
+    assert records[1].args == ((1 << 129) | 0xab, -3, 1.5)
+    assert records[3].cycle == 200
+
+
+def test_lines(trace_path):
+    """Rendered lines match the simulator's text log, without its `@line:` prefix."""
+    assert list(read_trace(str(trace_path)).lines()) == [
+        "Cycle @1.00: [Driver]\tcnt: 7, flag: 1",
+        f"Cycle @2.00: [Adder]\t{(1 << 129) | 0xab:x} -3 1.5",
+        "Cycle @2.00: [Driver]\tcnt: 300, flag: 0",
+        "Cycle @200.00: [Driver]\tcnt: 8, flag: 1",
+    ]
+
+
+def test_to_numpy(trace_path):
+    """Each format decodes into one structured array."""
+    np = pytest.importorskip("numpy")
+    arrays = read_trace(str(trace_path)).to_numpy()
+    driver = arrays[0]
+    assert driver['stamp'].tolist() == [100, 200, 20000]
+    assert driver['arg0'].tolist() == [7, 300, 8]
+    assert driver['arg0'].dtype == np.uint64
+    assert arrays[1]['arg1'].tolist() == [-3]
+    assert arrays[1]['arg0'][0] == (1 << 129) | 0xab
+
+
+def test_rejects_other_files(tmp_path):
+    """Files without the trace magic are rejected."""
+    path = tmp_path / "log.txt"
+    path.write_text("@line:12   Cycle @1.00: [Driver]\tcnt: 0\n")
+    with pytest.raises(ValueError):
+        read_trace(str(path))
@@ -0,0 +1,35 @@
+"""Simulator thresholds and seed as runtime parameters rather than build parameters."""
+
+from assassyn import utils
+from assassyn.backend import _generate_cache_key, config
+
+
+def test_cache_key_ignores_runtime_params():
+    base = _generate_cache_key("sys", config())
+    assert _generate_cache_key("sys", config(sim_threshold=5000, idle_threshold=7, seed=3)) == base
+    assert _generate_cache_key("sys", config(random=True)) != base
+    # The Verilog testbench bakes the simulation length in.
+    verilog = _generate_cache_key("sys", config(verilog=True))
+    assert _generate_cache_key("sys", config(verilog=True, sim_threshold=5000)) != verilog
+
+
+def test_run_simulator_passes_params(monkeypatch, tmp_path):
+    binary = str(tmp_path / "sim")
+    commands = []
+    monkeypatch.setattr(utils, '_cmd_wrapper', lambda cmd: commands.append(cmd[:-1]) or '')
+    monkeypatch.setitem(utils.RUNTIME_PARAMS, binary,
+                        {'sim_threshold': 1000, 'idle_threshold': 10, 'seed': None})
+
+    monkeypatch.delenv('ASSASSYN_SEED', raising=False)
+    utils.run_simulator(binary_path=binary)
+    utils.run_simulator(binary_path=binary, idle_threshold=3, seed=42)
+    utils.run_simulator(binary_path=str(tmp_path / "other"))
+
+    # No seed is baked into a cached binary, so a seed of None is a fresh one every run
+    fresh = commands.pop(0)
+    assert fresh[:3] == [binary, '--sim-threshold=1000', '--idle-threshold=10']
+    assert fresh[3].startswith('--seed=') and len(fresh) == 4
+    assert commands == [
+        [binary, '--sim-threshold=1000', '--idle-threshold=3', '--seed=42'],
+        [str(tmp_path / "other")],
+    ]
@@ -0,0 +1,36 @@
+"""The instances of one simulator run in a single process by run_simulator_batch."""
+
+import json
+import shlex
+
+from assassyn import utils
+
+
+def _option(args, flag):
+    return next(arg for arg in args if arg.startswith(f'--{flag}=')).split('=', 1)[1]
+
+
+def _fake_batch_simulator(cmd):
+    """Run every instance of the batch: log its options and write its statistics."""
+    with open(_option(cmd, 'batch'), encoding='utf-8') as f:
+        instances = [shlex.split(line) for line in f if line.strip()]
+    for i, args in enumerate(instances):
+        with open(_option(args, 'log-file'), 'w', encoding='utf-8') as f:
+            f.write(' '.join(arg for arg in args if not arg.startswith(('--log-file', '--stats'))))
+        with open(_option(args, 'stats'), 'w', encoding='utf-8') as f:
+            json.dump({'cycles': 100 * (i + 1)}, f)
+    return ''.join(f'[batch] instance {i}: ok\n' for i in range(len(instances)))
+
+
+def test_run_simulator_batch(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, '_cmd_wrapper', _fake_batch_simulator)
+    image = tmp_path / 'prog 1.hex'
+    kept = tmp_path / 'stats.json'
+    outputs = utils.run_simulator_batch(binary_path=str(tmp_path / 'sim'), instances=[
+        {'sim_threshold': 100},
+        {'load': {'sram': str(image)}, 'seed': 7, 'stats': str(kept)},
+    ])
+    assert outputs == ['--sim-threshold=100', f'--seed=7 --load=sram={image}']
+    assert [raw.stats['cycles'] for raw in outputs] == [100, 200]
+    assert utils.read_stats(str(kept)) == outputs[1].stats
+    assert [path.name for path in tmp_path.iterdir()] == ['stats.json']
@@ -0,0 +1,43 @@
+"""The end-of-run statistics returned by run_simulator."""
+
+import json
+
+import pytest
+
+from assassyn import utils
+from assassyn.utils import SimulatorOutput
+
+STATS = {
+    'cycles': 200, 'exit': 'finish',
+    'modules': {'WriteBack': {'triggered': 150, 'stalled': 0}},
+    'fifos': {}, 'arrays': {'rf': {'writes': 120}},
+}
+
+
+def _fake_simulator(cmd):
+    """Write the statistics where the simulator is told to, and print a log line."""
+    path = next(arg for arg in cmd if arg.startswith('--stats=')).split('=', 1)[1]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(STATS, f)
+    return 'Cycle @1.00: [Driver]\tok\n'
+
+
+def test_run_simulator_returns_stats(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, '_cmd_wrapper', _fake_simulator)
+    raw = utils.run_simulator(binary_path=str(tmp_path / 'sim'))
+    assert isinstance(raw, str) and raw.split() == ['Cycle', '@1.00:', '[Driver]', 'ok']
+    assert raw.stats == STATS
+    assert raw.ipc('WriteBack') == 0.75
+    assert not list(tmp_path.iterdir())
+
+    kept = tmp_path / 'stats.json'
+    raw = utils.run_simulator(binary_path=str(tmp_path / 'sim'), stats=str(kept))
+    assert utils.read_stats(str(kept)) == raw.stats
+
+
+def test_simulator_without_stats(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, '_cmd_wrapper', lambda cmd: 'done\n')
+    raw = utils.run_simulator(binary_path=str(tmp_path / 'sim'))
+    assert raw == 'done\n' and raw.stats is None
+    with pytest.raises(ValueError):
+        SimulatorOutput(raw).ipc('Driver')
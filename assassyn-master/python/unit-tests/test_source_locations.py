@@ -0,0 +1,40 @@
+"""IR nodes record the user source line they are built at, unless the builder is told not to."""
+
+from assassyn.builder import SysBuilder
+from assassyn.ir.array import RegArray
+from assassyn.ir.dtype import UInt
+from assassyn.ir.module import Module, combinational
+
+
+class Adder(Module):
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.sum = None
+
+    @combinational
+    def build(self):
+        reg = RegArray(UInt(8), 1)
+        self.sum = reg[0] + UInt(8)(1)  # located here
+
+
+def _marked_line():
+    with open(__file__, encoding="utf-8") as f:
+        return next(i for i, line in enumerate(f, 1) if line.rstrip().endswith("# located here"))
+
+
+def _build(**kwargs):
+    with SysBuilder("source_locations", **kwargs):
+        adder = Adder()
+        adder.build()
+    return adder.sum
+
+
+def test_source_location():
+    assert _build().loc == f"{__file__}:{_marked_line()}"
+
+
+def test_source_locations_disabled(monkeypatch):
+    assert _build(source_locations=False).loc is None
+    monkeypatch.setenv("ASSASSYN_SOURCE_LOCATIONS", "0")
+    assert _build().loc is None
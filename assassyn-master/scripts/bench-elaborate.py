@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+'''Time the elaboration of the examples: building their IR, then generating their code.
+
+Each example runs in a process of its own, as its own `__main__`, until its first call of
+`elaborate`, which generates the simulator (and the Verilog, if the example asks for it) into a
+temporary directory, without the build cache, and ends the run: nothing is compiled.
+
+    python scripts/bench-elaborate.py                    # every example calling elaborate
+    python scripts/bench-elaborate.py --repeat 5 examples/minor-cpu/src/main.py
+    python scripts/bench-elaborate.py --no-source-locations
+'''
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Elaborated(Exception):
+    '''Ends the run of an example once it elaborated its system.'''
+
+
+def examples():
+    '''The example scripts which elaborate a system.'''
+    found = []
+    for path in sorted(glob.glob(os.path.join(REPO, 'examples', '**', '*.py'), recursive=True)):
+        if 'unit-tests' in path.split(os.sep):
+            continue
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if 'elaborate(' in source or 'run_test(' in source:
+            found.append(path)
+    return found
+
+
+def run_child(script):
+    '''Run `script` until it elaborates, and print the time its IR and its code took.'''
+    # pylint: disable=import-outside-toplevel
+    from assassyn import backend
+    from assassyn import test as assassyn_test
+
+    elaborate = backend.elaborate
+    times = {}
+
+    def timed_elaborate(sys_builder, **kwargs):
+        times['ir'] = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as path:
+            kwargs.update(path=path, enable_cache=False, verbose=False)
+            begin = time.perf_counter()
+            elaborate(sys_builder, **kwargs)
+            times['codegen'] = time.perf_counter() - begin
+        raise _Elaborated()
+
+    backend.elaborate = assassyn_test.elaborate = timed_elaborate
+    os.chdir(os.path.dirname(script))
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script]
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            runpy.run_path(script, run_name='__main__')
+    except _Elaborated:
+        pass
+    print(json.dumps(times))
+
+
+def run_example(script, source_locations):
+    '''The times `script` took in a process of its own, or the error it gave.'''
+    env = dict(os.environ, ASSASSYN_SOURCE_LOCATIONS='1' if source_locations else '0')
+    proc = subprocess.run([sys.executable, __file__, '--child', script], env=env,
+                          capture_output=True, text=True, check=False)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        error = (proc.stderr.strip().splitlines() or ['no output'])[-1]
+        return None, error
+    times = json.loads(lines[-1])
+    if 'ir' not in times:
+        return None, 'did not elaborate'
+    return times, None
+
+
+def main():
+    '''Time each example, and print one line per example.'''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scripts', nargs='*', help='the example scripts, by default all of them')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per example, of which the fastest counts')
+    parser.add_argument('--no-source-locations', action='store_true',
+                        help='build the IR without recording the source location of each node')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(os.path.abspath(args.child))
+        return
+
+    total = {'ir': 0.0, 'codegen': 0.0}
+    print(f'{"example":<48} {"IR (s)":>8} {"codegen (s)":>12}')
+    for script in [os.path.abspath(s) for s in args.scripts] or examples():
+        runs, error = [], None
+        for _ in range(args.repeat):
+            times, error = run_example(script, not args.no_source_locations)
+            if times is None:
+                break
+            runs.append(times)
+        name = os.path.relpath(script, REPO)
+        if error is not None:
+            print(f'{name:<48} failed: {error}')
+            continue
+        best = {key: min(run[key] for run in runs) for key in total}
+        for key, value in best.items():
+            total[key] += value
+        print(f'{name:<48} {best["ir"]:>8.3f} {best["codegen"]:>12.3f}')
+    print(f'{"total":<48} {total["ir"]:>8.3f} {total["codegen"]:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
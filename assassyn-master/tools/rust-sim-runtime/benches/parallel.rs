@@ -0,0 +1,109 @@
+//! Scaling of the `WorkerPool` with the number of threads, on a synthetic simulator whose
+//! cycle is one phase of `MODULES` independent modules, then one phase of a single module,
+//! the shape of a wide design feeding a commit stage.
+//!
+//! Run with `cargo bench --bench parallel`, optionally with `-- <work>` to set the work of a
+//! module per cycle (default 2000 iterations, a few microseconds). Threads go from 1 up to
+//! twice the available cores, and the speedup is relative to 1 thread, which runs every
+//! module inline. How light a module can be and still gain is the pool's overhead: two
+//! barriers per cycle.
+
+use std::hint::black_box;
+use std::time::{Duration, Instant};
+
+use sim_runtime::{default_threads, Task, WorkerPool};
+
+const MODULES: usize = 16;
+const CYCLES: usize = 20_000;
+
+struct Sim {
+  work: u64,
+  state: [u64; MODULES],
+  commit: u64,
+}
+
+// Borrows its own element of `state` only, as the modules of a phase borrow disjoint fields
+unsafe fn evaluate<const I: usize>(sim: *mut Sim) {
+  let work = (*sim).work;
+  let state = &mut (*sim).state[I];
+  let mut x = *state | 1;
+  for _ in 0..work {
+    x ^= x << 13;
+    x ^= x >> 7;
+    x ^= x << 17;
+  }
+  *state = x;
+}
+
+// Alone in its phase, so it may borrow the whole simulator
+unsafe fn commit(sim: *mut Sim) {
+  let sim = &mut *sim;
+  sim.commit = sim
+    .state
+    .iter()
+    .fold(sim.commit, |acc, x| acc.wrapping_add(*x));
+}
+
+fn run(threads: usize, work: u64) -> (Duration, u64) {
+  let stage: Vec<Task<Sim>> = vec![
+    evaluate::<0>,
+    evaluate::<1>,
+    evaluate::<2>,
+    evaluate::<3>,
+    evaluate::<4>,
+    evaluate::<5>,
+    evaluate::<6>,
+    evaluate::<7>,
+    evaluate::<8>,
+    evaluate::<9>,
+    evaluate::<10>,
+    evaluate::<11>,
+    evaluate::<12>,
+    evaluate::<13>,
+    evaluate::<14>,
+    evaluate::<15>,
+  ];
+  let phases: Vec<Vec<Task<Sim>>> = vec![stage, vec![commit]];
+  let mut sim = Sim {
+    work,
+    state: std::array::from_fn(|i| i as u64),
+    commit: 0,
+  };
+  let pool = WorkerPool::new(threads);
+  let start = Instant::now();
+  for _ in 0..CYCLES {
+    for phase in phases.iter() {
+      // SAFETY: every module of the first phase borrows its own element of `state` only
+      if let Err(panic) = unsafe { pool.run(&mut sim, phase) } {
+        std::panic::resume_unwind(panic);
+      }
+    }
+  }
+  (start.elapsed(), black_box(sim.commit))
+}
+
+fn main() {
+  let work = std::env::args()
+    .skip(1)
+    .find_map(|arg| arg.parse().ok())
+    .unwrap_or(2000);
+  let cores = default_threads();
+  println!("{} modules, {} iterations each, {} cores", MODULES, work, cores);
+  let (serial, expected) = run(1, work);
+  let mut threads = 1;
+  while threads <= 2 * cores {
+    let (elapsed, result) = if threads == 1 {
+      (serial, expected)
+    } else {
+      run(threads, work)
+    };
+    assert_eq!(result, expected, "the result depends on the number of threads");
+    println!(
+      "threads {:>3} {:>10.2} us/cycle  speedup {:.2}x",
+      threads,
+      elapsed.as_secs_f64() * 1e6 / CYCLES as f64,
+      serial.as_secs_f64() / elapsed.as_secs_f64()
+    );
+    threads *= 2;
+  }
+}
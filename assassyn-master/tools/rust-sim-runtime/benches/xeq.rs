@@ -0,0 +1,219 @@
+//! Microbenchmark of the slot-ring `XEQ` against the former `BTreeMap`-backed queue, and of
+//! the dirty-tracking `Array::tick` against the former collect-then-apply tick.
+//!
+//! Run with `cargo bench --bench xeq`. Every simulated cycle schedules one event half a
+//! cycle ahead and commits it, which is exactly the pattern generated simulators produce
+//! for FIFO pushes, FIFO pops and array writes. The tick benchmarks model a CPU with
+//! `REGISTERS` single-element `RegArray`s, of which only a few are written per cycle.
+
+use std::collections::BTreeMap;
+use std::hint::black_box;
+use std::time::{Duration, Instant};
+
+use sim_runtime::{Array, ArrayWrite, Cycled, FIFOPop, XEQ};
+
+const CYCLES: usize = 5_000_000;
+const TICK_CYCLES: usize = 500_000;
+const REGISTERS: usize = 60;
+
+// The queue as it was before the slot ring, kept here as the baseline.
+struct BTreeXEQ<T: Cycled> {
+  q: BTreeMap<usize, T>,
+}
+
+impl<T: Cycled> BTreeXEQ<T> {
+  fn new() -> Self {
+    BTreeXEQ { q: BTreeMap::new() }
+  }
+
+  fn push(&mut self, event: T) {
+    if self.q.contains_key(&event.cycle()) {
+      panic!("Already occupied by {}!", event.pusher());
+    }
+    self.q.insert(event.cycle(), event);
+  }
+
+  fn pop(&mut self, current: usize) -> Option<T> {
+    if self
+      .q
+      .first_key_value()
+      .is_some_and(|(cycle, _)| *cycle <= current)
+    {
+      self.q.pop_first().map(|(_, event)| event)
+    } else {
+      None
+    }
+  }
+}
+
+struct LegacyWrite {
+  cycle: usize,
+  addr: usize,
+  data: u32,
+}
+
+impl Cycled for LegacyWrite {
+  fn cycle(&self) -> usize {
+    self.cycle
+  }
+  fn pusher(&self) -> &'static str {
+    "bench"
+  }
+}
+
+// The array tick as it was before dirty tracking, kept here as the baseline.
+struct LegacyArray {
+  payload: Vec<u32>,
+  write_ports: Vec<BTreeXEQ<LegacyWrite>>,
+}
+
+impl LegacyArray {
+  fn new(n: usize, num_ports: usize) -> Self {
+    LegacyArray {
+      payload: vec![0; n],
+      write_ports: (0..num_ports).map(|_| BTreeXEQ::new()).collect(),
+    }
+  }
+
+  fn write(&mut self, port_id: usize, write: LegacyWrite) {
+    self.write_ports[port_id].push(write);
+  }
+
+  fn tick(&mut self, cycle: usize) {
+    let mut pending_writes = Vec::new();
+    for port in self.write_ports.iter_mut() {
+      while let Some(write) = port.pop(cycle) {
+        pending_writes.push(write);
+      }
+    }
+    let mut write_map: BTreeMap<usize, u32> = BTreeMap::new();
+    for write in pending_writes {
+      write_map.insert(write.addr, write.data);
+    }
+    for (addr, data) in write_map {
+      if addr < self.payload.len() {
+        self.payload[addr] = data;
+      }
+    }
+  }
+}
+
+fn report(name: &str, elapsed: Duration, cycles: usize) {
+  println!(
+    "{:<32} {:>8.2} ns/cycle ({:.3}s total)",
+    name,
+    elapsed.as_nanos() as f64 / cycles as f64,
+    elapsed.as_secs_f64()
+  );
+}
+
+fn bench_for<F: FnMut(usize)>(name: &str, cycles: usize, mut step: F) -> Duration {
+  let start = Instant::now();
+  for i in 1..=cycles {
+    step(i * 100);
+  }
+  let elapsed = start.elapsed();
+  report(name, elapsed, cycles);
+  elapsed
+}
+
+fn bench<F: FnMut(usize)>(name: &str, step: F) -> Duration {
+  bench_for(name, CYCLES, step)
+}
+
+// Ticks `REGISTERS` arrays per cycle, writing `written` of them beforehand.
+fn bench_tick(written: usize) -> (Duration, Duration) {
+  let mut arrays: Vec<Array<u32>> = (0..REGISTERS)
+    .map(|_| Array::new_with_ports(1, 1))
+    .collect();
+  let dirty =
+    bench_for(&format!("tick/{}-of-{}/dirty", written, REGISTERS), TICK_CYCLES, |stamp| {
+      for array in arrays.iter_mut().take(written) {
+        array.write(0, ArrayWrite::new(stamp + 50, 0, stamp as u32, "bench"));
+      }
+      for array in arrays.iter_mut() {
+        if array.is_dirty() {
+          array.tick(stamp + 50);
+        }
+      }
+    });
+  black_box(&arrays);
+
+  let mut arrays: Vec<LegacyArray> = (0..REGISTERS).map(|_| LegacyArray::new(1, 1)).collect();
+  let legacy =
+    bench_for(&format!("tick/{}-of-{}/legacy", written, REGISTERS), TICK_CYCLES, |stamp| {
+      for array in arrays.iter_mut().take(written) {
+        array.write(
+          0,
+          LegacyWrite {
+            cycle: stamp + 50,
+            addr: 0,
+            data: stamp as u32,
+          },
+        );
+      }
+      for array in arrays.iter_mut() {
+        array.tick(stamp + 50);
+      }
+    });
+  black_box(arrays.iter().map(|a| a.payload[0]).sum::<u32>());
+
+  (dirty, legacy)
+}
+
+fn main() {
+  let mut ring = XEQ::new();
+  let ring_pop = bench("xeq/fifo-pop/slot-ring", |stamp| {
+    ring.push(FIFOPop::new(stamp + 50, "bench"));
+    black_box(ring.pop(stamp + 50));
+  });
+
+  let mut tree = BTreeXEQ::new();
+  let tree_pop = bench("xeq/fifo-pop/btree", |stamp| {
+    tree.push(FIFOPop::new(stamp + 50, "bench"));
+    black_box(tree.pop(stamp + 50));
+  });
+
+  let mut ring = XEQ::new();
+  let ring_write = bench("xeq/array-write/slot-ring", |stamp| {
+    ring.push(ArrayWrite::new(stamp + 50, 0, stamp as u32, "bench"));
+    black_box(ring.pop(stamp + 50));
+  });
+
+  let mut tree = BTreeXEQ::new();
+  let tree_write = bench("xeq/array-write/btree", |stamp| {
+    tree.push(ArrayWrite::new(stamp + 50, 0, stamp as u32, "bench"));
+    black_box(tree.pop(stamp + 50));
+  });
+
+  // Idle polling: the queue is checked every cycle but nothing was scheduled.
+  let mut ring: XEQ<FIFOPop> = XEQ::new();
+  let ring_idle = bench("xeq/idle-poll/slot-ring", |stamp| {
+    black_box(ring.pop(stamp + 50));
+  });
+
+  let mut tree: BTreeXEQ<FIFOPop> = BTreeXEQ::new();
+  let tree_idle = bench("xeq/idle-poll/btree", |stamp| {
+    black_box(tree.pop(stamp + 50));
+  });
+
+  let (idle_dirty, idle_legacy) = bench_tick(0);
+  let (sparse_dirty, sparse_legacy) = bench_tick(4);
+  let (busy_dirty, busy_legacy) = bench_tick(REGISTERS);
+
+  println!();
+  for (name, ring, tree) in [
+    ("fifo-pop", ring_pop, tree_pop),
+    ("array-write", ring_write, tree_write),
+    ("idle-poll", ring_idle, tree_idle),
+    ("tick/idle", idle_dirty, idle_legacy),
+    ("tick/sparse", sparse_dirty, sparse_legacy),
+    ("tick/busy", busy_dirty, busy_legacy),
+  ] {
+    println!(
+      "{:<32} {:>8.2}x",
+      format!("speedup/{}", name),
+      tree.as_secs_f64() / ring.as_secs_f64()
+    );
+  }
+}
@@ -0,0 +1,218 @@
+use std::any::Any;
+use std::cell::RefCell;
+use std::fs;
+use std::panic::{self, AssertUnwindSafe};
+use std::path::Path;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+
+use super::parallel::default_threads;
+use super::utils::{runtime_option, runtime_param};
+
+// Instances run on threads of their own, which get the stack of the main thread.
+const STACK_SIZE: usize = 8 << 20;
+
+// A simulation instance: the options it was given, and whether it is one of a batch, whose
+// instances also take the options of the process, or the session of a simulator library.
+struct Instance {
+  args: Arc<[String]>,
+  batch: bool,
+}
+
+thread_local! {
+  // The instance this thread simulates, if any
+  static INSTANCE: RefCell<Option<Instance>> = const { RefCell::new(None) };
+}
+
+/// Call `f` with the options of the instance the current thread simulates, or with no options
+/// outside of an instance, and whether the options of the process apply too.
+pub(crate) fn with_instance_args<R>(f: impl FnOnce(&[String], bool) -> R) -> R {
+  INSTANCE.with(|instance| match &*instance.borrow() {
+    Some(instance) => f(&instance.args, instance.batch),
+    None => f(&[], true),
+  })
+}
+
+pub(crate) fn in_batch() -> bool {
+  INSTANCE.with(|instance| instance.borrow().as_ref().is_some_and(|x| x.batch))
+}
+
+fn in_instance() -> bool {
+  INSTANCE.with(|instance| instance.borrow().is_some())
+}
+
+/// Run `f` as an instance with the options `args`, catching its panics. `finish()` ends an
+/// instance with a panic that `is_finished` tells from a failure.
+pub(crate) fn run_instance<R>(
+  args: &Arc<[String]>,
+  batch: bool,
+  f: impl FnOnce() -> R,
+) -> thread::Result<R> {
+  let args = args.clone();
+  let outer = INSTANCE.with(|x| x.borrow_mut().replace(Instance { args, batch }));
+  let result = panic::catch_unwind(AssertUnwindSafe(f));
+  INSTANCE.with(|x| *x.borrow_mut() = outer);
+  result
+}
+
+pub(crate) fn is_finished(payload: &(dyn Any + Send)) -> bool {
+  payload.is::<Finished>()
+}
+
+// The panic payload `finish_simulation` ends an instance with.
+struct Finished;
+
+/// End the simulation, after `finish()` wrote its report: exit the process, or, in a batch or
+/// a simulator library, only the instance the current thread simulates.
+pub fn finish_simulation() -> ! {
+  if in_instance() {
+    // Unwinds to `run_instance` without calling the panic hook, so nothing is printed
+    panic::resume_unwind(Box::new(Finished));
+  }
+  std::process::exit(0);
+}
+
+/// Many independent simulations of one design, run by one simulator process.
+///
+/// `--batch=FILE` (`ASSASSYN_BATCH`) lists one instance per line, as the options its own
+/// simulator would be run with, e.g. `--load icache=add.exe --sim-threshold=5000
+/// --log-file=add.log --stats=add.json`. Blank lines and lines starting with `#` are skipped,
+/// and an option containing spaces is quoted with `"`. An instance's options win over the
+/// process's command line and environment, which apply to every instance. An instance logs to
+/// `--log-file`, `FILE.<index>.log` by default, and if the process asks for `--stats=PATH`
+/// (`ASSASSYN_STATS`), an instance without a `--stats` of its own writes `PATH` with its index
+/// before the extension, e.g. `s.<index>.json`, so that no two instances share a file.
+///
+/// Instances run on `--jobs` (`ASSASSYN_JOBS`) threads, one per core by default, each calling
+/// the generated `simulate()` with the options of its instance. So the process starts once for
+/// the whole batch, and memory images shared by instances are read and parsed once.
+pub struct Batch {
+  path: String,
+  instances: Vec<Vec<String>>,
+}
+
+impl Batch {
+  /// The batch given on the command line or in the environment, if any.
+  pub fn from_args() -> Option<Self> {
+    let path = runtime_option("batch", "ASSASSYN_BATCH")?;
+    // An instance ends by unwinding, which would abort the whole batch
+    if cfg!(panic = "abort") {
+      panic!("The batch {} needs a simulator built to unwind, not to abort", path);
+    }
+    let text = fs::read_to_string(&path)
+      .unwrap_or_else(|e| panic!("Failed to read the batch {}: {}", path, e));
+    Some(Batch::parse(&path, &text))
+  }
+
+  /// The batch listed by `text`, read from `path`.
+  pub fn parse(path: &str, text: &str) -> Self {
+    let stats = runtime_option("stats", "ASSASSYN_STATS");
+    let instances = text
+      .lines()
+      .map(str::trim)
+      .filter(|line| !line.is_empty() && !line.starts_with('#'))
+      .enumerate()
+      .map(|(i, line)| {
+        let mut args = split_args(line)
+          .unwrap_or_else(|| panic!("Unterminated quote in line {:?} of {}", line, path));
+        if !args.iter().any(|arg| arg.starts_with("--log-file")) {
+          args.push(format!("--log-file={}.{}.log", path, i));
+        }
+        if let Some(stats) = &stats {
+          if !args.iter().any(|arg| arg.starts_with("--stats")) {
+            args.push(format!("--stats={}", indexed(stats, i)));
+          }
+        }
+        args
+      })
+      .collect();
+    Batch {
+      path: path.to_string(),
+      instances,
+    }
+  }
+
+  pub fn instances(&self) -> &[Vec<String>] {
+    &self.instances
+  }
+
+  /// Simulate every instance with `simulate`, on `--jobs` threads, and print one line per
+  /// instance saying whether it completed. Returns whether all of them did.
+  pub fn run(&self, simulate: fn()) -> bool {
+    let jobs = runtime_param("jobs", "ASSASSYN_JOBS", default_threads()).max(1);
+    let next = AtomicUsize::new(0);
+    let failures = Mutex::new(vec![None; self.instances.len()]);
+    thread::scope(|scope| {
+      for _ in 0..jobs.min(self.instances.len()) {
+        thread::Builder::new()
+          .stack_size(STACK_SIZE)
+          .spawn_scoped(scope, || loop {
+            let i = next.fetch_add(1, Ordering::Relaxed);
+            let Some(args) = self.instances.get(i) else {
+              return;
+            };
+            if let Err(payload) = run_instance(&args.as_slice().into(), true, simulate) {
+              if !is_finished(payload.as_ref()) {
+                failures.lock().unwrap()[i] = Some(panic_message(payload.as_ref()));
+              }
+            }
+          })
+          .expect("failed to spawn a batch thread");
+      }
+    });
+    let failures = failures.into_inner().unwrap();
+    for (i, failure) in failures.iter().enumerate() {
+      match failure {
+        None => println!("[batch] instance {}: ok", i),
+        Some(msg) => println!("[batch] instance {}: failed: {}", i, msg),
+      }
+    }
+    let failed = failures.iter().filter(|x| x.is_some()).count();
+    if failed > 0 {
+      eprintln!("{} of {} instances of {} failed", failed, failures.len(), self.path);
+    }
+    failed == 0
+  }
+}
+
+pub(crate) fn panic_message(payload: &(dyn Any + Send)) -> String {
+  if let Some(msg) = payload.downcast_ref::<&str>() {
+    msg.to_string()
+  } else if let Some(msg) = payload.downcast_ref::<String>() {
+    msg.clone()
+  } else {
+    "panicked".to_string()
+  }
+}
+
+// `path` with `index` inserted before its extension, or appended if it has none.
+fn indexed(path: &str, index: usize) -> String {
+  let file = Path::new(path);
+  match (file.file_stem(), file.extension()) {
+    (Some(stem), Some(ext)) => {
+      let name = format!("{}.{}.{}", stem.to_string_lossy(), index, ext.to_string_lossy());
+      file.with_file_name(name).display().to_string()
+    }
+    _ => format!("{}.{}", path, index),
+  }
+}
+
+// Split a line into whitespace-separated arguments, where `"` quotes spaces.
+fn split_args(line: &str) -> Option<Vec<String>> {
+  let mut args = Vec::new();
+  let mut arg: Option<String> = None;
+  let mut quoted = false;
+  for c in line.chars() {
+    match c {
+      '"' => {
+        quoted = !quoted;
+        arg.get_or_insert_with(String::new);
+      }
+      c if c.is_whitespace() && !quoted => args.extend(arg.take()),
+      c => arg.get_or_insert_with(String::new).push(c),
+    }
+  }
+  args.extend(arg);
+  (!quoted).then_some(args)
+}
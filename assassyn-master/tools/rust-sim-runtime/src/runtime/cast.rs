@@ -1,4 +1,7 @@
 use num_bigint::{BigInt, BigUint, ToBigInt, ToBigUint};
+use num_traits::{One, Zero};
+
+use super::wide::{IWide, UWide};
 
 pub trait ValueCastTo<T> {
   fn cast(&self) -> T;
@@ -753,3 +756,240 @@ impl ValueCastTo<i64> for i64 {
     *self
   }
 }
+
+// 128-bit primitives and the `[u64; N]`-backed wide integers. These are generated with macros
+// since the cross product grows with every width; the semantics follow the primitive `as` casts
+// above: truncate when narrowing, sign-extend signed sources, zero-extend unsigned ones.
+
+fn biguint_low_words<const N: usize>(value: &BigUint) -> [u64; N] {
+  let mut words = [0u64; N];
+  for (dst, src) in words.iter_mut().zip(value.iter_u64_digits()) {
+    *dst = src;
+  }
+  words
+}
+
+fn bigint_low_words<const N: usize>(value: &BigInt) -> [u64; N] {
+  let words = biguint_low_words(value.magnitude());
+  match value.sign() {
+    num_bigint::Sign::Minus => (-IWide(words)).0,
+    _ => words,
+  }
+}
+
+fn words_to_biguint(words: &[u64]) -> BigUint {
+  let digits = words
+    .iter()
+    .flat_map(|w| [*w as u32, (*w >> 32) as u32])
+    .collect();
+  BigUint::new(digits)
+}
+
+macro_rules! impl_cast_as {
+  ($src:ty => $($dst:ty),*) => {
+    $(
+      impl ValueCastTo<$dst> for $src {
+        fn cast(&self) -> $dst {
+          *self as $dst
+        }
+      }
+    )*
+  };
+}
+
+impl_cast_as!(u8 => u128, i128);
+impl_cast_as!(u16 => u128, i128);
+impl_cast_as!(u32 => u128, i128);
+impl_cast_as!(u64 => u128, i128);
+impl_cast_as!(i8 => u128, i128);
+impl_cast_as!(i16 => u128, i128);
+impl_cast_as!(i32 => u128, i128);
+impl_cast_as!(i64 => u128, i128);
+impl_cast_as!(u128 => u8, u16, u32, u64, u128, i8, i16, i32, i64, i128);
+impl_cast_as!(i128 => u8, u16, u32, u64, u128, i8, i16, i32, i64, i128);
+
+macro_rules! impl_cast_128 {
+  ($($ty:ty),*) => {
+    $(
+      impl ValueCastTo<bool> for $ty {
+        fn cast(&self) -> bool {
+          *self != 0
+        }
+      }
+      impl ValueCastTo<$ty> for bool {
+        fn cast(&self) -> $ty {
+          *self as $ty
+        }
+      }
+      impl ValueCastTo<BigInt> for $ty {
+        fn cast(&self) -> BigInt {
+          BigInt::from(*self)
+        }
+      }
+      impl ValueCastTo<BigUint> for $ty {
+        fn cast(&self) -> BigUint {
+          self.to_biguint().unwrap()
+        }
+      }
+      impl ValueCastTo<$ty> for BigInt {
+        fn cast(&self) -> $ty {
+          UWide::<2>(bigint_low_words(self)).low_u128() as $ty
+        }
+      }
+      impl ValueCastTo<$ty> for BigUint {
+        fn cast(&self) -> $ty {
+          UWide::<2>(biguint_low_words(self)).low_u128() as $ty
+        }
+      }
+    )*
+  };
+}
+
+impl_cast_128!(u128, i128);
+
+macro_rules! impl_cast_wide_prim {
+  ($($prim:ty => $ext:ident),*) => {
+    $(
+      impl<const N: usize> ValueCastTo<UWide<N>> for $prim {
+        fn cast(&self) -> UWide<N> {
+          UWide($ext(*self))
+        }
+      }
+      impl<const N: usize> ValueCastTo<IWide<N>> for $prim {
+        fn cast(&self) -> IWide<N> {
+          IWide($ext(*self))
+        }
+      }
+      impl<const N: usize> ValueCastTo<$prim> for UWide<N> {
+        fn cast(&self) -> $prim {
+          self.low_u128() as $prim
+        }
+      }
+      impl<const N: usize> ValueCastTo<$prim> for IWide<N> {
+        fn cast(&self) -> $prim {
+          self.low_u128() as $prim
+        }
+      }
+    )*
+  };
+}
+
+fn zero_extend<const N: usize, T: Into<u128>>(value: T) -> [u64; N] {
+  let value: u128 = value.into();
+  let mut words = [0u64; N];
+  words[0] = value as u64;
+  if N > 1 {
+    words[1] = (value >> 64) as u64;
+  }
+  words
+}
+
+fn sign_extend<const N: usize, T: Into<i128>>(value: T) -> [u64; N] {
+  let value: i128 = value.into();
+  let fill = if value < 0 { u64::MAX } else { 0 };
+  let mut words = [fill; N];
+  words[0] = value as u64;
+  if N > 1 {
+    words[1] = (value >> 64) as u64;
+  }
+  words
+}
+
+impl_cast_wide_prim!(
+  u8 => zero_extend, u16 => zero_extend, u32 => zero_extend, u64 => zero_extend,
+  u128 => zero_extend, i8 => sign_extend, i16 => sign_extend, i32 => sign_extend,
+  i64 => sign_extend, i128 => sign_extend
+);
+
+macro_rules! impl_cast_wide {
+  ($($src:ident),*) => {
+    $(
+      impl<const N: usize> ValueCastTo<bool> for $src<N> {
+        fn cast(&self) -> bool {
+          !self.is_zero()
+        }
+      }
+      impl<const N: usize> ValueCastTo<$src<N>> for bool {
+        fn cast(&self) -> $src<N> {
+          if *self {
+            $src::one()
+          } else {
+            $src::zero()
+          }
+        }
+      }
+      impl<const N: usize> ValueCastTo<$src<N>> for BigUint {
+        fn cast(&self) -> $src<N> {
+          $src(biguint_low_words(self))
+        }
+      }
+      impl<const N: usize> ValueCastTo<$src<N>> for BigInt {
+        fn cast(&self) -> $src<N> {
+          $src(bigint_low_words(self))
+        }
+      }
+    )*
+  };
+}
+
+impl_cast_wide!(UWide, IWide);
+
+impl<const N: usize, const M: usize> ValueCastTo<UWide<M>> for UWide<N> {
+  fn cast(&self) -> UWide<M> {
+    let mut words = [0u64; M];
+    for (dst, src) in words.iter_mut().zip(self.0.iter()) {
+      *dst = *src;
+    }
+    UWide(words)
+  }
+}
+
+impl<const N: usize, const M: usize> ValueCastTo<IWide<M>> for UWide<N> {
+  fn cast(&self) -> IWide<M> {
+    IWide(ValueCastTo::<UWide<M>>::cast(self).0)
+  }
+}
+
+impl<const N: usize, const M: usize> ValueCastTo<IWide<M>> for IWide<N> {
+  fn cast(&self) -> IWide<M> {
+    let mut words = [self.sign_word(); M];
+    for (dst, src) in words.iter_mut().zip(self.0.iter()) {
+      *dst = *src;
+    }
+    IWide(words)
+  }
+}
+
+impl<const N: usize, const M: usize> ValueCastTo<UWide<M>> for IWide<N> {
+  fn cast(&self) -> UWide<M> {
+    UWide(ValueCastTo::<IWide<M>>::cast(self).0)
+  }
+}
+
+impl<const N: usize> ValueCastTo<BigUint> for UWide<N> {
+  fn cast(&self) -> BigUint {
+    words_to_biguint(&self.0)
+  }
+}
+
+impl<const N: usize> ValueCastTo<BigInt> for UWide<N> {
+  fn cast(&self) -> BigInt {
+    words_to_biguint(&self.0).to_bigint().unwrap()
+  }
+}
+
+impl<const N: usize> ValueCastTo<BigInt> for IWide<N> {
+  fn cast(&self) -> BigInt {
+    if self.is_negative() {
+      BigInt::from_biguint(num_bigint::Sign::Minus, words_to_biguint(&(-*self).0))
+    } else {
+      words_to_biguint(&self.0).to_bigint().unwrap()
+    }
+  }
+}
+
+impl<const N: usize> ValueCastTo<BigUint> for IWide<N> {
+  fn cast(&self) -> BigUint {
+    ValueCastTo::<BigInt>::cast(self).to_biguint().unwrap()
+  }
+}
@@ -0,0 +1,328 @@
+use std::collections::{HashMap, VecDeque};
+use std::fs::File;
+use std::hash::Hash;
+use std::io::{self, BufReader, BufWriter, Read, Write};
+use std::path::Path;
+
+use num_bigint::{BigInt, BigUint, Sign};
+
+use super::wide::{IWide, UWide};
+
+/// The first bytes of every checkpoint.
+pub const CHECKPOINT_MAGIC: &[u8; 8] = b"ASCKPT\0\0";
+/// The layout version written after the magic, bumped on any incompatible change.
+pub const CHECKPOINT_VERSION: u32 = 5;
+
+/// A piece of simulator state that can be saved to, and restored from, a checkpoint.
+///
+/// `restore` overwrites `self` in place, so that what a value was built with and does not
+/// change while simulating, e.g. the capacity of a FIFO, comes from the simulator being
+/// restored rather than from the file. Values are little-endian, and lengths and stamps are
+/// LEB128 varints.
+pub trait Checkpoint {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()>;
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()>;
+}
+
+pub(crate) fn invalid(msg: String) -> io::Error {
+  io::Error::new(io::ErrorKind::InvalidData, msg)
+}
+
+/// Create the checkpoint at `path`, for a simulator elaborated from the IR hashed `ir_hash`.
+/// The caller then saves every field of the simulator to it, in order.
+pub fn checkpoint_writer(path: impl AsRef<Path>, ir_hash: &str) -> io::Result<BufWriter<File>> {
+  let mut out = BufWriter::new(File::create(path)?);
+  out.write_all(CHECKPOINT_MAGIC)?;
+  CHECKPOINT_VERSION.save(&mut out)?;
+  ir_hash.to_string().save(&mut out)?;
+  Ok(out)
+}
+
+/// Open the checkpoint at `path`, checking that it was saved by a simulator elaborated from
+/// the same IR, whose fields are then restored in the order they were saved.
+pub fn checkpoint_reader(path: impl AsRef<Path>, ir_hash: &str) -> io::Result<BufReader<File>> {
+  let path = path.as_ref();
+  let mut inp = BufReader::new(File::open(path)?);
+  let mut magic = [0u8; 8];
+  inp.read_exact(&mut magic)?;
+  if &magic != CHECKPOINT_MAGIC {
+    return Err(invalid(format!("{} is not a checkpoint", path.display())));
+  }
+  let mut version = 0u32;
+  version.restore(&mut inp)?;
+  if version != CHECKPOINT_VERSION {
+    return Err(invalid(format!(
+      "{} has checkpoint version {}, expected {}",
+      path.display(),
+      version,
+      CHECKPOINT_VERSION
+    )));
+  }
+  let mut saved = String::new();
+  saved.restore(&mut inp)?;
+  if saved != ir_hash {
+    return Err(invalid(format!(
+      "{} was saved by a simulator of IR {}, not {}",
+      path.display(),
+      saved,
+      ir_hash
+    )));
+  }
+  Ok(inp)
+}
+
+/// Check that a restore consumed the whole checkpoint.
+pub fn checkpoint_end<R: Read>(inp: &mut R) -> io::Result<()> {
+  let mut byte = [0u8; 1];
+  match inp.read(&mut byte)? {
+    0 => Ok(()),
+    _ => Err(invalid("trailing data in the checkpoint".to_string())),
+  }
+}
+
+fn write_varint<W: Write>(out: &mut W, mut x: u64) -> io::Result<()> {
+  let mut buf = [0u8; 10];
+  let mut n = 0;
+  while x >= 0x80 {
+    buf[n] = (x as u8) | 0x80;
+    x >>= 7;
+    n += 1;
+  }
+  buf[n] = x as u8;
+  out.write_all(&buf[..=n])
+}
+
+fn read_varint<R: Read>(inp: &mut R) -> io::Result<u64> {
+  let mut x = 0u64;
+  for shift in (0..64).step_by(7) {
+    let mut byte = [0u8; 1];
+    inp.read_exact(&mut byte)?;
+    x |= ((byte[0] & 0x7f) as u64) << shift;
+    if byte[0] < 0x80 {
+      return Ok(x);
+    }
+  }
+  Err(invalid("varint overflow in the checkpoint".to_string()))
+}
+
+macro_rules! impl_checkpoint_prim {
+  ($($ty:ty),*) => {
+    $(
+      impl Checkpoint for $ty {
+        fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+          out.write_all(&self.to_le_bytes())
+        }
+
+        fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+          let mut buf = [0u8; std::mem::size_of::<$ty>()];
+          inp.read_exact(&mut buf)?;
+          *self = <$ty>::from_le_bytes(buf);
+          Ok(())
+        }
+      }
+    )*
+  };
+}
+
+impl_checkpoint_prim!(u8, u16, u32, u64, u128, i8, i16, i32, i64, i128, f32, f64);
+
+impl Checkpoint for usize {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    write_varint(out, *self as u64)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    *self = read_varint(inp)? as usize;
+    Ok(())
+  }
+}
+
+impl Checkpoint for bool {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    out.write_all(&[*self as u8])
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut byte = 0u8;
+    byte.restore(inp)?;
+    *self = byte != 0;
+    Ok(())
+  }
+}
+
+// The placeholder of an external module without a Verilator FFI, which has no state.
+impl Checkpoint for () {
+  fn save<W: Write>(&self, _: &mut W) -> io::Result<()> {
+    Ok(())
+  }
+
+  fn restore<R: Read>(&mut self, _: &mut R) -> io::Result<()> {
+    Ok(())
+  }
+}
+
+impl Checkpoint for String {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.len().save(out)?;
+    out.write_all(self.as_bytes())
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut len = 0usize;
+    len.restore(inp)?;
+    let mut buf = vec![0u8; len];
+    inp.read_exact(&mut buf)?;
+    *self = String::from_utf8(buf).map_err(|e| invalid(e.to_string()))?;
+    Ok(())
+  }
+}
+
+impl<const N: usize> Checkpoint for UWide<N> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.0.iter().try_for_each(|word| word.save(out))
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.0.iter_mut().try_for_each(|word| word.restore(inp))
+  }
+}
+
+impl<const N: usize> Checkpoint for IWide<N> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.0.iter().try_for_each(|word| word.save(out))
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.0.iter_mut().try_for_each(|word| word.restore(inp))
+  }
+}
+
+impl Checkpoint for BigUint {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    let digits: Vec<u64> = self.iter_u64_digits().collect();
+    digits.save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut digits: Vec<u64> = Vec::new();
+    digits.restore(inp)?;
+    let digits = digits
+      .iter()
+      .flat_map(|x| [*x as u32, (*x >> 32) as u32])
+      .collect();
+    *self = BigUint::new(digits);
+    Ok(())
+  }
+}
+
+impl Checkpoint for BigInt {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    (self.sign() == Sign::Minus).save(out)?;
+    self.magnitude().save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let (mut negative, mut magnitude) = (false, BigUint::default());
+    negative.restore(inp)?;
+    magnitude.restore(inp)?;
+    let sign = if negative { Sign::Minus } else { Sign::Plus };
+    *self = BigInt::from_biguint(sign, magnitude);
+    Ok(())
+  }
+}
+
+impl<T: Checkpoint + Default> Checkpoint for Option<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.is_some().save(out)?;
+    match self {
+      Some(value) => value.save(out),
+      None => Ok(()),
+    }
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut some = false;
+    some.restore(inp)?;
+    *self = if some {
+      let mut value = T::default();
+      value.restore(inp)?;
+      Some(value)
+    } else {
+      None
+    };
+    Ok(())
+  }
+}
+
+impl<T: Checkpoint + Default> Checkpoint for Vec<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.len().save(out)?;
+    self.iter().try_for_each(|x| x.save(out))
+  }
+
+  // A restored vector keeps its allocation when the length matches, as array payloads do.
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut len = 0usize;
+    len.restore(inp)?;
+    self.resize_with(len, T::default);
+    self.iter_mut().try_for_each(|x| x.restore(inp))
+  }
+}
+
+impl<T: Checkpoint + Default> Checkpoint for VecDeque<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.len().save(out)?;
+    self.iter().try_for_each(|x| x.save(out))
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut len = 0usize;
+    len.restore(inp)?;
+    self.clear();
+    for _ in 0..len {
+      let mut value = T::default();
+      value.restore(inp)?;
+      self.push_back(value);
+    }
+    Ok(())
+  }
+}
+
+impl<K, V> Checkpoint for HashMap<K, V>
+where
+  K: Checkpoint + Default + Eq + Hash,
+  V: Checkpoint + Default,
+{
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.len().save(out)?;
+    self.iter().try_for_each(|(k, v)| {
+      k.save(out)?;
+      v.save(out)
+    })
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut len = 0usize;
+    len.restore(inp)?;
+    self.clear();
+    for _ in 0..len {
+      let (mut k, mut v) = (K::default(), V::default());
+      k.restore(inp)?;
+      v.restore(inp)?;
+      self.insert(k, v);
+    }
+    Ok(())
+  }
+}
+
+// The pusher of a pending write names the module that scheduled it, for diagnostics. Names
+// restored from a checkpoint are leaked, as there are only as many as writes in flight.
+pub(crate) fn save_pusher<W: Write>(pusher: &'static str, out: &mut W) -> io::Result<()> {
+  pusher.to_string().save(out)
+}
+
+pub(crate) fn restore_pusher<R: Read>(inp: &mut R) -> io::Result<&'static str> {
+  let mut pusher = String::new();
+  pusher.restore(inp)?;
+  Ok(Box::leak(pusher.into_boxed_str()))
+}
@@ -0,0 +1,97 @@
+use std::collections::VecDeque;
+use std::io::{self, Read, Write};
+
+use super::checkpoint::Checkpoint;
+
+const CYCLE: usize = 100;
+
+/// The trigger queue of a module, holding the stamps at which it should run.
+///
+/// Besides the stamps pushed by async calls, a queue can carry an implicit generator that
+/// fires every cycle up to a bound. Free-running modules (`Driver`, `Testbench`) use it so
+/// that neither startup time nor memory depend on how many cycles are simulated.
+#[derive(Default)]
+pub struct EventQueue {
+  queue: VecDeque<usize>,
+  // The next stamp and the last stamp (inclusive) of the every-cycle generator.
+  every_cycle: Option<(usize, usize)>,
+}
+
+impl EventQueue {
+  pub fn new() -> Self {
+    EventQueue::default()
+  }
+
+  /// A queue firing at cycles `1..=cycles`, i.e., stamps `100, 200, ..., cycles * 100`.
+  pub fn every_cycle(cycles: usize) -> Self {
+    EventQueue {
+      queue: VecDeque::new(),
+      every_cycle: (cycles > 0).then_some((CYCLE, cycles * CYCLE)),
+    }
+  }
+
+  /// Queue an event after every event already pending, including the generated ones.
+  pub fn push_back(&mut self, stamp: usize) {
+    self.queue.push_back(stamp);
+  }
+
+  /// Take back the last event pushed at `stamp`, if any.
+  pub fn retract(&mut self, stamp: usize) {
+    if let Some(i) = self.queue.iter().rposition(|x| *x == stamp) {
+      self.queue.remove(i);
+    }
+  }
+
+  pub fn front(&self) -> Option<usize> {
+    match self.every_cycle {
+      Some((next, _)) => Some(next),
+      None => self.queue.front().copied(),
+    }
+  }
+
+  pub fn pop_front(&mut self) -> Option<usize> {
+    match self.every_cycle {
+      Some((next, last)) => {
+        self.every_cycle = (next < last).then_some((next + CYCLE, last));
+        Some(next)
+      }
+      None => self.queue.pop_front(),
+    }
+  }
+
+  /// Make the every-cycle generator, if any, fire up to cycle `cycles`, e.g. when a simulation
+  /// restored from a checkpoint runs longer than the one that saved it.
+  pub fn set_last_cycle(&mut self, cycles: usize) {
+    if let Some((next, _)) = self.every_cycle {
+      self.every_cycle = (next <= cycles * CYCLE).then_some((next, cycles * CYCLE));
+    }
+  }
+
+  pub fn is_empty(&self) -> bool {
+    self.every_cycle.is_none() && self.queue.is_empty()
+  }
+
+  pub fn len(&self) -> usize {
+    let generated = self
+      .every_cycle
+      .map_or(0, |(next, last)| (last - next) / CYCLE + 1);
+    generated + self.queue.len()
+  }
+}
+
+impl Checkpoint for EventQueue {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.queue.save(out)?;
+    self.every_cycle.map(|x| x.0).save(out)?;
+    self.every_cycle.map(|x| x.1).save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let (mut next, mut last) = (None::<usize>, None::<usize>);
+    self.queue.restore(inp)?;
+    next.restore(inp)?;
+    last.restore(inp)?;
+    self.every_cycle = next.zip(last);
+    Ok(())
+  }
+}
@@ -0,0 +1,51 @@
+// A stamp no cycle is simulated at
+const NEVER: usize = usize::MAX;
+
+/// The value of an expression used outside its module, valid only in the cycle that set it.
+///
+/// Validity is the stamp of the cycle that set the value, rather than an `Option` cleared at
+/// the start of every cycle, so no cycle has to visit the exposures it does not set, and a
+/// wide value reuses its allocation from one cycle to the next.
+pub struct Exposed<T> {
+  stamp: usize,
+  value: T,
+}
+
+impl<T: Default> Default for Exposed<T> {
+  fn default() -> Self {
+    Exposed {
+      stamp: NEVER,
+      value: T::default(),
+    }
+  }
+}
+
+impl<T: Clone + Default> Exposed<T> {
+  pub fn new() -> Self {
+    Exposed::default()
+  }
+
+  /// Expose `value` for the cycle at `stamp`.
+  #[inline]
+  pub fn set(&mut self, stamp: usize, value: &T) {
+    self.value.clone_from(value);
+    self.stamp = stamp;
+  }
+
+  /// Withdraw the value for the rest of the cycle, e.g. when its module stalls.
+  #[inline]
+  pub fn invalidate(&mut self) {
+    self.stamp = NEVER;
+  }
+
+  #[inline]
+  pub fn is_valid(&self, stamp: usize) -> bool {
+    self.stamp == stamp
+  }
+
+  /// The value, if it was set in the cycle at `stamp`.
+  #[inline]
+  pub fn get(&self, stamp: usize) -> Option<&T> {
+    self.is_valid(stamp).then_some(&self.value)
+  }
+}
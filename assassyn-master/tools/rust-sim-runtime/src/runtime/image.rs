@@ -0,0 +1,253 @@
+use std::collections::HashMap;
+use std::fs;
+use std::sync::{Arc, Mutex};
+
+use num_bigint::BigUint;
+
+use super::batch::in_batch;
+use super::cast::ValueCastTo;
+use super::utils::runtime_options;
+
+/// Memory images to load into the simulator's arrays when it starts.
+///
+/// The code generator bakes the `init_file` of every SRAM in as a default, and any array can be
+/// (re)loaded at runtime with `--load <name>=<file>` (repeatable), or through the environment as
+/// `ASSASSYN_LOAD=<name>=<file>,<name>=<file>`. So one simulator binary can run many programs.
+///
+/// The format of a file is told by its content and name: ELF if it starts with the ELF magic,
+/// raw little-endian binary if its name ends in `.bin`, and hex text otherwise (see `load_hex`).
+pub struct MemoryImages {
+  overrides: HashMap<String, String>,
+}
+
+impl MemoryImages {
+  /// The images requested on the command line and in the environment.
+  pub fn new() -> Self {
+    MemoryImages::with_overrides(runtime_options("load", "ASSASSYN_LOAD"))
+  }
+
+  /// The images given as `<name>=<file>` strings.
+  pub fn with_overrides(specs: impl IntoIterator<Item = String>) -> Self {
+    let overrides = specs
+      .into_iter()
+      .map(|spec| match spec.split_once('=') {
+        Some((name, file)) => (name.trim().to_string(), file.trim().to_string()),
+        None => panic!("Invalid memory image {:?}, expected <name>=<file>", spec),
+      })
+      .collect();
+    MemoryImages { overrides }
+  }
+
+  /// Load `array`, known by any of `names`, from its runtime image if one was given and from
+  /// `default` otherwise. `bytes` is the width of an element in bytes, for binary images.
+  pub fn load<T>(&mut self, names: &[&str], array: &mut [T], default: Option<&str>, bytes: usize)
+  where
+    u128: ValueCastTo<T>,
+    BigUint: ValueCastTo<T>,
+  {
+    let file = names.iter().find_map(|name| self.overrides.remove(*name));
+    if let Some(file) = file.as_deref().or(default) {
+      load_memory_image(array, file, bytes);
+    }
+  }
+
+  /// Panic if an image was given for an array that does not exist, rather than silently
+  /// running without it.
+  pub fn finish(self, names: &[&str]) {
+    if let Some(name) = self.overrides.keys().next() {
+      panic!(
+        "No array named {:?} to load a memory image into, expected one of {:?}",
+        name, names
+      );
+    }
+  }
+}
+
+impl Default for MemoryImages {
+  fn default() -> Self {
+    MemoryImages::new()
+  }
+}
+
+/// Load `array` from the hex, binary or ELF image `file`, whose elements are `bytes` wide.
+pub fn load_memory_image<T>(array: &mut [T], file: &str, bytes: usize)
+where
+  u128: ValueCastTo<T>,
+  BigUint: ValueCastTo<T>,
+{
+  match &*parsed_image(file) {
+    Image::Bytes(data) => load_words(array, data, bytes, file),
+    Image::Hex(elements) => {
+      for (idx, le) in elements {
+        store(array, *idx, le, file);
+      }
+    }
+  }
+}
+
+// A memory image, read and parsed, but not yet cast to the elements of an array.
+enum Image {
+  // Little-endian bytes, from the first element on
+  Bytes(Vec<u8>),
+  // Each element given, with its index, as little-endian bytes
+  Hex(Vec<(usize, Vec<u8>)>),
+}
+
+// The instances of a batch run the same programs over and over, so their images are parsed
+// once per process.
+static BATCH_IMAGES: Mutex<Option<HashMap<String, Arc<Image>>>> = Mutex::new(None);
+
+fn parsed_image(file: &str) -> Arc<Image> {
+  if !in_batch() {
+    return Arc::new(parse_image(file));
+  }
+  if let Some(image) = BATCH_IMAGES
+    .lock()
+    .unwrap()
+    .get_or_insert_with(HashMap::new)
+    .get(file)
+  {
+    return image.clone();
+  }
+  // Parsed unlocked, so that instances loading other images do not wait
+  let image = Arc::new(parse_image(file));
+  let mut images = BATCH_IMAGES.lock().unwrap();
+  let images = images.get_or_insert_with(HashMap::new);
+  images.entry(file.to_string()).or_insert(image).clone()
+}
+
+fn parse_image(file: &str) -> Image {
+  let data = fs::read(file).unwrap_or_else(|e| panic!("can not open memory image {}: {}", file, e));
+  if data.starts_with(b"\x7fELF") {
+    Image::Bytes(elf_image(&data, file))
+  } else if file.ends_with(".bin") {
+    Image::Bytes(data)
+  } else {
+    let text = String::from_utf8(data).unwrap_or_else(|_| panic!("{} is not a hex file", file));
+    Image::Hex(parse_hex(&text, file))
+  }
+}
+
+// Hex text: one element per line in hex, `_` separators and `//` comments allowed, and
+// `@<addr>` moving to element `addr`, as `load_hex_file` and Verilog's `$readmemh` read it.
+fn parse_hex(text: &str, file: &str) -> Vec<(usize, Vec<u8>)> {
+  let mut elements = Vec::new();
+  let mut idx = 0;
+  for line in text.lines() {
+    let line = line.find("//").map_or(line, |x| &line[..x]).trim();
+    if line.is_empty() {
+      continue;
+    }
+    let line = line.replace('_', "");
+    if let Some(addr) = line.strip_prefix('@') {
+      idx = usize::from_str_radix(addr, 16)
+        .unwrap_or_else(|_| panic!("Invalid address {:?} in {}", line, file));
+      continue;
+    }
+    let le = hex_to_le_bytes(&line).unwrap_or_else(|| panic!("Invalid hex {:?} in {}", line, file));
+    elements.push((idx, le));
+    idx += 1;
+  }
+  elements
+}
+
+fn hex_to_le_bytes(hex: &str) -> Option<Vec<u8>> {
+  let digits = hex
+    .chars()
+    .rev()
+    .map(|c| c.to_digit(16).map(|d| d as u8))
+    .collect::<Option<Vec<u8>>>()?;
+  Some(
+    digits
+      .chunks(2)
+      .map(|pair| pair[0] | pair.get(1).map_or(0, |hi| hi << 4))
+      .collect(),
+  )
+}
+
+// Store `data` as consecutive `bytes`-wide little-endian elements from the first on.
+fn load_words<T>(array: &mut [T], data: &[u8], bytes: usize, file: &str)
+where
+  u128: ValueCastTo<T>,
+  BigUint: ValueCastTo<T>,
+{
+  for (i, word) in data.chunks(bytes.max(1)).enumerate() {
+    store(array, i, word, file);
+  }
+}
+
+fn store<T>(array: &mut [T], idx: usize, le: &[u8], file: &str)
+where
+  u128: ValueCastTo<T>,
+  BigUint: ValueCastTo<T>,
+{
+  let len = array.len();
+  let slot = array
+    .get_mut(idx)
+    .unwrap_or_else(|| panic!("{} does not fit in {} elements", file, len));
+  *slot = if le.len() <= 16 {
+    let mut buf = [0u8; 16];
+    buf[..le.len()].copy_from_slice(le);
+    ValueCastTo::<T>::cast(&u128::from_le_bytes(buf))
+  } else {
+    let digits = le
+      .chunks(4)
+      .map(|x| x.iter().rev().fold(0u32, |acc, b| (acc << 8) | *b as u32))
+      .collect();
+    ValueCastTo::<T>::cast(&BigUint::new(digits))
+  };
+}
+
+// The bytes of the loadable segments of a little-endian ELF32/ELF64 file, laid out from the
+// lowest segment address on. Gaps and `.bss` are zeros.
+fn elf_image(elf: &[u8], file: &str) -> Vec<u8> {
+  let field = |offset: usize, size: usize| -> usize {
+    let raw = elf
+      .get(offset..offset + size)
+      .unwrap_or_else(|| panic!("{} is a truncated ELF file", file));
+    raw
+      .iter()
+      .rev()
+      .fold(0usize, |acc, b| (acc << 8) | *b as usize)
+  };
+  if elf.get(5) != Some(&1) {
+    panic!("{} is not a little-endian ELF file", file);
+  }
+  let is_64 = match elf.get(4) {
+    Some(1) => false,
+    Some(2) => true,
+    _ => panic!("{} has an unknown ELF class", file),
+  };
+  // (phoff, phentsize, phnum), then (offset, vaddr, filesz, memsz) within a program header
+  let (phoff, phentsize, phnum) = if is_64 {
+    (field(0x20, 8), field(0x36, 2), field(0x38, 2))
+  } else {
+    (field(0x1c, 4), field(0x2a, 2), field(0x2c, 2))
+  };
+  const PT_LOAD: usize = 1;
+  let segments: Vec<(usize, usize, usize, usize)> = (0..phnum)
+    .map(|i| phoff + i * phentsize)
+    .filter(|&ph| field(ph, 4) == PT_LOAD)
+    .map(|ph| {
+      if is_64 {
+        (field(ph + 8, 8), field(ph + 16, 8), field(ph + 32, 8), field(ph + 40, 8))
+      } else {
+        (field(ph + 4, 4), field(ph + 8, 4), field(ph + 16, 4), field(ph + 20, 4))
+      }
+    })
+    .filter(|&(_, _, _, memsz)| memsz > 0)
+    .collect();
+  let base = match segments.iter().map(|s| s.1).min() {
+    Some(base) => base,
+    None => panic!("{} has no loadable segment", file),
+  };
+  let end = segments.iter().map(|s| s.1 + s.3).max().unwrap();
+  let mut image = vec![0u8; end - base];
+  for (offset, vaddr, filesz, _) in segments {
+    let src = elf
+      .get(offset..offset + filesz)
+      .unwrap_or_else(|| panic!("{} is a truncated ELF file", file));
+    image[vaddr - base..vaddr - base + filesz].copy_from_slice(src);
+  }
+  image
+}
@@ -0,0 +1,535 @@
+use std::ffi::{c_char, CStr};
+use std::sync::Arc;
+
+use num_bigint::{BigInt, BigUint, Sign};
+
+use super::batch::{is_finished, panic_message, run_instance};
+use super::stats::StatsReport;
+use super::wide::{IWide, UWide};
+use super::xeq::{Array, FIFO};
+
+/// A value a simulator library reads and writes as little-endian bytes, e.g. from Python.
+///
+/// `write_le` fills `out` with the two's complement of the value, truncated or sign-extended to
+/// its length, and `read_le` takes the value back from as many bytes.
+pub trait LeBytes: Sized {
+  fn write_le(&self, out: &mut [u8]);
+  fn read_le(bytes: &[u8]) -> Self;
+}
+
+// Copy `bytes` to `out`, filling the rest of it with `fill`.
+fn copy_extended(bytes: &[u8], out: &mut [u8], fill: u8) {
+  let n = bytes.len().min(out.len());
+  out[..n].copy_from_slice(&bytes[..n]);
+  out[n..].fill(fill);
+}
+
+// The byte a signed value given as `bytes` extends with.
+fn sign_fill(bytes: &[u8]) -> u8 {
+  match bytes.last() {
+    Some(x) if x & 0x80 != 0 => 0xff,
+    _ => 0,
+  }
+}
+
+macro_rules! impl_le_bytes_prim {
+  ($signed:expr, $($ty:ty),*) => {
+    $(
+      impl LeBytes for $ty {
+        fn write_le(&self, out: &mut [u8]) {
+          let bytes = self.to_le_bytes();
+          let fill = if $signed { sign_fill(&bytes) } else { 0 };
+          copy_extended(&bytes, out, fill);
+        }
+        fn read_le(bytes: &[u8]) -> Self {
+          let mut buf = <$ty>::MIN.to_le_bytes();
+          copy_extended(bytes, &mut buf, if $signed { sign_fill(bytes) } else { 0 });
+          <$ty>::from_le_bytes(buf)
+        }
+      }
+    )*
+  };
+}
+
+impl_le_bytes_prim!(false, u8, u16, u32, u64, u128);
+impl_le_bytes_prim!(true, i8, i16, i32, i64, i128);
+
+impl LeBytes for bool {
+  fn write_le(&self, out: &mut [u8]) {
+    copy_extended(&[*self as u8], out, 0);
+  }
+  fn read_le(bytes: &[u8]) -> Self {
+    bytes.iter().any(|x| *x != 0)
+  }
+}
+
+// The little-endian bytes of `words`.
+fn words_to_le(words: &[u64]) -> Vec<u8> {
+  words.iter().flat_map(|x| x.to_le_bytes()).collect()
+}
+
+// The words of the little-endian `bytes`, extended with `fill`.
+fn words_from_le<const N: usize>(bytes: &[u8], fill: u8) -> [u64; N] {
+  let mut buf = vec![fill; N * 8];
+  let n = bytes.len().min(N * 8);
+  buf[..n].copy_from_slice(&bytes[..n]);
+  std::array::from_fn(|i| u64::from_le_bytes(buf[i * 8..i * 8 + 8].try_into().unwrap()))
+}
+
+impl<const N: usize> LeBytes for UWide<N> {
+  fn write_le(&self, out: &mut [u8]) {
+    copy_extended(&words_to_le(&self.0), out, 0);
+  }
+  fn read_le(bytes: &[u8]) -> Self {
+    UWide(words_from_le(bytes, 0))
+  }
+}
+
+impl<const N: usize> LeBytes for IWide<N> {
+  fn write_le(&self, out: &mut [u8]) {
+    let bytes = words_to_le(&self.0);
+    copy_extended(&bytes, out, sign_fill(&bytes));
+  }
+  fn read_le(bytes: &[u8]) -> Self {
+    IWide(words_from_le(bytes, sign_fill(bytes)))
+  }
+}
+
+impl LeBytes for BigUint {
+  fn write_le(&self, out: &mut [u8]) {
+    copy_extended(&self.to_bytes_le(), out, 0);
+  }
+  fn read_le(bytes: &[u8]) -> Self {
+    BigUint::from_bytes_le(bytes)
+  }
+}
+
+impl LeBytes for BigInt {
+  fn write_le(&self, out: &mut [u8]) {
+    let fill = if self.sign() == Sign::Minus { 0xff } else { 0 };
+    copy_extended(&self.to_signed_bytes_le(), out, fill);
+  }
+  fn read_le(bytes: &[u8]) -> Self {
+    BigInt::from_signed_bytes_le(bytes)
+  }
+}
+
+/// An array of a live simulator, read and written in place.
+pub trait ArrayAccess {
+  fn len(&self) -> usize;
+  fn is_empty(&self) -> bool {
+    self.len() == 0
+  }
+  /// Read element `index` into `out`; false if it is out of bounds.
+  fn read(&self, index: usize, out: &mut [u8]) -> bool;
+  /// Overwrite element `index` with `bytes` right away, bypassing the write ports; false if it
+  /// is out of bounds.
+  fn write(&mut self, index: usize, bytes: &[u8]) -> bool;
+}
+
+impl<T: LeBytes + Default + Clone> ArrayAccess for Array<T> {
+  fn len(&self) -> usize {
+    self.payload.len()
+  }
+  fn read(&self, index: usize, out: &mut [u8]) -> bool {
+    self.payload.get(index).map(|x| x.write_le(out)).is_some()
+  }
+  fn write(&mut self, index: usize, bytes: &[u8]) -> bool {
+    self
+      .payload
+      .get_mut(index)
+      .map(|x| *x = T::read_le(bytes))
+      .is_some()
+  }
+}
+
+/// A FIFO of a live simulator, whose entries are pushed and popped right away rather than at
+/// the end of a cycle.
+pub trait FifoAccess {
+  fn len(&self) -> usize;
+  fn is_empty(&self) -> bool {
+    self.len() == 0
+  }
+  /// Read entry `index`, 0 being the front, into `out`; false if there is no such entry.
+  fn peek(&self, index: usize, out: &mut [u8]) -> bool;
+  /// Push `bytes` at the back; false if the FIFO is full.
+  fn push(&mut self, bytes: &[u8]) -> bool;
+  /// Drop the front entry; false if the FIFO is empty.
+  fn pop(&mut self) -> bool;
+}
+
+impl<T: LeBytes> FifoAccess for FIFO<T> {
+  fn len(&self) -> usize {
+    self.payload.len()
+  }
+  fn peek(&self, index: usize, out: &mut [u8]) -> bool {
+    self.payload.get(index).map(|x| x.write_le(out)).is_some()
+  }
+  fn push(&mut self, bytes: &[u8]) -> bool {
+    if self.is_full() {
+      return false;
+    }
+    self.payload.push_back(T::read_le(bytes));
+    true
+  }
+  fn pop(&mut self) -> bool {
+    self.payload.pop_front().is_some()
+  }
+}
+
+/// A generated simulator driven cycle by cycle, as its library exports it.
+pub trait Simulation: Sized {
+  /// The arrays and FIFOs of the design as JSON: their names, sizes, bits and signedness.
+  const PORTS: &'static str;
+
+  /// A simulation ready for its first cycle, or restored from a checkpoint. It ends once idle
+  /// for `--idle-threshold` cycles if `stop_when_idle`, and only at `--sim-threshold` or
+  /// `finish()` otherwise.
+  fn new(stop_when_idle: bool) -> Self;
+  /// Simulate the next cycle, and return whether the simulation goes on.
+  fn step(&mut self) -> bool;
+  /// Skip up to `max` of the next cycles in which no module can run, as if they were
+  /// simulated, and return how many were skipped.
+  fn skip(&mut self, _max: usize) -> usize {
+    0
+  }
+  /// Record that `finish()` ended the simulation, after it wrote its report.
+  fn finished(&mut self);
+  /// The last cycle simulated.
+  fn cycle(&self) -> usize;
+  /// Whether no module triggered for `--idle-threshold` cycles.
+  fn idle(&self) -> bool;
+  /// Why the simulation ended, if it did.
+  fn exit(&self) -> Option<&'static str>;
+  fn stats(&self) -> StatsReport;
+  fn flush(&mut self);
+  fn array(&mut self, name: &str) -> Option<&mut dyn ArrayAccess>;
+  fn fifo(&mut self, name: &str) -> Option<&mut dyn FifoAccess>;
+}
+
+/// The session of a simulator library: a simulation, the options it runs with, and the last
+/// error. `export_simulator!` hands it out as an opaque pointer.
+pub struct LibraryHandle<S> {
+  sim: Option<S>,
+  args: Arc<[String]>,
+  error: Option<String>,
+  // Whether the simulation panicked, which leaves it to be inspected but not stepped
+  failed: bool,
+}
+
+impl<S: Simulation> LibraryHandle<S> {
+  /// A session of the simulation given the options `args`, as its binary would be. If the
+  /// simulation fails to start, the session keeps the error.
+  pub fn new(args: Vec<String>) -> Self {
+    let args: Arc<[String]> = args.into();
+    let (sim, error) = match run_instance(&args, false, || S::new(false)) {
+      Ok(sim) => (Some(sim), None),
+      Err(payload) => (None, Some(panic_message(payload.as_ref()))),
+    };
+    LibraryHandle {
+      sim,
+      args,
+      error,
+      failed: false,
+    }
+  }
+
+  /// Simulate up to `n` cycles, fewer if the simulation ends, or with `until_idle` until it
+  /// is idle. Returns the number of cycles simulated, or -1 on an error.
+  pub fn step(&mut self, n: u64, until_idle: bool) -> i64 {
+    let Some(sim) = self.sim.as_mut().filter(|_| !self.failed) else {
+      return -1;
+    };
+    let mut cycles = 0;
+    let result = run_instance(&self.args, false, || {
+      while cycles < n {
+        cycles += sim.skip((n - cycles) as usize) as u64;
+        if cycles == n {
+          break;
+        }
+        // The cycle `finish()` ends in counts
+        cycles += 1;
+        if !sim.step() {
+          cycles -= 1;
+          break;
+        }
+        if until_idle && sim.idle() {
+          break;
+        }
+      }
+      sim.flush();
+    });
+    match result {
+      Ok(()) => cycles as i64,
+      Err(payload) if is_finished(payload.as_ref()) => {
+        sim.finished();
+        cycles as i64
+      }
+      Err(payload) => {
+        self.error = Some(panic_message(payload.as_ref()));
+        self.failed = true;
+        -1
+      }
+    }
+  }
+
+  pub fn sim(&mut self) -> Option<&mut S> {
+    self.sim.as_mut()
+  }
+
+  /// The last error: the panic that ended the simulation, or a failed access.
+  pub fn error(&self) -> Option<&str> {
+    self.error.as_deref()
+  }
+
+  pub fn set_error(&mut self, error: String) {
+    self.error = Some(error);
+  }
+
+  /// The array `name`, or an error saying there is none.
+  pub fn array(&mut self, name: &str) -> Result<&mut dyn ArrayAccess, String> {
+    self
+      .sim
+      .as_mut()
+      .ok_or_else(|| "The simulator failed to start".to_string())?
+      .array(name)
+      .ok_or_else(|| format!("No array named {:?}", name))
+  }
+
+  /// The FIFO `name`, or an error saying there is none.
+  pub fn fifo(&mut self, name: &str) -> Result<&mut dyn FifoAccess, String> {
+    self
+      .sim
+      .as_mut()
+      .ok_or_else(|| "The simulator failed to start".to_string())?
+      .fifo(name)
+      .ok_or_else(|| format!("No FIFO named {:?}", name))
+  }
+}
+
+/// Copy `text` to the buffer `out` of the caller, truncated to its length, and return the
+/// length of `text`, so that a caller with too small a buffer can retry.
+pub fn copy_text(text: &str, out: &mut [u8]) -> usize {
+  let n = text.len().min(out.len());
+  out[..n].copy_from_slice(&text.as_bytes()[..n]);
+  text.len()
+}
+
+/// The string at `ptr`.
+///
+/// # Safety
+///
+/// `ptr` must be null or point to a NUL-terminated string that outlives the result.
+pub unsafe fn c_str<'a>(ptr: *const c_char) -> &'a str {
+  if ptr.is_null() {
+    return "";
+  }
+  CStr::from_ptr(ptr).to_str().unwrap_or("")
+}
+
+/// The buffer of `len` bytes at `ptr`.
+///
+/// # Safety
+///
+/// `ptr` must be null, or valid for reads and writes of `len` bytes that nothing else accesses
+/// while the result lives.
+pub unsafe fn c_buffer<'a>(ptr: *mut u8, len: usize) -> &'a mut [u8] {
+  if ptr.is_null() || len == 0 {
+    return &mut [];
+  }
+  std::slice::from_raw_parts_mut(ptr, len)
+}
+
+/// Export the C ABI of a simulator library, driving the `Simulation` type `$sim`:
+///
+/// ```c
+/// void *assassyn_sim_new(size_t argc, const char **argv);
+/// void assassyn_sim_free(void *sim);
+/// int64_t assassyn_sim_step(void *sim, uint64_t cycles);
+/// int64_t assassyn_sim_run_until_idle(void *sim, uint64_t max_cycles);
+/// uint64_t assassyn_sim_cycle(void *sim);
+/// size_t assassyn_sim_exit(void *sim, char *buf, size_t len);
+/// size_t assassyn_sim_error(void *sim, char *buf, size_t len);
+/// size_t assassyn_sim_ports(char *buf, size_t len);
+/// size_t assassyn_sim_stats(void *sim, char *buf, size_t len);
+/// int32_t assassyn_sim_array_read(void *sim, const char *name, size_t i,
+///                                 uint8_t *buf, size_t len);
+/// int32_t assassyn_sim_array_write(void *sim, const char *name, size_t i,
+///                                  uint8_t *buf, size_t len);
+/// int64_t assassyn_sim_fifo_len(void *sim, const char *name);
+/// int32_t assassyn_sim_fifo_peek(void *sim, const char *name, size_t i, uint8_t *buf, size_t len);
+/// int32_t assassyn_sim_fifo_push(void *sim, const char *name, const uint8_t *buf, size_t len);
+/// int32_t assassyn_sim_fifo_pop(void *sim, const char *name);
+/// ```
+///
+/// Functions returning text copy it to `buf` and return its full length. The others return a
+/// negative number on an error, whose message `assassyn_sim_error` returns; an access out of
+/// bounds, to an empty or a full FIFO, returns 0 and is no error.
+#[macro_export]
+macro_rules! export_simulator {
+  ($sim:ty) => {
+    mod assassyn_sim_ffi {
+      use super::*;
+      use std::ffi::{c_char, c_void};
+      use $crate::library::{c_buffer, c_str, copy_text, LibraryHandle, Simulation};
+
+      type Handle = LibraryHandle<$sim>;
+
+      unsafe fn handle<'a>(ptr: *mut c_void) -> &'a mut Handle {
+        &mut *(ptr as *mut Handle)
+      }
+
+      // The result of an access: 1 if done, 0 if out of bounds, -1 on an error.
+      fn status(handle: &mut Handle, result: Result<bool, String>) -> i32 {
+        match result {
+          Ok(done) => done as i32,
+          Err(error) => {
+            handle.set_error(error);
+            -1
+          }
+        }
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_new(
+        argc: usize,
+        argv: *const *const c_char,
+      ) -> *mut c_void {
+        let args = (0..argc).map(|i| c_str(*argv.add(i)).to_string()).collect();
+        Box::into_raw(Box::new(Handle::new(args))) as *mut c_void
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_free(sim: *mut c_void) {
+        if !sim.is_null() {
+          drop(Box::from_raw(sim as *mut Handle));
+        }
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_step(sim: *mut c_void, cycles: u64) -> i64 {
+        handle(sim).step(cycles, false)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_run_until_idle(sim: *mut c_void, max: u64) -> i64 {
+        handle(sim).step(max, true)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_cycle(sim: *mut c_void) -> u64 {
+        handle(sim).sim().map_or(0, |x| x.cycle() as u64)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_exit(
+        sim: *mut c_void,
+        buf: *mut u8,
+        len: usize,
+      ) -> usize {
+        let exit = handle(sim).sim().and_then(|x| x.exit()).unwrap_or("");
+        copy_text(exit, c_buffer(buf, len))
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_error(
+        sim: *mut c_void,
+        buf: *mut u8,
+        len: usize,
+      ) -> usize {
+        copy_text(handle(sim).error().unwrap_or(""), c_buffer(buf, len))
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_ports(buf: *mut u8, len: usize) -> usize {
+        copy_text(<$sim as Simulation>::PORTS, c_buffer(buf, len))
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_stats(
+        sim: *mut c_void,
+        buf: *mut u8,
+        len: usize,
+      ) -> usize {
+        let stats = handle(sim).sim().map(|x| x.stats().to_json());
+        copy_text(&stats.unwrap_or_default(), c_buffer(buf, len))
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_array_read(
+        sim: *mut c_void,
+        name: *const c_char,
+        index: usize,
+        buf: *mut u8,
+        len: usize,
+      ) -> i32 {
+        let handle = handle(sim);
+        let result = handle
+          .array(c_str(name))
+          .map(|x| x.read(index, c_buffer(buf, len)));
+        status(handle, result)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_array_write(
+        sim: *mut c_void,
+        name: *const c_char,
+        index: usize,
+        buf: *mut u8,
+        len: usize,
+      ) -> i32 {
+        let handle = handle(sim);
+        let result = handle
+          .array(c_str(name))
+          .map(|x| x.write(index, c_buffer(buf, len)));
+        status(handle, result)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_fifo_len(sim: *mut c_void, name: *const c_char) -> i64 {
+        let handle = handle(sim);
+        match handle.fifo(c_str(name)).map(|x| x.len()) {
+          Ok(len) => len as i64,
+          Err(error) => {
+            handle.set_error(error);
+            -1
+          }
+        }
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_fifo_peek(
+        sim: *mut c_void,
+        name: *const c_char,
+        index: usize,
+        buf: *mut u8,
+        len: usize,
+      ) -> i32 {
+        let handle = handle(sim);
+        let result = handle
+          .fifo(c_str(name))
+          .map(|x| x.peek(index, c_buffer(buf, len)));
+        status(handle, result)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_fifo_push(
+        sim: *mut c_void,
+        name: *const c_char,
+        buf: *mut u8,
+        len: usize,
+      ) -> i32 {
+        let handle = handle(sim);
+        let result = handle.fifo(c_str(name)).map(|x| x.push(c_buffer(buf, len)));
+        status(handle, result)
+      }
+
+      #[no_mangle]
+      pub unsafe extern "C" fn assassyn_sim_fifo_pop(sim: *mut c_void, name: *const c_char) -> i32 {
+        let handle = handle(sim);
+        let result = handle.fifo(c_str(name)).map(|x| x.pop());
+        status(handle, result)
+      }
+    }
+  };
+}
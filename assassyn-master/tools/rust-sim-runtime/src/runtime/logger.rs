@@ -0,0 +1,253 @@
+use std::fs::File;
+use std::io::{self, BufWriter, Write};
+use std::ops::RangeInclusive;
+#[cfg(panic = "abort")]
+use std::sync::{Mutex, Once};
+
+use super::trace::{TraceLane, Tracer};
+use super::utils::runtime_option;
+
+const BUFFER_SIZE: usize = 1 << 20;
+
+/// The sink of all `log` output of a generated simulator.
+///
+/// Stdout, or the file given by `--log-file=PATH` (`ASSASSYN_LOG_FILE`), is locked once and
+/// written through a large buffer, which is flushed when the logger is dropped or `flush` is
+/// called (the generated `finish()` does so before exiting). A simulator built to abort on a
+/// panic drops nothing, so a panic hook flushes the buffers of its loggers instead. Logs can be
+/// filtered by module and by cycle when the simulator starts:
+///
+/// - `--log-modules=A,B` or `ASSASSYN_LOG_MODULES=A,B`: only log from modules `A` and `B`;
+///   an empty list disables all logs.
+/// - `--log-cycles=START:END` or `ASSASSYN_LOG_CYCLES=START:END`: only log in cycles
+///   `START..=END`; either bound may be omitted.
+/// - `--log-trace=PATH` or `ASSASSYN_LOG_TRACE=PATH`: write the admitted logs to a binary
+///   trace at `PATH` (see `Tracer`) instead of formatting them to stdout.
+pub struct Logger {
+  // Boxed, so that the panic hook of an aborting build can find it however the logger moves
+  sink: Box<LogSink>,
+  filter: LogFilter,
+}
+
+// The buffered outputs of a logger
+struct LogSink {
+  out: BufWriter<Box<dyn Write>>,
+  trace: Option<Tracer>,
+}
+
+impl LogSink {
+  fn flush(&mut self) {
+    self.out.flush().expect("failed to flush the simulator log");
+    if let Some(trace) = &mut self.trace {
+      trace.flush();
+    }
+  }
+}
+
+// The sinks of the live loggers, which the panic hook of a build with `panic = "abort"` flushes,
+// as an abort runs no destructor. The hook runs on the panicking thread, which is the only
+// one logging: under `parallel`, the thread owning the logger waits for the phase to end.
+#[cfg(panic = "abort")]
+static LIVE_SINKS: Mutex<Vec<usize>> = Mutex::new(Vec::new());
+
+#[cfg(panic = "abort")]
+fn flush_on_abort(sink: &mut LogSink) {
+  static HOOK: Once = Once::new();
+  HOOK.call_once(|| {
+    let report = std::panic::take_hook();
+    std::panic::set_hook(Box::new(move |info| {
+      report(info);
+      let sinks = LIVE_SINKS.lock().unwrap_or_else(|e| e.into_inner());
+      for &sink in sinks.iter() {
+        // SAFETY: a sink is registered as long as its logger lives, and nothing else uses it
+        unsafe { (*(sink as *mut LogSink)).flush() };
+      }
+    }));
+  });
+  let mut sinks = LIVE_SINKS.lock().unwrap_or_else(|e| e.into_inner());
+  sinks.push(sink as *mut LogSink as usize);
+}
+
+#[cfg(panic = "abort")]
+impl Drop for Logger {
+  fn drop(&mut self) {
+    let sink = &mut *self.sink as *mut LogSink as usize;
+    let mut sinks = LIVE_SINKS.lock().unwrap_or_else(|e| e.into_inner());
+    sinks.retain(|&x| x != sink);
+  }
+}
+
+// The modules and stamps whose logs are written
+#[derive(Clone)]
+struct LogFilter {
+  modules: Option<Vec<String>>,
+  stamps: RangeInclusive<usize>,
+}
+
+impl LogFilter {
+  #[inline]
+  fn admits(&self, module: &str, stamp: usize) -> bool {
+    if !self.stamps.contains(&stamp) {
+      return false;
+    }
+    match &self.modules {
+      None => true,
+      Some(modules) => modules.iter().any(|m| m == module),
+    }
+  }
+}
+
+impl Logger {
+  /// A logger configured from the command line and the environment.
+  pub fn new() -> Self {
+    let modules = runtime_option("log-modules", "ASSASSYN_LOG_MODULES");
+    let cycles = runtime_option("log-cycles", "ASSASSYN_LOG_CYCLES");
+    let out: Box<dyn Write> = match runtime_option("log-file", "ASSASSYN_LOG_FILE") {
+      Some(path) => Box::new(
+        File::create(&path)
+          .unwrap_or_else(|e| panic!("Failed to create the log file {}: {}", path, e)),
+      ),
+      None => Box::new(io::stdout().lock()),
+    };
+    Logger::with_output(out, modules.as_deref(), cycles.as_deref())
+  }
+
+  /// A logger to stdout with the given module list and cycle window, in the formats of `new`.
+  pub fn with_filter(modules: Option<&str>, cycles: Option<&str>) -> Self {
+    Logger::with_output(Box::new(io::stdout().lock()), modules, cycles)
+  }
+
+  fn with_output(out: Box<dyn Write>, modules: Option<&str>, cycles: Option<&str>) -> Self {
+    let modules = modules.map(|x| {
+      x.split(',')
+        .map(|m| m.trim().to_string())
+        .filter(|m| !m.is_empty())
+        .collect()
+    });
+    let stamps = match cycles {
+      None => 0..=usize::MAX,
+      Some(window) => {
+        let (start, end) = window.split_once(':').unwrap_or((window, window));
+        let bound = |x: &str, default: usize| {
+          let x = x.trim();
+          if x.is_empty() {
+            default
+          } else {
+            x.parse::<usize>()
+              .unwrap_or_else(|_| panic!("Invalid log cycle window: {}", window))
+          }
+        };
+        let start = bound(start, 0).saturating_mul(100);
+        let end = bound(end, usize::MAX / 100)
+          .saturating_mul(100)
+          .saturating_add(99);
+        start..=end
+      }
+    };
+    #[allow(unused_mut)]
+    let mut sink = Box::new(LogSink {
+      out: BufWriter::with_capacity(BUFFER_SIZE, out),
+      trace: None,
+    });
+    #[cfg(panic = "abort")]
+    flush_on_abort(&mut sink);
+    Logger {
+      sink,
+      filter: LogFilter { modules, stamps },
+    }
+  }
+
+  /// Trace to the file given by `--log-trace` or `ASSASSYN_LOG_TRACE`, if any, with `formats`
+  /// as the format table of the trace.
+  pub fn with_trace(mut self, formats: &str) -> Self {
+    if let Some(path) = runtime_option("log-trace", "ASSASSYN_LOG_TRACE") {
+      let trace = Tracer::create(&path, formats)
+        .unwrap_or_else(|e| panic!("Failed to create the log trace {}: {}", path, e));
+      self.sink.trace = Some(trace);
+    }
+    self
+  }
+
+  /// Whether a log from `module` at `stamp` should be written. Generated code checks this
+  /// before evaluating any of the log's arguments.
+  #[inline]
+  pub fn enabled(&self, module: &str, stamp: usize) -> bool {
+    self.filter.admits(module, stamp)
+  }
+
+  pub fn writer(&mut self) -> &mut impl Write {
+    &mut self.sink.out
+  }
+
+  /// The binary trace, when logs are traced rather than formatted.
+  #[inline]
+  pub fn tracer(&mut self) -> Option<&mut Tracer> {
+    self.sink.trace.as_mut()
+  }
+
+  /// A lane for one module to log to while modules are evaluated in parallel, with the
+  /// filters of this logger, and tracing if this logger traces.
+  pub fn lane(&self) -> LogLane {
+    LogLane {
+      text: Vec::new(),
+      filter: self.filter.clone(),
+      trace: self.sink.trace.as_ref().map(|_| TraceLane::default()),
+    }
+  }
+
+  /// Append what was logged to `lane`, and empty it. Absorbing the lanes of a cycle in the
+  /// modules' serial order gives the log a serial simulation writes.
+  pub fn absorb(&mut self, lane: &mut LogLane) {
+    if !lane.text.is_empty() {
+      self
+        .sink
+        .out
+        .write_all(&lane.text)
+        .expect("failed to write the simulator log");
+      lane.text.clear();
+    }
+    if let (Some(trace), Some(lane)) = (&mut self.sink.trace, &mut lane.trace) {
+      if !lane.is_empty() {
+        trace.absorb(lane);
+      }
+    }
+  }
+
+  pub fn flush(&mut self) {
+    self.sink.flush();
+  }
+}
+
+impl Default for Logger {
+  fn default() -> Self {
+    Logger::new()
+  }
+}
+
+/// The log of one module in a simulator that evaluates modules in parallel.
+///
+/// `Logger` writes to the locked stdout, which only the main thread may hold, and the order of
+/// its lines must not depend on the order threads finish in. So each module logs to a lane of
+/// its own, with the interface of `Logger`, and the simulator absorbs the lanes into its logger
+/// once every module of the cycle ran.
+pub struct LogLane {
+  text: Vec<u8>,
+  filter: LogFilter,
+  trace: Option<TraceLane>,
+}
+
+impl LogLane {
+  #[inline]
+  pub fn enabled(&self, module: &str, stamp: usize) -> bool {
+    self.filter.admits(module, stamp)
+  }
+
+  pub fn writer(&mut self) -> &mut impl Write {
+    &mut self.text
+  }
+
+  #[inline]
+  pub fn tracer(&mut self) -> Option<&mut TraceLane> {
+    self.trace.as_mut()
+  }
+}
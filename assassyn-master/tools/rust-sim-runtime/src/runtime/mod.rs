@@ -1,7 +1,29 @@
+pub mod batch;
 pub mod cast;
+pub mod checkpoint;
+pub mod event;
+pub mod exposure;
+pub mod image;
+pub mod library;
+pub mod logger;
+pub mod parallel;
+pub mod stats;
+pub mod trace;
 pub mod utils;
+pub mod wide;
 pub mod xeq;
 
+pub use batch::*;
 pub use cast::*;
+pub use checkpoint::*;
+pub use event::*;
+pub use exposure::*;
+pub use image::*;
+pub use library::*;
+pub use logger::*;
+pub use parallel::*;
+pub use stats::*;
+pub use trace::*;
 pub use utils::*;
+pub use wide::*;
 pub use xeq::*;
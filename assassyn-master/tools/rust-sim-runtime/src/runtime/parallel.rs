@@ -0,0 +1,207 @@
+use std::any::Any;
+use std::hint::spin_loop;
+use std::marker::PhantomData;
+use std::panic::{self, AssertUnwindSafe};
+use std::sync::atomic::{AtomicBool, AtomicPtr, AtomicUsize, Ordering};
+use std::sync::{Arc, Condvar, Mutex};
+use std::thread::{self, JoinHandle};
+
+/// The number of threads a parallel simulator runs on by default: one per available core.
+pub fn default_threads() -> usize {
+  thread::available_parallelism().map_or(1, |n| n.get())
+}
+
+// A thread waiting for the next phase, or for the end of one, spins for `SPINS` polls, then
+// yields the core between polls, so that a pool with more threads than cores still makes
+// progress. An idle worker sleeps after `POLLS` polls. Phases are microseconds apart while a
+// simulation runs.
+const SPINS: usize = 64;
+const POLLS: usize = 1 << 12;
+
+fn backoff(polls: &mut usize) {
+  if *polls < SPINS {
+    spin_loop();
+  } else {
+    thread::yield_now();
+  }
+  *polls += 1;
+}
+
+/// A module of a phase, run on a pointer to the simulator.
+///
+/// The tasks of a phase run at the same time, so a task never borrows the whole simulator: it
+/// borrows, through the pointer, only the fields it accesses (see `run`).
+pub type Task<S> = unsafe fn(*mut S);
+
+/// A pool of threads evaluating the phases of a simulator's cycle.
+///
+/// The code generator partitions the modules of a design into phases, each a list of modules
+/// that neither write what another module of the phase reads or writes, nor depend on one
+/// another's order (see `codegen/simulator/parallel.py`). `run` spreads the modules of a phase
+/// over the pool and returns once all of them ran, which is the barrier between phases. The
+/// calling thread takes part, so a pool of `threads` threads spawns `threads - 1` workers, and
+/// a pool of one thread runs every phase inline.
+///
+/// Workers poll for the next phase, and sleep once no phase started for a while, e.g. after
+/// the simulation ended.
+pub struct WorkerPool<S> {
+  shared: Arc<Shared>,
+  workers: Vec<JoinHandle<()>>,
+  _sim: PhantomData<Task<S>>,
+}
+
+struct Shared {
+  // Bumped by `run` to start a phase, and by `drop` to stop the workers
+  generation: AtomicUsize,
+  // The phase: the simulator, and the `len` tasks at `tasks`
+  sim: AtomicPtr<()>,
+  tasks: AtomicPtr<()>,
+  len: AtomicUsize,
+  // The next task to claim
+  next: AtomicUsize,
+  // The workers that did not finish the phase yet
+  pending: AtomicUsize,
+  // The first panic of the phase
+  panic: Mutex<Option<Box<dyn Any + Send>>>,
+  sleepers: AtomicUsize,
+  lock: Mutex<()>,
+  wake: Condvar,
+  shutdown: AtomicBool,
+}
+
+impl<S: 'static> WorkerPool<S> {
+  /// A pool of `threads` threads, including the calling one.
+  pub fn new(threads: usize) -> Self {
+    let shared = Arc::new(Shared {
+      generation: AtomicUsize::new(0),
+      sim: AtomicPtr::new(std::ptr::null_mut()),
+      tasks: AtomicPtr::new(std::ptr::null_mut()),
+      len: AtomicUsize::new(0),
+      next: AtomicUsize::new(0),
+      pending: AtomicUsize::new(0),
+      panic: Mutex::new(None),
+      sleepers: AtomicUsize::new(0),
+      lock: Mutex::new(()),
+      wake: Condvar::new(),
+      shutdown: AtomicBool::new(false),
+    });
+    let workers = (1..threads.max(1))
+      .map(|_| {
+        let shared = shared.clone();
+        thread::spawn(move || work::<S>(&shared))
+      })
+      .collect();
+    WorkerPool {
+      shared,
+      workers,
+      _sim: PhantomData,
+    }
+  }
+
+  pub fn threads(&self) -> usize {
+    self.workers.len() + 1
+  }
+
+  /// Run every task of `tasks` on `sim`, spread over the pool, and return once all of them
+  /// returned. If a task panics, the tasks not started yet are skipped, and the panic is
+  /// returned for the caller to resume once it has saved what it needs to.
+  ///
+  /// # Safety
+  ///
+  /// `sim` is valid, and nothing else accesses it, until `run` returns. The tasks run at the
+  /// same time, each with the same `sim`, so none may borrow the whole of `*sim`: a task may
+  /// borrow mutably the fields no other task of the phase accesses, and immutably those no
+  /// other task writes. Only a phase of one task may borrow `*sim` as a whole.
+  pub unsafe fn run(&self, sim: *mut S, tasks: &[Task<S>]) -> thread::Result<()> {
+    if self.workers.is_empty() || tasks.len() <= 1 {
+      return panic::catch_unwind(AssertUnwindSafe(|| tasks.iter().for_each(|task| task(sim))));
+    }
+    let shared = &*self.shared;
+    shared.sim.store(sim as *mut (), Ordering::Relaxed);
+    shared
+      .tasks
+      .store(tasks.as_ptr() as *mut (), Ordering::Relaxed);
+    shared.len.store(tasks.len(), Ordering::Relaxed);
+    shared.next.store(0, Ordering::Relaxed);
+    shared.pending.store(self.workers.len(), Ordering::Relaxed);
+    // Publishes the phase to the workers
+    shared.generation.fetch_add(1, Ordering::SeqCst);
+    if shared.sleepers.load(Ordering::SeqCst) > 0 {
+      let _guard = shared.lock.lock().unwrap();
+      shared.wake.notify_all();
+    }
+    claim(shared, sim, tasks);
+    let mut polls = 0;
+    while shared.pending.load(Ordering::Acquire) != 0 {
+      backoff(&mut polls);
+    }
+    match shared.panic.lock().unwrap().take() {
+      Some(panic) => Err(panic),
+      None => Ok(()),
+    }
+  }
+}
+
+impl<S> Drop for WorkerPool<S> {
+  fn drop(&mut self) {
+    self.shared.shutdown.store(true, Ordering::SeqCst);
+    self.shared.generation.fetch_add(1, Ordering::SeqCst);
+    {
+      let _guard = self.shared.lock.lock().unwrap();
+      self.shared.wake.notify_all();
+    }
+    for worker in self.workers.drain(..) {
+      let _ = worker.join();
+    }
+  }
+}
+
+// Run the tasks of the current phase until none is left to claim.
+unsafe fn claim<S>(shared: &Shared, sim: *mut S, tasks: &[Task<S>]) {
+  loop {
+    let i = shared.next.fetch_add(1, Ordering::Relaxed);
+    let Some(task) = tasks.get(i) else {
+      return;
+    };
+    if let Err(panic) = panic::catch_unwind(AssertUnwindSafe(|| task(sim))) {
+      shared.next.store(tasks.len(), Ordering::Relaxed);
+      shared.panic.lock().unwrap().get_or_insert(panic);
+      return;
+    }
+  }
+}
+
+fn work<S>(shared: &Shared) {
+  let mut seen = 0;
+  loop {
+    let mut polls = 0;
+    while shared.generation.load(Ordering::Acquire) == seen {
+      if polls < POLLS {
+        backoff(&mut polls);
+        continue;
+      }
+      // Sleep until `run` or `drop` bumps the generation. `run` only notifies when it sees a
+      // sleeper, so register before checking the generation under the lock.
+      shared.sleepers.fetch_add(1, Ordering::SeqCst);
+      let mut guard = shared.lock.lock().unwrap();
+      while shared.generation.load(Ordering::SeqCst) == seen {
+        guard = shared.wake.wait(guard).unwrap();
+      }
+      drop(guard);
+      shared.sleepers.fetch_sub(1, Ordering::SeqCst);
+    }
+    if shared.shutdown.load(Ordering::SeqCst) {
+      return;
+    }
+    // `run` waits for every worker before it starts another phase, so this is the phase
+    // whose generation was just seen.
+    seen = shared.generation.load(Ordering::Acquire);
+    let sim = shared.sim.load(Ordering::Relaxed) as *mut S;
+    let tasks = shared.tasks.load(Ordering::Relaxed) as *const Task<S>;
+    let len = shared.len.load(Ordering::Relaxed);
+    // SAFETY: `run` keeps the simulator and the tasks alive until `pending` drops to zero,
+    // and its caller vouches that the tasks of a phase can run at the same time.
+    unsafe { claim(shared, sim, std::slice::from_raw_parts(tasks, len)) };
+    shared.pending.fetch_sub(1, Ordering::Release);
+  }
+}
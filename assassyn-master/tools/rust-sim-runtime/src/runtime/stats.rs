@@ -0,0 +1,149 @@
+use std::fmt::Write as _;
+use std::io::{self, Read, Write};
+use std::path::Path;
+
+use super::checkpoint::Checkpoint;
+use super::xeq::{Array, FIFO};
+
+/// How often a module ran, kept by the generated simulator for every module.
+///
+/// A module whose trigger is valid either completes (`triggered`) or returns early because a
+/// `wait_until` condition does not hold (`stalled`), in which case it retries next cycle.
+#[derive(Default, Clone, Copy, Debug, PartialEq, Eq)]
+pub struct ModuleCounters {
+  pub triggered: u64,
+  pub stalled: u64,
+}
+
+impl ModuleCounters {
+  #[inline]
+  pub fn record(&mut self, succ: bool) {
+    if succ {
+      self.triggered += 1;
+    } else {
+      self.stalled += 1;
+    }
+  }
+}
+
+impl Checkpoint for ModuleCounters {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.triggered.save(out)?;
+    self.stalled.save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.triggered.restore(inp)?;
+    self.stalled.restore(inp)
+  }
+}
+
+/// The statistics of a simulation as one JSON document, written when it exits:
+///
+/// ```json
+/// {"cycles": 120, "exit": "idle",
+///  "modules": {"Adder": {"triggered": 100, "stalled": 3}},
+///  "fifos": {"Adder_a": {"capacity": 16, "pushes": 100, "pops": 100, "drops": 0,
+///                        "high_water_mark": 2, "full_cycles": 0, "occupancy": [20, 99, 1]}},
+///  "arrays": {"cnt": {"writes": 100}}}
+/// ```
+///
+/// `occupancy[n]` is the number of cycles a FIFO held `n` entries. `capacity` is `null` for
+/// an unbounded FIFO.
+pub struct StatsReport {
+  now: usize,
+  cycles: usize,
+  exit: String,
+  modules: Vec<String>,
+  fifos: Vec<String>,
+  arrays: Vec<String>,
+}
+
+impl StatsReport {
+  /// A report of a simulation that exits at `stamp`, because of `exit`.
+  pub fn new(stamp: usize, exit: &str) -> Self {
+    StatsReport {
+      now: stamp,
+      cycles: stamp / 100,
+      exit: exit.to_string(),
+      modules: Vec::new(),
+      fifos: Vec::new(),
+      arrays: Vec::new(),
+    }
+  }
+
+  pub fn module(&mut self, name: &str, counters: &ModuleCounters) {
+    self.modules.push(format!(
+      "{}: {{\"triggered\": {}, \"stalled\": {}}}",
+      json_str(name),
+      counters.triggered,
+      counters.stalled
+    ));
+  }
+
+  pub fn fifo<T>(&mut self, name: &str, fifo: &FIFO<T>) {
+    let capacity = match fifo.capacity() {
+      usize::MAX => "null".to_string(),
+      capacity => capacity.to_string(),
+    };
+    let occupancy = fifo
+      .occupancy(self.now)
+      .iter()
+      .map(u64::to_string)
+      .collect::<Vec<_>>()
+      .join(", ");
+    self.fifos.push(format!(
+      "{}: {{\"capacity\": {}, \"pushes\": {}, \"pops\": {}, \"drops\": {}, \
+       \"high_water_mark\": {}, \"full_cycles\": {}, \"occupancy\": [{}]}}",
+      json_str(name),
+      capacity,
+      fifo.pushes(),
+      fifo.pops(),
+      fifo.drops(),
+      fifo.high_water_mark(),
+      fifo.full_cycles(self.now),
+      occupancy
+    ));
+  }
+
+  pub fn array<T: Sized + Default + Clone>(&mut self, name: &str, array: &Array<T>) {
+    self
+      .arrays
+      .push(format!("{}: {{\"writes\": {}}}", json_str(name), array.writes()));
+  }
+
+  pub fn to_json(&self) -> String {
+    let section = |entries: &[String]| match entries.len() {
+      0 => "{}".to_string(),
+      _ => format!("{{\n    {}\n  }}", entries.join(",\n    ")),
+    };
+    format!(
+      "{{\n  \"cycles\": {},\n  \"exit\": {},\n  \"modules\": {},\n  \"fifos\": {},\n  \
+       \"arrays\": {}\n}}\n",
+      self.cycles,
+      json_str(&self.exit),
+      section(&self.modules),
+      section(&self.fifos),
+      section(&self.arrays)
+    )
+  }
+
+  pub fn write(&self, path: impl AsRef<Path>) -> io::Result<()> {
+    std::fs::write(path, self.to_json())
+  }
+}
+
+fn json_str(s: &str) -> String {
+  let mut out = String::with_capacity(s.len() + 2);
+  out.push('"');
+  for c in s.chars() {
+    match c {
+      '"' => out.push_str("\\\""),
+      '\\' => out.push_str("\\\\"),
+      c if (c as u32) < 0x20 => write!(out, "\\u{:04x}", c as u32).unwrap(),
+      c => out.push(c),
+    }
+  }
+  out.push('"');
+  out
+}
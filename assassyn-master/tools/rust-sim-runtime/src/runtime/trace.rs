@@ -0,0 +1,235 @@
+use std::fs::File;
+use std::io::{self, BufWriter, Write};
+use std::path::Path;
+
+use num_bigint::{BigInt, BigUint, Sign};
+
+use super::wide::{IWide, UWide};
+
+/// The first bytes of every binary trace.
+pub const TRACE_MAGIC: &[u8; 8] = b"ASTRACE\0";
+/// The layout version written after the magic, bumped on any incompatible change.
+pub const TRACE_VERSION: u32 = 1;
+
+const BUFFER_SIZE: usize = 1 << 20;
+
+/// A binary trace of `log()` calls, written instead of the formatted text when the simulator
+/// runs with `--log-trace=<path>`.
+///
+/// The file starts with `TRACE_MAGIC`, `TRACE_VERSION` and the code generator's JSON table of
+/// log formats (a little-endian `u32` length, then the text). Each log is then one record: the
+/// stamp delta from the previous record and the format ID as LEB128 varints, followed by each
+/// argument as little-endian two's complement bytes, as many as the format table gives it.
+pub struct Tracer {
+  out: BufWriter<File>,
+  last_stamp: usize,
+}
+
+impl Tracer {
+  /// Create the trace at `path`, with `formats` as its format table.
+  pub fn create(path: impl AsRef<Path>, formats: &str) -> io::Result<Self> {
+    let mut out = BufWriter::with_capacity(BUFFER_SIZE, File::create(path)?);
+    out.write_all(TRACE_MAGIC)?;
+    out.write_all(&TRACE_VERSION.to_le_bytes())?;
+    out.write_all(&(formats.len() as u32).to_le_bytes())?;
+    out.write_all(formats.as_bytes())?;
+    Ok(Tracer { out, last_stamp: 0 })
+  }
+
+  /// Start the record of a log with format `format` at `stamp`. Stamps never decrease.
+  #[inline]
+  pub fn record(&mut self, stamp: usize, format: u32) {
+    self.advance(stamp);
+    write_varint(&mut self.out, format as u64);
+  }
+
+  /// Append an argument of the current record, truncated or extended to `bytes` bytes.
+  #[inline]
+  pub fn arg<T: TraceArg>(&mut self, value: &T, bytes: usize) {
+    value
+      .write_trace(bytes, &mut self.out)
+      .expect("failed to write the simulator trace");
+  }
+
+  /// Append the records of `lane`, in the order they were made, and empty it.
+  pub fn absorb(&mut self, lane: &mut TraceLane) {
+    for (i, &(stamp, start)) in lane.records.iter().enumerate() {
+      let end = lane.records.get(i + 1).map_or(lane.bytes.len(), |x| x.1);
+      self.advance(stamp);
+      self
+        .out
+        .write_all(&lane.bytes[start..end])
+        .expect("failed to write the simulator trace");
+    }
+    lane.records.clear();
+    lane.bytes.clear();
+  }
+
+  pub fn flush(&mut self) {
+    self
+      .out
+      .flush()
+      .expect("failed to flush the simulator trace");
+  }
+
+  // Write the stamp delta that starts a record.
+  fn advance(&mut self, stamp: usize) {
+    debug_assert!(stamp >= self.last_stamp, "trace stamps must not decrease");
+    let delta = stamp - self.last_stamp;
+    self.last_stamp = stamp;
+    write_varint(&mut self.out, delta as u64);
+  }
+}
+
+/// The records of one module's logs in a cycle evaluated in parallel, kept in memory until
+/// `Tracer::absorb` appends them to the trace in the modules' serial order.
+///
+/// A record's stamp delta depends on the record before it in the trace, so a lane keeps each
+/// record's stamp aside and holds only its format ID and arguments.
+#[derive(Default)]
+pub struct TraceLane {
+  bytes: Vec<u8>,
+  // The stamp of each record, and where it starts in `bytes`
+  records: Vec<(usize, usize)>,
+}
+
+impl TraceLane {
+  /// Start the record of a log with format `format` at `stamp`, as `Tracer::record` does.
+  #[inline]
+  pub fn record(&mut self, stamp: usize, format: u32) {
+    self.records.push((stamp, self.bytes.len()));
+    write_varint(&mut self.bytes, format as u64);
+  }
+
+  /// Append an argument of the current record, as `Tracer::arg` does.
+  #[inline]
+  pub fn arg<T: TraceArg>(&mut self, value: &T, bytes: usize) {
+    value
+      .write_trace(bytes, &mut self.bytes)
+      .expect("failed to write the simulator trace");
+  }
+
+  pub fn is_empty(&self) -> bool {
+    self.records.is_empty()
+  }
+}
+
+fn write_varint<W: Write>(out: &mut W, mut x: u64) {
+  let mut buf = [0u8; 10];
+  let mut n = 0;
+  while x >= 0x80 {
+    buf[n] = (x as u8) | 0x80;
+    x >>= 7;
+    n += 1;
+  }
+  buf[n] = x as u8;
+  out
+    .write_all(&buf[..=n])
+    .expect("failed to write the simulator trace");
+}
+
+/// A value that a `log()` argument can be traced as.
+pub trait TraceArg {
+  /// Write exactly `bytes` little-endian bytes of `self`, zero- or sign-extended as its type is.
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()>;
+}
+
+// Write the little-endian `words`, then `fill` bytes, `bytes` bytes in total.
+fn write_words<W: Write>(
+  words: impl Iterator<Item = u64>,
+  fill: u8,
+  bytes: usize,
+  out: &mut W,
+) -> io::Result<()> {
+  let mut left = bytes;
+  for word in words {
+    if left == 0 {
+      return Ok(());
+    }
+    let n = left.min(8);
+    out.write_all(&word.to_le_bytes()[..n])?;
+    left -= n;
+  }
+  for _ in 0..left {
+    out.write_all(&[fill])?;
+  }
+  Ok(())
+}
+
+macro_rules! impl_trace_prim {
+  ($signed:expr => $($ty:ty),*) => {
+    $(
+      impl TraceArg for $ty {
+        #[inline]
+        fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+          let le = self.to_le_bytes();
+          let n = bytes.min(le.len());
+          out.write_all(&le[..n])?;
+          // A signed value is negative when its top bit is set.
+          let fill = if $signed && self.leading_zeros() == 0 { 0xff } else { 0 };
+          for _ in n..bytes {
+            out.write_all(&[fill])?;
+          }
+          Ok(())
+        }
+      }
+    )*
+  };
+}
+
+impl_trace_prim!(false => u8, u16, u32, u64, u128, usize);
+impl_trace_prim!(true => i8, i16, i32, i64, i128, isize);
+
+impl TraceArg for bool {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    (*self as u8).write_trace(bytes, out)
+  }
+}
+
+impl TraceArg for f32 {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    self.to_bits().write_trace(bytes, out)
+  }
+}
+
+impl TraceArg for f64 {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    self.to_bits().write_trace(bytes, out)
+  }
+}
+
+impl<const N: usize> TraceArg for UWide<N> {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    write_words(self.0.iter().copied(), 0, bytes, out)
+  }
+}
+
+impl<const N: usize> TraceArg for IWide<N> {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    let fill = if self.is_negative() { 0xff } else { 0 };
+    write_words(self.0.iter().copied(), fill, bytes, out)
+  }
+}
+
+impl TraceArg for BigUint {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    write_words(self.iter_u64_digits(), 0, bytes, out)
+  }
+}
+
+impl TraceArg for BigInt {
+  fn write_trace<W: Write>(&self, bytes: usize, out: &mut W) -> io::Result<()> {
+    let digits = self.magnitude().iter_u64_digits();
+    if self.sign() != Sign::Minus {
+      return write_words(digits, 0, bytes, out);
+    }
+    // Two's complement of the magnitude: invert, then add one.
+    let mut carry = true;
+    let negated = digits.map(|w| {
+      let (v, c) = (!w).overflowing_add(carry as u64);
+      carry = c;
+      v
+    });
+    write_words(negated, 0xff, bytes, out)
+  }
+}
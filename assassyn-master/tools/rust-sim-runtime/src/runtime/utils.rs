@@ -1,5 +1,10 @@
 use num_traits::Num;
+use rand::rngs::StdRng;
+use rand::SeedableRng;
 use std::fs::read_to_string;
+use std::str::FromStr;
+
+use super::batch::with_instance_args;
 
 pub fn cyclize(stamp: usize) -> String {
   format!("Cycle @{}.{:02}", stamp / 100, stamp % 100)
@@ -29,3 +34,94 @@ pub fn load_hex_file<T: Num>(array: &mut [T], init_file: &str) {
     idx += 1;
   }
 }
+
+/// Look up a runtime option, given either as `--<flag>=<value>` / `--<flag> <value>` on the
+/// simulator's command line or as the environment variable `var`. The command line wins. In a
+/// batch instance, the options of the instance win over both (see `Batch`). A session of a
+/// simulator library takes its own options and the environment, not the command line of the
+/// process that loaded it.
+pub fn runtime_option(flag: &str, var: &str) -> Option<String> {
+  let prefix = format!("--{}", flag);
+  with_instance_args(|args, process| {
+    option_values(args.iter().cloned(), &prefix)
+      .next()
+      .or_else(|| process_args(process).find_map(|args| option_values(args, &prefix).next()))
+  })
+  .or_else(|| std::env::var(var).ok())
+}
+
+/// Like `runtime_option`, for an option that can be given many times: every value of `--<flag>`
+/// given to the instance, or else on the command line, or else the comma-separated values
+/// of the environment variable `var`.
+pub fn runtime_options(flag: &str, var: &str) -> Vec<String> {
+  let prefix = format!("--{}", flag);
+  let mut values: Vec<String> = with_instance_args(|args, process| {
+    let values: Vec<String> = option_values(args.iter().cloned(), &prefix).collect();
+    match process_args(process).next() {
+      Some(args) if values.is_empty() => option_values(args, &prefix).collect(),
+      _ => values,
+    }
+  });
+  if values.is_empty() {
+    if let Ok(env) = std::env::var(var) {
+      values = env
+        .split(',')
+        .map(str::trim)
+        .filter(|x| !x.is_empty())
+        .map(String::from)
+        .collect();
+    }
+  }
+  values
+}
+
+// The command line of the process, if its options apply.
+fn process_args(process: bool) -> impl Iterator<Item = impl Iterator<Item = String>> {
+  process.then(|| std::env::args().skip(1)).into_iter()
+}
+
+// The values of `<prefix>=<value>` and `<prefix> <value>` in `args`, in order.
+fn option_values<'a>(
+  mut args: impl Iterator<Item = String> + 'a,
+  prefix: &'a str,
+) -> impl Iterator<Item = String> + 'a {
+  std::iter::from_fn(move || {
+    while let Some(arg) = args.next() {
+      if arg == prefix {
+        return args.next();
+      }
+      if let Some(value) = arg.strip_prefix(prefix).and_then(|x| x.strip_prefix('=')) {
+        return Some(value.to_string());
+      }
+    }
+    None
+  })
+}
+
+/// A runtime parameter parsed from `runtime_option(flag, var)`, or `default`, the value it was
+/// elaborated with, if it is not given. Panics on a value that does not parse.
+pub fn runtime_param<T: FromStr>(flag: &str, var: &str, default: T) -> T {
+  match runtime_option(flag, var) {
+    Some(value) => value
+      .trim()
+      .parse()
+      .unwrap_or_else(|_| panic!("Invalid value {:?} for --{}", value, flag)),
+    None => default,
+  }
+}
+
+/// The seed of the module order under the `random` config: `--seed` / `ASSASSYN_SEED`, or else
+/// `seed`, or else a random one. A schedule that exposed a bug is replayed with its seed.
+pub fn runtime_seed(seed: Option<u64>) -> u64 {
+  runtime_param("seed", "ASSASSYN_SEED", seed.unwrap_or_else(rand::random))
+}
+
+/// The random number generator that shuffles the module order of `cycle` under the `random`
+/// config. Drawn from the seed and the cycle alone, the order of a cycle needs no state from
+/// the cycles before it, so a checkpoint only saves the seed and skipped cycles draw nothing.
+pub fn cycle_rng(seed: u64, cycle: usize) -> StdRng {
+  let mut key = [0u8; 32];
+  key[..8].copy_from_slice(&seed.to_le_bytes());
+  key[8..16].copy_from_slice(&(cycle as u64).to_le_bytes());
+  StdRng::from_seed(key)
+}
@@ -0,0 +1,526 @@
+use std::cmp::Ordering;
+use std::fmt;
+use std::ops::{Add, BitAnd, BitOr, BitXor, Div, Mul, Neg, Not, Rem, Shl, Shr, Sub};
+
+use num_traits::{Num, One, Zero};
+
+/// Unsigned fixed-width integer of `64 * N` bits, stored little-endian in `u64` words.
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash)]
+pub struct UWide<const N: usize>(pub [u64; N]);
+
+/// Two's complement signed fixed-width integer of `64 * N` bits.
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash)]
+pub struct IWide<const N: usize>(pub [u64; N]);
+
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct ParseWideError;
+
+impl fmt::Display for ParseWideError {
+  fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+    write!(f, "invalid digit found in wide integer literal")
+  }
+}
+
+impl std::error::Error for ParseWideError {}
+
+fn words_add<const N: usize>(a: &[u64; N], b: &[u64; N]) -> [u64; N] {
+  let mut res = [0u64; N];
+  let mut carry = false;
+  for i in 0..N {
+    let (s, c1) = a[i].overflowing_add(b[i]);
+    let (s, c2) = s.overflowing_add(carry as u64);
+    res[i] = s;
+    carry = c1 || c2;
+  }
+  res
+}
+
+fn words_sub<const N: usize>(a: &[u64; N], b: &[u64; N]) -> [u64; N] {
+  let mut res = [0u64; N];
+  let mut borrow = false;
+  for i in 0..N {
+    let (d, b1) = a[i].overflowing_sub(b[i]);
+    let (d, b2) = d.overflowing_sub(borrow as u64);
+    res[i] = d;
+    borrow = b1 || b2;
+  }
+  res
+}
+
+fn words_mul<const N: usize>(a: &[u64; N], b: &[u64; N]) -> [u64; N] {
+  let mut res = [0u64; N];
+  for i in 0..N {
+    if a[i] == 0 {
+      continue;
+    }
+    let mut carry = 0u128;
+    for j in 0..(N - i) {
+      let cur = res[i + j] as u128 + (a[i] as u128) * (b[j] as u128) + carry;
+      res[i + j] = cur as u64;
+      carry = cur >> 64;
+    }
+  }
+  res
+}
+
+fn words_cmp<const N: usize>(a: &[u64; N], b: &[u64; N]) -> Ordering {
+  for i in (0..N).rev() {
+    match a[i].cmp(&b[i]) {
+      Ordering::Equal => continue,
+      ord => return ord,
+    }
+  }
+  Ordering::Equal
+}
+
+fn words_is_zero<const N: usize>(a: &[u64; N]) -> bool {
+  a.iter().all(|w| *w == 0)
+}
+
+fn words_neg<const N: usize>(a: &[u64; N]) -> [u64; N] {
+  let mut inv = [0u64; N];
+  for i in 0..N {
+    inv[i] = !a[i];
+  }
+  let mut one = [0u64; N];
+  one[0] = 1;
+  words_add(&inv, &one)
+}
+
+fn words_shl<const N: usize>(a: &[u64; N], amount: usize) -> [u64; N] {
+  let mut res = [0u64; N];
+  if amount >= 64 * N {
+    return res;
+  }
+  let (word, bit) = (amount / 64, amount % 64);
+  for i in (word..N).rev() {
+    res[i] = a[i - word] << bit;
+    if bit != 0 && i > word {
+      res[i] |= a[i - word - 1] >> (64 - bit);
+    }
+  }
+  res
+}
+
+/// Shift right, filling the vacated high bits with `fill` (all zeros or all ones).
+fn words_shr<const N: usize>(a: &[u64; N], amount: usize, fill: u64) -> [u64; N] {
+  let mut res = [fill; N];
+  if amount >= 64 * N {
+    return res;
+  }
+  let (word, bit) = (amount / 64, amount % 64);
+  for i in 0..(N - word) {
+    let hi = if i + word + 1 < N {
+      a[i + word + 1]
+    } else {
+      fill
+    };
+    res[i] = a[i + word] >> bit;
+    if bit != 0 {
+      res[i] |= hi << (64 - bit);
+    }
+  }
+  res
+}
+
+/// Unsigned long division; panics on a zero divisor like the primitive integers do.
+fn words_divrem<const N: usize>(a: &[u64; N], b: &[u64; N]) -> ([u64; N], [u64; N]) {
+  if words_is_zero(b) {
+    panic!("attempt to divide by zero");
+  }
+  let mut quot = [0u64; N];
+  let mut rem = [0u64; N];
+  for i in (0..64 * N).rev() {
+    rem = words_shl(&rem, 1);
+    rem[0] |= (a[i / 64] >> (i % 64)) & 1;
+    if words_cmp(&rem, b) != Ordering::Less {
+      rem = words_sub(&rem, b);
+      quot[i / 64] |= 1 << (i % 64);
+    }
+  }
+  (quot, rem)
+}
+
+/// Divide in place by a single word, returning the remainder.
+fn words_divrem_small<const N: usize>(a: &mut [u64; N], divisor: u64) -> u64 {
+  let mut rem = 0u128;
+  for i in (0..N).rev() {
+    let cur = (rem << 64) | a[i] as u128;
+    a[i] = (cur / divisor as u128) as u64;
+    rem = cur % divisor as u128;
+  }
+  rem as u64
+}
+
+/// Multiply in place by a single word and add `addend`, wrapping at the type width.
+fn words_muladd_small<const N: usize>(a: &mut [u64; N], factor: u64, addend: u64) {
+  let mut carry = addend as u128;
+  for w in a.iter_mut() {
+    let cur = (*w as u128) * (factor as u128) + carry;
+    *w = cur as u64;
+    carry = cur >> 64;
+  }
+}
+
+/// Shift amounts are taken from the low word; anything that does not fit saturates.
+fn words_shift_amount<const N: usize>(a: &[u64; N]) -> usize {
+  if a[1..].iter().any(|w| *w != 0) {
+    usize::MAX
+  } else {
+    usize::try_from(a[0]).unwrap_or(usize::MAX)
+  }
+}
+
+fn words_parse<const N: usize>(src: &str, radix: u32) -> Result<[u64; N], ParseWideError> {
+  let src = src.strip_prefix('+').unwrap_or(src);
+  if src.is_empty() {
+    return Err(ParseWideError);
+  }
+  let mut res = [0u64; N];
+  for c in src.chars() {
+    if c == '_' {
+      continue;
+    }
+    let digit = c.to_digit(radix).ok_or(ParseWideError)?;
+    words_muladd_small(&mut res, radix as u64, digit as u64);
+  }
+  Ok(res)
+}
+
+fn words_fmt_decimal<const N: usize>(
+  mut a: [u64; N],
+  negative: bool,
+  f: &mut fmt::Formatter<'_>,
+) -> fmt::Result {
+  const CHUNK: u64 = 10_000_000_000_000_000_000;
+  let mut chunks = Vec::new();
+  loop {
+    let rem = words_divrem_small(&mut a, CHUNK);
+    chunks.push(rem);
+    if words_is_zero(&a) {
+      break;
+    }
+  }
+  let mut digits = chunks.pop().unwrap().to_string();
+  for chunk in chunks.iter().rev() {
+    digits.push_str(&format!("{:019}", chunk));
+  }
+  f.pad_integral(!negative, "", &digits)
+}
+
+fn words_fmt_radix<const N: usize>(
+  a: &[u64; N],
+  bits_per_digit: u32,
+  upper: bool,
+  prefix: &str,
+  f: &mut fmt::Formatter<'_>,
+) -> fmt::Result {
+  let top = a.iter().rposition(|w| *w != 0);
+  let digits = match top {
+    None => "0".to_string(),
+    Some(top) => {
+      let width = (64 / bits_per_digit) as usize;
+      let mut digits = match (bits_per_digit, upper) {
+        (4, false) => format!("{:x}", a[top]),
+        (4, true) => format!("{:X}", a[top]),
+        _ => format!("{:b}", a[top]),
+      };
+      for w in a[..top].iter().rev() {
+        match (bits_per_digit, upper) {
+          (4, false) => digits.push_str(&format!("{:0width$x}", w, width = width)),
+          (4, true) => digits.push_str(&format!("{:0width$X}", w, width = width)),
+          _ => digits.push_str(&format!("{:0width$b}", w, width = width)),
+        }
+      }
+      digits
+    }
+  };
+  f.pad_integral(true, prefix, &digits)
+}
+
+macro_rules! impl_wide_common {
+  ($ty:ident) => {
+    impl<const N: usize> $ty<N> {
+      pub const BITS: usize = 64 * N;
+
+      pub const fn from_words(words: [u64; N]) -> Self {
+        $ty(words)
+      }
+
+      pub fn count_ones(&self) -> u32 {
+        self.0.iter().map(|w| w.count_ones()).sum()
+      }
+
+      pub(crate) fn low_u128(&self) -> u128 {
+        let hi = if N > 1 { self.0[1] } else { 0 };
+        ((hi as u128) << 64) | self.0[0] as u128
+      }
+    }
+
+    impl<const N: usize> Default for $ty<N> {
+      fn default() -> Self {
+        $ty([0u64; N])
+      }
+    }
+
+    impl<const N: usize> Add for $ty<N> {
+      type Output = Self;
+      fn add(self, rhs: Self) -> Self {
+        $ty(words_add(&self.0, &rhs.0))
+      }
+    }
+
+    impl<const N: usize> Sub for $ty<N> {
+      type Output = Self;
+      fn sub(self, rhs: Self) -> Self {
+        $ty(words_sub(&self.0, &rhs.0))
+      }
+    }
+
+    impl<const N: usize> Mul for $ty<N> {
+      type Output = Self;
+      fn mul(self, rhs: Self) -> Self {
+        $ty(words_mul(&self.0, &rhs.0))
+      }
+    }
+
+    impl<const N: usize> BitAnd for $ty<N> {
+      type Output = Self;
+      fn bitand(mut self, rhs: Self) -> Self {
+        self
+          .0
+          .iter_mut()
+          .zip(rhs.0.iter())
+          .for_each(|(a, b)| *a &= b);
+        self
+      }
+    }
+
+    impl<const N: usize> BitOr for $ty<N> {
+      type Output = Self;
+      fn bitor(mut self, rhs: Self) -> Self {
+        self
+          .0
+          .iter_mut()
+          .zip(rhs.0.iter())
+          .for_each(|(a, b)| *a |= b);
+        self
+      }
+    }
+
+    impl<const N: usize> BitXor for $ty<N> {
+      type Output = Self;
+      fn bitxor(mut self, rhs: Self) -> Self {
+        self
+          .0
+          .iter_mut()
+          .zip(rhs.0.iter())
+          .for_each(|(a, b)| *a ^= b);
+        self
+      }
+    }
+
+    impl<const N: usize> Not for $ty<N> {
+      type Output = Self;
+      fn not(mut self) -> Self {
+        self.0.iter_mut().for_each(|a| *a = !*a);
+        self
+      }
+    }
+
+    impl<const N: usize> Shl<usize> for $ty<N> {
+      type Output = Self;
+      fn shl(self, rhs: usize) -> Self {
+        $ty(words_shl(&self.0, rhs))
+      }
+    }
+
+    impl<const N: usize> Shl for $ty<N> {
+      type Output = Self;
+      fn shl(self, rhs: Self) -> Self {
+        self << words_shift_amount(&rhs.0)
+      }
+    }
+
+    impl<const N: usize> Shr for $ty<N> {
+      type Output = Self;
+      fn shr(self, rhs: Self) -> Self {
+        self >> words_shift_amount(&rhs.0)
+      }
+    }
+
+    impl<const N: usize> PartialOrd for $ty<N> {
+      fn partial_cmp(&self, other: &Self) -> Option<Ordering> {
+        Some(self.cmp(other))
+      }
+    }
+
+    impl<const N: usize> Zero for $ty<N> {
+      fn zero() -> Self {
+        Self::default()
+      }
+      fn is_zero(&self) -> bool {
+        words_is_zero(&self.0)
+      }
+    }
+
+    impl<const N: usize> One for $ty<N> {
+      fn one() -> Self {
+        let mut words = [0u64; N];
+        words[0] = 1;
+        $ty(words)
+      }
+    }
+
+    impl<const N: usize> fmt::LowerHex for $ty<N> {
+      fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        words_fmt_radix(&self.0, 4, false, "0x", f)
+      }
+    }
+
+    impl<const N: usize> fmt::UpperHex for $ty<N> {
+      fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        words_fmt_radix(&self.0, 4, true, "0x", f)
+      }
+    }
+
+    impl<const N: usize> fmt::Binary for $ty<N> {
+      fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        words_fmt_radix(&self.0, 1, false, "0b", f)
+      }
+    }
+  };
+}
+
+impl_wide_common!(UWide);
+impl_wide_common!(IWide);
+
+impl<const N: usize> Div for UWide<N> {
+  type Output = Self;
+  fn div(self, rhs: Self) -> Self {
+    UWide(words_divrem(&self.0, &rhs.0).0)
+  }
+}
+
+impl<const N: usize> Rem for UWide<N> {
+  type Output = Self;
+  fn rem(self, rhs: Self) -> Self {
+    UWide(words_divrem(&self.0, &rhs.0).1)
+  }
+}
+
+impl<const N: usize> Shr<usize> for UWide<N> {
+  type Output = Self;
+  fn shr(self, rhs: usize) -> Self {
+    UWide(words_shr(&self.0, rhs, 0))
+  }
+}
+
+impl<const N: usize> Ord for UWide<N> {
+  fn cmp(&self, other: &Self) -> Ordering {
+    words_cmp(&self.0, &other.0)
+  }
+}
+
+impl<const N: usize> Num for UWide<N> {
+  type FromStrRadixErr = ParseWideError;
+  fn from_str_radix(src: &str, radix: u32) -> Result<Self, ParseWideError> {
+    words_parse(src, radix).map(UWide)
+  }
+}
+
+impl<const N: usize> fmt::Display for UWide<N> {
+  fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+    words_fmt_decimal(self.0, false, f)
+  }
+}
+
+impl<const N: usize> IWide<N> {
+  pub fn is_negative(&self) -> bool {
+    (self.0[N - 1] as i64) < 0
+  }
+
+  /// The all-ones or all-zeros word this value sign-extends with.
+  pub(crate) fn sign_word(&self) -> u64 {
+    if self.is_negative() {
+      u64::MAX
+    } else {
+      0
+    }
+  }
+
+  fn magnitude(&self) -> [u64; N] {
+    if self.is_negative() {
+      words_neg(&self.0)
+    } else {
+      self.0
+    }
+  }
+
+  fn from_magnitude(magnitude: [u64; N], negative: bool) -> Self {
+    if negative {
+      IWide(words_neg(&magnitude))
+    } else {
+      IWide(magnitude)
+    }
+  }
+}
+
+impl<const N: usize> Neg for IWide<N> {
+  type Output = Self;
+  fn neg(self) -> Self {
+    IWide(words_neg(&self.0))
+  }
+}
+
+/// Truncating division, matching the primitive signed integers.
+impl<const N: usize> Div for IWide<N> {
+  type Output = Self;
+  fn div(self, rhs: Self) -> Self {
+    let (quot, _) = words_divrem(&self.magnitude(), &rhs.magnitude());
+    IWide::from_magnitude(quot, self.is_negative() != rhs.is_negative())
+  }
+}
+
+/// The remainder takes the sign of the dividend, matching the primitive signed integers.
+impl<const N: usize> Rem for IWide<N> {
+  type Output = Self;
+  fn rem(self, rhs: Self) -> Self {
+    let (_, rem) = words_divrem(&self.magnitude(), &rhs.magnitude());
+    IWide::from_magnitude(rem, self.is_negative())
+  }
+}
+
+/// Arithmetic shift right.
+impl<const N: usize> Shr<usize> for IWide<N> {
+  type Output = Self;
+  fn shr(self, rhs: usize) -> Self {
+    IWide(words_shr(&self.0, rhs, self.sign_word()))
+  }
+}
+
+impl<const N: usize> Ord for IWide<N> {
+  fn cmp(&self, other: &Self) -> Ordering {
+    match (self.is_negative(), other.is_negative()) {
+      (true, false) => Ordering::Less,
+      (false, true) => Ordering::Greater,
+      _ => words_cmp(&self.0, &other.0),
+    }
+  }
+}
+
+impl<const N: usize> Num for IWide<N> {
+  type FromStrRadixErr = ParseWideError;
+  fn from_str_radix(src: &str, radix: u32) -> Result<Self, ParseWideError> {
+    match src.strip_prefix('-') {
+      Some(rest) => words_parse(rest, radix).map(|m| IWide::from_magnitude(m, true)),
+      None => words_parse(src, radix).map(IWide),
+    }
+  }
+}
+
+impl<const N: usize> fmt::Display for IWide<N> {
+  fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+    words_fmt_decimal(self.magnitude(), self.is_negative(), f)
+  }
+}
@@ -1,4 +1,7 @@
-use std::collections::{BTreeMap, VecDeque};
+use std::collections::VecDeque;
+use std::io::{self, Read, Write};
+
+use super::checkpoint::{invalid, restore_pusher, save_pusher, Checkpoint};
 
 pub trait Cycled {
   fn cycle(&self) -> usize;
@@ -36,6 +39,10 @@ pub struct Array<T: Sized + Default + Clone> {
   pub payload: Vec<T>,
   // Vec-based ports for optimal performance with compile-time port indices
   write_ports: Vec<XEQ<ArrayWrite<T>>>,
+  // Set by `write`, cleared once `tick` has committed every pending write
+  dirty: bool,
+  // The number of writes scheduled, for the simulator's statistics
+  writes: u64,
 }
 
 impl<T: Sized + Default + Clone> Array<T> {
@@ -43,6 +50,8 @@ impl<T: Sized + Default + Clone> Array<T> {
     Array {
       payload: vec![T::default(); n],
       write_ports: vec![],
+      dirty: false,
+      writes: 0,
     }
   }
 
@@ -50,6 +59,8 @@ impl<T: Sized + Default + Clone> Array<T> {
     Array {
       payload,
       write_ports: vec![],
+      dirty: false,
+      writes: 0,
     }
   }
 
@@ -57,6 +68,8 @@ impl<T: Sized + Default + Clone> Array<T> {
     Array {
       payload: vec![T::default(); n],
       write_ports: (0..num_ports).map(|_| XEQ::new()).collect(),
+      dirty: false,
+      writes: 0,
     }
   }
 
@@ -64,44 +77,116 @@ impl<T: Sized + Default + Clone> Array<T> {
     Array {
       payload,
       write_ports: (0..num_ports).map(|_| XEQ::new()).collect(),
+      dirty: false,
+      writes: 0,
     }
   }
 
   // Write with port_id - direct Vec indexing for optimal performance
   pub fn write(&mut self, port_id: usize, write: ArrayWrite<T>) {
-    // Grow vec if needed (for backwards compatibility with on-demand creation)
-    while port_id >= self.write_ports.len() {
-      self.write_ports.push(XEQ::new());
+    ArrayPorts {
+      write_ports: &mut self.write_ports,
+      dirty: &mut self.dirty,
+      writes: &mut self.writes,
     }
-    self.write_ports[port_id].push(write);
+    .write(port_id, write);
   }
 
-  pub fn tick(&mut self, cycle: usize) {
-    // Collect all writes from all ports
-    let mut pending_writes = Vec::new();
+  pub fn is_dirty(&self) -> bool {
+    self.dirty
+  }
+
+  // The number of writes scheduled so far
+  pub fn writes(&self) -> u64 {
+    self.writes
+  }
 
+  pub fn tick(&mut self, cycle: usize) {
+    if !self.dirty {
+      return;
+    }
+    // Apply writes in place in port order - the last write wins for conflicts
+    let mut pending = false;
     for port in self.write_ports.iter_mut() {
       while let Some(write) = port.pop(cycle) {
-        pending_writes.push(write);
+        if write.addr < self.payload.len() {
+          self.payload[write.addr] = write.data;
+        }
       }
+      pending |= !port.is_empty();
     }
+    self.dirty = pending;
+  }
+}
+
+// FIFO structures
+/// A module's access to an array within a phase of a parallel simulator.
+///
+/// A module of a phase may read an array that another one writes, since a write only goes to
+/// the write ports until `tick`. So a view borrows the payload, shared, and the write ports
+/// only if the module writes the array: no two views of a phase overlap mutably.
+pub struct ArrayView<'a, T: Sized + Default + Clone> {
+  pub payload: &'a Vec<T>,
+  ports: Option<ArrayPorts<'a, T>>,
+}
 
-    // Apply writes - last write wins for conflicts
-    let mut write_map: BTreeMap<usize, T> = BTreeMap::new();
+// The parts of an array a write changes
+struct ArrayPorts<'a, T: Sized + Default + Clone> {
+  write_ports: &'a mut Vec<XEQ<ArrayWrite<T>>>,
+  dirty: &'a mut bool,
+  writes: &'a mut u64,
+}
 
-    for write in pending_writes {
-      write_map.insert(write.addr, write.data);
+impl<T: Sized + Default + Clone> ArrayPorts<'_, T> {
+  fn write(&mut self, port_id: usize, write: ArrayWrite<T>) {
+    // Grow vec if needed (for backwards compatibility with on-demand creation)
+    while port_id >= self.write_ports.len() {
+      self.write_ports.push(XEQ::new());
     }
+    self.write_ports[port_id].push(write);
+    *self.dirty = true;
+    *self.writes += 1;
+  }
+}
 
-    for (addr, data) in write_map {
-      if addr < self.payload.len() {
-        self.payload[addr] = data;
-      }
+impl<'a, T: Sized + Default + Clone> ArrayView<'a, T> {
+  /// A view reading `array`.
+  ///
+  /// # Safety
+  ///
+  /// `array` stays valid for `'a`, and nothing writes its payload in the meantime.
+  pub unsafe fn reader(array: *const Array<T>) -> Self {
+    ArrayView {
+      payload: &(*array).payload,
+      ports: None,
+    }
+  }
+
+  /// A view reading and writing `array`.
+  ///
+  /// # Safety
+  ///
+  /// As for `reader`, and no other view writes `array` in the meantime.
+  pub unsafe fn writer(array: *mut Array<T>) -> Self {
+    ArrayView {
+      payload: &(*array).payload,
+      ports: Some(ArrayPorts {
+        write_ports: &mut (*array).write_ports,
+        dirty: &mut (*array).dirty,
+        writes: &mut (*array).writes,
+      }),
+    }
+  }
+
+  /// `Array::write`, through a view made by `writer`.
+  pub fn write(&mut self, port_id: usize, write: ArrayWrite<T>) {
+    match self.ports.as_mut() {
+      Some(ports) => ports.write(port_id, write),
+      None => panic!("An array is written through a view that only reads it"),
     }
   }
 }
 
-// FIFO structures remain unchanged
 pub struct FIFOPush<T: Sized> {
   cycle: usize,
   data: T,
@@ -147,10 +232,27 @@ impl Cycled for FIFOPop {
   }
 }
 
+// A bounded FIFO modelled after `fifo.sv`: the payload is a ring buffer allocated once
+// with `capacity` slots, and a push is only accepted when there is room or the front
+// entry is popped in the same cycle.
 pub struct FIFO<T: Sized> {
   pub payload: VecDeque<T>,
   pub push: XEQ<FIFOPush<T>>,
   pub pop: XEQ<FIFOPop>,
+  // Set by `schedule_push`/`schedule_pop`, cleared once `tick` has nothing left to commit
+  dirty: bool,
+  capacity: usize,
+  // Occupancy statistics for sizing queues from simulation data
+  high_water_mark: usize,
+  full_cycles: usize,
+  full_since: Option<usize>,
+  pushes: u64,
+  pops: u64,
+  // Pushes dropped by a full FIFO
+  drops: u64,
+  // Cycles spent at each occupancy, up to the stamp the occupancy last changed at
+  occupancy: Vec<u64>,
+  occupancy_since: usize,
 }
 
 impl<T: Sized> Default for FIFO<T> {
@@ -160,11 +262,33 @@ impl<T: Sized> Default for FIFO<T> {
 }
 
 impl<T: Sized> FIFO<T> {
+  // An unbounded FIFO, kept for designs elaborated without a FIFO depth
   pub fn new() -> Self {
+    Self::with_payload(VecDeque::new(), usize::MAX)
+  }
+
+  // A FIFO holding at most `capacity` entries, allocated up front
+  pub fn with_capacity(capacity: usize) -> Self {
+    assert!(capacity > 0, "FIFO capacity must be positive");
+    Self::with_payload(VecDeque::with_capacity(capacity), capacity)
+  }
+
+  fn with_payload(payload: VecDeque<T>, capacity: usize) -> Self {
     FIFO {
-      payload: VecDeque::new(),
+      payload,
       push: XEQ::new(),
       pop: XEQ::new(),
+      dirty: false,
+      capacity,
+      high_water_mark: 0,
+      full_cycles: 0,
+      full_since: None,
+      pushes: 0,
+      pops: 0,
+      drops: 0,
+      occupancy: Vec::new(),
+      // The tick before the first cycle, when every FIFO is empty
+      occupancy_since: HALF_CYCLE,
     }
   }
 
@@ -172,23 +296,131 @@ impl<T: Sized> FIFO<T> {
     self.payload.is_empty()
   }
 
+  pub fn is_full(&self) -> bool {
+    self.payload.len() >= self.capacity
+  }
+
+  pub fn capacity(&self) -> usize {
+    self.capacity
+  }
+
+  pub fn len(&self) -> usize {
+    self.payload.len()
+  }
+
   pub fn front(&self) -> Option<&T> {
     self.payload.front()
   }
 
-  pub fn tick(&mut self, cycle: usize) {
+  // Mirrors `push_ready` in `fifo.sv`: not full, or the front entry is popped this cycle
+  pub fn push_ready(&self) -> bool {
+    !self.is_full() || (!self.pop.is_empty() && !self.payload.is_empty())
+  }
+
+  pub fn schedule_push(&mut self, event: FIFOPush<T>) {
+    self.push.push(event);
+    self.dirty = true;
+  }
+
+  pub fn schedule_pop(&mut self, event: FIFOPop) {
+    self.pop.push(event);
+    self.dirty = true;
+  }
+
+  pub fn is_dirty(&self) -> bool {
+    self.dirty
+  }
+
+  // The largest occupancy observed so far
+  pub fn high_water_mark(&self) -> usize {
+    self.high_water_mark
+  }
+
+  // The number of cycles the FIFO has spent full, up to the stamp `now`
+  pub fn full_cycles(&self, now: usize) -> usize {
+    match self.full_since {
+      Some(since) => self.full_cycles + (now - since) / 100,
+      None => self.full_cycles,
+    }
+  }
+
+  // The number of entries pushed and popped so far
+  pub fn pushes(&self) -> u64 {
+    self.pushes
+  }
+
+  pub fn pops(&self) -> u64 {
+    self.pops
+  }
+
+  // The number of pushes dropped because the FIFO was full
+  pub fn drops(&self) -> u64 {
+    self.drops
+  }
+
+  // The number of cycles spent at each occupancy (the index), up to the stamp `now`
+  pub fn occupancy(&self, now: usize) -> Vec<u64> {
+    let mut occupancy = self.occupancy.clone();
+    Self::account(&mut occupancy, self.payload.len(), self.occupancy_since, now);
+    occupancy
+  }
+
+  // Charge the cycles from `since` to `now` to occupancy `len`. Rounding to the nearest cycle
+  // counts the current cycle when `now` is mid-cycle, e.g. at a `finish()`.
+  fn account(occupancy: &mut Vec<u64>, len: usize, since: usize, now: usize) {
+    if occupancy.len() <= len {
+      occupancy.resize(len + 1, 0);
+    }
+    occupancy[len] += (now.saturating_sub(since) + HALF_CYCLE) as u64 / 100;
+  }
+
+  // Commit the pop, then the push, due by `cycle`. As `push_fire = push_valid & push_ready` in
+  // `fifo.sv`, a push finding the FIFO still full is dropped; its pusher is returned.
+  pub fn tick(&mut self, cycle: usize) -> Option<&'static str> {
+    if !self.dirty {
+      return None;
+    }
+    let len = self.payload.len();
+    let mut dropped = None;
     if self.pop.pop(cycle).is_some() && !self.payload.is_empty() {
       self.payload.pop_front().unwrap();
+      self.pops += 1;
     }
     if let Some(event) = self.push.pop(cycle) {
-      self.payload.push_back(event.data);
+      if self.is_full() {
+        self.drops += 1;
+        dropped = Some(event.pusher);
+      } else {
+        self.payload.push_back(event.data);
+        self.pushes += 1;
+      }
+    }
+    if self.payload.len() != len {
+      Self::account(&mut self.occupancy, len, self.occupancy_since, cycle);
+      self.occupancy_since = cycle;
     }
+    self.high_water_mark = self.high_water_mark.max(self.payload.len());
+    match (self.is_full(), self.full_since) {
+      (true, None) => self.full_since = Some(cycle),
+      (false, Some(since)) => {
+        self.full_cycles += (cycle - since) / 100;
+        self.full_since = None;
+      }
+      _ => {}
+    }
+    self.dirty = !self.push.is_empty() || !self.pop.is_empty();
+    dropped
   }
 }
 
-// XEQ for exclusive events per cycle
+// Events are always scheduled one half-cycle ahead of the current stamp, so two
+// half-cycle slots ("this" and "next") are enough to hold everything in flight.
+const HALF_CYCLE: usize = 50;
+const XEQ_SLOTS: usize = 2;
+
+// XEQ for exclusive events per cycle, backed by a fixed ring of half-cycle slots
 pub struct XEQ<T: Sized + Cycled> {
-  q: BTreeMap<usize, T>,
+  slots: [Option<T>; XEQ_SLOTS],
 }
 
 impl<T: Sized + Cycled> Default for XEQ<T> {
@@ -199,31 +431,187 @@ impl<T: Sized + Cycled> Default for XEQ<T> {
 
 impl<T: Sized + Cycled> XEQ<T> {
   pub fn new() -> Self {
-    XEQ { q: BTreeMap::new() }
+    XEQ {
+      slots: [None, None],
+    }
+  }
+
+  fn slot_of(cycle: usize) -> usize {
+    (cycle / HALF_CYCLE) % XEQ_SLOTS
+  }
+
+  pub fn is_empty(&self) -> bool {
+    self.slots.iter().all(Option::is_none)
   }
 
   pub fn push(&mut self, event: T) {
-    if let Some(existing) = self.q.get(&event.cycle()) {
+    let slot = &mut self.slots[Self::slot_of(event.cycle())];
+    if let Some(existing) = slot {
+      if existing.cycle() == event.cycle() {
+        panic!(
+          "{}: Already occupied by {}, cannot accept {}!",
+          super::utils::cyclize(existing.cycle()),
+          existing.pusher(),
+          event.pusher()
+        );
+      }
       panic!(
-        "{}: Already occupied by {}, cannot accept {}!",
+        "{}: Event from {} was never committed before {} reused its slot at {}!",
         super::utils::cyclize(existing.cycle()),
         existing.pusher(),
-        event.pusher()
+        event.pusher(),
+        super::utils::cyclize(event.cycle())
       );
-    } else {
-      self.q.insert(event.cycle(), event);
     }
+    *slot = Some(event);
   }
 
   pub fn pop(&mut self, current: usize) -> Option<T> {
-    if self
-      .q
-      .first_key_value()
-      .is_some_and(|(cycle, _)| *cycle <= current)
-    {
-      self.q.pop_first().map(|(_, event)| event)
-    } else {
-      None
+    let ready = |slot: &Option<T>| {
+      slot
+        .as_ref()
+        .map(T::cycle)
+        .filter(|cycle| *cycle <= current)
+    };
+    // Commit the earlier of the two half-cycle slots first, as the ordered map used to.
+    let idx = match (ready(&self.slots[0]), ready(&self.slots[1])) {
+      (Some(a), Some(b)) => usize::from(b < a),
+      (Some(_), None) => 0,
+      (None, Some(_)) => 1,
+      (None, None) => return None,
+    };
+    self.slots[idx].take()
+  }
+}
+
+// Checkpointing. The events of a `XEQ` are restored into defaults, which only exist for that.
+
+impl<T: Sized + Default + Clone> Default for ArrayWrite<T> {
+  fn default() -> Self {
+    ArrayWrite::new(0, 0, T::default(), "")
+  }
+}
+
+impl<T: Sized + Default + Clone + Checkpoint> Checkpoint for ArrayWrite<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.cycle.save(out)?;
+    self.addr.save(out)?;
+    self.data.save(out)?;
+    save_pusher(self.pusher, out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.cycle.restore(inp)?;
+    self.addr.restore(inp)?;
+    self.data.restore(inp)?;
+    self.pusher = restore_pusher(inp)?;
+    Ok(())
+  }
+}
+
+impl<T: Sized + Default> Default for FIFOPush<T> {
+  fn default() -> Self {
+    FIFOPush::new(0, T::default(), "")
+  }
+}
+
+impl<T: Sized + Checkpoint> Checkpoint for FIFOPush<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.cycle.save(out)?;
+    self.data.save(out)?;
+    save_pusher(self.pusher, out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.cycle.restore(inp)?;
+    self.data.restore(inp)?;
+    self.pusher = restore_pusher(inp)?;
+    Ok(())
+  }
+}
+
+impl Default for FIFOPop {
+  fn default() -> Self {
+    FIFOPop::new(0, "")
+  }
+}
+
+impl Checkpoint for FIFOPop {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.cycle.save(out)?;
+    save_pusher(self.pusher, out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.cycle.restore(inp)?;
+    self.pusher = restore_pusher(inp)?;
+    Ok(())
+  }
+}
+
+impl<T: Sized + Cycled + Checkpoint + Default> Checkpoint for XEQ<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.slots.iter().try_for_each(|slot| slot.save(out))
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.slots.iter_mut().try_for_each(|slot| slot.restore(inp))
+  }
+}
+
+impl<T: Sized + Default + Clone + Checkpoint> Checkpoint for Array<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.payload.save(out)?;
+    self.write_ports.save(out)?;
+    self.dirty.save(out)?;
+    self.writes.save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    self.payload.restore(inp)?;
+    self.write_ports.restore(inp)?;
+    self.dirty.restore(inp)?;
+    self.writes.restore(inp)
+  }
+}
+
+impl<T: Sized + Default + Checkpoint> Checkpoint for FIFO<T> {
+  fn save<W: Write>(&self, out: &mut W) -> io::Result<()> {
+    self.capacity.save(out)?;
+    self.payload.save(out)?;
+    self.push.save(out)?;
+    self.pop.save(out)?;
+    self.dirty.save(out)?;
+    self.high_water_mark.save(out)?;
+    self.full_cycles.save(out)?;
+    self.full_since.save(out)?;
+    self.pushes.save(out)?;
+    self.pops.save(out)?;
+    self.drops.save(out)?;
+    self.occupancy.save(out)?;
+    self.occupancy_since.save(out)
+  }
+
+  fn restore<R: Read>(&mut self, inp: &mut R) -> io::Result<()> {
+    let mut capacity = 0usize;
+    capacity.restore(inp)?;
+    if capacity != self.capacity {
+      return Err(invalid(format!(
+        "a FIFO of capacity {} was saved into one of capacity {}",
+        capacity, self.capacity
+      )));
     }
+    self.payload.restore(inp)?;
+    self.push.restore(inp)?;
+    self.pop.restore(inp)?;
+    self.dirty.restore(inp)?;
+    self.high_water_mark.restore(inp)?;
+    self.full_cycles.restore(inp)?;
+    self.full_since.restore(inp)?;
+    self.pushes.restore(inp)?;
+    self.pops.restore(inp)?;
+    self.drops.restore(inp)?;
+    self.occupancy.restore(inp)?;
+    self.occupancy_since.restore(inp)
   }
 }
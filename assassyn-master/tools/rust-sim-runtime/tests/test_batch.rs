@@ -0,0 +1,69 @@
+use std::sync::Mutex;
+
+use sim_runtime::{finish_simulation, runtime_option, runtime_options, Batch};
+
+static SEEN: Mutex<Vec<(Option<String>, Vec<String>)>> = Mutex::new(Vec::new());
+
+fn simulate() {
+  let name = runtime_option("name", "ASSASSYN_TEST_NO_SUCH_VAR");
+  let loads = runtime_options("load", "ASSASSYN_TEST_NO_SUCH_VAR");
+  SEEN.lock().unwrap().push((name.clone(), loads));
+  match name.as_deref() {
+    Some("finish") => finish_simulation(),
+    Some("panic") => panic!("instance failed"),
+    _ => {}
+  }
+}
+
+#[test]
+fn test_batch_parse() {
+  let batch = Batch::parse(
+    "b.txt",
+    "# a comment\n--name=a --log-file=a.log\n\n  \"--load=x=dir with spaces/x.hex\" --name b\n",
+  );
+  assert_eq!(
+    batch.instances(),
+    &[
+      vec!["--name=a".to_string(), "--log-file=a.log".to_string()],
+      vec![
+        "--load=x=dir with spaces/x.hex".to_string(),
+        "--name".to_string(),
+        "b".to_string(),
+        "--log-file=b.txt.1.log".to_string(),
+      ],
+    ]
+  );
+}
+
+#[test]
+#[should_panic(expected = "Unterminated quote")]
+fn test_batch_unterminated_quote() {
+  Batch::parse("b.txt", "--name \"a");
+}
+
+#[test]
+fn test_batch_runs_every_instance() {
+  let dir = std::env::temp_dir();
+  let log = |name: &str| format!("--log-file={}", dir.join(name).display());
+  let text = [
+    format!("--name=ok --load=a=1 --load=b=2 {}", log("ok.log")),
+    format!("--name=finish {}", log("finish.log")),
+    format!("--name=panic {}", log("panic.log")),
+  ]
+  .join("\n");
+  let batch = Batch::parse("b.txt", &text);
+  // The instance that panics fails the batch, the one that calls finish does not
+  assert!(!batch.run(simulate));
+  let mut seen = SEEN.lock().unwrap().clone();
+  seen.sort();
+  assert_eq!(
+    seen,
+    vec![
+      (Some("finish".to_string()), vec![]),
+      (Some("ok".to_string()), vec!["a=1".to_string(), "b=2".to_string()]),
+      (Some("panic".to_string()), vec![]),
+    ]
+  );
+  // Outside of the batch, options come from the command line again
+  assert_eq!(runtime_option("name", "ASSASSYN_TEST_NO_SUCH_VAR"), None);
+}
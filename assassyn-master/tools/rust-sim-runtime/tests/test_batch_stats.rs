@@ -0,0 +1,28 @@
+use sim_runtime::Batch;
+
+// Its own test binary, as setting `ASSASSYN_STATS` would affect the other batch tests
+#[test]
+fn test_batch_stats_per_instance() {
+  std::env::set_var("ASSASSYN_STATS", "out/s.json");
+  let batch = Batch::parse("b.txt", "--name=a\n--name=b --stats=b.json\n--name=c\n");
+  assert_eq!(
+    batch.instances(),
+    &[
+      vec![
+        "--name=a".to_string(),
+        "--log-file=b.txt.0.log".to_string(),
+        "--stats=out/s.0.json".to_string(),
+      ],
+      vec![
+        "--name=b".to_string(),
+        "--stats=b.json".to_string(),
+        "--log-file=b.txt.1.log".to_string(),
+      ],
+      vec![
+        "--name=c".to_string(),
+        "--log-file=b.txt.2.log".to_string(),
+        "--stats=out/s.2.json".to_string(),
+      ],
+    ]
+  );
+}
@@ -0,0 +1,89 @@
+use std::path::PathBuf;
+
+use sim_runtime::num_bigint::BigInt;
+use sim_runtime::{
+  checkpoint_end, checkpoint_reader, checkpoint_writer, Array, ArrayWrite, Checkpoint, EventQueue,
+  FIFOPush, UWide, ValueCastTo, FIFO,
+};
+
+fn temp_path(name: &str) -> PathBuf {
+  std::env::temp_dir().join(format!("assassyn-ckpt-{}-{}", std::process::id(), name))
+}
+
+fn roundtrip<T: Checkpoint>(value: &T, into: &mut T) {
+  let mut buf = Vec::new();
+  value.save(&mut buf).unwrap();
+  into.restore(&mut buf.as_slice()).unwrap();
+}
+
+#[test]
+fn test_values_roundtrip() {
+  let mut wide = UWide::<2>::default();
+  roundtrip(&UWide::from_words([1, u64::MAX]), &mut wide);
+  assert_eq!(wide, UWide::from_words([1, u64::MAX]));
+  let neg: BigInt = ValueCastTo::<BigInt>::cast(&-(3i128 << 70));
+  let mut big = BigInt::default();
+  roundtrip(&neg, &mut big);
+  assert_eq!(big, neg);
+  let mut opt = Some(5i8);
+  roundtrip(&None, &mut opt);
+  assert_eq!(opt, None);
+}
+
+#[test]
+fn test_state_roundtrip() {
+  // A register with a write still in flight, a FIFO with a pending push, and an event queue
+  // both generating and holding events.
+  let mut array = Array::new_with_ports(4, 1);
+  array.payload[2] = 7u32;
+  array.write(0, ArrayWrite::new(250, 1, 9, "Driver"));
+  let mut fifo = FIFO::with_capacity(4);
+  fifo.schedule_push(FIFOPush::new(150, 3u8, "Driver"));
+  fifo.tick(150);
+  fifo.schedule_push(FIFOPush::new(250, 4u8, "Driver"));
+  let mut events = EventQueue::every_cycle(3);
+  events.pop_front();
+  events.push_back(450);
+
+  let (mut array2, mut fifo2, mut events2) =
+    (Array::new_with_ports(4, 1), FIFO::with_capacity(4), EventQueue::new());
+  roundtrip(&array, &mut array2);
+  roundtrip(&fifo, &mut fifo2);
+  roundtrip(&events, &mut events2);
+
+  array2.tick(250);
+  assert_eq!(array2.payload, [0, 9, 7, 0]);
+  fifo2.tick(250);
+  assert_eq!(fifo2.payload, [3, 4]);
+  assert_eq!(fifo2.high_water_mark(), 2);
+  events2.set_last_cycle(4);
+  let drained: Vec<_> = std::iter::from_fn(|| events2.pop_front()).collect();
+  assert_eq!(drained, [200, 300, 400, 450]);
+}
+
+#[test]
+fn test_fifo_capacity_mismatch() {
+  let mut buf = Vec::new();
+  FIFO::<u8>::with_capacity(2).save(&mut buf).unwrap();
+  let err = FIFO::<u8>::with_capacity(4)
+    .restore(&mut buf.as_slice())
+    .unwrap_err();
+  assert!(err.to_string().contains("capacity 2"));
+}
+
+#[test]
+fn test_header_checks_ir_hash() {
+  let path = temp_path("header.ckpt");
+  let mut out = checkpoint_writer(&path, "abc").unwrap();
+  1234usize.save(&mut out).unwrap();
+  drop(out);
+
+  let mut inp = checkpoint_reader(&path, "abc").unwrap();
+  let mut stamp = 0usize;
+  stamp.restore(&mut inp).unwrap();
+  checkpoint_end(&mut inp).unwrap();
+  assert_eq!(stamp, 1234);
+  let err = checkpoint_reader(&path, "def").unwrap_err();
+  std::fs::remove_file(&path).unwrap();
+  assert!(err.to_string().contains("IR abc, not def"));
+}
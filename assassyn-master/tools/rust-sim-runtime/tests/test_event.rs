@@ -0,0 +1,50 @@
+use sim_runtime::EventQueue;
+
+#[test]
+fn test_every_cycle_matches_prepushed_queue() {
+  let mut generated = EventQueue::every_cycle(5);
+  let mut pushed = EventQueue::new();
+  for i in 1..=5 {
+    pushed.push_back(i * 100);
+  }
+  assert_eq!(generated.len(), pushed.len());
+  while !pushed.is_empty() {
+    assert_eq!(generated.front(), pushed.front());
+    assert_eq!(generated.pop_front(), pushed.pop_front());
+  }
+  assert!(generated.is_empty());
+  assert_eq!(generated.front(), None);
+}
+
+#[test]
+fn test_every_cycle_is_constant_size() {
+  let mut q = EventQueue::every_cycle(1_000_000_000_000);
+  assert_eq!(q.len(), 1_000_000_000_000);
+  assert_eq!(q.pop_front(), Some(100));
+  assert_eq!(q.front(), Some(200));
+}
+
+#[test]
+fn test_pushed_events_follow_generated_ones() {
+  let mut q = EventQueue::every_cycle(2);
+  q.push_back(150);
+  assert_eq!(q.pop_front(), Some(100));
+  assert_eq!(q.pop_front(), Some(200));
+  assert_eq!(q.pop_front(), Some(150));
+  assert!(q.pop_front().is_none());
+  assert!(EventQueue::every_cycle(0).is_empty());
+}
+
+#[test]
+fn test_retract_takes_back_the_last_event_at_a_stamp() {
+  let mut q = EventQueue::new();
+  q.push_back(100);
+  q.push_back(200);
+  q.push_back(200);
+  q.retract(200);
+  q.retract(300);
+  assert_eq!(q.len(), 2);
+  assert_eq!(q.pop_front(), Some(100));
+  assert_eq!(q.pop_front(), Some(200));
+  assert!(q.is_empty());
+}
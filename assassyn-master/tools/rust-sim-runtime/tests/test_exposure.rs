@@ -0,0 +1,35 @@
+use sim_runtime::num_bigint::{BigUint, ToBigUint};
+use sim_runtime::Exposed;
+
+#[test]
+fn test_valid_in_the_cycle_it_was_set() {
+  let mut x = Exposed::<u32>::new();
+  assert!(!x.is_valid(100));
+  assert_eq!(x.get(100), None);
+  x.set(100, &7);
+  assert!(x.is_valid(100));
+  assert_eq!(x.get(100), Some(&7));
+  // The next cycle invalidates it without touching it
+  assert_eq!(x.get(200), None);
+  x.set(200, &8);
+  assert_eq!(x.get(200), Some(&8));
+}
+
+#[test]
+fn test_invalidate() {
+  let mut x = Exposed::<bool>::new();
+  x.set(100, &true);
+  x.invalidate();
+  assert!(!x.is_valid(100));
+  x.set(100, &false);
+  assert_eq!(x.get(100), Some(&false));
+}
+
+#[test]
+fn test_wide_values() {
+  let mut x = Exposed::<BigUint>::new();
+  x.set(100, &(1u128 << 100).to_biguint().unwrap());
+  let three = 3u32.to_biguint().unwrap();
+  x.set(200, &three);
+  assert_eq!(x.get(200), Some(&three));
+}
@@ -0,0 +1,84 @@
+use std::path::PathBuf;
+
+use sim_runtime::{load_memory_image, MemoryImages, UWide};
+
+fn temp_file(name: &str, content: &[u8]) -> PathBuf {
+  let path = std::env::temp_dir().join(format!("assassyn-image-{}-{}", std::process::id(), name));
+  std::fs::write(&path, content).unwrap();
+  path
+}
+
+// A little-endian ELF32 with two loadable segments: 8 bytes at 0x1000, and 4 bytes of data
+// followed by 4 bytes of .bss at 0x1010.
+fn tiny_elf() -> Vec<u8> {
+  let mut elf = vec![0u8; 0x80];
+  elf[..6].copy_from_slice(b"\x7fELF\x01\x01");
+  elf[0x1c..0x20].copy_from_slice(&0x34u32.to_le_bytes()); // e_phoff
+  elf[0x2a..0x2c].copy_from_slice(&32u16.to_le_bytes()); // e_phentsize
+  elf[0x2c..0x2e].copy_from_slice(&2u16.to_le_bytes()); // e_phnum
+  for (i, (offset, vaddr, filesz, memsz)) in
+    [(0x74u32, 0x1000u32, 8u32, 8u32), (0x7c, 0x1010, 4, 8)]
+      .iter()
+      .enumerate()
+  {
+    let ph = 0x34 + i * 32;
+    elf[ph..ph + 4].copy_from_slice(&1u32.to_le_bytes()); // PT_LOAD
+    elf[ph + 4..ph + 8].copy_from_slice(&offset.to_le_bytes());
+    elf[ph + 8..ph + 12].copy_from_slice(&vaddr.to_le_bytes());
+    elf[ph + 16..ph + 20].copy_from_slice(&filesz.to_le_bytes());
+    elf[ph + 20..ph + 24].copy_from_slice(&memsz.to_le_bytes());
+  }
+  elf[0x74..0x80].copy_from_slice(&[1, 0, 0, 0, 2, 0, 0, 0, 3, 0, 0, 0]);
+  elf
+}
+
+#[test]
+fn test_load_hex() {
+  let path = temp_file("a.hex", b"// program\n0000_0013\n@3\nDEADBEEF // tail\n\n");
+  let mut array = vec![7u32; 5];
+  load_memory_image(&mut array, path.to_str().unwrap(), 4);
+  std::fs::remove_file(&path).unwrap();
+  assert_eq!(array, [0x13, 7, 7, 0xdead_beef, 7]);
+}
+
+#[test]
+fn test_load_binary_and_wide() {
+  let path = temp_file("a.bin", &[1, 2, 3, 4, 5, 6]);
+  let mut array = vec![0u16; 4];
+  load_memory_image(&mut array, path.to_str().unwrap(), 2);
+  assert_eq!(array, [0x0201, 0x0403, 0x0605, 0]);
+  let mut wide = vec![UWide::<3>::default(); 1];
+  load_memory_image(&mut wide, path.to_str().unwrap(), 24);
+  std::fs::remove_file(&path).unwrap();
+  assert_eq!(wide[0], UWide::from_words([0x0605_0403_0201, 0, 0]));
+}
+
+#[test]
+fn test_load_elf() {
+  let path = temp_file("a.elf", &tiny_elf());
+  let mut array = vec![0xffu32; 7];
+  load_memory_image(&mut array, path.to_str().unwrap(), 4);
+  std::fs::remove_file(&path).unwrap();
+  assert_eq!(array, [1, 2, 0, 0, 3, 0, 0xff]);
+}
+
+#[test]
+fn test_overrides_and_defaults() {
+  let program = temp_file("b.hex", b"2a\n");
+  let default = temp_file("c.hex", b"1\n");
+  let mut images = MemoryImages::with_overrides([format!("icache={}", program.display())]);
+  let (mut icache, mut dcache) = (vec![0u8; 1], vec![0u8; 1]);
+  images.load(&["icache", "icache_payload"], &mut icache, default.to_str(), 1);
+  images.load(&["dcache"], &mut dcache, default.to_str(), 1);
+  images.finish(&["icache", "dcache"]);
+  std::fs::remove_file(&program).unwrap();
+  std::fs::remove_file(&default).unwrap();
+  assert_eq!((icache[0], dcache[0]), (0x2a, 1));
+}
+
+#[test]
+#[should_panic(expected = "No array named \"nosuch\"")]
+fn test_unknown_array() {
+  let images = MemoryImages::with_overrides(["nosuch=x.hex".to_string()]);
+  images.finish(&["icache"]);
+}
@@ -0,0 +1,202 @@
+use std::ffi::{c_char, c_void, CString};
+
+use sim_runtime::num_bigint::BigInt;
+use sim_runtime::*;
+
+// A counter that increments `count[0]` every cycle, idles while `gate[0]` is zero, and
+// calls `finish()` at `--finish-at`.
+struct Counter {
+  cycle: usize,
+  idle_count: usize,
+  count: Array<u32>,
+  gate: Array<bool>,
+  queue: FIFO<i8>,
+  exit: Option<&'static str>,
+}
+
+impl Simulation for Counter {
+  const PORTS: &'static str = r#"{"arrays": [], "fifos": []}"#;
+
+  fn new(_stop_when_idle: bool) -> Self {
+    if runtime_option("fail-new", "ASSASSYN_TEST_NO_SUCH_VAR").is_some() {
+      panic!("bad option");
+    }
+    Counter {
+      cycle: 0,
+      idle_count: 0,
+      count: Array::new(1),
+      gate: Array::new_with_init(vec![true]),
+      queue: FIFO::with_capacity(2),
+      exit: None,
+    }
+  }
+
+  fn step(&mut self) -> bool {
+    if self.exit.is_some() {
+      return false;
+    }
+    self.cycle += 1;
+    let finish_at = runtime_option("finish-at", "ASSASSYN_TEST_NO_SUCH_VAR");
+    if finish_at == Some(self.cycle.to_string()) {
+      finish_simulation();
+    }
+    if self.cycle == 1000 {
+      panic!("overflow");
+    }
+    if self.gate.payload[0] {
+      self.count.payload[0] += 1;
+      self.idle_count = 0;
+    } else {
+      self.idle_count += 1;
+    }
+    true
+  }
+
+  fn finished(&mut self) {
+    self.exit = Some("finish");
+  }
+
+  fn cycle(&self) -> usize {
+    self.cycle
+  }
+
+  fn idle(&self) -> bool {
+    self.idle_count >= 3
+  }
+
+  fn exit(&self) -> Option<&'static str> {
+    self.exit
+  }
+
+  fn stats(&self) -> StatsReport {
+    StatsReport::new(self.cycle * 100, self.exit.unwrap_or("running"))
+  }
+
+  fn flush(&mut self) {}
+
+  fn array(&mut self, name: &str) -> Option<&mut dyn ArrayAccess> {
+    match name {
+      "count" => Some(&mut self.count),
+      "gate" => Some(&mut self.gate),
+      _ => None,
+    }
+  }
+
+  fn fifo(&mut self, name: &str) -> Option<&mut dyn FifoAccess> {
+    match name {
+      "queue" => Some(&mut self.queue),
+      _ => None,
+    }
+  }
+}
+
+sim_runtime::export_simulator!(Counter);
+
+use assassyn_sim_ffi::*;
+
+fn new(args: &[&str]) -> *mut c_void {
+  let args: Vec<CString> = args.iter().map(|x| CString::new(*x).unwrap()).collect();
+  let argv: Vec<*const c_char> = args.iter().map(|x| x.as_ptr()).collect();
+  unsafe { assassyn_sim_new(argv.len(), argv.as_ptr()) }
+}
+
+fn text(f: impl Fn(*mut u8, usize) -> usize) -> String {
+  let mut buf = vec![0u8; f(std::ptr::null_mut(), 0)];
+  f(buf.as_mut_ptr(), buf.len());
+  String::from_utf8(buf).unwrap()
+}
+
+fn read(sim: *mut c_void, name: &str, index: usize) -> u32 {
+  let name = CString::new(name).unwrap();
+  let mut buf = [0u8; 4];
+  assert_eq!(
+    unsafe { assassyn_sim_array_read(sim, name.as_ptr(), index, buf.as_mut_ptr(), 4) },
+    1
+  );
+  u32::from_le_bytes(buf)
+}
+
+#[test]
+fn test_le_bytes() {
+  let mut out = [0u8; 2];
+  (-3i8).write_le(&mut out);
+  assert_eq!(out, [0xfd, 0xff]);
+  assert_eq!(i32::read_le(&[0xfd]), -3);
+  assert_eq!(u32::read_le(&[0xfd]), 0xfd);
+  assert_eq!(u8::read_le(&[0x34, 0x12]), 0x34);
+  let mut out = [0u8; 3];
+  0x123456u32.write_le(&mut out);
+  assert_eq!(out, [0x56, 0x34, 0x12]);
+  assert!(bool::read_le(&[0, 1]));
+
+  let mut out = [0u8; 24];
+  IWide::<2>([u64::MAX - 1, u64::MAX]).write_le(&mut out);
+  assert_eq!(out[0], 0xfe);
+  assert!(out[1..].iter().all(|x| *x == 0xff));
+  assert_eq!(UWide::<2>::read_le(&[1, 2]).0, [0x201, 0]);
+  assert_eq!(IWide::<2>::read_le(&[0xff]).0, [u64::MAX, u64::MAX]);
+  assert_eq!(BigInt::read_le(&[0xfe]), BigInt::from(-2i128));
+}
+
+#[test]
+fn test_library_session() {
+  let sim = new(&["--finish-at=20"]);
+  unsafe {
+    assert_eq!(assassyn_sim_step(sim, 5), 5);
+    assert_eq!(assassyn_sim_cycle(sim), 5);
+    assert_eq!(read(sim, "count", 0), 5);
+
+    // Poke the gate closed: the counter idles
+    let gate = CString::new("gate").unwrap();
+    assert_eq!(assassyn_sim_array_write(sim, gate.as_ptr(), 0, [0].as_ptr() as *mut u8, 1), 1);
+    assert_eq!(assassyn_sim_run_until_idle(sim, 100), 3);
+    assert_eq!(read(sim, "count", 0), 5);
+    assert_eq!(text(|buf, len| assassyn_sim_exit(sim, buf, len)), "");
+
+    // Out of bounds is no error, an unknown name is
+    let count = CString::new("count").unwrap();
+    let nothing = CString::new("nothing").unwrap();
+    let mut buf = [0u8; 4];
+    assert_eq!(assassyn_sim_array_read(sim, count.as_ptr(), 1, buf.as_mut_ptr(), 4), 0);
+    assert_eq!(assassyn_sim_array_read(sim, nothing.as_ptr(), 0, buf.as_mut_ptr(), 4), -1);
+    assert_eq!(text(|buf, len| assassyn_sim_error(sim, buf, len)), "No array named \"nothing\"");
+
+    let queue = CString::new("queue").unwrap();
+    assert_eq!(assassyn_sim_fifo_push(sim, queue.as_ptr(), [0xfb].as_ptr() as *mut u8, 1), 1);
+    assert_eq!(assassyn_sim_fifo_push(sim, queue.as_ptr(), [1].as_ptr() as *mut u8, 1), 1);
+    assert_eq!(assassyn_sim_fifo_push(sim, queue.as_ptr(), [2].as_ptr() as *mut u8, 1), 0);
+    assert_eq!(assassyn_sim_fifo_len(sim, queue.as_ptr()), 2);
+    let mut buf = [0u8; 2];
+    assert_eq!(assassyn_sim_fifo_peek(sim, queue.as_ptr(), 0, buf.as_mut_ptr(), 2), 1);
+    assert_eq!(i16::from_le_bytes(buf), -5);
+    assert_eq!(assassyn_sim_fifo_pop(sim, queue.as_ptr()), 1);
+    assert_eq!(assassyn_sim_fifo_len(sim, queue.as_ptr()), 1);
+
+    // `finish()` ends the session in cycle 20, not the process
+    assert_eq!(assassyn_sim_step(sim, 100), 12);
+    assert_eq!(text(|buf, len| assassyn_sim_exit(sim, buf, len)), "finish");
+    assert_eq!(assassyn_sim_step(sim, 100), 0);
+    let stats = text(|buf, len| assassyn_sim_stats(sim, buf, len));
+    assert!(stats.contains("\"cycles\": 20"), "{}", stats);
+    assassyn_sim_free(sim);
+  }
+}
+
+#[test]
+fn test_library_errors() {
+  unsafe {
+    let sim = new(&["--fail-new=1"]);
+    assert_eq!(assassyn_sim_step(sim, 1), -1);
+    assert_eq!(text(|buf, len| assassyn_sim_error(sim, buf, len)), "bad option");
+    assassyn_sim_free(sim);
+
+    // A panic stops the session, which can still be inspected
+    let sim = new(&[]);
+    assert_eq!(assassyn_sim_step(sim, 2000), -1);
+    assert_eq!(text(|buf, len| assassyn_sim_error(sim, buf, len)), "overflow");
+    assert_eq!(assassyn_sim_cycle(sim), 1000);
+    assert_eq!(read(sim, "count", 0), 999);
+    assert_eq!(assassyn_sim_step(sim, 1), -1);
+    assassyn_sim_free(sim);
+  }
+}
@@ -0,0 +1,42 @@
+use sim_runtime::Logger;
+
+#[test]
+fn test_logger_without_filter_logs_everything() {
+  let logger = Logger::with_filter(None, None);
+  assert!(logger.enabled("Driver", 0));
+  assert!(logger.enabled("Adder", usize::MAX));
+}
+
+#[test]
+fn test_logger_module_filter() {
+  let logger = Logger::with_filter(Some("Driver, Adder"), None);
+  assert!(logger.enabled("Driver", 100));
+  assert!(logger.enabled("Adder", 100));
+  assert!(!logger.enabled("Sub", 100));
+  assert!(!Logger::with_filter(Some(""), None).enabled("Driver", 100));
+}
+
+#[test]
+fn test_logger_cycle_window() {
+  let logger = Logger::with_filter(None, Some("3:4"));
+  assert!(!logger.enabled("Driver", 250));
+  assert!(logger.enabled("Driver", 300));
+  assert!(logger.enabled("Driver", 450));
+  assert!(!logger.enabled("Driver", 500));
+  let open_ended = Logger::with_filter(Some("Driver"), Some("10:"));
+  assert!(!open_ended.enabled("Driver", 999));
+  assert!(open_ended.enabled("Driver", 1_000_000));
+  assert!(!open_ended.enabled("Adder", 1_000_000));
+  assert!(Logger::with_filter(None, Some(":2")).enabled("Driver", 200));
+  assert!(Logger::with_filter(None, Some("7")).enabled("Driver", 700));
+}
+
+#[test]
+fn test_log_lane_keeps_the_filters() {
+  let logger = Logger::with_filter(Some("Driver"), Some("3:4"));
+  let mut lane = logger.lane();
+  assert!(lane.enabled("Driver", 300));
+  assert!(!lane.enabled("Driver", 500));
+  assert!(!lane.enabled("Adder", 300));
+  assert!(lane.tracer().is_none());
+}
@@ -0,0 +1,96 @@
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use sim_runtime::{Array, ArrayView, ArrayWrite, Task, WorkerPool};
+
+// A stand-in simulator: every task borrows its own slot, as the modules of a phase borrow
+// disjoint fields of the simulator.
+struct Sim {
+  slots: [usize; 5],
+  runs: AtomicUsize,
+  array: Array<u32>,
+  seen: u32,
+}
+
+macro_rules! task {
+  ($name:ident, $slot:expr) => {
+    unsafe fn $name(sim: *mut Sim) {
+      let slot = &mut (*sim).slots[$slot];
+      *slot += $slot + 1;
+      (*sim).runs.fetch_add(1, Ordering::Relaxed);
+    }
+  };
+}
+
+task!(t0, 0);
+task!(t1, 1);
+task!(t2, 2);
+task!(t3, 3);
+task!(t4, 4);
+
+unsafe fn boom(_: *mut Sim) {
+  panic!("boom");
+}
+
+// A module writing the array, and one reading it, in the same phase
+unsafe fn write_array(sim: *mut Sim) {
+  let mut array = ArrayView::writer(std::ptr::addr_of_mut!((*sim).array));
+  let next = array.payload[0] + 1;
+  array.write(0, ArrayWrite::new(50, 0, next, "write_array"));
+}
+
+unsafe fn read_array(sim: *mut Sim) {
+  let array = ArrayView::reader(std::ptr::addr_of!((*sim).array));
+  (*sim).seen = array.payload[0];
+}
+
+fn new_sim() -> Sim {
+  Sim {
+    slots: [0; 5],
+    runs: AtomicUsize::new(0),
+    array: Array::new_with_ports(1, 1),
+    seen: 0,
+  }
+}
+
+#[test]
+fn test_phases_run_every_task() {
+  for threads in [1, 2, 4] {
+    let pool = WorkerPool::new(threads);
+    assert_eq!(pool.threads(), threads);
+    let mut sim = new_sim();
+    let phases: Vec<Vec<Task<Sim>>> = vec![vec![t0, t1, t2], vec![t3], vec![t4, t0]];
+    for _ in 0..1000 {
+      for phase in phases.iter() {
+        unsafe { pool.run(&mut sim, phase) }.unwrap();
+      }
+    }
+    assert_eq!(sim.slots, [2000, 2000, 3000, 4000, 5000]);
+    assert_eq!(sim.runs.load(Ordering::Relaxed), 6000);
+  }
+}
+
+#[test]
+fn test_panics_are_returned() {
+  let pool = WorkerPool::new(2);
+  let mut sim = new_sim();
+  let panic = unsafe { pool.run(&mut sim, &[t0, boom, t1]) }.unwrap_err();
+  assert_eq!(panic.downcast_ref::<&str>(), Some(&"boom"));
+  // The pool is still usable after a panic.
+  unsafe { pool.run(&mut sim, &[t2, t3]) }.unwrap();
+  assert_eq!(sim.slots[2..4], [3, 4]);
+}
+
+#[test]
+fn test_array_views_read_and_write_in_one_phase() {
+  let pool = WorkerPool::new(2);
+  let mut sim = new_sim();
+  for cycle in 1..=100 {
+    unsafe { pool.run(&mut sim, &[write_array, read_array]) }.unwrap();
+    // The reader sees the payload of the cycle before, whichever task ran first
+    assert_eq!(sim.seen, cycle - 1);
+    assert!(sim.array.is_dirty());
+    sim.array.tick(50);
+  }
+  assert_eq!(sim.array.payload[0], 100);
+  assert_eq!(sim.array.writes(), 100);
+}
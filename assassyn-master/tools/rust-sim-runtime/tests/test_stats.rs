@@ -0,0 +1,47 @@
+use sim_runtime::{Array, ArrayWrite, FIFOPop, FIFOPush, ModuleCounters, StatsReport, FIFO};
+
+#[test]
+fn test_fifo_counters() {
+  // Cycles 1 and 2 push and cycle 4 pops, committed at the end of the cycle: the FIFO holds 0,
+  // 1, 2, 2 and then 1 entry in cycles 1 to 5.
+  let mut fifo = FIFO::with_capacity(2);
+  for (stamp, push, pop) in [(150, true, false), (250, true, false), (450, false, true)] {
+    if push {
+      fifo.schedule_push(FIFOPush::new(stamp, 0u8, "Driver"));
+    }
+    if pop {
+      fifo.schedule_pop(FIFOPop::new(stamp, "Sink"));
+    }
+    fifo.tick(stamp);
+  }
+  assert_eq!((fifo.pushes(), fifo.pops()), (2, 1));
+  assert_eq!(fifo.occupancy(550), [1, 2, 2]);
+  assert_eq!(fifo.full_cycles(550), 2);
+  // A finish() in the middle of cycle 6 counts it.
+  assert_eq!(fifo.occupancy(600), [1, 3, 2]);
+}
+
+#[test]
+fn test_report_json() {
+  let mut counters = ModuleCounters::default();
+  counters.record(true);
+  counters.record(false);
+  counters.record(true);
+  let mut array = Array::new_with_ports(2, 1);
+  array.write(0, ArrayWrite::new(150, 0, 1u32, "Driver"));
+  let fifo = FIFO::<u8>::new();
+
+  let mut report = StatsReport::new(250, "finish");
+  report.module("Driver", &counters);
+  report.fifo("Sink_a", &fifo);
+  report.array("cnt", &array);
+  let json: String = report.to_json().split_whitespace().collect();
+  assert_eq!(
+    json,
+    concat!(
+      r#"{"cycles":2,"exit":"finish","modules":{"Driver":{"triggered":2,"stalled":1}},"#,
+      r#""fifos":{"Sink_a":{"capacity":null,"pushes":0,"pops":0,"drops":0,"high_water_mark":0,"#,
+      r#""full_cycles":0,"occupancy":[2]}},"arrays":{"cnt":{"writes":1}}}"#
+    )
+  );
+}
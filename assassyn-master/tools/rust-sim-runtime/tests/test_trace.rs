@@ -0,0 +1,79 @@
+use sim_runtime::num_bigint::{BigInt, BigUint};
+use sim_runtime::{
+  IWide, TraceArg, TraceLane, Tracer, UWide, ValueCastTo, TRACE_MAGIC, TRACE_VERSION,
+};
+
+fn bytes_of<T: TraceArg>(value: &T, bytes: usize) -> Vec<u8> {
+  let mut out = Vec::new();
+  value.write_trace(bytes, &mut out).unwrap();
+  assert_eq!(out.len(), bytes);
+  out
+}
+
+#[test]
+fn test_trace_arg_extension() {
+  assert_eq!(bytes_of(&0x1234u16, 1), [0x34]);
+  assert_eq!(bytes_of(&0x1234u16, 3), [0x34, 0x12, 0]);
+  assert_eq!(bytes_of(&-2i8, 2), [0xfe, 0xff]);
+  assert_eq!(bytes_of(&true, 1), [1]);
+  assert_eq!(bytes_of(&1.0f32, 4), 1.0f32.to_le_bytes());
+  let wide = UWide::<3>::from_words([1, 2, 3]);
+  assert_eq!(bytes_of(&wide, 9), [1, 0, 0, 0, 0, 0, 0, 0, 2]);
+  let neg: IWide<3> = ValueCastTo::<IWide<3>>::cast(&-3i8);
+  assert_eq!(bytes_of(&neg, 25), [&[0xfd][..], &[0xff; 24][..]].concat());
+}
+
+#[test]
+fn test_trace_arg_bigint() {
+  let big: BigUint = ValueCastTo::<BigUint>::cast(&0x0102_0304_0506_0708_090au128);
+  assert_eq!(bytes_of(&big, 12), [0x0a, 0x09, 8, 7, 6, 5, 4, 3, 2, 1, 0, 0]);
+  let neg: BigInt = ValueCastTo::<BigInt>::cast(&-(1i128 << 64));
+  assert_eq!(bytes_of(&neg, 10), [0, 0, 0, 0, 0, 0, 0, 0, 0xff, 0xff]);
+  let neg: BigInt = ValueCastTo::<BigInt>::cast(&-5i64);
+  assert_eq!(bytes_of(&neg, 2), [0xfb, 0xff]);
+}
+
+#[test]
+fn test_tracer_layout() {
+  let path = std::env::temp_dir().join(format!("assassyn-trace-{}.bin", std::process::id()));
+  let formats = r#"{"formats":[]}"#;
+  let mut trace = Tracer::create(&path, formats).unwrap();
+  trace.record(100, 0);
+  trace.arg(&7u8, 1);
+  trace.record(300, 200);
+  trace.arg(&-1i32, 2);
+  trace.flush();
+  let data = std::fs::read(&path).unwrap();
+  std::fs::remove_file(&path).unwrap();
+
+  let (header, records) = data.split_at(16 + formats.len());
+  assert_eq!(&header[..8], TRACE_MAGIC);
+  assert_eq!(header[8..12], TRACE_VERSION.to_le_bytes());
+  assert_eq!(header[12..16], (formats.len() as u32).to_le_bytes());
+  assert_eq!(&header[16..], formats.as_bytes());
+  // Stamp deltas and format IDs are LEB128 varints.
+  assert_eq!(records, [100, 0, 7, 0xc8, 0x01, 0xc8, 0x01, 0xff, 0xff]);
+}
+
+#[test]
+fn test_tracer_absorbs_lanes() {
+  let path = std::env::temp_dir().join(format!("assassyn-lanes-{}.bin", std::process::id()));
+  let formats = r#"{"formats":[]}"#;
+  let mut trace = Tracer::create(&path, formats).unwrap();
+  let (mut a, mut b) = (TraceLane::default(), TraceLane::default());
+  b.record(300, 2);
+  b.arg(&9u8, 1);
+  a.record(300, 1);
+  a.record(300, 1);
+  a.arg(&-1i16, 2);
+  trace.record(100, 0);
+  trace.absorb(&mut a);
+  trace.absorb(&mut b);
+  assert!(a.is_empty() && b.is_empty());
+  trace.flush();
+  let data = std::fs::read(&path).unwrap();
+  std::fs::remove_file(&path).unwrap();
+  // The same records as if they were traced directly, in the order the lanes were absorbed.
+  let records = &data[16 + formats.len()..];
+  assert_eq!(records, [100, 0, 0xc8, 0x01, 1, 0, 1, 0xff, 0xff, 0, 2, 9]);
+}
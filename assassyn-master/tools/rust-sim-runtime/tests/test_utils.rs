@@ -0,0 +1,28 @@
+use sim_runtime::rand::RngCore;
+use sim_runtime::{cycle_rng, runtime_param, runtime_seed};
+
+#[test]
+fn test_runtime_param() {
+  assert_eq!(runtime_param("no-such-flag", "ASSASSYN_TEST_NO_SUCH_VAR", 42usize), 42);
+  std::env::set_var("ASSASSYN_TEST_PARAM", " 1000 ");
+  assert_eq!(runtime_param("no-such-flag", "ASSASSYN_TEST_PARAM", 42usize), 1000);
+}
+
+#[test]
+#[should_panic(expected = "Invalid value \"many\" for --bad-flag")]
+fn test_invalid_runtime_param() {
+  std::env::set_var("ASSASSYN_TEST_BAD_PARAM", "many");
+  runtime_param("bad-flag", "ASSASSYN_TEST_BAD_PARAM", 42usize);
+}
+
+#[test]
+fn test_cycle_rng_replays() {
+  let draw = |seed, cycle| {
+    let mut rng = cycle_rng(seed, cycle);
+    (0..8).map(|_| rng.next_u32()).collect::<Vec<_>>()
+  };
+  assert_eq!(draw(7, 3), draw(7, 3));
+  assert_ne!(draw(7, 3), draw(8, 3));
+  assert_ne!(draw(7, 3), draw(7, 4));
+  assert_eq!(runtime_seed(Some(7)), 7);
+}
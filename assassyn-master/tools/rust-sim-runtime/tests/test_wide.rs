@@ -0,0 +1,119 @@
+use sim_runtime::num_bigint::{BigInt, BigUint};
+use sim_runtime::num_traits::Num;
+use sim_runtime::{IWide, UWide, ValueCastTo};
+
+const SAMPLES: [u128; 6] = [
+  0,
+  1,
+  0xdead_beef,
+  u64::MAX as u128,
+  0x1234_5678_9abc_def0_0fed_cba9_8765_4321,
+  u128::MAX,
+];
+
+fn u(x: u128) -> UWide<2> {
+  ValueCastTo::<UWide<2>>::cast(&x)
+}
+
+fn i(x: i128) -> IWide<2> {
+  ValueCastTo::<IWide<2>>::cast(&x)
+}
+
+#[test]
+fn test_unsigned_ops_match_u128() {
+  for &a in SAMPLES.iter() {
+    for &b in SAMPLES.iter() {
+      let (wa, wb) = (u(a), u(b));
+      assert_eq!(ValueCastTo::<u128>::cast(&(wa + wb)), a.wrapping_add(b));
+      assert_eq!(ValueCastTo::<u128>::cast(&(wa - wb)), a.wrapping_sub(b));
+      assert_eq!(ValueCastTo::<u128>::cast(&(wa * wb)), a.wrapping_mul(b));
+      assert_eq!(ValueCastTo::<u128>::cast(&(wa ^ wb)), a ^ b);
+      assert_eq!(wa.cmp(&wb), a.cmp(&b));
+      if b != 0 {
+        assert_eq!(ValueCastTo::<u128>::cast(&(wa / wb)), a / b);
+        assert_eq!(ValueCastTo::<u128>::cast(&(wa % wb)), a % b);
+      }
+      let shift = (b % 130) as usize;
+      assert_eq!(
+        ValueCastTo::<u128>::cast(&(wa << shift)),
+        a.checked_shl(shift as u32).unwrap_or(0)
+      );
+      assert_eq!(
+        ValueCastTo::<u128>::cast(&(wa >> shift)),
+        a.checked_shr(shift as u32).unwrap_or(0)
+      );
+    }
+  }
+}
+
+#[test]
+fn test_signed_ops_match_i128() {
+  let samples = [
+    0i128,
+    1,
+    -1,
+    7,
+    -7,
+    i64::MIN as i128,
+    i128::MAX,
+    i128::MIN + 1,
+  ];
+  for &a in samples.iter() {
+    for &b in samples.iter() {
+      let (wa, wb) = (i(a), i(b));
+      assert_eq!(ValueCastTo::<i128>::cast(&(wa + wb)), a.wrapping_add(b));
+      assert_eq!(ValueCastTo::<i128>::cast(&(wa * wb)), a.wrapping_mul(b));
+      assert_eq!(wa.cmp(&wb), a.cmp(&b));
+      if b != 0 {
+        assert_eq!(ValueCastTo::<i128>::cast(&(wa / wb)), a.wrapping_div(b));
+        assert_eq!(ValueCastTo::<i128>::cast(&(wa % wb)), a.wrapping_rem(b));
+      }
+      let shift = (b.unsigned_abs() % 128) as usize;
+      assert_eq!(ValueCastTo::<i128>::cast(&(wa >> shift)), a >> shift);
+    }
+  }
+}
+
+#[test]
+fn test_extension_and_truncation() {
+  let neg: IWide<4> = ValueCastTo::<IWide<4>>::cast(&-2i32);
+  assert_eq!(neg.0, [u64::MAX - 1, u64::MAX, u64::MAX, u64::MAX]);
+  assert_eq!(ValueCastTo::<i8>::cast(&neg), -2);
+  let zext: UWide<4> = ValueCastTo::<UWide<4>>::cast(&u(u128::MAX));
+  assert_eq!(zext.0, [u64::MAX, u64::MAX, 0, 0]);
+  let sext: UWide<4> = ValueCastTo::<UWide<4>>::cast(&i(-1));
+  assert_eq!(sext.0, [u64::MAX; 4]);
+  let narrow: UWide<3> = ValueCastTo::<UWide<3>>::cast(&sext);
+  assert_eq!(narrow.0, [u64::MAX; 3]);
+  assert!(ValueCastTo::<bool>::cast(&zext));
+  assert!(!ValueCastTo::<bool>::cast(&UWide::<3>::default()));
+}
+
+#[test]
+fn test_bigint_round_trip() {
+  let wide = UWide::<4>::from_words([1, 2, 3, 4]);
+  let big: BigUint = ValueCastTo::<BigUint>::cast(&wide);
+  assert_eq!(ValueCastTo::<UWide<4>>::cast(&big), wide);
+  let neg: IWide<3> = ValueCastTo::<IWide<3>>::cast(&-5i64);
+  let big: BigInt = ValueCastTo::<BigInt>::cast(&neg);
+  assert_eq!(ValueCastTo::<IWide<3>>::cast(&big), neg);
+  assert_eq!(ValueCastTo::<i128>::cast(&big), -5);
+  assert_eq!(ValueCastTo::<u128>::cast(&big), (-5i128) as u128);
+}
+
+#[test]
+fn test_format_and_parse() {
+  let wide = UWide::<4>::from_words([0, 0, 0, 1]);
+  let text = "6277101735386680763835789423207666416102355444464034512896";
+  assert_eq!(wide.to_string(), text);
+  assert_eq!(UWide::<4>::from_str_radix(text, 10).unwrap(), wide);
+  assert_eq!(format!("{:x}", wide), format!("1{}", "0".repeat(48)));
+  assert_eq!(format!("{:#x}", u(0xabc)), "0xabc");
+  assert_eq!(i(-42).to_string(), "-42");
+  assert_eq!(
+    IWide::<3>::from_str_radix("-42", 10).unwrap(),
+    ValueCastTo::<IWide<3>>::cast(&-42i8)
+  );
+  assert_eq!(format!("{:>6}", i(-42)), "   -42");
+  assert_eq!(UWide::<3>::from_words([0b1011, 0, 1]).count_ones(), 4);
+}
@@ -0,0 +1,92 @@
+use sim_runtime::{Array, ArrayWrite, Cycled, FIFOPop, FIFOPush, FIFO, XEQ};
+
+#[test]
+fn test_xeq_commits_in_cycle_order() {
+  let mut q = XEQ::new();
+  q.push(FIFOPop::new(200, "late"));
+  q.push(FIFOPop::new(150, "early"));
+  assert!(q.pop(100).is_none());
+  assert_eq!(q.pop(200).map(|e| e.pusher()), Some("early"));
+  assert_eq!(q.pop(200).map(|e| e.pusher()), Some("late"));
+  assert!(q.pop(200).is_none());
+  assert!(q.is_empty());
+}
+
+#[test]
+fn test_xeq_slot_reuse_across_cycles() {
+  let mut q = XEQ::new();
+  for stamp in (100..10_000).step_by(100) {
+    q.push(FIFOPop::new(stamp + 50, "pusher"));
+    assert_eq!(q.pop(stamp + 50).map(|e| e.cycle()), Some(stamp + 50));
+  }
+  assert!(q.is_empty());
+}
+
+#[test]
+#[should_panic(expected = "Already occupied by first, cannot accept second!")]
+fn test_xeq_conflict_panics() {
+  let mut q = XEQ::new();
+  q.push(FIFOPop::new(150, "first"));
+  q.push(FIFOPop::new(150, "second"));
+}
+
+#[test]
+fn test_array_tick_last_writer_wins() {
+  let mut array: Array<u32> = Array::new_with_ports(4, 3);
+  assert!(!array.is_dirty());
+  array.write(0, ArrayWrite::new(150, 1, 10, "port0"));
+  array.write(1, ArrayWrite::new(150, 1, 20, "port1"));
+  array.write(2, ArrayWrite::new(150, 8, 30, "out_of_range"));
+  assert!(array.is_dirty());
+  array.tick(150);
+  assert_eq!(array.payload, vec![0, 20, 0, 0]);
+  assert!(!array.is_dirty());
+}
+
+#[test]
+fn test_fifo_tick_skips_when_idle() {
+  let mut fifo: FIFO<u32> = FIFO::new();
+  assert!(!fifo.is_dirty());
+  fifo.schedule_push(FIFOPush::new(150, 7, "producer"));
+  assert!(fifo.is_dirty());
+  fifo.tick(150);
+  assert_eq!(fifo.front(), Some(&7));
+  assert!(!fifo.is_dirty());
+  fifo.schedule_pop(FIFOPop::new(250, "consumer"));
+  fifo.tick(250);
+  assert!(fifo.is_empty());
+}
+
+#[test]
+fn test_fifo_backpressure_and_counters() {
+  let mut fifo: FIFO<u32> = FIFO::with_capacity(1);
+  assert!(fifo.push_ready());
+  fifo.schedule_push(FIFOPush::new(150, 1, "producer"));
+  fifo.tick(150);
+  assert!(fifo.is_full());
+  assert!(!fifo.push_ready());
+  // A pop in the same cycle frees the slot, like `push_ready` in fifo.sv
+  fifo.schedule_pop(FIFOPop::new(250, "consumer"));
+  assert!(fifo.push_ready());
+  fifo.schedule_push(FIFOPush::new(250, 2, "producer"));
+  fifo.tick(250);
+  assert_eq!(fifo.front(), Some(&2));
+  fifo.schedule_pop(FIFOPop::new(450, "consumer"));
+  fifo.tick(450);
+  assert!(fifo.is_empty());
+  assert_eq!(fifo.high_water_mark(), 1);
+  assert_eq!(fifo.full_cycles(450), 3);
+}
+
+#[test]
+fn test_fifo_overflow_drops_push() {
+  let mut fifo: FIFO<u32> = FIFO::with_capacity(1);
+  fifo.schedule_push(FIFOPush::new(150, 1, "producer"));
+  assert_eq!(fifo.tick(150), None);
+  // Like `push_fire = push_valid & push_ready` in fifo.sv, the push is dropped
+  fifo.schedule_push(FIFOPush::new(250, 2, "producer"));
+  assert_eq!(fifo.tick(250), Some("producer"));
+  assert_eq!(fifo.front(), Some(&1));
+  assert_eq!((fifo.pushes(), fifo.drops()), (1, 1));
+  assert!(!fifo.is_dirty());
+}